@@ -58,6 +58,32 @@ def reconfigure_logger():
     for _handler in logging.getLogger('River System Control Software').handlers:
         logger.addHandler(_handler)
 
+def get_temperatures():
+    """
+    This function reads the temperatures of the NAS box's system board and drives,
+    using the temperature_monitor command.
+
+    Returns:
+        tuple. (system board, HDD 0, HDD 1), as strings, in degrees C.
+
+    Throws:
+        OSError, if temperature_monitor couldn't be run (it only exists on the NAS box).
+
+    Usage:
+        >>> get_temperatures()
+        >>> ("35", "38", "37")
+    """
+
+    temps = []
+
+    for args in (["-b"], ["-c", "0"], ["-c", "1"]):
+        cmd = subprocess.run(["temperature_monitor"]+args,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
+
+        temps.append(cmd.stdout.decode("UTF-8", errors="ignore").split()[-1])
+
+    return tuple(temps)
+
 def nas_logic():
     """
     This control logic runs on the NAS box, and is responsible for:
@@ -125,30 +151,22 @@ def nas_logic():
         logger.error("Error: Couldn't store current tick!")
 
     #---------- Monitor the temperature of the NAS box and the drives ----------
-    #System board temp.
-    cmd = subprocess.run(["temperature_monitor", "-b"],
-                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
-
-    sys_temp = cmd.stdout.decode("UTF-8", errors="ignore").split()[-1]
-
-    #HDD 0 temp.
-    cmd = subprocess.run(["temperature_monitor", "-c", "0"],
-                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
-
-    hdd0_temp = cmd.stdout.decode("UTF-8", errors="ignore").split()[-1]
+    try:
+        sys_temp, hdd0_temp, hdd1_temp = get_temperatures()
 
-    #HDD 1 temp.
-    cmd = subprocess.run(["temperature_monitor", "-c", "1"],
-                         stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
+    except OSError:
+        #Still update the status, so the site shows as up.
+        print("Error: Couldn't read the temperatures!", level="error")
+        logger.error("Error: Couldn't read the temperatures!")
 
-    hdd1_temp = cmd.stdout.decode("UTF-8", errors="ignore").split()[-1]
+        sys_temp = hdd0_temp = hdd1_temp = "Unknown"
 
     #Log temperatures and update in system status table.
     #Check if any of the temps are > 50C.
     hot = False
 
     for temp in (sys_temp, hdd0_temp, hdd1_temp):
-        if int(temp) > 50:
+        if temp.isdigit() and int(temp) > 50:
             hot = True
 
     if not hot:
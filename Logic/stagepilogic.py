@@ -118,8 +118,7 @@ class StagePiReadingsParser():
 
         try:
             g4m0_reading = logiccoretools.get_latest_reading("G4", "M0")
-            g4m0 = g4m0_reading.get_value()
-            self.g4_level = int(g4m0.replace("m", ""))
+            self.g4_level = g4m0_reading.get_numeric_value()
 
         except (RuntimeError, AttributeError) as err:
             self.g4_level = None
@@ -130,14 +129,9 @@ class StagePiReadingsParser():
 
         try:
             g4fs0_reading = logiccoretools.get_latest_reading("G4", "FS0")
-            g4fs0  = g4fs0_reading.get_value()
+            self.g4_full = g4fs0_reading.get_bool_value()
 
-            if not g4fs0 in ("True", "False"):
-                raise AssertionError
-
-            self.g4_full = g4fs0 == "True"
-
-        except (RuntimeError, AssertionError, AttributeError) as err:
+        except (RuntimeError, ValueError, AttributeError) as err:
             self.g4_full = None
             failed_to_get_some_readings = True
 
@@ -146,14 +140,9 @@ class StagePiReadingsParser():
 
         try:
             g4fs1_reading = logiccoretools.get_latest_reading("G4", "FS1")
-            g4fs1  = g4fs1_reading.get_value()
-
-            if not g4fs1 in ("True", "False"):
-                raise AssertionError
-
-            self.g4_empty = g4fs1 == "True"
+            self.g4_empty = g4fs1_reading.get_bool_value()
 
-        except (RuntimeError, AssertionError, AttributeError) as err:
+        except (RuntimeError, ValueError, AttributeError) as err:
             self.g4_empty = None
             failed_to_get_some_readings = True
 
@@ -162,8 +151,7 @@ class StagePiReadingsParser():
 
         try:
             g6m0_reading =  logiccoretools.get_latest_reading("G6", "M0")
-            g6m0  =  g6m0_reading.get_value()
-            self.g6_level = int(g6m0.replace("m", ""))
+            self.g6_level = g6m0_reading.get_numeric_value()
 
         except (RuntimeError, AttributeError) as err:
             self.g6_level = None
@@ -174,14 +162,9 @@ class StagePiReadingsParser():
 
         try:
             g6fs0_reading = logiccoretools.get_latest_reading("G6", "FS0")
-            g6fs0  = g6fs0_reading.get_value()
+            self.g6_is_full = g6fs0_reading.get_bool_value()
 
-            if not g6fs0 in ("True", "False"):
-                raise AssertionError
-
-            self.g6_is_full = g6fs0 == "True"
-
-        except (RuntimeError, AssertionError, AttributeError) as err:
+        except (RuntimeError, ValueError, AttributeError) as err:
             self.g6_is_full = None
             failed_to_get_some_readings = True
             if isinstance(err, AttributeError) and not g6fs0_reading is None:
@@ -189,14 +172,9 @@ class StagePiReadingsParser():
 
         try:
             g6fs1_reading = logiccoretools.get_latest_reading("G6", "FS1")
-            g6fs1  = g6fs1_reading.get_value()
-
-            if not g6fs1 in ("True", "False"):
-                raise AssertionError
-
-            self.g6_is_empty = g6fs1 == "True"
+            self.g6_is_empty = g6fs1_reading.get_bool_value()
 
-        except (RuntimeError, AssertionError, AttributeError) as err:
+        except (RuntimeError, ValueError, AttributeError) as err:
             self.g6_is_empty = None
             failed_to_get_some_readings = True
             if isinstance(err, AttributeError) and not g6fs1_reading is None:
@@ -35,12 +35,12 @@ This is the sumppilogic module, which contains control logic for Sump Pi.
 import sys
 import os
 import logging
-from datetime import datetime
 
 sys.path.insert(0, os.path.abspath('..'))
 
 import config
 from Tools import logiccoretools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 #Don't ask for a logger name, so this works with all modules.
@@ -123,7 +123,7 @@ def sumppi_logic(readings, devices, monitors, reading_interval):
     """
 
     #Call sump water backup function if not Opening Hours
-    timenow = datetime.now()
+    timenow = clocktools.get_clock().now()
 
     hour = int(timenow.hour)
 
@@ -132,9 +132,9 @@ def sumppi_logic(readings, devices, monitors, reading_interval):
         pass #return sumppi_water_backup_control_logic(readings, devices, monitors,
                                                       #reading_interval)
 
-    #Remove the 'mm' from the end of the reading value and convert to int.
+    #Get the reading value as a number, without the 'mm' on the end.
     try:
-        sump_reading = int(readings["SUMP:M0"].get_value().replace("m", ""))
+        sump_reading = readings["SUMP:M0"].get_numeric_value()
 
     except (AttributeError, KeyError):
         print("Error: Error trying to get latest SUMP:M0 reading!", level="error")
@@ -144,8 +144,7 @@ def sumppi_logic(readings, devices, monitors, reading_interval):
         sump_reading = 0
 
     try:
-        butts_reading = int(logiccoretools.get_latest_reading("G4", "M0") \
-                            .get_value().replace("m", ""))
+        butts_reading = logiccoretools.get_latest_reading("G4", "M0").get_numeric_value()
 
     except (RuntimeError, AttributeError):
         print("Error: Error trying to get latest G4:M0 reading!", level="error")
@@ -712,9 +711,9 @@ def sumppi_water_backup_control_logic(readings, devices, monitors, reading_inter
 
     """
 
-    #Remove the 'mm' from the end of the reading value and convert to int.
+    #Get the reading value as a number, without the 'mm' on the end.
     try:
-        sump_reading = int(readings["SUMP:M0"].get_value().replace("m", ""))
+        sump_reading = readings["SUMP:M0"].get_numeric_value()
 
     except (AttributeError, KeyError):
         print("Error: Error trying to get latest SUMP:M0 reading!", level="error")
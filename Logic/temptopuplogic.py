@@ -85,6 +85,7 @@ import datetime
 sys.path.insert(0, os.path.abspath(os.path.split(os.path.dirname(__file__))[0]))
 
 from Tools import logiccoretools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 from Tools.statetools import ControlStateMachineABC, GenericControlState
 
@@ -185,8 +186,7 @@ class TempTopUpReadingsParser():
         # (The G3 site handles the G1, G2 and G3 butts groups.)
         try:
             g3m0_reading =  readings["G3:M0"]
-            g3m0  =  g3m0_reading.get_value()
-            self.g1_level = int(g3m0.replace("m", ""))
+            self.g1_level = g3m0_reading.get_numeric_value()
 
         except (RuntimeError, AttributeError, KeyError) as err:
             self.g1_level = None
@@ -197,14 +197,9 @@ class TempTopUpReadingsParser():
 
         try:
             g3fs0_reading = readings["G3:FS0"]
-            g3fs0  = g3fs0_reading.get_value()
+            self.g1_is_full = g3fs0_reading.get_bool_value()
 
-            if not g3fs0 in ("True", "False"):
-                raise AssertionError
-
-            self.g1_is_full = g3fs0 == "True"
-
-        except (RuntimeError, AssertionError, AttributeError, KeyError) as err:
+        except (RuntimeError, ValueError, AttributeError, KeyError) as err:
             self.g1_is_full = None
             failed_to_get_some_readings = True
 
@@ -213,14 +208,9 @@ class TempTopUpReadingsParser():
 
         try:
             g3fs1_reading = readings["G3:FS1"]
-            g3fs1  = g3fs1_reading.get_value()
-
-            if not g3fs1 in ("True", "False"):
-                raise AssertionError
-
-            self.g1_is_empty = g3fs1 == "True"
+            self.g1_is_empty = g3fs1_reading.get_bool_value()
 
-        except (RuntimeError, AssertionError, AttributeError, KeyError) as err:
+        except (RuntimeError, ValueError, AttributeError, KeyError) as err:
             self.g1_is_empty = None
             failed_to_get_some_readings = True
 
@@ -478,8 +468,8 @@ class TTUIdleState(GenericControlState):
                 self.csm.set_state_by(TTUToppingUpState, self)
 
             elif (parser.g1_needs_top_up()
-                  and datetime.datetime.now().time() >= START_TIME[0]
-                  and datetime.datetime.now().time() <= START_TIME[1]):
+                  and clocktools.get_clock().now().time() >= START_TIME[0]
+                  and clocktools.get_clock().now().time() <= START_TIME[1]):
                 # Start daily top-up
                 self.csm.set_state_by(TTUToppingUpState, self)
 
@@ -526,8 +516,8 @@ class TTUToppingUpState(GenericControlState):
                 self.csm.set_state_by(TTUIdleState, self)
 
             elif (parser.g1_topped_up()
-                  or datetime.datetime.now().time() >= FAILSAFE_END_TIME
-                  or datetime.datetime.now().time() < START_TIME[0]):
+                  or clocktools.get_clock().now().time() >= FAILSAFE_END_TIME
+                  or clocktools.get_clock().now().time() < START_TIME[0]):
                 # Terminate daily top-up
                 self.csm.set_state_by(TTUIdleState, self)
 
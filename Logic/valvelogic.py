@@ -40,6 +40,7 @@ sys.path.insert(0, os.path.abspath('..'))
 
 import config
 from Tools import logiccoretools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 #Don't ask for a logger name, so this works with all modules.
@@ -59,51 +60,72 @@ def reconfigure_logger():
     for _handler in logging.getLogger('River System Control Software').handlers:
         logger.addHandler(_handler)
 
+#How often to check our control state in the database, in seconds.
+#Changes are normally pushed to us by the NAS box, so this is just a consistency check.
+DB_CHECK_INTERVAL = 120
+
+#The time we last checked our control state in the database.
+last_db_check = None
+
 #----- Valve Control Logic (not for Matrix pump) -----
 def valve_logic(devices):
     """
     This control logic is generic and runs on all the gate valves. It does the following:
 
-    - Polls the database and sets valve positions upon request.
+    - Sets valve positions upon request, using the control states pushed to us by
+      the NAS box, and polling the database every DB_CHECK_INTERVAL seconds to make
+      sure we haven't missed anything.
 
     """
 
+    global last_db_check #pylint: disable=global-statement,invalid-name
+
     #Get the sensor name for this valve.
     for valve in config.SITE_SETTINGS[config.SITE_ID]["Devices"]:
         valve_id = valve.split(":")[1]
 
     position = None
+    state = config.CONTROLSTATES.get(valve_id)
 
-    #Check if there's a request for a new valve position.
-    try:
-        state = logiccoretools.get_state(config.SITE_ID, valve_id)
+    #Check the database if we have no pushed state yet, or it's time for a consistency check.
+    if state is None or last_db_check is None or \
+        clocktools.get_clock().time() - last_db_check >= DB_CHECK_INTERVAL:
 
-    except RuntimeError:
-        print("Error: Couldn't get site status!", level="error")
-        logger.error("Error: Couldn't get site status!")
+        try:
+            state = logiccoretools.get_state(config.SITE_ID, valve_id)
 
-    else:
-        if state is not None:
-            request = state[1]
+        except RuntimeError:
+            print("Error: Couldn't get site status!", level="error")
+            logger.error("Error: Couldn't get site status!")
+
+        else:
+            last_db_check = clocktools.get_clock().time()
+
+            if state is not None:
+                config.CONTROLSTATES[valve_id] = tuple(state)
+
+    #Check if there's a request for a new valve position.
+    if state is not None:
+        request = state[1]
 
-            if request != "None":
-                position = int(request.replace("%", ""))
+        if request != "None":
+            position = int(request.replace("%", ""))
 
-                #There's only one device for gate valve pis, the gate valve, so take a shortcut.
-                #Only do anything if the position has changed.
-                if position != devices[0].get_requested_position():
-                    devices[0].set_position(position)
+            #There's only one device for gate valve pis, the gate valve, so take a shortcut.
+            #Only do anything if the position has changed.
+            if position != devices[0].get_requested_position():
+                devices[0].set_position(position)
 
-                    logger.info("New valve position: "+str(position))
-                    print("New valve position: "+str(position))
+                logger.info("New valve position: "+str(position))
+                print("New valve position: "+str(position))
 
-                    try:
-                        logiccoretools.log_event(config.SITE_ID+": New valve position: "
-                                                 + str(position))
+                try:
+                    logiccoretools.log_event(config.SITE_ID+": New valve position: "
+                                             + str(position))
 
-                    except RuntimeError:
-                        print("Error: Couldn't log event!", level="error")
-                        logger.error("Error: Couldn't log event!")
+                except RuntimeError:
+                    print("Error: Couldn't log event!", level="error")
+                    logger.error("Error: Couldn't log event!")
 
     if position is not None:
         try:
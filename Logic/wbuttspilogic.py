@@ -35,12 +35,12 @@ Wendy Butts Pi.
 import sys
 import os
 import logging
-from datetime import datetime
 
 sys.path.insert(0, os.path.abspath('..'))
 
 import config
 from Tools import logiccoretools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 #Don't ask for a logger name, so this works with all modules.
@@ -90,7 +90,7 @@ def wbuttspi_logic(readings, devices, monitors, reading_interval):
     assert reading_interval > 0
 
     #Call wendy butts water backup function if not Opening Hours
-    timenow = datetime.now()
+    timenow = clocktools.get_clock().now()
 
     hour = int(timenow.hour)
 
@@ -172,8 +172,8 @@ def wbuttspi_water_backup_logic(readings, devices, monitors, reading_interval):
 
     """
 
-    #Remove the 'mm' from the end of the reading value and convert to int.
-    wbutts_reading = int(readings["G4:M0"].get_value().replace("m", ""))
+    #Get the reading value as a number, without the 'mm' on the end.
+    wbutts_reading = readings["G4:M0"].get_numeric_value()
 
     #Read the Lady Hanham and Stage high Float Switches so we can stop pumping
     #when all butts are full.
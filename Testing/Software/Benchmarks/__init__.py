@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Benchmarks Package for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This is the Benchmarks package. Each module has a get_benchmarks() function, which
+returns a list of Tools.benchmarktools.Benchmark objects. They are run with
+benchmarks.py, which compares the results with the baselines in baselines.json.
+Baselines depend on the hardware, so they aren't kept in the repository; save
+them on the machine you want to compare on with benchmarks.py -s.
+"""
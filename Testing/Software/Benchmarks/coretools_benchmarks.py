@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Core Tools Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for the Reading class in Tools/coretools.py. Readings are created,
+compared, written out and pickled for every reading taken at every site, so these
+are the cheapest and most frequently run paths in the system.
+"""
+
+#Import modules
+import sys
+import os
+import pickle
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools.benchmarktools import Benchmark
+
+#Fixed inputs, so results are comparable between runs.
+READING_TIME = "2020-09-30 12:01:12.000000"
+READING_EPOCH = 1601467272 #Whole seconds, as the monitors use.
+
+READING = coretools.Reading(READING_TIME, 1000, "G4:M0", "475mm", "OK")
+SAME_READING = coretools.Reading(READING_TIME, 1001, "G4:M0", "475mm", "OK")
+PICKLED_READING = pickle.dumps(READING)
+
+def get_benchmarks():
+    """
+    Returns the benchmarks in this module.
+
+    Returns:
+        list<Benchmark>.
+    """
+
+    #Both kinds of time are just stored, so these take about the same time (epochs
+    #need one more type check). The saving from epochs comes later, when readings
+    #are compared or sorted by time, and when monitors take readings.
+    return [Benchmark("coretools.Reading (from time string)",
+                      lambda: coretools.Reading(READING_TIME, 1000, "G4:M0", "475mm", "OK"),
+                      number=10000),
+
+            Benchmark("coretools.Reading (from epoch)",
+                      lambda: coretools.Reading(READING_EPOCH, 1000, "G4:M0", "475mm", "OK"),
+                      number=10000),
+
+            Benchmark("coretools.Reading.__eq__",
+                      lambda: READING == SAME_READING, number=10000),
+
+            #A new reading each time, so the time has to be formatted, as it does
+            #when a monitor writes out a reading it has just taken.
+            Benchmark("coretools.Reading.as_csv (from epoch)",
+                      lambda: coretools.Reading(READING_EPOCH, 1000, "G4:M0", "475mm",
+                                                "OK").as_csv(),
+                      number=10000),
+
+            Benchmark("coretools.Reading.as_csv",
+                      READING.as_csv, number=10000),
+
+            Benchmark("coretools.Reading pickle.dumps",
+                      lambda: pickle.dumps(READING), number=10000),
+
+            Benchmark("coretools.Reading pickle.loads",
+                      lambda: pickle.loads(PICKLED_READING), number=10000)]
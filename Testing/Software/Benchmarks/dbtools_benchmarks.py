@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Database Tools Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for DatabaseConnection.do_query() in Tools/dbtools.py. Queries make the
+full round trip through the database thread to the stand-in database from
+Tools/simulationtools.py, which is served over loopback like the real one.
+
+.. note::
+    Like the stand-in itself, these need the MySQLdb module to be importable, and
+    the ping command to be available (the database thread pings the NAS box).
+"""
+
+#Import modules
+import sys
+import os
+import time
+import threading
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+import config
+from Tools import coretools
+from Tools import dbtools
+from Tools import simulationtools
+from Tools.benchmarktools import Benchmark
+
+#The NAS box's database is on the same machine, so the stand-in can be used as-is.
+SITE_ID = "NAS"
+
+READING = coretools.Reading("2020-09-30 12:01:12.000000", 1000, "NAS:M0", "475mm", "OK")
+
+class Database:
+    """
+    A DatabaseConnection, connected to a stand-in database.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.connection = None
+        self.server = None
+
+        self.orig_mysql = None
+        self.orig_connection = None
+
+    def setup(self):
+        """Starts the stand-in database and connects to it"""
+        simulationtools.DATABASE = simulationtools.StandInDatabase(config.SITE_SETTINGS)
+
+        manager = simulationtools.DatabaseManager(address=("127.0.0.1", 0), authkey=b"benchmark")
+        self.server = manager.get_server()
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        #So there is a reading to fetch.
+        simulationtools.DATABASE.execute("""INSERT INTO `G4Readings`(`Probe ID`, `Tick`, """
+                                         + """`Measure Time`, `Value`, `Status`) """
+                                         + """VALUES('M0', 1000, '2020-09-30 12:01:12', """
+                                         + """'475mm', 'OK');""")
+
+        self.orig_mysql = dbtools.mysql
+        dbtools.mysql = simulationtools.StandInMySQL(self.server.address, b"benchmark")
+
+        self.orig_connection = config.DBCONNECTION
+        self.connection = dbtools.DatabaseConnection(SITE_ID)
+        self.connection.start_thread()
+
+        for _ in range(100):
+            if self.connection.is_ready() or not self.connection.is_alive():
+                break
+
+            time.sleep(0.1)
+
+        if not self.connection.is_ready():
+            self.teardown()
+            raise RuntimeError("Couldn't connect to the stand-in database")
+
+    def teardown(self):
+        """Stops the database thread and the stand-in, and puts everything back"""
+        config.EXITING = True
+
+        #wait_exit() would wait forever if the thread died while starting up.
+        if self.connection.is_alive():
+            self.connection.wait_exit()
+
+        config.EXITING = False
+
+        config.DBCONNECTION = self.orig_connection
+        dbtools.mysql = self.orig_mysql
+
+        self.server.stop_event.set()
+        simulationtools.DATABASE = None
+
+    def store_reading(self):
+        """Stores a reading"""
+        self.connection.store_reading(READING)
+
+    def get_latest_reading(self):
+        """Fetches the latest reading"""
+        self.connection.get_latest_reading("G4", "M0")
+
+def get_benchmarks():
+    """
+    Returns the benchmarks in this module.
+
+    Returns:
+        list<Benchmark>.
+    """
+
+    database = Database()
+
+    return [Benchmark("dbtools.DatabaseConnection.do_query (INSERT)",
+                      database.store_reading, number=20, setup=database.setup,
+                      teardown=database.teardown),
+
+            Benchmark("dbtools.DatabaseConnection.do_query (SELECT)",
+                      database.get_latest_reading, number=20, setup=database.setup,
+                      teardown=database.teardown)]
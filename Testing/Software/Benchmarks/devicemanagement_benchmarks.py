@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Device Management Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for the ManageHallEffectProbe class in Tools/devicemanagement.py. The
+ADC is replaced with a stand-in that returns fixed voltages straight away, so the
+time measured is the bus manager, the compensation and the band lookup.
+"""
+
+#Import modules
+import sys
+import os
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+import config
+from Tools import deviceobjects
+from Tools import devicemanagement as device_mgmt
+from Tools import i2ctools
+from Tools import testingtools
+from Tools.benchmarktools import Benchmark
+
+PROBE_ID = "G4:M0"
+ADC_ADDRESS = 0x48
+
+#The probe is at 475mm, so the sensor on channel 3 in band 4 is in the middle of
+#its band, and the other channels are at rest. See testingtools.HallEffectProbeModel.
+LEVEL_BAND = 4
+LEVEL_CHANNEL = 3
+
+class HallEffectProbe:
+    """
+    A ManageHallEffectProbe, reading from a stand-in ADC.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.mgmtclass = None
+        self.orig_bus_manager = None
+        self.orig_start = None
+
+    def setup(self):
+        """Creates the probe and its management class, without starting its thread"""
+        settings = config.SITE_SETTINGS["G4"]["Probes"][PROBE_ID]
+
+        backend = i2ctools.StandInBackend()
+
+        for channel in range(4):
+            voltage = testingtools.REST_VOLTAGE
+
+            if channel == LEVEL_CHANNEL:
+                voltage -= (settings["HighLimits"][LEVEL_BAND]
+                            + settings["LowLimits"][LEVEL_BAND]) / 2
+
+            backend.set_voltage(ADC_ADDRESS, channel, voltage)
+
+        self.orig_bus_manager = device_mgmt.BUS_MANAGER
+        device_mgmt.BUS_MANAGER = i2ctools.I2CBusManager(backend)
+
+        probe = deviceobjects.HallEffectProbe(PROBE_ID, settings["Name"])
+        probe.set_limits(settings["HighLimits"], settings["LowLimits"])
+        probe.set_depths([settings["Depths100s"], settings["Depths25s"],
+                          settings["Depths50s"], settings["Depths75s"]])
+
+        #Don't start the thread - the benchmarks call its methods directly.
+        self.orig_start = device_mgmt.ManageHallEffectProbe.start
+        device_mgmt.ManageHallEffectProbe.start = lambda self: None
+
+        try:
+            self.mgmtclass = device_mgmt.ManageHallEffectProbe(probe, ADC_ADDRESS)
+
+        finally:
+            device_mgmt.ManageHallEffectProbe.start = self.orig_start
+
+    def teardown(self):
+        """Puts everything back"""
+        device_mgmt.BUS_MANAGER = self.orig_bus_manager
+
+    def get_compensated_probe_voltages(self):
+        """Reads and compensates the voltages, and clears the stand-in's record of reads"""
+        self.mgmtclass.get_compensated_probe_voltages()
+        self.mgmtclass.bus.backend.reads.clear()
+
+    def get_level(self):
+        """Gets the level, and clears the stand-in's record of reads"""
+        self.mgmtclass.get_level()
+        self.mgmtclass.bus.backend.reads.clear()
+
+def get_benchmarks():
+    """
+    Returns the benchmarks in this module.
+
+    Returns:
+        list<Benchmark>.
+    """
+
+    probe = HallEffectProbe()
+
+    return [Benchmark("devicemanagement.ManageHallEffectProbe.get_compensated_probe_voltages",
+                      probe.get_compensated_probe_voltages, number=5000,
+                      setup=probe.setup, teardown=probe.teardown),
+
+            Benchmark("devicemanagement.ManageHallEffectProbe.get_level",
+                      probe.get_level, number=5000, setup=probe.setup,
+                      teardown=probe.teardown)]
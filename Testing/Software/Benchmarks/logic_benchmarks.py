@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Control Logic Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for one step of the control logic state machines in Logic/stagepilogic.py
+and Logic/temptopuplogic.py. The readings and devices come from the water models
+used by the unit tests, so the time measured is the logic itself.
+"""
+
+#Import modules
+import sys
+import os
+import datetime
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+import Tools.logiccoretools
+from Tools import clocktools
+from Logic import stagepilogic
+from Logic import temptopuplogic
+from Tools.benchmarktools import Benchmark
+
+from UnitTests.Logic.stagepilogic_tests import stagePiWaterModel
+from UnitTests.Logic.temptopuplogic_tests import tempTopUpWaterModel, TempTopUpFakeSolenoid
+
+#Temp top up depends on the time of day, so use a fixed time outside its window.
+TEMPTOPUP_TIME = datetime.datetime(2020, 9, 30, 12, 0).timestamp()
+
+class StagePi:
+    """
+    The Stage Pi control logic, with the levels in G4 and G6 from a water model.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.water_model = None
+        self.logic = None
+
+    def setup(self):
+        """Creates the water model and the state machine"""
+        self.water_model = stagePiWaterModel(500, 500)
+        self.water_model.overrideFunctions(Tools.logiccoretools)
+
+        self.logic = stagepilogic.StagePiControlLogic()
+
+    def teardown(self):
+        """Puts everything back"""
+        self.water_model.unOverrideFunctions()
+
+    def do_logic(self):
+        """Does one step of the control logic"""
+        self.logic.do_logic(30)
+
+class TempTopUp:
+    """
+    The temporary top up control logic, with the level in G1 from a water model.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.water_model = None
+        self.logic = None
+        self.orig_clock = None
+
+    def setup(self):
+        """Creates the water model and the state machine"""
+        self.water_model = tempTopUpWaterModel(600)
+        self.water_model.overrideFunctions(Tools.logiccoretools)
+
+        temptopuplogic.readings = self.water_model.getReadingsDict("G1", "G2", "G3")
+        temptopuplogic.solenoid = TempTopUpFakeSolenoid(self.water_model)
+
+        #Time only moves when a thread sleeps on the clock, and do_logic() doesn't.
+        self.orig_clock = clocktools.get_clock()
+        clocktools.set_clock(clocktools.VirtualClock(start=TEMPTOPUP_TIME))
+
+        self.logic = temptopuplogic.TempTopUpControlLogic()
+
+    def teardown(self):
+        """Puts everything back"""
+        clocktools.set_clock(self.orig_clock)
+
+        temptopuplogic.readings = {}
+        temptopuplogic.solenoid = None
+
+        self.water_model.unOverrideFunctions()
+
+    def do_logic(self):
+        """Does one step of the control logic"""
+        self.logic.do_logic(30)
+
+def get_benchmarks():
+    """
+    Returns the benchmarks in this module.
+
+    Returns:
+        list<Benchmark>.
+    """
+
+    stagepi = StagePi()
+    temptopup = TempTopUp()
+
+    return [Benchmark("stagepilogic.StagePiControlLogic.do_logic", stagepi.do_logic,
+                      number=2000, setup=stagepi.setup, teardown=stagepi.teardown),
+
+            Benchmark("temptopuplogic.TempTopUpControlLogic.do_logic", temptopup.do_logic,
+                      number=2000, setup=temptopup.setup, teardown=temptopup.teardown)]
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Monitor Tools Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for BaseMonitorClass.handle_reading() in Tools/monitortools.py. The
+readings file is written to a temporary directory, and the database isn't used.
+"""
+
+#Import modules
+import sys
+import os
+import shutil
+import tempfile
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools import monitortools
+from Tools import logiccoretools
+from Tools.benchmarktools import Benchmark
+
+READING_EPOCH = 1601467272
+
+class Monitor:
+    """
+    A BaseMonitorClass, writing to a readings file in a temporary directory.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.monitor = None
+        self.previous_reading = None
+        self.tick = 0
+
+        self.orig_directory = None
+        self.directory = None
+        self.orig_store_reading = None
+
+    def setup(self):
+        """Creates the monitor and opens its readings file"""
+        self.orig_directory = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+
+        #The readings would be stored in the database as well.
+        self.orig_store_reading = logiccoretools.store_reading
+        logiccoretools.store_reading = lambda reading: None
+
+        self.monitor = monitortools.BaseMonitorClass("SUMP", "M0")
+        self.monitor.create_file_handle()
+
+        self.previous_reading = coretools.Reading(READING_EPOCH, 0, "SUMP:M0", "475mm", "OK")
+        self.tick = 0
+
+    def teardown(self):
+        """Closes the readings file and puts everything back"""
+        self.monitor.close_files()
+
+        logiccoretools.store_reading = self.orig_store_reading
+
+        os.chdir(self.orig_directory)
+        shutil.rmtree(self.directory)
+
+    def new_value(self):
+        """Handles a reading with a different value to the last one"""
+        self.tick += 1
+        value = "500mm" if self.tick % 2 else "475mm"
+
+        self.previous_reading = self.monitor.handle_reading(
+            coretools.Reading(READING_EPOCH + self.tick, self.tick, "SUMP:M0", value, "OK"),
+            self.previous_reading)[0]
+
+    def same_value(self):
+        """Handles a reading with the same value as the last one"""
+        self.tick += 1
+
+        self.previous_reading = self.monitor.handle_reading(
+            coretools.Reading(READING_EPOCH + self.tick, self.tick, "SUMP:M0", "475mm", "OK"),
+            self.previous_reading)[0]
+
+def get_benchmarks():
+    """
+    Returns the benchmarks in this module.
+
+    Returns:
+        list<Benchmark>.
+    """
+
+    monitor = Monitor()
+
+    return [Benchmark("monitortools.BaseMonitorClass.handle_reading (new value)",
+                      monitor.new_value, number=10000, setup=monitor.setup,
+                      teardown=monitor.teardown),
+
+            Benchmark("monitortools.BaseMonitorClass.handle_reading (same value)",
+                      monitor.same_value, number=10000, setup=monitor.setup,
+                      teardown=monitor.teardown)]
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Sockets Tools Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Benchmarks for the Sockets class in Tools/sockettools.py. Messages are framed,
+sent and parsed over a real loopback connection, without the handler thread, so
+the time measured is the time spent in Sockets itself.
+"""
+
+#Import modules
+import sys
+import os
+import time
+import select
+import threading
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+import config
+from Tools import coretools
+from Tools import sockettools
+from Tools.benchmarktools import Benchmark
+
+#The port used for the loopback connection.
+PORT_NUMBER = 30100
+
+#How many messages are sent each time.
+MESSAGES = 100
+
+#Nothing subscribes to this sensor, so its readings go to the incoming queue.
+READING = coretools.Reading("2020-09-30 12:01:12.000000", 1000, "SUMP:M0", "475mm", "OK")
+
+#The sites that forwarded messages are addressed to.
+FORWARD_SITES = ("G4", "G6", "VALVE4", "VALVE12")
+
+class select_no_wait: #pylint: disable=invalid-name
+    """
+    Replaces the select module in sockettools. read_pending_messages() waits for up
+    to a second for data that never comes, which would swamp the time spent reading.
+    """
+
+    @classmethod
+    def select(cls, rlist, wlist, xlist, timeout): #pylint: disable=unused-argument
+        """Like select.select(), but never waits"""
+        return select.select(rlist, wlist, xlist, 0)
+
+class Loopback:
+    """
+    A Socket and a Plug, connected over loopback, for the benchmarks that send
+    messages.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.socket = None
+        self.plug = None
+        self.orig_sockets_list = None
+        self.orig_send_reading_batches = None
+
+    def setup(self):
+        """Connects the Socket and the Plug"""
+        self.orig_sockets_list = config.SOCKETSLIST
+        config.SOCKETSLIST = []
+
+        #Readings are sent in batches, as they will be once every site can receive them.
+        self.orig_send_reading_batches = config.SEND_READING_BATCHES
+        config.SEND_READING_BATCHES = True
+
+        sockettools.select = select_no_wait
+
+        self.socket = sockettools.Sockets("Socket", "NAS", "Benchmark Socket")
+        self.socket.set_portnumber(PORT_NUMBER)
+        self.socket.set_server_address("127.0.0.1")
+
+        self.plug = sockettools.Sockets("Plug", "SUMP", "Benchmark Plug")
+        self.plug.set_portnumber(PORT_NUMBER)
+        self.plug.set_server_address("127.0.0.1")
+
+        #The socket has to be accepting connections before the plug connects.
+        thread = threading.Thread(target=self.socket.create_and_connect)
+        thread.start()
+
+        for _ in range(50):
+            time.sleep(0.1)
+            self.plug.create_and_connect()
+
+            if self.plug.ready_to_send:
+                break
+
+        thread.join()
+
+        if not (self.socket.ready_to_send and self.plug.ready_to_send):
+            raise RuntimeError("Couldn't connect over loopback on port "+str(PORT_NUMBER))
+
+    def teardown(self):
+        """Closes the connection and puts everything back"""
+        self.socket.reset()
+        self.plug.reset()
+
+        sockettools.select = select
+        config.SOCKETSLIST = self.orig_sockets_list
+        config.SEND_READING_BATCHES = self.orig_send_reading_batches
+
+    def send_readings(self):
+        """Sends MESSAGES readings from the plug to the socket, which are batched"""
+        for _ in range(MESSAGES):
+            self.plug.write(READING)
+
+        self._send_and_receive()
+
+    def send_strings(self):
+        """Sends MESSAGES strings from the plug to the socket, one frame each"""
+        for _ in range(MESSAGES):
+            self.plug.write("Valve Position 25")
+
+        self._send_and_receive()
+
+    def _send_and_receive(self):
+        """Sends the plug's queue, and reads until it has all arrived at the socket"""
+        self.plug.send_pending_messages()
+
+        while len(self.socket.in_queue) < MESSAGES:
+            self.socket.read_pending_messages()
+
+        self.socket.in_queue.clear()
+
+class Forwarding:
+    """
+    Sockets for several sites, as on the NAS box, for the forward_messages()
+    benchmark. They aren't connected, because forwarding only queues the messages.
+    """
+
+    def __init__(self):
+        """The constructor"""
+        self.socket = None
+        self.orig_sockets_list = None
+
+    def setup(self):
+        """Creates the sockets"""
+        self.orig_sockets_list = config.SOCKETSLIST
+        config.SOCKETSLIST = []
+
+        for site_id in FORWARD_SITES:
+            _socket = sockettools.Sockets("Socket", "NAS", site_id+" Socket")
+            _socket.server_address = config.SITE_SETTINGS[site_id]["IPAddress"]
+
+        self.socket = config.SOCKETSLIST[0]
+
+    def teardown(self):
+        """Puts everything back"""
+        config.SOCKETSLIST = self.orig_sockets_list
+
+    def forward(self):
+        """Forwards MESSAGES messages, spread over the sites"""
+        for i in range(MESSAGES):
+            self.socket.forward_queue.append("*"+FORWARD_SITES[i % len(FORWARD_SITES)]
+                                             + "* Valve Position 25")
+
+        self.socket.forward_messages()
+
+        for _socket in config.SOCKETSLIST:
+            _socket.out_queue.clear()
+
+def get_benchmarks():
+    """
+    Returns the benchmarks in this module.
+
+    Returns:
+        list<Benchmark>.
+    """
+
+    loopback = Loopback()
+    forwarding = Forwarding()
+
+    return [Benchmark("sockettools.Sockets loopback (readings)", loopback.send_readings,
+                      number=100, operations=MESSAGES, setup=loopback.setup,
+                      teardown=loopback.teardown),
+
+            Benchmark("sockettools.Sockets loopback (strings)", loopback.send_strings,
+                      number=100, operations=MESSAGES, setup=loopback.setup,
+                      teardown=loopback.teardown),
+
+            Benchmark("sockettools.Sockets.forward_messages", forwarding.forward,
+                      number=100, operations=MESSAGES, setup=forwarding.setup,
+                      teardown=forwarding.teardown)]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Whole-site simulation for the River System Control and Monitoring Software
+# This file is part of the River System Control and Monitoring Software.
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import time
+import sys
+import os
+import getopt
+
+sys.path.insert(0, os.path.abspath('../../../'))
+
+def usage():
+    """
+    This function is used to output help information to the standard output
+    if the user passes invalid/incorrect commandline arguments.
+
+    Usage:
+
+    >>> usage()
+    """
+
+    print("\nUsage: site_simulation.py [OPTION]\n\n")
+    print("Runs the NAS box and every site on this machine, with simulated hardware")
+    print("and a stand-in database, and reports latency, load and queue depths.\n")
+    print("Options:\n")
+    print("       -h, --help:                   Show this help message")
+    print("       -s, --sites:                  Comma-separated site IDs to run (default all)")
+    print("       -n, --extrasites:             The number of synthetic sites to add")
+    print("       -d, --duration:               How long to run for, in seconds (default")
+    print("                                     until CTRL-C is pressed)")
+    print("       -p, --portoffset:             Added to every site's server port")
+    print("       -o, --output:                 Where the sites keep their files")
+    print("                                     (default a temporary directory)")
+    print("site_simulation.py is released under the GNU GPL Version 3")
+    print("Copyright (C) Wimborne Model Town 2017-2022")
+
+def run_standalone():
+    sites = None
+    extra_sites = 0
+    duration = None
+    port_offset = 0
+    directory = None
+
+    #Check all cmdline options are valid.
+    try:
+        opts = getopt.getopt(sys.argv[1:], "hs:n:d:p:o:",
+                             ["help", "sites=", "extrasites=", "duration=", "portoffset=",
+                              "output="])[0]
+
+    except getopt.GetoptError as err:
+        #Invalid option. Show the help message and then exit.
+        #Show the error.
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    #Do setup. o=option, a=argument.
+    for opt, arg in opts:
+        if opt in ("-s", "--sites"):
+            sites = ["NAS"] + [site_id for site_id in arg.split(",") if site_id != "NAS"]
+
+        elif opt in ("-n", "--extrasites"):
+            extra_sites = int(arg)
+
+        elif opt in ("-d", "--duration"):
+            duration = float(arg)
+
+        elif opt in ("-p", "--portoffset"):
+            port_offset = int(arg)
+
+        elif opt in ("-o", "--output"):
+            directory = os.path.abspath(arg)
+
+        elif opt in ("-h", "--help"):
+            usage()
+            sys.exit()
+
+        else:
+            assert False, "unhandled option"
+
+    #Do required imports.
+    from Tools import simulationtools
+
+    simulationtools.logger = logger
+
+    simulation = simulationtools.SiteSimulation(sites, extra_sites, port_offset, directory)
+
+    print("Testing. Please stand by...")
+
+    simulation.start()
+
+    try:
+        while duration is None or time.time() - simulation.start_time < duration:
+            time.sleep(simulationtools.REPORT_INTERVAL)
+
+            simulation.update()
+            print(simulationtools.format_report(simulation.get_report())+"\n")
+
+    except KeyboardInterrupt:
+        pass
+
+    #Clean up.
+    simulation.stop()
+
+    print("\nFinal report:")
+    print(simulationtools.format_report(simulation.get_report()))
+
+if __name__ == "__main__":
+    #Set up basic logging to stdout.
+    logger = logging
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s: %(message)s', datefmt='%d/%m/%Y %I:%M:%S %p', level=logging.INFO)
+
+    run_standalone()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Archive Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import math
+import shutil
+import datetime
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools import clocktools
+from Tools import archivetools
+
+class TestConversionFunctions(unittest.TestCase):
+    """
+    This test class tests the value and status conversion functions in
+    Tools/archivetools.py
+    """
+
+    def test_encode_value_1(self):
+        """Test that values are converted to numbers correctly"""
+        for value, expected in (("400", 400.0), ("12.5", 12.5), ("True", 1.0),
+                                ("False", 0.0), ("400mm", 400.0), ("50%", 50.0)):
+
+            self.assertEqual(archivetools.encode_value(value), expected)
+
+    def test_encode_value_2(self):
+        """Test that values that aren't numbers are stored as NaN"""
+        self.assertTrue(math.isnan(archivetools.encode_value("Unknown")))
+        self.assertTrue(math.isnan(archivetools.encode_value("")))
+
+    def test_encode_status_1(self):
+        """Test that statuses are converted to status codes correctly"""
+        self.assertEqual(archivetools.encode_status("OK"), 0)
+        self.assertEqual(archivetools.encode_status("FAULT DETECTED"), 1)
+        self.assertEqual(archivetools.encode_status("FAULT DETECTED: Jammed"), 1)
+        self.assertEqual(archivetools.encode_status("Unknown"), archivetools.STATUS_OTHER)
+
+class TestArchiveWriter(unittest.TestCase):
+    """
+    This test class tests the ArchiveWriter class and the loader functions in
+    Tools/archivetools.py
+    """
+
+    def setUp(self):
+        self.directory = "archivetests"
+        self.writer = archivetools.ArchiveWriter("G4:M0", directory=self.directory,
+                                                 flush_records=1000)
+
+        self.file_name = archivetools.get_archive_name("G4:M0", 2020, self.directory)
+
+    def tearDown(self):
+        self.writer.close()
+
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+        del self.writer
+        del self.directory
+        del self.file_name
+
+    def write_days(self, days, readings_per_day):
+        """Writes readings_per_day readings for each of the given days in 2020"""
+        tick = 0
+
+        for day in days:
+            start = datetime.datetime(2020, 1, 1) + datetime.timedelta(days=day)
+
+            for minute in range(readings_per_day):
+                tick += 1
+                self.writer.write_record(start + datetime.timedelta(minutes=minute), tick,
+                                         float(minute), 0)
+
+    def test_constructor_1(self):
+        """Test that sensor IDs that are too long to store are rejected"""
+        self.assertRaises(ValueError, archivetools.ArchiveWriter, "G4:"+("M" * 40))
+
+    def test_write_1(self):
+        """Test that a reading is written, and can be read back"""
+        reading = coretools.Reading("2020-09-30 12:01:12", 7, "G4:M0", "400", "OK")
+
+        self.writer.write(reading)
+        self.writer.flush()
+
+        records = archivetools.load_archive(self.file_name)
+
+        self.assertEqual(len(records), 1)
+        self.assertEqual(records["time"][0],
+                         datetime.datetime(2020, 9, 30, 12, 1, 12).timestamp())
+
+        self.assertEqual(records["value"][0], 400.0)
+        self.assertEqual(records["tick"][0], 7)
+        self.assertEqual(records["status"][0], 0)
+
+    def test_write_2(self):
+        """Test that records are buffered until enough are waiting"""
+        self.writer.flush_records = 3
+        self.write_days([0], 2)
+
+        self.assertEqual(len(archivetools.load_archive(self.file_name)), 0)
+
+        self.write_days([1], 1)
+
+        self.assertEqual(len(archivetools.load_archive(self.file_name)), 3)
+
+    def test_write_3(self):
+        """Test that the index records the first record of each day"""
+        self.write_days([0, 1, 5], 10)
+        self.writer.close()
+
+        header = archivetools.read_header(self.file_name)
+
+        self.assertEqual(header.sensor_id, "G4:M0")
+        self.assertEqual(header.year, 2020)
+        self.assertEqual(header.index[:3], (0, 10, archivetools.NO_RECORDS))
+        self.assertEqual(header.index[5], 20)
+
+    def test_write_4(self):
+        """Test that existing archives are appended to"""
+        self.write_days([0], 10)
+        self.writer.close()
+
+        writer = archivetools.ArchiveWriter("G4:M0", directory=self.directory)
+        writer.write_record(datetime.datetime(2020, 1, 3), 11, 1.0, 0)
+        writer.close()
+
+        self.assertEqual(len(archivetools.load_archive(self.file_name)), 11)
+        self.assertEqual(archivetools.read_header(self.file_name).index[2], 10)
+
+    def test_write_5(self):
+        """Test that a partly-written record at the end of an archive is removed"""
+        self.write_days([0], 10)
+        self.writer.close()
+
+        with open(self.file_name, "ab") as archive:
+            archive.write(b"\x01\x02\x03")
+
+        self.assertEqual(len(archivetools.load_archive(self.file_name)), 10)
+
+        self.write_days([1], 1)
+        self.writer.close()
+
+        self.assertEqual(len(archivetools.load_archive(self.file_name)), 11)
+        self.assertEqual(os.path.getsize(self.file_name),
+                         archivetools.HEADER_SIZE + (11 * archivetools.RECORD_SIZE))
+
+    def test_write_6(self):
+        """Test that a new file is started for a new year"""
+        self.write_days([365], 1)
+        self.writer.write_record(datetime.datetime(2021, 1, 1), 2, 1.0, 0)
+        self.writer.close()
+
+        self.assertEqual(len(archivetools.load_year("G4:M0", 2020, self.directory)), 1)
+        self.assertEqual(len(archivetools.load_year("G4:M0", 2021, self.directory)), 1)
+
+    def test_write_7(self):
+        """Test that buffered records are written after flush_interval seconds on the clock"""
+        clock = clocktools.VirtualClock(start=1601460000)
+        clocktools.set_clock(clock)
+
+        try:
+            self.writer.close()
+            self.writer = archivetools.ArchiveWriter("G4:M0", directory=self.directory,
+                                                     flush_records=1000, flush_interval=60)
+
+            self.write_days([0], 2)
+            self.assertEqual(len(archivetools.load_archive(self.file_name)), 0)
+
+            clock.advance(60)
+            self.write_days([1], 1)
+
+            self.assertEqual(len(archivetools.load_archive(self.file_name)), 3)
+
+        finally:
+            clocktools.set_clock(clocktools.RealClock())
+
+    def test_open_1(self):
+        """Test that archives for other sensors are rejected"""
+        self.write_days([0], 1)
+        self.writer.close()
+
+        writer = archivetools.ArchiveWriter("G4:M0", directory=self.directory)
+        os.rename(self.file_name, archivetools.get_archive_name("G4:M1", 2020, self.directory))
+        writer.sensor_id = "G4:M1"
+
+        self.assertRaises(ValueError, writer.open, 2020)
+
+    def test_read_header_1(self):
+        """Test that files that aren't archives are rejected"""
+        os.mkdir(self.directory)
+
+        with open(self.file_name, "wb") as archive:
+            archive.write(b"TIME,SYSTEM TICK,ID,VALUE,STATUS\n" * 100)
+
+        self.assertRaises(ValueError, archivetools.read_header, self.file_name)
+
+    def test_load_archive_1(self):
+        """Test that days can be loaded using the index"""
+        self.write_days([0, 1, 2, 5], 10)
+        self.writer.close()
+
+        records = archivetools.load_archive(self.file_name, start=datetime.date(2020, 1, 2),
+                                            end=datetime.date(2020, 1, 3))
+
+        self.assertEqual(len(records), 20)
+        self.assertEqual(records["tick"][0], 11)
+        self.assertEqual(records["tick"][-1], 30)
+
+        #Days without records.
+        records = archivetools.load_archive(self.file_name, start=datetime.date(2020, 1, 4),
+                                            end=datetime.date(2020, 1, 5))
+
+        self.assertEqual(len(records), 0)
+
+        records = archivetools.load_archive(self.file_name, start=datetime.date(2020, 1, 4))
+
+        self.assertEqual(len(records), 10)
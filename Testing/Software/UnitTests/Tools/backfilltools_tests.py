@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Backfill Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import shutil
+import time
+import datetime
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools import logiccoretools
+from Tools import backfilltools
+
+def make_readings(start, count, interval=15):
+    """Returns (time, Reading) tuples, interval seconds apart, from start"""
+    readings = []
+
+    for number in range(count):
+        reading_time = start + datetime.timedelta(seconds=number * interval)
+        readings.append((reading_time.timestamp(),
+                         coretools.Reading(reading_time.strftime("%Y-%m-%d %H:%M:%S"), number,
+                                           "G4:M0", str(400 + number), "OK")))
+
+    return readings
+
+class TestFindMissing(unittest.TestCase):
+    """
+    This test class tests the find_missing() function in Tools/backfilltools.py
+    """
+
+    def setUp(self):
+        #Ten minutes of readings, every 15 seconds.
+        self.start = datetime.datetime(2020, 9, 30, 10, 0, 0)
+        self.readings = make_readings(self.start, 40)
+
+        #The database has all of them.
+        self.coverage = {}
+
+        for minute in range(10):
+            bucket = ((10 * 3600) + (minute * 60)) // 60
+            first = self.start + datetime.timedelta(minutes=minute)
+
+            self.coverage[bucket] = (4, first, first + datetime.timedelta(seconds=45))
+
+    def tearDown(self):
+        del self.start
+        del self.readings
+        del self.coverage
+
+    def test_find_missing_1(self):
+        """Test that nothing is missing when the database has all the readings"""
+        self.assertEqual(backfilltools.find_missing(self.readings, self.coverage, 7.5), [])
+
+    def test_find_missing_2(self):
+        """Test that whole minutes the database doesn't have are missing"""
+        del self.coverage[601]
+        del self.coverage[602]
+
+        missing = backfilltools.find_missing(self.readings, self.coverage, 7.5)
+
+        self.assertEqual([reading.get_tick() for reading in missing], list(range(4, 12)))
+
+    def test_find_missing_3(self):
+        """Test that the start and end of an outage in the middle of a minute are found"""
+        #The outage started 30 seconds into minute 2, and ended 15 seconds into minute 4.
+        first = self.start + datetime.timedelta(minutes=2)
+        self.coverage[602] = (2, first, first + datetime.timedelta(seconds=15))
+        del self.coverage[603]
+
+        first = self.start + datetime.timedelta(minutes=4, seconds=30)
+        self.coverage[604] = (2, first, first + datetime.timedelta(seconds=15))
+
+        missing = backfilltools.find_missing(self.readings, self.coverage, 7.5)
+
+        self.assertEqual([reading.get_tick() for reading in missing], list(range(10, 18)))
+
+class TestBackfillDay(unittest.TestCase):
+    """
+    This test class tests the backfill_day() function in Tools/backfilltools.py
+    """
+
+    def setUp(self):
+        #Make sure it won't exit immediately.
+        backfilltools.config.EXITING = False
+
+        self.directory = "backfilltests"
+        os.mkdir(self.directory)
+
+        #A readings file with 40 readings, every 15 seconds.
+        self.date = datetime.date(2020, 9, 30)
+
+        with open(os.path.join(self.directory, "G4:M0-2020-09-30.csv"), "w",
+                  encoding="utf-8") as readings_file:
+
+            readings_file.write("\n\nStart Time: 2020-09-30 10:00:00\n\n"
+                                + "\nTIME,SYSTEM TICK,ID,VALUE,STATUS\n")
+
+            for time_and_reading in make_readings(datetime.datetime(2020, 9, 30, 10), 40):
+                readings_file.write("\n"+time_and_reading[1].as_csv())
+
+        #The database has none of them.
+        self.coverage = {}
+        self.stored = []
+        self.queries = 0
+
+        self.orig_get_readings_coverage = logiccoretools.get_readings_coverage
+        self.orig_store_readings = logiccoretools.store_readings
+        self.orig_is_quiet = backfilltools.is_quiet
+        self.orig_batch_size = backfilltools.BATCH_SIZE
+
+        logiccoretools.get_readings_coverage = self.fake_get_readings_coverage
+        logiccoretools.store_readings = self.fake_store_readings
+        backfilltools.is_quiet = lambda: True
+
+    def tearDown(self):
+        logiccoretools.get_readings_coverage = self.orig_get_readings_coverage
+        logiccoretools.store_readings = self.orig_store_readings
+        backfilltools.is_quiet = self.orig_is_quiet
+        backfilltools.BATCH_SIZE = self.orig_batch_size
+
+        shutil.rmtree(self.directory)
+
+    def fake_get_readings_coverage(self, sensor_id, date, bucket_size=60, retries=3):
+        """Returns the coverage set up by the test"""
+        self.assertEqual(sensor_id, "M0")
+        self.assertEqual(date, self.date)
+        self.queries += 1
+
+        return self.coverage
+
+    def fake_store_readings(self, readings, retries=3):
+        """Stores the readings so the test can check them"""
+        self.stored.append(readings)
+
+    def test_backfill_day_1(self):
+        """Test that the missing readings are stored in batches, with one coverage query"""
+        backfilltools.BATCH_SIZE = 15
+
+        self.assertEqual(backfilltools.backfill_day("G4:M0", self.date, self.directory), 40)
+
+        self.assertEqual(self.queries, 1)
+        self.assertEqual([len(batch) for batch in self.stored], [15, 15, 10])
+        self.assertEqual(self.stored[0][0].get_time(), "2020-09-30 10:00:00")
+
+    def test_backfill_day_2(self):
+        """Test that days without readings files don't query the database"""
+        self.assertEqual(backfilltools.backfill_day("G4:M0", datetime.date(2020, 10, 1),
+                                                    self.directory), 0)
+
+        self.assertEqual(self.queries, 0)
+
+    def test_backfill_day_3(self):
+        """Test that we give up if we are exiting while waiting for a quiet period"""
+        backfilltools.is_quiet = lambda: False
+        backfilltools.config.EXITING = True
+
+        try:
+            self.assertIsNone(backfilltools.backfill_day("G4:M0", self.date, self.directory))
+
+        finally:
+            backfilltools.config.EXITING = False
+
+        self.assertEqual(self.stored, [])
+
+class FailingBackfill(backfilltools.Backfill):
+    """A backfill thread whose backfill fails, and then asks everything to exit"""
+
+    def do_backfill(self):
+        """Fails as if a readings file was malformed"""
+        backfilltools.config.EXITING = True
+        raise ValueError("Malformed readings line")
+
+class TestBackfill(unittest.TestCase):
+    """
+    This test class tests the Backfill class in Tools/backfilltools.py
+    """
+
+    def setUp(self):
+        self.orig_start_delay = backfilltools.START_DELAY
+        backfilltools.START_DELAY = 0
+
+    def tearDown(self):
+        backfilltools.START_DELAY = self.orig_start_delay
+        backfilltools.config.EXITING = False
+
+        del self.orig_start_delay
+
+    def test_run_1(self):
+        """Test that the thread still signals that it has exited after an unexpected error"""
+        backfill = FailingBackfill([])
+        backfill.join(10)
+
+        self.assertFalse(backfill.is_alive())
+        self.assertFalse(backfill.is_running)
+
+    def test_run_2(self):
+        """Test that the thread exits straight away when request_exit() is called"""
+        backfilltools.START_DELAY = 600
+        backfill = backfilltools.Backfill([])
+
+        start = time.monotonic()
+        coretools.request_exit()
+        backfill.join(5)
+
+        self.assertFalse(backfill.is_alive())
+        self.assertLess(time.monotonic() - start, 0.5)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Batch Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import shutil
+import pickle
+import datetime
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools import archivetools
+from Tools import batchtools
+
+def make_readings():
+    """Returns some readings from two sensors, including some unusual ones"""
+    readings = []
+
+    for tick in range(6):
+        readings.append(coretools.Reading("2020-09-30 10:00:"+str(10 + (tick * 5)), tick,
+                                          "G4:M0", str(400 + (tick * 10)), "OK"))
+
+    readings.append(coretools.Reading("2020-09-30 10:00:45.250000", 6, "G4:FS0", "True",
+                                      "OK"))
+
+    readings.append(coretools.Reading("2020-09-30 10:00:50", 7, "G4:FS0", "False",
+                                      "FAULT DETECTED: Stuck"))
+
+    readings.append(coretools.Reading("2020-09-30 10:00:55", 8, "G4:M0", "475mm", "OK"))
+    readings.append(coretools.Reading("2020-09-30 10:01:00", 9, "G4:M0", "12.5", "UNKNOWN"))
+
+    return readings
+
+class TestReadingBatch(unittest.TestCase):
+    """
+    This test class tests the ReadingBatch class in Tools/batchtools.py
+    """
+
+    def setUp(self):
+        self.readings = make_readings()
+        self.batch = batchtools.ReadingBatch(self.readings)
+
+    def tearDown(self):
+        del self.readings
+        del self.batch
+
+    def test_constructor_1(self):
+        """Test that readings are stored in columns, with the sensor IDs interned"""
+        self.assertEqual(len(self.batch), len(self.readings))
+        self.assertEqual(self.batch.sensor_ids, ["G4:M0", "G4:FS0"])
+        self.assertEqual(list(self.batch.sensors), [0] * 6 + [1, 1, 0, 0])
+        self.assertEqual(list(self.batch.values[:3]), [400.0, 410.0, 420.0])
+        self.assertEqual(list(self.batch.ticks), list(range(10)))
+
+        #Only the text that can't be recreated is kept.
+        self.assertEqual(sorted(self.batch.texts), [7, 8, 9])
+
+    def test_to_readings_1(self):
+        """Test that readings come back exactly as they went in"""
+        self.assertEqual(self.batch.to_readings(), self.readings)
+
+        for reading, batch_reading in zip(self.readings, self.batch):
+            self.assertEqual(reading.as_csv(), batch_reading.as_csv())
+
+        self.assertEqual(self.batch[-1].as_csv(), self.readings[-1].as_csv())
+
+        with self.assertRaises(IndexError):
+            self.batch.get_row(len(self.readings))
+
+    def test_append_row_1(self):
+        """Test that rows with datetimes, as returned by the database, are added correctly"""
+        batch = batchtools.ReadingBatch()
+        batch.append_row((datetime.datetime(2020, 9, 30, 10, 0, 5), 1, "G4:M0", "400", "OK"))
+
+        self.assertEqual(batch[0].get_time(), "2020-09-30 10:00:05")
+        self.assertEqual(batch.texts, {})
+
+    def test_compare_1(self):
+        """Test that values can be compared with a number"""
+        self.assertEqual([bool(each) for each in self.batch.compare(">=", 450)],
+                         [False] * 5 + [True, False, False, True, False])
+
+        with self.assertRaises(ValueError):
+            self.batch.compare("=>", 450)
+
+    def test_filter_1(self):
+        """Test that readings can be filtered by sensor, time and status"""
+        start = datetime.datetime(2020, 9, 30, 10, 0, 20).timestamp()
+        end = datetime.datetime(2020, 9, 30, 10, 0, 55).timestamp()
+
+        batch = self.batch.filter(sensor_id="G4:M0", start=start, end=end)
+
+        self.assertEqual(batch.to_readings(), self.readings[2:6])
+
+        batch = self.batch.filter(status="FAULT DETECTED")
+
+        self.assertEqual(batch.to_readings(), [self.readings[7]])
+        self.assertEqual(batch[0].get_status(), "FAULT DETECTED: Stuck")
+
+        self.assertEqual(len(self.batch.filter(sensor_id="G6:M0")), 0)
+
+    def test_select_1(self):
+        """Test that readings can be selected with a comparison"""
+        batch = self.batch.select(self.batch.compare(">", 460))
+
+        self.assertEqual(batch.to_readings(), [self.readings[8]])
+        self.assertEqual(batch[0].get_value(), "475mm")
+
+        with self.assertRaises(ValueError):
+            self.batch.select([True])
+
+    def test_to_bytes_1(self):
+        """Test that batches can be serialised and pickled, and are smaller than the readings"""
+        data = self.batch.to_bytes()
+
+        self.assertEqual(batchtools.ReadingBatch.from_bytes(data), self.batch)
+        self.assertEqual(pickle.loads(pickle.dumps(self.batch)), self.batch)
+        self.assertLess(len(pickle.dumps(self.batch)), len(pickle.dumps(self.readings)))
+
+        self.assertEqual(len(batchtools.ReadingBatch.from_bytes(
+            batchtools.ReadingBatch().to_bytes())), 0)
+
+    def test_from_bytes_1(self):
+        """Test that corrupted data is rejected"""
+        data = self.batch.to_bytes()
+
+        for bad_data in (b"", b"XXXX"+data[4:], data[:-1]):
+            with self.assertRaises(ValueError):
+                batchtools.ReadingBatch.from_bytes(bad_data)
+
+class TestFromArchive(unittest.TestCase):
+    """
+    This test class tests exporting readings archives as batches in Tools/batchtools.py
+    """
+
+    def setUp(self):
+        self.directory = "batchtests"
+        os.mkdir(self.directory)
+
+        self.writer = archivetools.ArchiveWriter("G4:M0", self.directory)
+
+        for reading in make_readings():
+            if reading.get_id() == "G4:M0":
+                self.writer.write(reading)
+
+        self.writer.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        del self.directory
+        del self.writer
+
+    def test_from_archive_1(self):
+        """Test that archived readings are exported correctly"""
+        batch = batchtools.ReadingBatch.from_archive(
+            archivetools.get_archive_name("G4:M0", 2020, self.directory))
+
+        self.assertEqual(len(batch), 8)
+        self.assertEqual(batch.sensor_ids, ["G4:M0"])
+
+        self.assertEqual(batch[0].as_csv(), "2020-09-30 10:00:10,0,G4:M0,400,OK")
+
+        #Values are stored as numbers, and only the status codes are archived.
+        self.assertEqual(batch[6].get_value(), "475")
+        self.assertEqual(batch[7].get_status(), "UNKNOWN")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Benchmark Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import gc
+import json
+import shutil
+import tempfile
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import benchmarktools
+
+class TestBenchmark(unittest.TestCase):
+    """
+    This test class tests the Benchmark class in Tools/benchmarktools.py
+    """
+
+    def test_constructor_1(self):
+        """Test that the constructor works when passed valid arguments"""
+        benchmark = benchmarktools.Benchmark("test", int, number=10, operations=5)
+
+        self.assertEqual(benchmark.name, "test")
+        self.assertIs(benchmark.function, int)
+        self.assertEqual((benchmark.number, benchmark.operations), (10, 5))
+        self.assertIsNone(benchmark.setup)
+        self.assertIsNone(benchmark.teardown)
+
+    def test_constructor_2(self):
+        """Test that the constructor fails when passed invalid arguments"""
+        for args in (("", int), (None, int), ("test", int, 0), ("test", int, 1.5),
+                     ("test", int, 10, 0), ("test", int, 10, "5")):
+
+            with self.assertRaises(ValueError):
+                benchmarktools.Benchmark(*args)
+
+class TestMeasure(unittest.TestCase):
+    """
+    This test class tests the measure() and run_benchmarks() functions in
+    Tools/benchmarktools.py
+    """
+
+    def setUp(self):
+        self.calls = []
+
+    def tearDown(self):
+        del self.calls
+
+    def test_measure_1(self):
+        """Test that the function is called the right number of times, between setup and teardown"""
+        benchmark = benchmarktools.Benchmark("test", lambda: self.calls.append("call"),
+                                             number=10, operations=4,
+                                             setup=lambda: self.calls.append("setup"),
+                                             teardown=lambda: self.calls.append("teardown"))
+
+        result = benchmarktools.measure(benchmark, repeat=3)
+
+        #One call to warm up, then 10 for each of the 3 runs.
+        self.assertEqual(self.calls, ["setup"] + ["call"] * 31 + ["teardown"])
+
+        self.assertGreater(result["best"], 0)
+        self.assertLessEqual(result["best"], result["median"])
+
+        #The garbage collector is turned back on afterwards.
+        self.assertTrue(gc.isenabled())
+
+    def test_measure_2(self):
+        """Test that teardown is still run, and the garbage collector turned back on, if the benchmark fails"""
+        def fail():
+            raise RuntimeError("test")
+
+        benchmark = benchmarktools.Benchmark("test", fail,
+                                             teardown=lambda: self.calls.append("teardown"))
+
+        with self.assertRaises(RuntimeError):
+            benchmarktools.measure(benchmark)
+
+        self.assertEqual(self.calls, ["teardown"])
+        self.assertTrue(gc.isenabled())
+
+    def test_run_benchmarks_1(self):
+        """Test that benchmarks that fail are left out of the results"""
+        def fail():
+            raise RuntimeError("test")
+
+        results = benchmarktools.run_benchmarks([benchmarktools.Benchmark("good", int, number=10),
+                                                 benchmarktools.Benchmark("bad", fail)],
+                                                repeat=2)
+
+        self.assertEqual(list(results), ["good"])
+        self.assertEqual(set(results["good"]), {"best", "median"})
+
+class TestBaselines(unittest.TestCase):
+    """
+    This test class tests the load_baselines() and save_baselines() functions in
+    Tools/benchmarktools.py
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "baselines.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+        del self.directory
+        del self.filename
+
+    def test_load_baselines_1(self):
+        """Test that there are no baselines if the file doesn't exist"""
+        self.assertEqual(benchmarktools.load_baselines(self.filename), {})
+
+    def test_load_baselines_2(self):
+        """Test that an invalid baselines file is rejected"""
+        for contents in ("not json", "[1, 2]", "{}"):
+            with open(self.filename, "w", encoding="utf-8") as baselines_file:
+                baselines_file.write(contents)
+
+            with self.assertRaises(ValueError):
+                benchmarktools.load_baselines(self.filename)
+
+    def test_save_baselines_1(self):
+        """Test that saved baselines are loaded again, and merged with the old ones"""
+        benchmarktools.save_baselines(self.filename, {"a": {"best": 1.0, "median": 1.5},
+                                                      "b": {"best": 2.0, "median": 2.5}})
+
+        benchmarktools.save_baselines(self.filename, {"b": {"best": 3.0, "median": 3.5}})
+
+        self.assertEqual(benchmarktools.load_baselines(self.filename),
+                         {"a": {"best": 1.0, "median": 1.5}, "b": {"best": 3.0, "median": 3.5}})
+
+        #The machine is recorded too.
+        with open(self.filename, encoding="utf-8") as baselines_file:
+            data = json.load(baselines_file)
+
+        for key in ("version", "created", "machine", "python"):
+            self.assertIn(key, data)
+
+class TestCompare(unittest.TestCase):
+    """
+    This test class tests the compare(), get_regressions(), format_time() and
+    format_report() functions in Tools/benchmarktools.py
+    """
+
+    def setUp(self):
+        self.baselines = {"slower": {"best": 1.0e-6, "median": 1.0e-6},
+                          "faster": {"best": 1.0e-6, "median": 1.0e-6},
+                          "same": {"best": 1.0e-6, "median": 1.0e-6}}
+
+        self.results = {"slower": {"best": 1.5e-6, "median": 1.5e-6},
+                        "faster": {"best": 0.5e-6, "median": 0.5e-6},
+                        "same": {"best": 1.1e-6, "median": 1.1e-6},
+                        "new": {"best": 2.0e-3, "median": 2.0e-3}}
+
+    def tearDown(self):
+        del self.baselines
+        del self.results
+
+    def test_compare_1(self):
+        """Test that results are compared with their baselines using the threshold"""
+        comparisons = benchmarktools.compare(self.results, self.baselines)
+
+        self.assertEqual([comparison.name for comparison in comparisons],
+                         ["slower", "faster", "same", "new"])
+
+        self.assertEqual([comparison.status for comparison in comparisons],
+                         [benchmarktools.REGRESSED, benchmarktools.IMPROVED,
+                          benchmarktools.UNCHANGED, benchmarktools.NEW])
+
+        self.assertAlmostEqual(comparisons[0].change, 0.5)
+        self.assertAlmostEqual(comparisons[1].change, -0.5)
+        self.assertIsNone(comparisons[3].change)
+
+        self.assertEqual(benchmarktools.get_regressions(comparisons), [comparisons[0]])
+
+    def test_compare_2(self):
+        """Test that a higher threshold lets bigger changes through"""
+        comparisons = benchmarktools.compare(self.results, self.baselines, threshold=0.6)
+
+        self.assertEqual(benchmarktools.get_regressions(comparisons), [])
+
+    def test_format_time_1(self):
+        """Test that times are shown in the most readable unit"""
+        for seconds, expected in ((2.5, "2.5 s"), (0.0025, "2.5 ms"), (2.5e-6, "2.5 us"),
+                                  (2.5e-9, "2.5 ns"), (0, "0.0 ns")):
+
+            self.assertEqual(benchmarktools.format_time(seconds), expected)
+
+    def test_format_report_1(self):
+        """Test that the report has a line for each benchmark, and a summary"""
+        report = benchmarktools.format_report(benchmarktools.compare(self.results,
+                                                                     self.baselines))
+
+        lines = report.split("\n")
+
+        self.assertEqual(len(lines), 7)
+        self.assertIn("+50.0%", lines[1])
+        self.assertTrue(lines[1].endswith("REGRESSED"))
+        self.assertIn("-50.0%", lines[2])
+        self.assertTrue(lines[4].endswith("NEW"))
+        self.assertEqual(lines[-1], "4 benchmarks, 1 regressed by more than 25%.")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Blackboard Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import datetime
+import threading
+import time
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools import clocktools
+from Tools import blackboardtools
+
+class TestReadingsBlackboard(unittest.TestCase):
+    """
+    This test class tests the features of the ReadingsBlackboard class in
+    Tools/blackboardtools.py
+    """
+
+    def setUp(self):
+        self.blackboard = blackboardtools.ReadingsBlackboard()
+
+        self.reading = coretools.Reading(str(datetime.datetime.now()), 1, "G4:M0", "400mm", "OK")
+        self.reading_2 = coretools.Reading(str(datetime.datetime.now()), 2, "G4:M0", "500mm", "OK")
+        self.reading_3 = coretools.Reading(str(datetime.datetime.now()), 2, "G4:FS0", "True", "OK")
+
+    def tearDown(self):
+        del self.blackboard
+        del self.reading
+        del self.reading_2
+        del self.reading_3
+
+    def test_constructor_1(self):
+        """Test that a new blackboard is empty"""
+        self.assertEqual(self.blackboard.get_seq(), 0)
+        self.assertIsNone(self.blackboard.get("G4:M0"))
+        self.assertIsNone(self.blackboard.get_entry("G4:M0"))
+        self.assertEqual(len(self.blackboard.snapshot()), 0)
+
+    def test_post_1(self):
+        """Test that posting readings gives them increasing sequence numbers"""
+        self.assertEqual(self.blackboard.post(self.reading), 1)
+        self.assertEqual(self.blackboard.post(self.reading_3), 2)
+
+        self.assertEqual(self.blackboard.get_seq(), 2)
+        self.assertEqual(self.blackboard.get_entry("G4:M0").seq, 1)
+        self.assertEqual(self.blackboard.get_entry("G4:FS0").seq, 2)
+
+    def test_post_2(self):
+        """Test that posting a reading replaces the last one from the same sensor"""
+        self.blackboard.post(self.reading)
+        self.blackboard.post(self.reading_2)
+
+        self.assertEqual(self.blackboard.get("G4:M0").get_value(), "500mm")
+        self.assertEqual(self.blackboard.get_entry("G4:M0").seq, 2)
+
+    def test_post_3(self):
+        """Test that readings are stamped with the time from the clock service"""
+        clocktools.set_clock(clocktools.VirtualClock(start=1601460000))
+
+        try:
+            self.blackboard.post(self.reading)
+
+        finally:
+            clocktools.set_clock(clocktools.RealClock())
+
+        self.assertEqual(self.blackboard.get_entry("G4:M0").received, 1601460000)
+
+    def test_clear_1(self):
+        """Test that clearing the blackboard removes readings but counts as a change"""
+        self.blackboard.post(self.reading)
+        self.blackboard.clear()
+
+        self.assertIsNone(self.blackboard.get("G4:M0"))
+        self.assertEqual(self.blackboard.get_seq(), 2)
+
+    def test_snapshot_1(self):
+        """Test that snapshots behave like a dictionary of readings"""
+        self.blackboard.post(self.reading)
+        self.blackboard.post(self.reading_3)
+
+        snapshot = self.blackboard.snapshot()
+
+        self.assertEqual(snapshot.seq, 2)
+        self.assertEqual(snapshot["G4:M0"], self.reading)
+        self.assertEqual(snapshot["G4:FS0"], self.reading_3)
+        self.assertTrue("G4:M0" in snapshot)
+        self.assertFalse("G6:M0" in snapshot)
+        self.assertEqual(sorted(snapshot), ["G4:FS0", "G4:M0"])
+        self.assertEqual(snapshot.get_entry("G4:M0").seq, 1)
+
+    def test_snapshot_2(self):
+        """Test that snapshots don't change when new readings are posted"""
+        self.blackboard.post(self.reading)
+
+        snapshot = self.blackboard.snapshot()
+
+        self.blackboard.post(self.reading_2)
+        self.blackboard.post(self.reading_3)
+
+        self.assertEqual(snapshot.seq, 1)
+        self.assertEqual(snapshot["G4:M0"].get_value(), "400mm")
+        self.assertEqual(len(snapshot), 1)
+
+    def test_changed_since_1(self):
+        """Test that only the entries posted after the given sequence number are returned"""
+        self.blackboard.post(self.reading)
+        seq = self.blackboard.get_seq()
+        self.blackboard.post(self.reading_3)
+
+        self.assertEqual(list(self.blackboard.changed_since(seq)), ["G4:FS0"])
+        self.assertEqual(self.blackboard.changed_since(self.blackboard.get_seq()), {})
+
+    def test_wait_for_change_1(self):
+        """Test that waiting times out when nothing is posted"""
+        start = time.time()
+
+        self.assertEqual(self.blackboard.wait_for_change(0, timeout=0.5), 0)
+        self.assertGreaterEqual(time.time() - start, 0.5)
+
+    def test_wait_for_change_2(self):
+        """Test that waiting returns as soon as a reading is posted"""
+        timer = threading.Timer(0.2, self.blackboard.post, args=(self.reading,))
+        timer.start()
+
+        start = time.time()
+
+        self.assertEqual(self.blackboard.wait_for_change(0, timeout=10), 1)
+        self.assertLess(time.time() - start, 5)
+
+        timer.join()
+
+    def test_wait_for_change_3(self):
+        """Test that waiting returns immediately if there are changes we haven't seen"""
+        self.blackboard.post(self.reading)
+
+        self.assertEqual(self.blackboard.wait_for_change(0, timeout=10), 1)
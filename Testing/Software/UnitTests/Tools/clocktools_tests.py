@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Clock Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import datetime
+import threading
+import time
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+import config
+from Tools import coretools
+from Tools import clocktools
+
+class TestRealClock(unittest.TestCase):
+    """
+    This test class tests the RealClock class in Tools/clocktools.py
+    """
+
+    def test_time_1(self):
+        """Test that the real clock follows the system clocks"""
+        clock = clocktools.RealClock()
+
+        self.assertAlmostEqual(clock.time(), time.time(), delta=1)
+        self.assertAlmostEqual(clock.monotonic(), time.monotonic(), delta=1)
+        self.assertLess(abs((clock.now() - datetime.datetime.now()).total_seconds()), 1)
+
+        start = time.monotonic()
+        clock.sleep(0.05)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+class TestVirtualClock(unittest.TestCase):
+    """
+    This test class tests the VirtualClock class in Tools/clocktools.py
+    """
+
+    def setUp(self):
+        config.EXITING = False
+
+        self.clock = clocktools.VirtualClock(start=1601460000)
+        clocktools.set_clock(self.clock)
+
+    def tearDown(self):
+        clocktools.set_clock(clocktools.RealClock())
+
+        del self.clock
+
+    def test_sleep_1(self):
+        """Test that sleeping threads wake in order of their deadlines, without waiting"""
+        woken = []
+        barrier = threading.Barrier(2)
+
+        def sleeper(seconds):
+            self.clock.register()
+            barrier.wait()
+            self.clock.sleep(seconds)
+            woken.append((seconds, self.clock.time()))
+
+        threads = [threading.Thread(target=sleeper, args=(seconds,)) for seconds in (3600, 60)]
+
+        start = time.monotonic()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(woken, [(60, 1601460060), (3600, 1601463600)])
+        self.assertLess(time.monotonic() - start, 2)
+
+        self.assertEqual(self.clock.now(), datetime.datetime.fromtimestamp(1601463600))
+
+    def test_advance_1(self):
+        """Test that advance() moves time, and wakes threads that are due"""
+        self.clock.advance(30)
+        self.assertEqual(self.clock.time(), 1601460030)
+
+        #Use the clock from this thread too, so time only moves when we say so.
+        self.clock.idle_time = 5
+        self.clock.register()
+
+        waiter = coretools.IntervalWaiter()
+        results = []
+
+        thread = threading.Thread(target=lambda: results.append(waiter.wait_until(1601460090)))
+        thread.start()
+
+        time.sleep(0.2)
+        self.assertEqual(self.clock.time(), 1601460030)
+
+        self.clock.advance(60)
+        thread.join()
+
+        self.assertEqual(results, [False])
+
+    def test_interval_waiter_1(self):
+        """Test that IntervalWaiters use virtual time, and can still be woken early"""
+        waiter = coretools.IntervalWaiter(86400)
+
+        start = time.monotonic()
+        self.assertFalse(waiter.wait())
+        self.assertEqual(self.clock.time(), 1601460000 + 86400)
+
+        #Another thread is using the clock, so time doesn't move until it wakes us.
+        self.clock.idle_time = 5
+        barrier = threading.Barrier(2)
+
+        def waker():
+            self.clock.register()
+            barrier.wait()
+            time.sleep(0.2)
+            waiter.wake()
+
+        thread = threading.Thread(target=waker)
+        thread.start()
+        barrier.wait()
+
+        self.assertTrue(waiter.wait())
+        thread.join()
+
+        self.assertEqual(self.clock.time(), 1601460000 + 86400)
+        self.assertLess(time.monotonic() - start, 2)
+
+    def test_simulated_day_1(self):
+        """Test that a day of 15 second reading intervals runs in a few seconds"""
+        readings = []
+        barrier = threading.Barrier(2)
+
+        def monitor():
+            waiter = coretools.IntervalWaiter(15)
+            self.clock.register()
+            barrier.wait()
+
+            while self.clock.time() < 1601460000 + 86400:
+                start = self.clock.monotonic()
+                readings.append(start)
+                waiter.wait(start)
+
+        threads = [threading.Thread(target=monitor) for _ in range(2)]
+        start = time.monotonic()
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(readings), 2 * 5760)
+        self.assertEqual(readings[-1], 1601460000 + 86400 - 15)
+        self.assertLess(time.monotonic() - start, 10)
@@ -67,3 +67,29 @@ TEST_READING_BAD_DATA = [
     [str(datetime.datetime.now()), 1, "G4:M0", "400", True],
     [str(datetime.datetime.now()), 1, "G4:M0", "400", 7.8],
 ]
+
+class FakeSocket:
+    """A fake Sockets class, used to test pushing and receiving control states"""
+    def __init__(self, server_address="192.168.0.1", messages=None):
+        self.server_address = server_address
+        self.in_queue = list(messages or [])
+        self.out_queue = []
+
+    def write(self, data):
+        """Stores the message so we can check it later"""
+        self.out_queue.append(data)
+
+    def has_data(self):
+        """Returns True if there are messages left to read"""
+        return bool(self.in_queue)
+
+    def read(self):
+        """Returns the oldest message"""
+        return self.in_queue[0]
+
+    def pop(self):
+        """Removes the oldest message"""
+        self.in_queue.pop(0)
+
+    def add_waiter(self, waiter):
+        """Does nothing - messages don't arrive later"""
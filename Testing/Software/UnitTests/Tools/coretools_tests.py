@@ -24,6 +24,7 @@ import sys
 import os
 import datetime
 import threading
+import pickle
 from collections import deque
 import time
 
@@ -33,6 +34,7 @@ sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the
 import config
 import Tools
 from Tools import coretools
+from Tools import blackboardtools
 
 #Import test data and functions.
 from . import coretools_test_data as data
@@ -118,6 +120,78 @@ class TestReading(unittest.TestCase):
         """Test that the get_status method works correctly"""
         self.assertEqual(self.reading.get_status(), "OK")
 
+    def test_get_numeric_value_1(self):
+        """Test that values are converted to numbers, without their units"""
+        self.assertEqual(self.reading.get_numeric_value(), 100)
+        self.assertIsInstance(self.reading.get_numeric_value(), int)
+
+        for value, expected in (("400mm", 400), ("12.5", 12.5), ("-3 mm", -3), ("50%", 50)):
+            reading = coretools.Reading(self.time, 1, "SUMP:M0", value, "OK")
+            self.assertEqual(reading.get_numeric_value(), expected)
+
+    def test_get_numeric_value_2(self):
+        """Test that values that aren't numbers throw ValueError, every time"""
+        reading = coretools.Reading(self.time, 1, "SUMP:FS0", "True", "OK")
+
+        for _ in range(2):
+            self.assertRaises(ValueError, reading.get_numeric_value)
+
+    def test_get_bool_value_1(self):
+        """Test that float switch values are converted to bools"""
+        for value, expected in (("True", True), ("False", False)):
+            reading = coretools.Reading(self.time, 1, "SUMP:FS0", value, "OK")
+            self.assertIs(reading.get_bool_value(), expected)
+
+        self.assertRaises(ValueError, self.reading.get_bool_value)
+
+    def test_from_row_1(self):
+        """Test that readings created from rows are the same as with the constructor"""
+        reading = coretools.Reading.from_row((self.time, 1, "SUMP:M0", "100", "OK"))
+
+        self.assertEqual(reading, self.reading)
+        self.assertEqual(reading.as_csv(), self.reading.as_csv())
+        self.assertEqual(reading.get_sensor_id(), "M0")
+        self.assertEqual(reading.get_numeric_value(), 100)
+
+    def test_get_time_1(self):
+        """Test that times given in seconds since the epoch are formatted when needed"""
+        epoch = datetime.datetime(2020, 9, 30, 10, 0, 5).timestamp()
+        reading = coretools.Reading(epoch, 1, "SUMP:M0", "100", "OK")
+
+        self.assertEqual(reading.get_epoch(), epoch)
+        self.assertEqual(reading.get_time(), "2020-09-30 10:00:05")
+        self.assertEqual(reading.as_csv(), "2020-09-30 10:00:05,1,SUMP:M0,100,OK")
+
+        #Pickled readings still contain the time as text.
+        self.assertEqual(reading.__getstate__()["_time"], "2020-09-30 10:00:05")
+        self.assertEqual(pickle.loads(pickle.dumps(reading)).get_epoch(), epoch)
+
+    def test_get_epoch_1(self):
+        """Test that times given as text are converted to seconds since the epoch"""
+        self.assertEqual(self.reading.get_epoch(),
+                         datetime.datetime.fromisoformat(self.time).timestamp())
+
+        self.assertEqual(self.reading.get_time(), self.time)
+
+        reading = coretools.Reading("Not a time", 1, "SUMP:M0", "100", "OK")
+
+        self.assertRaises(ValueError, reading.get_epoch)
+        self.assertEqual(reading.get_time(), "Not a time")
+
+    def test_pickle_1(self):
+        """Test that readings pickle in the same format as before they used __slots__"""
+        self.assertFalse(hasattr(self.reading, "__dict__"))
+
+        self.assertEqual(self.reading.__getstate__(),
+                         {"_time": self.time, "_tick": 1, "_id": "SUMP:M0", "_value": "100",
+                          "_status": "OK"})
+
+        reading = pickle.loads(pickle.dumps(self.reading))
+
+        self.assertEqual(reading.as_csv(), self.reading.as_csv())
+        self.assertEqual(reading.get_group_id(), "SUMP")
+        self.assertEqual(reading.get_numeric_value(), 100)
+
     #---------- EQUALITY AND COMPARISON TESTS ----------
     def test_equality(self):
         """Test that the equality method (__eq__) works correctly"""
@@ -188,6 +262,231 @@ class TestReading(unittest.TestCase):
         self.assertEqual(self.reading_3.as_csv(), self.time
                          + ",6,SUMP:M0,100,OK")
 
+class TestControlStates(unittest.TestCase):
+    """
+    This test class tests pushing and receiving control states with the
+    functions in Tools/coretools.py
+    """
+
+    def setUp(self):
+        self.orig_site_id = config.SITE_ID
+        self.orig_sockets_list = config.SOCKETSLIST
+
+        config.CONTROLSTATES = {}
+
+    def tearDown(self):
+        config.SITE_ID = self.orig_site_id
+        config.SOCKETSLIST = self.orig_sockets_list
+        config.CONTROLSTATES = {}
+
+    def test_push_control_state_1(self):
+        """Test that pushing a state from a pi sends it to the NAS box"""
+        config.SITE_ID = "SUMP"
+        nas_socket = data.FakeSocket(config.SITE_SETTINGS["SUMP"]["ServerAddress"])
+        config.SOCKETSLIST = [nas_socket]
+
+        coretools.push_control_state("VALVE4", "V4", ("Locked", "50%", "SUMP"))
+
+        self.assertEqual(nas_socket.out_queue, ["VALVE4 State: V4 Locked 50% SUMP"])
+        self.assertEqual(config.CONTROLSTATES, {})
+
+    def test_push_control_state_2(self):
+        """Test that pushing a state from the NAS box only sends it to the owning site"""
+        config.SITE_ID = "NAS"
+        valve_socket = data.FakeSocket(config.SITE_SETTINGS["VALVE4"]["IPAddress"])
+        other_socket = data.FakeSocket(config.SITE_SETTINGS["VALVE6"]["IPAddress"])
+        config.SOCKETSLIST = [other_socket, valve_socket]
+
+        coretools.push_control_state("VALVE4", "V4", ("Unlocked", "None", "None"))
+
+        self.assertEqual(valve_socket.out_queue, ["VALVE4 State: V4 Unlocked None None"])
+        self.assertEqual(other_socket.out_queue, [])
+
+    def test_push_control_state_3(self):
+        """Test that pushing a state for one of our own devices just stores it"""
+        config.SITE_ID = "VALVE4"
+        nas_socket = data.FakeSocket()
+        config.SOCKETSLIST = [nas_socket]
+
+        coretools.push_control_state("VALVE4", "V4", ["Locked", "50%", "SUMP"])
+
+        self.assertEqual(nas_socket.out_queue, [])
+        self.assertEqual(config.CONTROLSTATES, {"V4": ("Locked", "50%", "SUMP")})
+
+    def test_wait_for_next_reading_interval_1(self):
+        """Test that we store pushed control states and return early"""
+        nas_socket = data.FakeSocket(messages=["VALVE4 State: V4 Locked 75% SUMP"])
+        config.SOCKETSLIST = [nas_socket]
+
+        start = time.time()
+
+        coretools.wait_for_next_reading_interval(15, "VALVE4", nas_socket)
+
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(config.CONTROLSTATES, {"V4": ("Locked", "75%", "SUMP")})
+        self.assertFalse(nas_socket.has_data())
+
+    def test_wait_for_next_reading_interval_2(self):
+        """Test that invalid or misdirected control state messages are ignored"""
+        nas_socket = data.FakeSocket(messages=["VALVE4 State: V4 Locked",
+                                               "VALVE6 State: V6 Locked 75% SUMP"])
+
+        config.SOCKETSLIST = [nas_socket]
+
+        coretools.wait_for_next_reading_interval(2, "VALVE4", nas_socket)
+
+        self.assertEqual(config.CONTROLSTATES, {})
+        self.assertFalse(nas_socket.has_data())
+
+    def test_wait_for_next_reading_interval_3(self):
+        """Test that control states arriving during the wait are handled straight away"""
+        nas_socket = data.FakeSocket()
+        config.SOCKETSLIST = [nas_socket]
+
+        def push_state():
+            nas_socket.in_queue.append("VALVE4 State: V4 Locked 75% SUMP")
+            coretools.MAIN_LOOP_WAITER.wake()
+
+        threading.Timer(0.5, push_state).start()
+
+        start = time.monotonic()
+
+        coretools.wait_for_next_reading_interval(15, "VALVE4", nas_socket)
+
+        self.assertLess(time.monotonic() - start, 1.5)
+        self.assertEqual(config.CONTROLSTATES, {"V4": ("Locked", "75%", "SUMP")})
+
+class TestIntervalWaiter(unittest.TestCase):
+    """
+    This test class tests the features of the IntervalWaiter class, and the
+    request_exit() function, in Tools/coretools.py
+    """
+
+    def setUp(self):
+        self.waiter = coretools.IntervalWaiter(0.5)
+
+    def tearDown(self):
+        config.EXITING = False
+        del self.waiter
+
+    def test_wait_1(self):
+        """Test that waits end at the end of the interval"""
+        start = time.monotonic()
+
+        self.assertFalse(self.waiter.wait(start))
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.5)
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_wait_2(self):
+        """Test that changing the interval takes effect during a wait"""
+        self.waiter.set_interval(30)
+        threading.Timer(0.3, self.waiter.set_interval, args=(0.5,)).start()
+
+        start = time.monotonic()
+
+        self.assertFalse(self.waiter.wait(start))
+        self.assertLess(time.monotonic() - start, 0.6)
+
+    def test_wake_1(self):
+        """Test that wake() ends a wait early, and is remembered if nothing is waiting"""
+        self.waiter.set_interval(30)
+        threading.Timer(0.2, self.waiter.wake).start()
+
+        start = time.monotonic()
+
+        self.assertTrue(self.waiter.wait())
+        self.assertLess(time.monotonic() - start, 1)
+
+        self.waiter.wake()
+
+        self.assertTrue(self.waiter.wait_until(None))
+        self.assertFalse(self.waiter.wait_until(time.monotonic()))
+
+    def test_request_exit_1(self):
+        """Test that request_exit() ends waits straight away"""
+        threading.Timer(0.2, coretools.request_exit).start()
+
+        start = time.monotonic()
+
+        self.assertTrue(self.waiter.wait_until(None))
+        self.assertTrue(config.EXITING)
+        self.assertLess(time.monotonic() - start, 1)
+
+class TestReadingSubscriptions(unittest.TestCase):
+    """
+    This test class tests publishing and forwarding readings to subscribing
+    sites with the functions in Tools/coretools.py
+    """
+
+    def setUp(self):
+        self.orig_site_id = config.SITE_ID
+        self.orig_sockets_list = config.SOCKETSLIST
+
+        self.reading = coretools.Reading(str(datetime.datetime.now()), 1, "G4:M0", "400mm", "OK")
+
+        config.LATESTREADINGS = blackboardtools.ReadingsBlackboard()
+
+    def tearDown(self):
+        config.SITE_ID = self.orig_site_id
+        config.SOCKETSLIST = self.orig_sockets_list
+        config.LATESTREADINGS = blackboardtools.ReadingsBlackboard()
+
+        del self.reading
+
+    def test_get_subscribers_1(self):
+        """Test that the sites subscribing to a sensor are found"""
+        self.assertEqual(coretools.get_subscribers("G4:M0"), ["SUMP", "G6"])
+        self.assertEqual(coretools.get_subscribers("SUMP:M0"), [])
+
+    def test_publish_reading_1(self):
+        """Test that a subscribed reading is stored and sent to the NAS box"""
+        config.SITE_ID = "G4"
+        nas_socket = data.FakeSocket()
+        config.SOCKETSLIST = [nas_socket]
+
+        coretools.publish_reading(self.reading)
+
+        self.assertEqual(nas_socket.out_queue, [self.reading])
+        self.assertEqual(config.LATESTREADINGS.get("G4:M0"), self.reading)
+
+    def test_publish_reading_2(self):
+        """Test that a reading nobody subscribes to is only stored"""
+        config.SITE_ID = "SUMP"
+        nas_socket = data.FakeSocket()
+        config.SOCKETSLIST = [nas_socket]
+
+        reading = coretools.Reading(str(datetime.datetime.now()), 1, "SUMP:M0", "400mm", "OK")
+        coretools.publish_reading(reading)
+
+        self.assertEqual(nas_socket.out_queue, [])
+        self.assertEqual(config.LATESTREADINGS.get("SUMP:M0"), reading)
+
+    def test_forward_reading_1(self):
+        """Test that the NAS box forwards readings only to the subscribing sites"""
+        config.SITE_ID = "NAS"
+        sump_socket = data.FakeSocket(config.SITE_SETTINGS["SUMP"]["IPAddress"])
+        stage_socket = data.FakeSocket(config.SITE_SETTINGS["G6"]["IPAddress"])
+        other_socket = data.FakeSocket(config.SITE_SETTINGS["G3"]["IPAddress"])
+        config.SOCKETSLIST = [sump_socket, stage_socket, other_socket]
+
+        coretools.forward_reading(self.reading)
+
+        self.assertEqual(sump_socket.out_queue, [self.reading])
+        self.assertEqual(stage_socket.out_queue, [self.reading])
+        self.assertEqual(other_socket.out_queue, [])
+
+    def test_forward_reading_2(self):
+        """Test that the other pis just store forwarded readings"""
+        config.SITE_ID = "SUMP"
+        nas_socket = data.FakeSocket()
+        config.SOCKETSLIST = [nas_socket]
+
+        coretools.forward_reading(self.reading)
+
+        self.assertEqual(nas_socket.out_queue, [])
+        self.assertEqual(config.LATESTREADINGS.get("G4:M0"), self.reading)
+
 class TestMiscFunctions(unittest.TestCase):
     """
     This test class tests the miscellaneous functions in
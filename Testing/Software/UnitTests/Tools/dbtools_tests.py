@@ -173,6 +173,44 @@ class TestDatabaseConnection(unittest.TestCase):
             self.dbconn.is_running = _bool
             self.assertEqual(self.dbconn.thread_running(), _bool)
 
+    #---------- TEST DO_QUERY ----------
+    def test_do_query_1(self):
+        """Test that do_query wakes the database thread, and is woken when the result is ready"""
+        self.dbconn.is_connected = True
+
+        def answer_query():
+            #Do what the database thread does for a query, without a database.
+            self.dbconn.queue_waiter.wait_until(None)
+
+            self.dbconn.client_thread_done = False
+            self.dbconn._set_result("Success")
+            self.dbconn._wait_for_client()
+
+            self.dbconn.result = None
+
+        thread = threading.Thread(target=answer_query, daemon=True)
+        thread.start()
+
+        self.assertEqual(self.orig_do_query(self.dbconn, "test query;", 0), "Success")
+
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+
+        self.assertEqual(list(self.dbconn.in_queue), ["test query;"])
+        self.assertTrue(self.dbconn.client_thread_done)
+
+    def test_do_query_2(self):
+        """Test that do_query fails instead of waiting forever for a result when we are exiting"""
+        self.dbconn.is_connected = True
+        config.EXITING = True
+
+        try:
+            with self.assertRaises(RuntimeError):
+                self.orig_do_query(self.dbconn, "test query;", 0)
+
+        finally:
+            config.EXITING = False
+
     #---------- TEST CONVENIENCE READER METHODS ----------
     def test_get_latest_reading_1(self):
         """Test this works as when there are readings"""
@@ -28,6 +28,7 @@ sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the
 
 import Tools
 from Tools import deviceobjects
+from Tools import i2ctools
 import Tools.devicemanagement as device_mgmt
 
 #Import test data and functions.
@@ -41,11 +42,53 @@ device_mgmt.ads = None
 device_mgmt.ADS = data.ADS
 device_mgmt.AnalogIn = data.AnalogIn
 
+#Read the ADCs through a stand-in backend, so we can set the voltages.
+BACKEND = i2ctools.StandInBackend()
+device_mgmt.BUS_MANAGER = i2ctools.I2CBusManager(BACKEND)
+
 #Prevent any management threads from being started - disable self.start by replacing
 #it with a do-nothing function.
 device_mgmt.ManageHallEffectProbe.start = data.start
 device_mgmt.ManageGateValve.start = data.start
 
+class TestLevelFilter(unittest.TestCase):
+    """This class tests the features of the LevelFilter class in Tools/devicemanagement.py"""
+
+    def add_all(self, level_filter, levels):
+        """Adds each level to the filter, and returns the filtered levels"""
+        return [level_filter.add(level) for level in levels]
+
+    def test_add_1(self):
+        """Test that the median filter ignores outliers and missing levels"""
+        level_filter = device_mgmt.LevelFilter(size=5, hysteresis=1)
+
+        self.assertEqual(self.add_all(level_filter, [-1, 400, 400, 800, -1, 400, 0]),
+                         [None, 400, 400, 400, 400, 400, 400])
+
+        self.assertEqual(level_filter.get_confidence(), 0.4)
+
+    def test_add_2(self):
+        """Test that noise between adjacent levels is held back by the hysteresis"""
+        level_filter = device_mgmt.LevelFilter(device_mgmt.MAJORITY_FILTER, 3, 2)
+
+        self.assertEqual(self.add_all(level_filter, [400, 425, 400, 425, 425]),
+                         [400, 400, 400, 400, 425])
+
+        #Bigger changes are reported straight away.
+        self.assertEqual(self.add_all(level_filter, [500, 500]), [425, 500])
+
+    def test_get_confidence_1(self):
+        """Test that there is no confidence before a level has been found"""
+        level_filter = device_mgmt.LevelFilter()
+
+        self.assertEqual(level_filter.get_confidence(), 0)
+
+        level_filter.add(-1)
+        self.assertEqual(level_filter.get_confidence(), 0)
+
+        level_filter.add(475)
+        self.assertEqual(level_filter.get_confidence(), 0.5)
+
 class TestManageHallEffectProbe(unittest.TestCase):
     """This class tests the features of the ManageHallEffectProbe class in Tools/devicemanagement.py"""
 
@@ -67,11 +110,9 @@ class TestManageHallEffectProbe(unittest.TestCase):
 
         self.assertEqual(mgmtclass.probe, probe)
 
-        #Test that channels are being set correctly.
-        self.assertEqual(mgmtclass.chan0.__class__, data.ADS)
-        self.assertEqual(mgmtclass.chan1.__class__, data.ADS)
-        self.assertEqual(mgmtclass.chan2.__class__, data.ADS)
-        self.assertEqual(mgmtclass.chan3.__class__, data.ADS)
+        #Test that the shared bus manager is used.
+        self.assertIs(mgmtclass.bus, device_mgmt.BUS_MANAGER)
+        self.assertEqual(mgmtclass.i2c_address, 0x48)
 
     #---------- OTHER METHOD TESTS ----------
     def test_get_compensated_probe_voltages_1(self):
@@ -79,15 +120,34 @@ class TestManageHallEffectProbe(unittest.TestCase):
         for dataset in data.TEST_MANAGEHALLEFFECTPROBE_COMP_VOLTAGES:
             index = data.TEST_MANAGEHALLEFFECTPROBE_COMP_VOLTAGES.index(dataset)
 
-            self.mgmtclass.chan0.voltage = dataset[0]
-            self.mgmtclass.chan1.voltage = dataset[1]
-            self.mgmtclass.chan2.voltage = dataset[2]
-            self.mgmtclass.chan3.voltage = dataset[3]
+            for channel in range(4):
+                BACKEND.set_voltage(0x48, channel, dataset[channel])
 
             results = self.mgmtclass.get_compensated_probe_voltages()
 
             self.assertEqual(results, data.TEST_MANAGEHALLEFFECTPROBE_COMP_VOLTAGES_RESULTS[index])
 
+    def test_get_compensated_probe_voltages_2(self):
+        """Test that the channels are read in one scan at the probe's data rate, and timed"""
+        self.probe.set_data_rate(475)
+        del BACKEND.reads[:]
+
+        self.mgmtclass.get_compensated_probe_voltages()
+
+        self.assertEqual(BACKEND.reads, [(0x48, (0, 1, 2, 3), i2ctools.DEFAULT_GAIN, 475)])
+        self.assertEqual(len(self.mgmtclass.scan_times), 4)
+        self.assertEqual(self.mgmtclass.scan_times, sorted(self.mgmtclass.scan_times))
+
+        #Failed scans are counted separately.
+        BACKEND.fail(0x48)
+        self.assertEqual(self.mgmtclass.get_compensated_probe_voltages(), (False, False))
+
+        stats = self.mgmtclass.get_scan_stats()
+
+        self.assertEqual((stats["scans"], stats["errors"]), (1, 1))
+        self.assertEqual(stats["max_spread"],
+                         self.mgmtclass.scan_times[-1] - self.mgmtclass.scan_times[0])
+
     def test_get_level_1(self):
         """Test that the get_level() function works as expected"""
         self.probe.set_limits(data.HIGH_LIMITS, data.LOW_LIMITS)
@@ -106,6 +166,23 @@ class TestManageHallEffectProbe(unittest.TestCase):
             #Happens when there are no more results to test.
             pass
 
+    def test_get_level_2(self):
+        """Test that band lookup results are counted"""
+        self.probe.set_limits(data.HIGH_LIMITS, data.LOW_LIMITS)
+        self.probe.set_depths(data.DEPTHS)
+
+        for voltages in ((3.0, 3.0, 1.0, 3.0), (3.0, 3.0, 3.0, 3.0), (3.0, 3.0, 3.0, 3.0)):
+            for channel in range(4):
+                BACKEND.set_voltage(0x48, channel, voltages[channel])
+
+            self.mgmtclass.get_level()
+
+        self.assertEqual(self.mgmtclass.get_lookup_stats(),
+                         {device_mgmt.BAND_MATCHED: 1, device_mgmt.NO_BAND_MATCHED: 2,
+                          device_mgmt.AMBIGUOUS_BAND: 0})
+
+        self.assertEqual(self.mgmtclass.last_lookup, device_mgmt.NO_BAND_MATCHED)
+
 class TestManageGateValve(unittest.TestCase):
     """This class tests the features of the ManageGateValve class in Tools/devicemanagement.py"""
 
@@ -149,13 +226,12 @@ class TestManageGateValve(unittest.TestCase):
     #---------- GETTER TESTS ----------
     def test__get_position_1(self):
         """Test that the _get_position() method works as expected when there is no error reading the voltage"""
-        return
         for voltage in range(0, 331, 1):
             #We have to use ints with range, but we want a gradual increase to
             #3.3v so, we'll divide these values by 100.
             voltage /= 100
 
-            data.ADS.voltage = voltage
+            BACKEND.set_voltage(0x48, 0, voltage)
 
             position = self.mgmtclass._get_position()
 
@@ -163,16 +239,11 @@ class TestManageGateValve(unittest.TestCase):
 
     def test__get_position_2(self):
         """Test that the _get_position() method works as expected when there is an error reading the voltage"""
-        return
-        #Use the special ADS class that always throws an OSError when voltage is
-        #accessed.
-        device_mgmt.AnalogIn = data.AnalogIn2
+        #Make the next read fail.
+        BACKEND.fail(0x48)
 
         position = self.mgmtclass._get_position()
 
-        #Revert the change.
-        device_mgmt.AnalogIn = data.AnalogIn
-
         self.assertEqual(position, -1)
 
     #---------- SETTER TESTS ----------
@@ -264,6 +335,87 @@ class TestManageGateValve(unittest.TestCase):
                 self.assertEqual(self.mgmtclass.low_limit, low_limit)
                 self.assertEqual(self.mgmtclass.high_limit, high_limit)
 
+    #---------- CONTROLLER TESTS ----------
+    def simulate(self, position, seconds, speed=1.5):
+        """
+        Runs the controller against a simulated valve that moves speed % per control
+        step while the motor is on, and returns the final position.
+        """
+
+        motor = {"direction": 0}
+
+        self.mgmtclass.motor_open = lambda: motor.update(direction=1)
+        self.mgmtclass.motor_close = lambda: motor.update(direction=-1)
+        self.mgmtclass.motor_stop = lambda: motor.update(direction=0)
+
+        now = 0
+
+        while now < seconds:
+            BACKEND.set_voltage(0x48, 0, (position + 0.5) / 100 * 3.3)
+            now += self.mgmtclass.control_step(self.now + now, self.mgmtclass._get_position())
+            position += motor["direction"] * speed
+
+        self.now += now
+
+        return position
+
+    def test_control_step_1(self):
+        """Test that the valve is moved to the requested position, and the move is recorded"""
+        self.now = 1000
+        self.mgmtclass.set_position(50)
+
+        position = self.simulate(0, 60)
+
+        self.assertTrue(45 <= position <= 55)
+        self.assertEqual(self.mgmtclass.state, device_mgmt.IDLE_STATE)
+
+        move = self.mgmtclass.get_move_stats()[-1]
+
+        self.assertEqual(move["result"], "settled")
+        self.assertEqual(move["target"], 50)
+        self.assertEqual(move["start_position"], 0)
+        self.assertLess(move["time_to_target"], 5)
+        self.assertGreater(move["adc_reads"], 10)
+        self.assertLessEqual(move["overshoot"], 5)
+
+        #Once settled, the position is only checked every HOLD_INTERVAL seconds.
+        reads = self.mgmtclass.adc_reads
+        self.simulate(position, 10)
+
+        self.assertEqual(self.mgmtclass.adc_reads - reads, 10)
+        self.assertEqual(len(self.mgmtclass.get_move_stats()), 1)
+
+    def test_control_step_2(self):
+        """Test that small drifts are ignored, but larger ones are corrected"""
+        self.now = 1000
+        self.mgmtclass.set_position(50)
+        self.simulate(50, 5)
+
+        self.simulate(56, 5, speed=0)
+        self.assertEqual(len(self.mgmtclass.get_move_stats()), 0)
+
+        self.simulate(58, 10)
+        self.assertEqual(self.mgmtclass.get_move_stats()[-1]["result"], "settled")
+
+    def test_control_step_3(self):
+        """Test that stalls stop the valve until a new position is requested"""
+        self.now = 1000
+        self.mgmtclass.set_position(50)
+
+        self.simulate(0, 10, speed=0)
+
+        self.assertEqual(self.mgmtclass.state, device_mgmt.FAULT_STATE)
+        self.assertEqual([move["result"] for move in self.mgmtclass.get_move_stats()],
+                         ["stalled"])
+
+        self.simulate(0, 10, speed=0)
+        self.assertEqual(len(self.mgmtclass.get_move_stats()), 1)
+
+        self.mgmtclass.set_position(30)
+        self.simulate(0, 30)
+
+        self.assertEqual(self.mgmtclass.get_move_stats()[-1]["result"], "settled")
+
     #---------- CONTROL METHOD TESTS ----------
     #We just check that these two run without error - they are very simple.
     def test_clutch_engage(self):
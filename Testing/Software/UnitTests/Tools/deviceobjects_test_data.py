@@ -56,6 +56,11 @@ class GPIO:
     def remove_event_detect(pin):
         pass
 
+#Band lookup results and filter modes, as used by HallEffectProbe.
+#pylint: disable=wrong-import-position
+from Tools.devicemanagement import BAND_MATCHED, NO_BAND_MATCHED, AMBIGUOUS_BAND
+from Tools.devicemanagement import MEDIAN_FILTER, MAJORITY_FILTER
+
 #Dummy ManageHallEffectProbe class for testing.
 class ManageHallEffectProbe:
     def __init__(self, probe):
@@ -155,6 +160,10 @@ TEST_HALLEFFECTPROBE_SETLIMITS_BAD_DATA = [
     [(9, 19, 29, 39, 49, 59, 69, 79, 89, 99),
      (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)],
 
+    #Overlapping bands.
+    [(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+     (0.09, 0.19, 0.29, 0.39, 0.35, 0.59, 0.69, 0.79, 0.89, 0.99)],
+
     #Only one list.
     [(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0), ()],
 
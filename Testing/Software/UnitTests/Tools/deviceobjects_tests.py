@@ -22,6 +22,7 @@
 import unittest
 import sys
 import os
+import time
 
 #Import other modules.
 sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
@@ -346,6 +347,8 @@ class TestHallEffectDevice(unittest.TestCase):
         halleffectdevice = deviceobjects.HallEffectDevice("G6:W1", "Test")
 
         self.assertEqual(halleffectdevice._num_detections, 0)
+        self.assertEqual(len(halleffectdevice._edges), 0)
+        self.assertFalse(halleffectdevice.slow_reader)
 
     #------------ PRIVATE METHOD TESTS ----------
     def test_increment_num_detections(self):
@@ -357,17 +360,87 @@ class TestHallEffectDevice(unittest.TestCase):
 
         self.assertEqual(self.halleffectdevice._num_detections, 500)
 
-    #---------- GETTER TESTS ----------
-    def test_get_reading(self):
-        """Test that get_reading() works as expected (slow test)"""
+        #Only the most recent edges are kept.
+        self.assertEqual(len(self.halleffectdevice._edges), 500)
+
+        for i in range(0, deviceobjects.EDGE_BUFFER_SIZE):
+            self.halleffectdevice._increment_num_detections("test")
+
+        self.assertEqual(len(self.halleffectdevice._edges), deviceobjects.EDGE_BUFFER_SIZE)
+
+    #---------- SETTER TESTS ----------
+    def test_set_pins_1(self):
+        """Test that edges are counted as soon as the pin is set"""
         #NOTE: We have a custom fake GPIO.add_event_detect() method just for this purpose.
         #NOTE: We can set data.GPIO.num_events to change how many times it calls back the function.
-        for num in (1, 5, 10, 50, 7000):
-            data.GPIO.num_events = num
+        data.GPIO.num_events = 5
+
+        try:
+            self.halleffectdevice.set_pins(15)
+
+        finally:
+            data.GPIO.num_events = 0
+
+        self.assertEqual(self.halleffectdevice._num_detections, 5)
+
+    def test_set_window_1(self):
+        """Test that the window is 5 seconds by default, and can be changed"""
+        self.assertEqual(self.halleffectdevice.get_window(), 5)
+
+        self.halleffectdevice.set_window(2.5)
+        self.assertEqual(self.halleffectdevice.get_window(), 2.5)
+
+        for window in (0, -1, 301, True, "5", None):
+            self.assertRaises(ValueError, self.halleffectdevice.set_window, window)
+
+    #---------- GETTER TESTS ----------
+    def add_edges(self, periods):
+        """Adds edges to the buffer with the given times between them, ending now"""
+        edge = time.monotonic()
+        edges = [edge]
+
+        for period in reversed(periods):
+            edge -= period
+            edges.insert(0, edge)
+
+        self.halleffectdevice._edges.extend(edges)
+
+    def test_get_reading_1(self):
+        """Test that get_reading() works out the RPM from the edges in the window"""
+        self.assertEqual(self.halleffectdevice.get_reading(), (0, "OK"))
+
+        #Edges before the window are ignored.
+        self.add_edges([10, 1, 1.5, 1, 1])
+
+        start = time.monotonic()
+        reading = self.halleffectdevice.get_reading()
+
+        self.assertEqual(reading, (53, "OK"))
+
+        #It shouldn't block.
+        self.assertLess(time.monotonic() - start, 0.1)
 
-            reading = self.halleffectdevice.get_reading()
+    def test_get_reading_2(self):
+        """Test that the RPM drops when the edges stop"""
+        self.halleffectdevice._edges.extend([time.monotonic() - 3, time.monotonic() - 2])
 
-            self.assertEqual(reading, (num*12, "OK"))
+        self.assertEqual(self.halleffectdevice.get_reading(), (30, "OK"))
+
+    def test_get_stats_1(self):
+        """Test that get_stats() works as expected"""
+        self.assertEqual(self.halleffectdevice.get_stats(),
+                         {"edges": 0, "min_period": None, "max_period": None,
+                          "mean_period": None, "jitter": None})
+
+        self.add_edges([1, 1.5, 1, 1])
+
+        stats = self.halleffectdevice.get_stats()
+
+        self.assertEqual(stats["edges"], 5)
+        self.assertAlmostEqual(stats["min_period"], 1)
+        self.assertAlmostEqual(stats["max_period"], 1.5)
+        self.assertAlmostEqual(stats["mean_period"], 1.125)
+        self.assertAlmostEqual(stats["jitter"], 0.25)
 
 class TestHallEffectProbe(unittest.TestCase):
     """
@@ -404,6 +477,26 @@ class TestHallEffectProbe(unittest.TestCase):
         self.assertEqual(self.halleffectprobe.get_limits(),
                          ((1, 2, 3, 4), (-3, -2, -1, 0)))
 
+    def test_get_sample_rate_1(self):
+        """Test that the sample rate is 2 Hz by default, and can be changed"""
+        self.assertEqual(self.halleffectprobe.get_sample_rate(), 2)
+
+        self.halleffectprobe.set_sample_rate(0.5)
+        self.assertEqual(self.halleffectprobe.get_sample_rate(), 0.5)
+
+        for sample_rate in (0, -1, 21, True, "2", None):
+            self.assertRaises(ValueError, self.halleffectprobe.set_sample_rate, sample_rate)
+
+    def test_get_data_rate_1(self):
+        """Test that the data rate is 860 by default, and can only be set to supported rates"""
+        self.assertEqual(self.halleffectprobe.get_data_rate(), 860)
+
+        self.halleffectprobe.set_data_rate(128)
+        self.assertEqual(self.halleffectprobe.get_data_rate(), 128)
+
+        for data_rate in (0, 100, 860.0, True, "128", None):
+            self.assertRaises(ValueError, self.halleffectprobe.set_data_rate, data_rate)
+
     def test_get_depths_1(self):
         """Test the get_depths() method works as expected"""
         self.assertEqual(self.halleffectprobe.get_depths(), None)
@@ -447,6 +540,47 @@ class TestHallEffectProbe(unittest.TestCase):
                 #This should have failed!
                 self.assertTrue(False, "ValueError was expected for data: "+str(dataset))
 
+    def test_get_filter_1(self):
+        """Test that levels are median filtered over 5 samples by default, and can be changed"""
+        self.assertEqual(self.halleffectprobe.get_filter(), (data.MEDIAN_FILTER, 5))
+
+        self.halleffectprobe.set_filter(data.MAJORITY_FILTER, 9)
+        self.assertEqual(self.halleffectprobe.get_filter(), (data.MAJORITY_FILTER, 9))
+
+        for filter_mode, filter_size in (("mean", 5), (data.MEDIAN_FILTER, 0),
+                                         (data.MEDIAN_FILTER, 51), (data.MEDIAN_FILTER, 5.0),
+                                         (data.MEDIAN_FILTER, True)):
+
+            self.assertRaises(ValueError, self.halleffectprobe.set_filter, filter_mode,
+                              filter_size)
+
+    def test_get_hysteresis_1(self):
+        """Test that the hysteresis is 2 samples by default, and can be changed"""
+        self.assertEqual(self.halleffectprobe.get_hysteresis(), 2)
+
+        self.halleffectprobe.set_hysteresis(1)
+        self.assertEqual(self.halleffectprobe.get_hysteresis(), 1)
+
+        for hysteresis in (0, 11, 2.0, True, "2", None):
+            self.assertRaises(ValueError, self.halleffectprobe.set_hysteresis, hysteresis)
+
+    def test_find_band_1(self):
+        """Test that the find_band() method finds the right band, or reports why it didn't"""
+        #The bands are deliberately out of order, and two share a boundary.
+        self.halleffectprobe.set_limits((0.2, 0.1, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0),
+                                        (0.15, 0.05, 0.25, 0.35, 0.45, 0.55, 0.65, 0.75, 0.85,
+                                         0.9))
+
+        self.assertEqual(self.halleffectprobe.find_band(0.07), (1, data.BAND_MATCHED))
+        self.assertEqual(self.halleffectprobe.find_band(0.15), (0, data.BAND_MATCHED))
+        self.assertEqual(self.halleffectprobe.find_band(1.0), (9, data.BAND_MATCHED))
+
+        for voltage in (0, 0.12, 0.22, 1.1):
+            self.assertEqual(self.halleffectprobe.find_band(voltage),
+                             (-1, data.NO_BAND_MATCHED))
+
+        self.assertEqual(self.halleffectprobe.find_band(0.9), (-1, data.AMBIGUOUS_BAND))
+
     def test_set_depths_1(self):
         """Test that the set_depths() method works when given valid data"""
         for dataset in data.TEST_HALLEFFECTPROBE_SETDEPTHS_DATA:
@@ -577,6 +711,16 @@ class TestGateValve(unittest.TestCase):
         """Test that the get_ref_voltage() method works as expected"""
         self.assertEqual(self.gatevalve.get_ref_voltage(), 3.3)
 
+    def test_get_control_rate(self):
+        """Test that the control rate is 10 Hz by default, and can be changed"""
+        self.assertEqual(self.gatevalve.get_control_rate(), 10)
+
+        self.gatevalve.set_control_rate(20)
+        self.assertEqual(self.gatevalve.get_control_rate(), 20)
+
+        for control_rate in (0, 51, 10.0, True, "10", None):
+            self.assertRaises(ValueError, self.gatevalve.set_control_rate, control_rate)
+
     def test_get_reading_1(self):
         """Test that the get_reading() method works as expected"""
         #Start our fake thread.
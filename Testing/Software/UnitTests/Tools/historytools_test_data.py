@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# History Tools Unit Test Data for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#A readings file, as the monitors write it, with a restart, a warning, and a
+#line that can't be read. Read with a reading interval of 10 seconds.
+DAY_1 = ("\n\nStart Time: 2020-09-29 10:00:00.000000\n\n"
+         + "\nTIME,SYSTEM TICK,ID,VALUE,STATUS\n"
+         + "\n2020-09-29 10:00:00,1,G4:M0,400,OK.."
+         + "\n2020-09-29 10:00:30,4,G4:M0,410,FAULT DETECTED: Jammed...."
+         + "\nWARNING: Couldn't write to previous readings file.\n"
+         + "\nrubbish"
+         + "\n2020-09-29 10:00:50,9,G4:M0,True,OK."
+         + "\n\nStart Time: 2020-09-29 11:00:00.000000\n\n"
+         + "\nTIME,SYSTEM TICK,ID,VALUE,STATUS\n"
+         + "..."
+         + "\n2020-09-29 11:00:00,1,G4:M0,False,OK")
+
+DAY_1_VALUES = [400.0, 400.0, 400.0, 410.0, 410.0, 410.0, 410.0, 410.0, 1.0, 1.0, 0.0]
+DAY_1_TICKS = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 1]
+DAY_1_STATUSES = [0, 0, 0, 1, 1, 1, 1, 1, 0, 0, 0]
+
+#The second "." run is too long for the gap before the next reading, so it is
+#spread evenly over it instead.
+DAY_1_OFFSETS = [0.0, 10.0, 20.0, 30.0, 34.0, 38.0, 42.0, 46.0, 50.0, 60.0, 3600.0]
+
+DAY_2 = ("\n\nStart Time: 2020-09-30 09:00:00.000000\n\n"
+         + "\nTIME,SYSTEM TICK,ID,VALUE,STATUS\n"
+         + "\n2020-09-30 09:00:00,20,G4:M0,500,OK..")
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# History Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import gzip
+import shutil
+import datetime
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import archivetools
+from Tools import historytools
+
+#Import test data.
+from . import historytools_test_data as data
+
+class TestFindingFiles(unittest.TestCase):
+    """
+    This test class tests the functions used to find readings files in
+    Tools/historytools.py
+    """
+
+    def setUp(self):
+        self.directory = "historytests"
+        os.mkdir(self.directory)
+
+        for name in ("G4:M0-2020-09-30.csv", "G4:M0-2020-10-01.csv.gz", "G4:M0-2020-10-02.csv",
+                     "G4:M0-notes.csv", "G4:M01-2020-09-30.csv", "G4:M0-2020.rca"):
+
+            with open(os.path.join(self.directory, name), "w", encoding="utf-8"):
+                pass
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        del self.directory
+
+    def test_get_file_date_1(self):
+        """Test that dates are read from file names correctly"""
+        self.assertEqual(historytools.get_file_date("readings/G4:M0-2020-09-30.csv"),
+                         datetime.date(2020, 9, 30))
+
+        self.assertEqual(historytools.get_file_date("G4:M0-2020-09-30.csv.gz"),
+                         datetime.date(2020, 9, 30))
+
+        self.assertIsNone(historytools.get_file_date("G4:M0-notes.csv"))
+        self.assertIsNone(historytools.get_file_date("G4:M0-2020.rca"))
+
+    def test_find_files_1(self):
+        """Test that only the sensor's readings files are found, in date order"""
+        files = [os.path.basename(name) for name in
+                 historytools.find_files("G4:M0", directory=self.directory)]
+
+        self.assertEqual(files, ["G4:M0-2020-09-30.csv", "G4:M0-2020-10-01.csv.gz",
+                                 "G4:M0-2020-10-02.csv"])
+
+    def test_find_files_2(self):
+        """Test that files can be limited to a range of dates"""
+        files = [os.path.basename(name) for name in
+                 historytools.find_files("G4:M0", directory=self.directory,
+                                         start=datetime.date(2020, 10, 1),
+                                         end=datetime.date(2020, 10, 1))]
+
+        self.assertEqual(files, ["G4:M0-2020-10-01.csv.gz"])
+
+    def test_get_default_interval_1(self):
+        """Test that the reading interval is found for known and unknown sites"""
+        self.assertEqual(historytools.get_default_interval("G4:M0"), 15)
+        self.assertEqual(historytools.get_default_interval("XX:M0"),
+                         historytools.DEFAULT_INTERVAL)
+
+class TestParsing(unittest.TestCase):
+    """
+    This test class tests parsing and converting readings files in
+    Tools/historytools.py
+    """
+
+    def setUp(self):
+        self.directory = "historytests"
+        os.mkdir(self.directory)
+
+        self.file_names = []
+
+        for day, contents in enumerate((data.DAY_1, data.DAY_2)):
+            file_name = os.path.join(self.directory, "G4:M0-2020-09-"+str(29 + day)+".csv")
+
+            with open(file_name, "w", encoding="utf-8") as readings_file:
+                readings_file.write(contents)
+
+            self.file_names.append(file_name)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        del self.directory
+        del self.file_names
+
+    def test_parse_file_1(self):
+        """Test that readings, "." runs, banners and warnings are handled correctly"""
+        columns = historytools.parse_file(self.file_names[0], interval=10)
+
+        self.assertEqual(list(columns["value"]), data.DAY_1_VALUES)
+        self.assertEqual(list(columns["tick"]), data.DAY_1_TICKS)
+        self.assertEqual(list(columns["status"]), data.DAY_1_STATUSES)
+        self.assertEqual(list(columns["time"] - columns["time"][0]), data.DAY_1_OFFSETS)
+
+    def test_parse_file_2(self):
+        """Test that compressed files can be read"""
+        with open(self.file_names[0], "rb") as readings_file:
+            with gzip.open(self.file_names[0]+".gz", "wb") as compressed_file:
+                compressed_file.write(readings_file.read())
+
+        columns = historytools.parse_file(self.file_names[0]+".gz", interval=10)
+
+        self.assertEqual(list(columns["value"]), data.DAY_1_VALUES)
+
+    def test_parse_file_3(self):
+        """Test that empty files return empty columns"""
+        with open(self.file_names[0], "w", encoding="utf-8"):
+            pass
+
+        columns = historytools.parse_file(self.file_names[0], interval=10)
+
+        self.assertEqual(sorted(columns), sorted(historytools.COLUMNS))
+        self.assertEqual(len(columns["time"]), 0)
+
+    def test_read_readings_1(self):
+        """Test that readings files are read as Readings, with the same times as parse_file"""
+        readings = historytools.read_readings(self.file_names[0], interval=10)
+
+        self.assertEqual([reading.get_tick() for reading_time, reading in readings],
+                         data.DAY_1_TICKS)
+
+        self.assertEqual([reading_time - readings[0][0] for reading_time, reading in readings],
+                         data.DAY_1_OFFSETS)
+
+        self.assertEqual(readings[1][1].get_value(), readings[0][1].get_value())
+
+    def test_parse_files_1(self):
+        """Test that files read in several processes are joined in order"""
+        columns = historytools.parse_files(self.file_names, interval=10, processes=2)
+        serial = historytools.parse_files(self.file_names, interval=10, processes=1)
+
+        self.assertEqual(len(columns["time"]), len(data.DAY_1_VALUES) + 3)
+        self.assertEqual(list(columns["time"]), list(serial["time"]))
+        self.assertTrue(all(columns["time"][1:] >= columns["time"][:-1]))
+
+    def test_convert_to_archive_1(self):
+        """Test that readings files are converted to an archive correctly"""
+        archives = historytools.convert_to_archive("G4:M0", directory=self.directory,
+                                                   interval=10, processes=1)
+
+        self.assertEqual([os.path.basename(name) for name in archives], ["G4:M0-2020.rca"])
+
+        records = archivetools.load_year("G4:M0", 2020, self.directory)
+        columns = historytools.load_sensor("G4:M0", directory=self.directory, interval=10,
+                                           processes=1)
+
+        self.assertEqual(list(records["value"]), list(columns["value"]))
+        self.assertEqual(list(records["time"]), list(columns["time"]))
+
+        #Check the index.
+        day_2 = archivetools.load_archive(archives[0], start=datetime.date(2020, 9, 30))
+
+        self.assertEqual(len(day_2), 3)
+
+    def test_convert_to_archive_2(self):
+        """Test that existing archives aren't replaced unless asked"""
+        historytools.convert_to_archive("G4:M0", directory=self.directory, processes=1)
+        os.remove(self.file_names[1])
+
+        self.assertEqual(historytools.convert_to_archive("G4:M0", directory=self.directory,
+                                                         processes=1), [])
+
+        historytools.convert_to_archive("G4:M0", directory=self.directory, interval=10,
+                                        processes=1, overwrite=True)
+
+        self.assertEqual(len(archivetools.load_year("G4:M0", 2020, self.directory)),
+                         len(data.DAY_1_VALUES))
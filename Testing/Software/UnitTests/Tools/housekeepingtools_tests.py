@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Housekeeping Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import gzip
+import time
+import shutil
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import coretools
+from Tools import housekeepingtools
+
+class FakeWriter:
+    """A stand-in for a monitor's ReadingsWriter"""
+    def __init__(self, current_file_name):
+        self.current_file_name = current_file_name
+
+class FakeMonitor:
+    """A stand-in for a monitor, with just the readings writer"""
+    def __init__(self, current_file_name):
+        self.writer = FakeWriter(current_file_name)
+
+class FakeHandler:
+    """A stand-in for a logging file handler"""
+    def __init__(self, base_file_name):
+        self.baseFilename = os.path.abspath(base_file_name)
+
+class TestHousekeeping(unittest.TestCase):
+    """
+    This test class tests the functions and the Housekeeping class in
+    Tools/housekeepingtools.py
+    """
+
+    def setUp(self):
+        #Make sure it won't exit immediately.
+        housekeepingtools.config.EXITING = False
+
+        self.directory = "housekeepingtests"
+        os.mkdir(self.directory)
+
+        #Pretend the files were last changed a day ago, apart from today's readings file.
+        day_ago = time.time() - 86400
+
+        for name, days_old in (("G4:M0-2020-09-28.csv", 2), ("G4:M0-2020-09-29.csv", 1),
+                               ("G4:M0-2020-09-30.csv", 0), ("G4:M0-2020.rca", 3),
+                               ("rivercontrolsystem.log", 0),
+                               ("rivercontrolsystem.log.2020-09-29", 1), ("notes.txt", 3)):
+
+            path = os.path.join(self.directory, name)
+
+            with open(path, "w", encoding="utf-8") as new_file:
+                new_file.write("2020-09-29 10:00:00,1,G4:M0,400,OK....\n" * 100)
+
+            if days_old:
+                mtime = day_ago - ((days_old - 1) * 86400)
+                os.utime(path, (mtime, mtime))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        del self.directory
+
+    def path(self, name):
+        """Returns the path to a test file"""
+        return os.path.join(self.directory, name)
+
+    def test_find_files_1(self):
+        """Test that only readings files and rotated logs are found, oldest first"""
+        names = [os.path.basename(path) for mtime, size, path in
+                 housekeepingtools.find_files(self.directory)]
+
+        self.assertEqual(names[:2], ["G4:M0-2020-09-28.csv", "G4:M0-2020-09-29.csv"])
+        self.assertEqual(sorted(names[2:]), ["G4:M0-2020-09-30.csv",
+                                             "rivercontrolsystem.log.2020-09-29"])
+
+    def test_find_files_2(self):
+        """Test that missing directories are ignored"""
+        self.assertEqual(housekeepingtools.find_files("nosuchdirectory"), [])
+
+    def test_compress_file_1(self):
+        """Test that files are compressed correctly, and keep their modification time"""
+        path = self.path("G4:M0-2020-09-29.csv")
+        mtime = os.stat(path).st_mtime
+
+        with open(path, "rb") as original:
+            contents = original.read()
+
+        self.assertTrue(housekeepingtools.compress_file(path))
+
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(os.path.exists(path+".gz.part"))
+        self.assertEqual(os.stat(path+".gz").st_mtime, mtime)
+
+        with gzip.open(path+".gz", "rb") as compressed:
+            self.assertEqual(compressed.read(), contents)
+
+    def test_compress_file_2(self):
+        """Test that compression is slowed down to the rate limit"""
+        path = self.path("G4:M0-2020-09-29.csv")
+        size = os.stat(path).st_size
+
+        start = time.monotonic()
+        housekeepingtools.compress_file(path, rate_limit=size / 0.5)
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.45)
+
+    def test_compress_file_3(self):
+        """Test that nothing is changed if we are exiting"""
+        path = self.path("G4:M0-2020-09-29.csv")
+
+        housekeepingtools.config.EXITING = True
+
+        try:
+            self.assertFalse(housekeepingtools.compress_file(path))
+
+        finally:
+            housekeepingtools.config.EXITING = False
+
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(os.path.exists(path+".gz"))
+
+    def test_compress_file_4(self):
+        """Test that an existing compressed file isn't overwritten"""
+        path = self.path("G4:M0-2020-09-29.csv")
+
+        with open(path+".gz", "wb") as existing:
+            existing.write(b"existing")
+
+        self.assertFalse(housekeepingtools.compress_file(path))
+
+        self.assertTrue(os.path.exists(path))
+
+        with open(path+".gz", "rb") as existing:
+            self.assertEqual(existing.read(), b"existing")
+        self.assertFalse(os.path.exists(path+".gz.part"))
+
+    def test_enforce_quota_1(self):
+        """Test that files older than the maximum age are removed"""
+        removed = housekeepingtools.enforce_quota(self.directory,
+                                                  housekeepingtools.Quota(10 ** 9, 1.5))
+
+        self.assertEqual(removed, [self.path("G4:M0-2020-09-28.csv")])
+
+    def test_enforce_quota_2(self):
+        """Test that the oldest files are removed to keep within the size, apart from recent files and files in use"""
+        size = os.stat(self.path("G4:M0-2020-09-28.csv")).st_size
+        in_use = {os.path.abspath(self.path("G4:M0-2020-09-29.csv"))}
+
+        removed = housekeepingtools.enforce_quota(self.directory,
+                                                  housekeepingtools.Quota(size, 365),
+                                                  in_use=in_use)
+
+        self.assertEqual(sorted(removed), [self.path("G4:M0-2020-09-28.csv"),
+                                           self.path("rivercontrolsystem.log.2020-09-29")])
+
+        self.assertTrue(os.path.exists(self.path("G4:M0-2020-09-29.csv")))
+        self.assertTrue(os.path.exists(self.path("G4:M0-2020-09-30.csv")))
+        self.assertTrue(os.path.exists(self.path("G4:M0-2020.rca")))
+
+    def test_do_housekeeping_1(self):
+        """Test that only closed files are compressed"""
+        housekeepingtools.config.EXITING = True
+
+        try:
+            housekeeping = housekeepingtools.Housekeeping(
+                monitors=[FakeMonitor(self.path("G4:M0-2020-09-28.csv"))],
+                handlers=[FakeHandler(self.path("rivercontrolsystem.log"))],
+                quotas={self.directory: housekeepingtools.Quota(10 ** 9, 365)})
+
+            housekeeping.wait_exit()
+
+        finally:
+            housekeepingtools.config.EXITING = False
+
+        housekeeping.do_housekeeping()
+
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         ["G4:M0-2020-09-28.csv", "G4:M0-2020-09-29.csv.gz",
+                          "G4:M0-2020-09-30.csv", "G4:M0-2020.rca", "notes.txt",
+                          "rivercontrolsystem.log", "rivercontrolsystem.log.2020-09-29.gz"])
+
+    def test_run_1(self):
+        """Test that the thread exits straight away when request_exit() is called"""
+        housekeeping = housekeepingtools.Housekeeping(quotas={})
+
+        try:
+            start = time.monotonic()
+            coretools.request_exit()
+            housekeeping.join(5)
+
+        finally:
+            housekeepingtools.config.EXITING = False
+
+        self.assertFalse(housekeeping.is_alive())
+        self.assertLess(time.monotonic() - start, 0.5)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# I2C Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import time
+import threading
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import i2ctools
+from Tools import testingtools
+
+class TestI2CBusManager(unittest.TestCase):
+    """
+    This test class tests the I2CBusManager class in Tools/i2ctools.py
+    """
+
+    def setUp(self):
+        self.backend = i2ctools.StandInBackend()
+        self.bus = i2ctools.I2CBusManager(self.backend)
+
+        for channel in range(4):
+            self.backend.set_voltage(0x48, channel, channel + 0.5)
+            self.backend.set_voltage(0x49, channel, channel + 1.5)
+
+        self.threads = []
+
+    def tearDown(self):
+        for thread in self.threads:
+            thread.join()
+
+        del self.backend
+        del self.bus
+        del self.threads
+
+    def read_in_thread(self, address, channels, results):
+        """Starts a thread that reads the channels and appends the voltages to results"""
+        def read():
+            results.append([voltage for voltage, _ in self.bus.read(address, channels)])
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        self.threads.append(thread)
+
+        #Give it time to queue its request.
+        time.sleep(0.05)
+
+    def test_read_1(self):
+        """Test that channels are read in the order asked for, with timestamps"""
+        results = self.bus.read(0x48, (3, 0))
+
+        self.assertEqual([voltage for voltage, _ in results], [3.5, 0.5])
+        self.assertLessEqual(results[0][1], results[1][1])
+        self.assertEqual(self.backend.reads, [(0x48, (3, 0), i2ctools.DEFAULT_GAIN,
+                                               i2ctools.DEFAULT_DATA_RATE)])
+
+    def test_read_2(self):
+        """Test that waiting requests for the same chip are batched, and chips served in turn"""
+        self.backend.conversion_time = 0.1
+        results = []
+
+        #Keep the bus busy, then queue requests for two chips.
+        self.read_in_thread(0x48, (0,), results)
+        self.read_in_thread(0x49, (0,), results)
+        self.read_in_thread(0x48, (0, 1), results)
+        self.read_in_thread(0x48, (1, 2), results)
+
+        for thread in self.threads:
+            thread.join()
+
+        self.assertEqual([read[:2] for read in self.backend.reads],
+                         [(0x48, (0,)), (0x49, (0,)), (0x48, (0, 1, 2))])
+
+        self.assertEqual(sorted(results), [[0.5], [0.5, 1.5], [1.5], [1.5, 2.5]])
+
+        stats = self.bus.get_stats()
+
+        self.assertEqual(stats[0x48]["requests"], 3)
+        self.assertEqual(stats[0x48]["conversions"], 4)
+        self.assertEqual(stats[0x49]["requests"], 1)
+        self.assertGreater(stats[0x48]["max_latency"], 0.1)
+
+    def test_read_3(self):
+        """Test that errors are raised as OSError, and counted"""
+        self.backend.fail(0x48)
+
+        self.assertRaises(OSError, self.bus.read, 0x48, (0,))
+        self.assertEqual(self.bus.read(0x48, (0,))[0][0], 0.5)
+
+        stats = self.bus.get_stats()
+
+        self.assertEqual(stats[0x48]["errors"], 1)
+        self.assertEqual(stats[0x48]["error_rate"], 0.5)
+
+        #The bus should still be usable by other threads.
+        self.assertFalse(self.bus.busy)
+
+    def test_read_4(self):
+        """Test that unexpected errors are raised as OSError for every request in the batch"""
+        def read_channels(address, channels, gain, data_rate):
+            if address == 0x49:
+                raise RuntimeError("Unexpected library error")
+
+            time.sleep(0.1)
+            return [(0.5, time.monotonic()) for _ in channels]
+
+        self.backend.read_channels = read_channels
+        errors = []
+
+        def read():
+            try:
+                self.bus.read(0x49, (0,))
+
+            except OSError as error:
+                errors.append(str(error))
+
+        #Keep the bus busy, so both requests for 0x49 are served together.
+        self.read_in_thread(0x48, (0,), [])
+
+        for _ in range(2):
+            thread = threading.Thread(target=read)
+            thread.start()
+            self.threads.append(thread)
+
+        for thread in self.threads:
+            thread.join(5)
+            self.assertFalse(thread.is_alive())
+
+        self.assertEqual(errors, ["Unexpected library error"] * 2)
+        self.assertEqual(self.bus.get_stats()[0x49]["errors"], 2)
+        self.assertFalse(self.bus.busy)
+
+class TestADS1115Backend(unittest.TestCase):
+    """
+    This test class tests the ADS1115Backend class in Tools/i2ctools.py
+    """
+
+    def test_read_channels_1(self):
+        """Test that channels are created once, and read"""
+        backend = i2ctools.ADS1115Backend(None, testingtools.ADS, testingtools.AnalogIn)
+
+        results = backend.read_channels(0x48, (0, 1), 1, 128)
+        backend.read_channels(0x48, (0, 1), 1, 128)
+
+        self.assertEqual([voltage for voltage, _ in results], [0, 0])
+        self.assertEqual(sorted(backend.channels), [(0x48, 0), (0x48, 1)])
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import datetime
+import time
 import sys
 import os
 
@@ -24,6 +25,7 @@ sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the
 #This is needed for access to BaseDeviceClass, which our dummy classes extend from.
 import Tools
 from Tools import deviceobjects
+from Tools import sockettools
 
 class Dummy:
     """A dummy class that does nothing, just used for testing"""
@@ -68,6 +70,21 @@ class Motor(deviceobjects.BaseDeviceClass):
 
         return True
 
+class CountingProbe(deviceobjects.BaseDeviceClass):
+    """A fake probe that counts its readings, and can be made to block like a slow reader"""
+    def __init__(self, _id, _name, delay=0):
+        deviceobjects.BaseDeviceClass.__init__(self, _id, _name)
+
+        self.delay = delay
+        self.slow_reader = bool(delay)
+        self.count = 0
+
+    def get_reading(self):
+        time.sleep(self.delay)
+        self.count += 1
+
+        return self.count, "OK"
+
 class Monitor:
     """A fake do-nothing Monitor class, just used for testing"""
     def __init__(self):
@@ -99,6 +116,13 @@ class Sockets:
     def write(self, data):
         self.out_queue.append(data)
 
+    def subscribe(self, sensor_id, callback=None):
+        self.subscription = sockettools.ReadingSubscription(sensor_id, callback)
+        return self.subscription
+
+    def unsubscribe(self, subscription):
+        self.subscription = None
+
 class GoodFakeFile:
     def write(self, data):
         pass
@@ -33,6 +33,8 @@ sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the
 
 import Tools
 from Tools import monitortools
+from Tools import blackboardtools
+from Tools import archivetools
 from Tools import coretools
 from Tools import logiccoretools
 from Tools import deviceobjects
@@ -40,15 +42,94 @@ from Tools import deviceobjects
 #Import test data and functions.
 from . import monitortools_test_data as data
 
+class TestReadingsWriter(unittest.TestCase):
+    """This test class tests the features of the ReadingsWriter class in Tools/monitortools.py"""
+
+    def setUp(self):
+        os.chdir("UnitTests")
+
+        self.writer = monitortools.ReadingsWriter("readings/SUMP:M0", flush_records=3,
+                                                  flush_interval=60)
+
+        self.writer.open()
+
+    def tearDown(self):
+        self.writer.close()
+        del self.writer
+
+        #Clear the readings directory that has been created.
+        if os.path.isdir("readings"):
+            shutil.rmtree("readings")
+            os.mkdir("readings")
+
+        os.chdir("../")
+
+    def read_file(self):
+        """Returns the contents of the readings file"""
+        with open(self.writer.current_file_name, "r", encoding="utf-8") as readings_file:
+            return readings_file.read()
+
+    def test_open_1(self):
+        """Test that opening the file writes the header and sets the rotation deadline"""
+        self.assertTrue(self.writer.current_file_name.startswith("readings/SUMP:M0-"))
+        self.assertTrue("TIME,SYSTEM TICK,ID,VALUE,STATUS" in self.read_file())
+
+        #Rotation should be due at the next midnight.
+        midnight = datetime.datetime.combine(datetime.date.today() + datetime.timedelta(days=1),
+                                             datetime.time())
+
+        self.assertEqual(self.writer.rotation_deadline, midnight.timestamp())
+        self.assertFalse(self.writer.rotation_due())
+
+    def test_write_1(self):
+        """Test that records are buffered until there are enough of them"""
+        self.writer.write(".")
+        self.writer.write(".")
+
+        self.assertFalse(self.read_file().endswith(".."))
+
+        self.writer.write(".")
+
+        self.assertTrue(self.read_file().endswith("..."))
+        self.assertEqual(self.writer.buffer, [])
+
+    def test_write_2(self):
+        """Test that records are written when they have been buffered long enough"""
+        self.writer.flush_interval = 0.5
+
+        self.writer.write(".")
+        time.sleep(0.6)
+        self.writer.write("!")
+
+        self.assertTrue(self.read_file().endswith(".!"))
+
+    def test_close_1(self):
+        """Test that closing the file writes any buffered records"""
+        self.writer.write(".")
+        self.writer.close()
+
+        self.assertTrue(self.read_file().endswith("."))
+
+    def test_file_deleted_1(self):
+        """Test that deleting the open file is noticed"""
+        self.assertFalse(self.writer.file_deleted())
+
+        os.remove(self.writer.current_file_name)
+
+        self.assertTrue(self.writer.file_deleted())
+
 class TestBaseMonitorClass(unittest.TestCase):
     """This test class tests the features of the BaseMonitorClass class in Tools/monitortools.py"""
     def setUp(self):
+        self.orig_blackboard = monitortools.config.LATESTREADINGS
+        monitortools.config.LATESTREADINGS = blackboardtools.ReadingsBlackboard()
+
         self.basemonitor = monitortools.BaseMonitorClass("SUMP", "M0")
 
         self.reading = coretools.Reading(str(datetime.datetime.now()), 0,
-                                     "G4:M0", "400mm", "OK")
+                                     "SUMP:M0", "400mm", "OK")
 
-        self.basemonitor.queue.append(self.reading)
+        monitortools.config.LATESTREADINGS.post(self.reading)
 
         self.orig_store_reading = logiccoretools.store_reading
         logiccoretools.store_reading = data.fake_store_reading
@@ -57,6 +138,8 @@ class TestBaseMonitorClass(unittest.TestCase):
         del self.reading
         del self.basemonitor
 
+        monitortools.config.LATESTREADINGS = self.orig_blackboard
+
         logiccoretools.store_reading = self.orig_store_reading
 
     def set_exited_flag(self):
@@ -127,6 +210,17 @@ class TestBaseMonitorClass(unittest.TestCase):
         self.basemonitor.get_reading()
         self.assertFalse(self.basemonitor.has_data())
 
+    def test_has_data_3(self):
+        """Test that only the latest of several new readings is returned"""
+        reading = coretools.Reading(str(datetime.datetime.now()), 1,
+                                    "SUMP:M0", "500mm", "OK")
+
+        monitortools.config.LATESTREADINGS.post(reading)
+
+        self.assertTrue(self.basemonitor.has_data())
+        self.assertEqual(self.basemonitor.get_reading().get_value(), "500mm")
+        self.assertFalse(self.basemonitor.has_data())
+
     def test_set_reading_interval_1(self):
         """Test that setting the reading interval works"""
         for i in range(0, 600):
@@ -142,14 +236,14 @@ class TestBaseMonitorClass(unittest.TestCase):
                 shutil.rmtree("readings")
 
             self.basemonitor.create_file_handle()
-            self.basemonitor.file_handle.close()
+            self.basemonitor.writer.file_handle.close()
 
         except Exception as e:
             raise e
 
         finally:
             try:
-                self.basemonitor.file_handle.close()
+                self.basemonitor.writer.file_handle.close()
 
             except:
                 pass
@@ -174,14 +268,14 @@ class TestBaseMonitorClass(unittest.TestCase):
             os.mkdir("readings")
 
             self.basemonitor.create_file_handle()
-            self.basemonitor.file_handle.close()
+            self.basemonitor.writer.file_handle.close()
 
         except Exception as e:
             raise e
 
         finally:
             try:
-                self.basemonitor.file_handle.close()
+                self.basemonitor.writer.file_handle.close()
 
             except:
                 pass
@@ -212,14 +306,14 @@ class TestBaseMonitorClass(unittest.TestCase):
             monitortools.open = data.badopen
 
             self.basemonitor.create_file_handle()
-            self.basemonitor.file_handle.close()
+            self.basemonitor.writer.file_handle.close()
 
         except Exception as e:
             error = e
 
         finally:
             try:
-                self.basemonitor.file_handle.close()
+                self.basemonitor.writer.file_handle.close()
 
             except:
                 pass
@@ -243,7 +337,7 @@ class TestBaseMonitorClass(unittest.TestCase):
         previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "775mm", "OK")
 
         #Create a fake file handle.
-        self.basemonitor.file_handle = data.goodopen("test", "r")
+        self.basemonitor.writer.file_handle = data.goodopen("test", "r")
 
         previous_reading, write_failed = self.basemonitor.handle_reading(reading, previous_reading)
 
@@ -256,7 +350,7 @@ class TestBaseMonitorClass(unittest.TestCase):
         previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
 
         #Create a fake file handle.
-        self.basemonitor.file_handle = data.goodopen("test", "r")
+        self.basemonitor.writer.file_handle = data.goodopen("test", "r")
 
         prev_reading, write_failed = self.basemonitor.handle_reading(reading, previous_reading)
 
@@ -269,8 +363,9 @@ class TestBaseMonitorClass(unittest.TestCase):
         reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
         previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
 
-        #Create a fake file handle.
-        self.basemonitor.file_handle = data.badopen("test", "r")
+        #Create a fake file handle, and write straight away rather than buffering.
+        self.basemonitor.writer.file_handle = data.badopen("test", "r")
+        self.basemonitor.writer.flush_records = 1
 
         prev_reading, write_failed = self.basemonitor.handle_reading(reading, previous_reading)
 
@@ -278,26 +373,41 @@ class TestBaseMonitorClass(unittest.TestCase):
         self.assertEqual(prev_reading, reading)
         self.assertTrue(write_failed)
 
+    def test_handle_reading_4(self):
+        """Test that handle_reading() writes every reading to the archive, if enabled"""
+        reading = coretools.Reading("2020-09-30 12:01:12", 0, "SUMP:M0", "800", "OK")
+
+        #Create a fake file handle, and an archive.
+        self.basemonitor.writer.file_handle = data.goodopen("test", "r")
+        self.basemonitor.archive = archivetools.ArchiveWriter("SUMP:M0", directory="archivetests")
+
+        try:
+            self.basemonitor.handle_reading(reading, None)
+            self.basemonitor.handle_reading(reading, reading)
+            self.basemonitor.close_files()
+
+            records = archivetools.load_year("SUMP:M0", 2020, directory="archivetests")
+
+            self.assertEqual(len(records), 2)
+            self.assertEqual(list(records["value"]), [800.0, 800.0])
+
+        finally:
+            shutil.rmtree("archivetests")
+
     def test_manage_rotation_1(self):
         """Test that manage_rotation() works as expected when rotation is not due and all is fine"""
         previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
 
-        #Just a hack to make sure that the file is reported to exist.
-        self.basemonitor.current_file_name = "unittests.py"
-
-        #Set the expiration time to midnight so we can rotate readings files.
-        #This uses the datetime class cos it's easier to compare times that way.
-        midnight = datetime.time(hour=23, minute=59, second=59)
-        current_time = datetime.datetime.now()
+        #Use a file that exists, and set the rotation deadline an hour from now.
+        self.basemonitor.writer.file_handle = open("unittests.py", "r", encoding="utf-8")
+        self.basemonitor.writer.rotation_deadline = time.time() + 3600
 
-        self.basemonitor.midnight_tonight = datetime.datetime.combine(current_time.date(),
-                                                                      midnight)
-
-        prev_reading, should_continue = self.basemonitor.manage_rotation(False,
-                                                                         previous_reading)
+        try:
+            prev_reading, should_continue = self.basemonitor.manage_rotation(False,
+                                                                             previous_reading)
 
-        del self.basemonitor.current_file_name
-        del self.basemonitor.midnight_tonight
+        finally:
+            self.basemonitor.writer.file_handle.close()
 
         self.assertEqual(prev_reading, previous_reading)
         self.assertFalse(should_continue)
@@ -306,75 +416,57 @@ class TestBaseMonitorClass(unittest.TestCase):
         """Test that manage_rotation() works as expected when rotation is not due and the readings file is missing"""
         previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
 
-        #----- BEGIN HACKY STUFF TO MAKE THE TEST WORK -----
-        #Just a hack to make sure that the file is reported not to exist.
-        self.basemonitor.current_file_name = "i_dont_exist"
-
-        #Set the expiration time to midnight so we can rotate readings files.
-        #This uses the datetime class cos it's easier to compare times that way.
-        midnight = datetime.time(hour=23, minute=59, second=59)
-        current_time = datetime.datetime.now()
-
-        self.basemonitor.midnight_tonight = datetime.datetime.combine(current_time.date(),
-                                                                      midnight)
-
-        self.basemonitor.file_handle = data.goodopen("test", "r")
+        #Open a file and then delete it.
+        self.basemonitor.writer.file_handle = open("deleted_readings_file", "a", encoding="utf-8")
+        self.basemonitor.writer.rotation_deadline = time.time() + 3600
+        os.remove("deleted_readings_file")
 
-        create_file_handle_method = self.basemonitor.create_file_handle
-
-        self.basemonitor.create_filehandle = data.do_nothing
-
-        #----- END HACKY STUFF ---
+        self.basemonitor.create_file_handle = data.do_nothing
 
         prev_reading, should_continue = self.basemonitor.manage_rotation(False,
                                                                          previous_reading)
 
-        #Revert all the hacky stuff we just did.
-        self.basemonitor.current_file_name = None
-        self.basemonitor.midnight_tonight = None
-        self.basemonitor.file_handle = None
-        self.basemonitor.create_file_handle = create_file_handle_method
-
         self.assertEqual(prev_reading, None)
         self.assertTrue(should_continue)
 
+        #The warning should be waiting to be written to the new file.
+        self.assertEqual(self.basemonitor.writer.buffer,
+                         ["WARNING: Previous readings file was deleted.\n"])
+
     def test_manage_rotation_3(self):
         """Test that manage_rotation() works as expected when rotation is not due and we failed to write to the readings file"""
         previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
 
-        #----- BEGIN HACKY STUFF TO MAKE THE TEST WORK -----
-        #Just a hack to make sure that the file is reported not to exist.
-        self.basemonitor.current_file_name = "main.py"
+        self.basemonitor.writer.file_handle = open("unittests.py", "r", encoding="utf-8")
+        self.basemonitor.writer.rotation_deadline = time.time() + 3600
 
-        #Set the expiration time to midnight so we can rotate readings files.
-        #This uses the datetime class cos it's easier to compare times that way.
-        midnight = datetime.time(hour=23, minute=59, second=59)
-        current_time = datetime.datetime.now()
+        self.basemonitor.create_file_handle = data.do_nothing
 
-        self.basemonitor.midnight_tonight = datetime.datetime.combine(current_time.date(),
-                                                                      midnight)
+        prev_reading, should_continue = self.basemonitor.manage_rotation(True,
+                                                                         previous_reading)
 
-        self.basemonitor.file_handle = data.goodopen("test", "r")
+        self.assertTrue(self.basemonitor.writer.file_handle.closed)
+        self.assertEqual(prev_reading, None)
+        self.assertTrue(should_continue)
 
-        create_file_handle_method = self.basemonitor.create_file_handle
+    def test_manage_rotation_4(self):
+        """Test that manage_rotation() works as expected when rotation is due"""
+        previous_reading = coretools.Reading(str(datetime.datetime.now()), 0, "SUMP:M0", "800mm", "OK")
 
-        self.basemonitor.create_filehandle = data.do_nothing
+        self.basemonitor.writer.file_handle = data.goodopen("test", "r")
+        self.basemonitor.writer.rotation_deadline = time.time() - 1
+        self.basemonitor.writer.buffer = ["."]
 
-        #----- END HACKY STUFF ---
+        self.basemonitor.writer.file_deleted = lambda: False
+        self.basemonitor.create_file_handle = data.do_nothing
 
-        prev_reading, should_continue = self.basemonitor.manage_rotation(True,
+        prev_reading, should_continue = self.basemonitor.manage_rotation(False,
                                                                          previous_reading)
 
-        #Revert all the hacky stuff we just did.
-        self.basemonitor.current_file_name = None
-        self.basemonitor.midnight_tonight = None
-        self.basemonitor.file_handle = None
-        self.basemonitor.create_file_handle = create_file_handle_method
-
+        #Buffered readings should have been written to the old file.
+        self.assertEqual(self.basemonitor.writer.buffer, [])
         self.assertEqual(prev_reading, None)
-        self.assertTrue(should_continue)
-
-    #TODO Test that manage_rotation works when rotation is due.
+        self.assertFalse(should_continue)
 
     def test_wait_exit(self):
         """Test that waiting for the thread to exit works (slow test)"""
@@ -434,6 +526,92 @@ class TestMonitor(unittest.TestCase):
         #Check teardown code worked.
         self.assertFalse(monitor.running)
 
+class TestSamplingScheduler(unittest.TestCase):
+    """
+    This test class tests the features of the SamplingScheduler class in
+    Tools/monitortools.py
+    """
+
+    def setUp(self):
+        os.chdir("UnitTests")
+
+        #Make sure it won't exit immediately.
+        monitortools.config.EXITING = False
+
+        self.orig_store_reading = logiccoretools.store_reading
+        logiccoretools.store_reading = data.fake_store_reading
+
+    def tearDown(self):
+        #Stop the scheduler.
+        monitortools.coretools.request_exit()
+
+        scheduler = monitortools.get_scheduler()
+
+        while scheduler.is_running():
+            time.sleep(0.1)
+
+        #Clear the readings directory that has been created.
+        if os.path.isdir("readings"):
+            shutil.rmtree("readings")
+            os.mkdir("readings")
+
+        os.chdir("../")
+
+        logiccoretools.store_reading = self.orig_store_reading
+
+    def test_1(self):
+        """Test that one scheduler takes readings for each monitor on its own interval"""
+        fast_probe = data.CountingProbe("SUMP:M0", "Fast")
+        slow_probe = data.CountingProbe("SUMP:M1", "Slow")
+
+        fast_monitor = monitortools.Monitor(fast_probe, 1, "SUMP")
+        slow_monitor = monitortools.Monitor(slow_probe, 10, "SUMP")
+
+        self.assertIs(fast_monitor.scheduler, slow_monitor.scheduler)
+
+        time.sleep(3.5)
+
+        self.assertGreaterEqual(fast_probe.count, 3)
+        self.assertEqual(slow_probe.count, 1)
+
+    def test_2(self):
+        """Test that changing the reading interval takes effect immediately"""
+        probe = data.CountingProbe("SUMP:M0", "Test")
+        monitor = monitortools.Monitor(probe, 600, "SUMP")
+
+        time.sleep(1)
+        self.assertEqual(probe.count, 1)
+
+        monitor.set_reading_interval(1)
+
+        time.sleep(1.5)
+        self.assertGreaterEqual(probe.count, 2)
+
+    def test_3(self):
+        """Test that slow readers don't hold up the other monitors"""
+        fast_probe = data.CountingProbe("SUMP:M0", "Fast")
+        blocking_probe = data.CountingProbe("SUMP:M1", "Blocking", delay=3)
+
+        monitortools.Monitor(blocking_probe, 1, "SUMP")
+        monitortools.Monitor(fast_probe, 1, "SUMP")
+
+        time.sleep(2.5)
+
+        self.assertEqual(blocking_probe.count, 0)
+        self.assertGreaterEqual(fast_probe.count, 2)
+
+    def test_4(self):
+        """Test that the monitors stop when the scheduler exits"""
+        probe = data.CountingProbe("SUMP:M0", "Test")
+        monitor = monitortools.Monitor(probe, 1, "SUMP")
+
+        self.assertTrue(monitor.is_running())
+
+        monitortools.config.EXITING = True
+        monitor.wait_exit()
+
+        self.assertFalse(monitor.is_running())
+
 class TestSocketsMonitor(unittest.TestCase):
     """
     This test class tests the features of the SocketsMonitor class in
@@ -477,3 +655,25 @@ class TestSocketsMonitor(unittest.TestCase):
         #Monitor thread has exited.
         #Check teardown code worked.
         self.assertFalse(monitor.running)
+
+    def test_2(self):
+        """Test that only this monitor's readings are handled, as soon as they arrive"""
+        monitor = monitortools.SocketsMonitor(self.socket, "SUMP", "M0")
+        reading = coretools.Reading(time.strftime("%Y-%m-%d %H:%M:%S"), 1, "SUMP:M0",
+                                    "400mm", "OK")
+
+        try:
+            self.assertEqual(self.socket.subscription.sensor_id, "SUMP:M0")
+
+            self.socket.subscription.deliver(reading)
+
+            time.sleep(0.5)
+
+            self.assertEqual(monitor.get_reading(), reading)
+            self.assertFalse(self.socket.subscription.has_data())
+
+        finally:
+            monitortools.config.EXITING = True
+            monitor.wait_exit()
+
+        self.assertIsNone(self.socket.subscription)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Profiling Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import json
+import shutil
+import tempfile
+import threading
+import time
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+from Tools import profilingtools
+
+class TestCycleProfiler(unittest.TestCase):
+    """
+    This test class tests the CycleProfiler class in Tools/profilingtools.py
+    """
+
+    def setUp(self):
+        self.profiler = profilingtools.CycleProfiler("G4", window=10, overrun_share=0.5)
+
+    def tearDown(self):
+        del self.profiler
+
+    def do_cycle(self, logic_time=0, queries=0, reading_interval=15):
+        """Goes once around a fake main loop"""
+        self.profiler.start_cycle()
+
+        self.profiler.start_phase(profilingtools.READINGS)
+        self.profiler.end_phase()
+
+        self.profiler.start_phase(profilingtools.LOGIC)
+
+        for _ in range(queries):
+            start = time.perf_counter()
+            self.profiler.add_query(start, start + 0.001)
+
+        time.sleep(logic_time)
+        self.profiler.end_phase()
+
+        self.profiler.start_phase(profilingtools.WAIT)
+        self.profiler.end_cycle(reading_interval)
+
+    def test_constructor_1(self):
+        """Test that the constructor works when passed valid arguments"""
+        self.assertEqual(self.profiler.site_id, "G4")
+        self.assertEqual((self.profiler.window, self.profiler.overrun_share), (10, 0.5))
+        self.assertEqual((self.profiler.cycles, self.profiler.overruns), (0, 0))
+
+        for phase in profilingtools.PHASES:
+            self.assertEqual(self.profiler.timings[phase].maxlen, 10)
+
+    def test_constructor_2(self):
+        """Test that the constructor fails when passed invalid arguments"""
+        for kwargs in ({"window": 0}, {"window": 1.5}, {"window": True},
+                       {"overrun_share": 0}, {"overrun_share": "0.5"}):
+
+            with self.assertRaises(ValueError):
+                profilingtools.CycleProfiler("G4", **kwargs)
+
+    def test_cycle_1(self):
+        """Test that every phase is timed, and only the last window cycles are kept"""
+        for _ in range(15):
+            self.do_cycle(queries=2)
+
+        stats = self.profiler.get_stats()
+
+        self.assertEqual((stats["site_id"], stats["cycles"], stats["overruns"]), ("G4", 15, 0))
+        self.assertEqual(set(stats["phases"]), set(profilingtools.PHASES))
+
+        for phase in profilingtools.PHASES:
+            self.assertEqual(len(self.profiler.timings[phase]), 10)
+
+        #Two 1 ms queries in each cycle.
+        self.assertAlmostEqual(stats["phases"][profilingtools.DATABASE]["max"], 0.002)
+
+    def test_cycle_2(self):
+        """Test that the database time is zero if the logic made no queries, and missing if it didn't run"""
+        self.do_cycle()
+
+        self.profiler.start_cycle()
+        self.profiler.start_phase(profilingtools.WAIT)
+        self.profiler.end_cycle(15)
+
+        self.assertEqual(list(self.profiler.timings[profilingtools.DATABASE]), [0])
+        self.assertEqual(len(self.profiler.timings[profilingtools.LOGIC]), 1)
+        self.assertEqual(len(self.profiler.timings[profilingtools.CYCLE]), 2)
+
+    def test_add_query_1(self):
+        """Test that only queries made by the main loop thread, during the logic, are counted"""
+        self.profiler.start_cycle()
+
+        #Not during the logic.
+        self.profiler.start_phase(profilingtools.READINGS)
+        self.profiler.add_query(0, 1)
+        self.profiler.end_phase()
+
+        self.profiler.start_phase(profilingtools.LOGIC)
+
+        #Not the main loop thread.
+        thread = threading.Thread(target=self.profiler.add_query, args=(0, 1))
+        thread.start()
+        thread.join()
+
+        self.profiler.add_query(0, 0.5)
+        self.profiler.end_phase()
+
+        self.assertEqual(self.profiler.queries, 1)
+        self.assertEqual(self.profiler.durations[profilingtools.DATABASE], 0.5)
+
+    def test_overrun_1(self):
+        """Test that cycles where the logic takes too much of the reading interval are counted"""
+        self.do_cycle(logic_time=0.02, reading_interval=0.01)
+        self.do_cycle(logic_time=0, reading_interval=15)
+
+        self.assertEqual(self.profiler.get_stats()["overruns"], 1)
+
+    def test_get_percentiles_1(self):
+        """Test that nearest-rank percentiles are found"""
+        self.assertEqual(self.profiler.get_percentiles(profilingtools.LOGIC), {})
+
+        self.profiler.timings[profilingtools.LOGIC].extend([0.01 * i for i in range(10, 0, -1)])
+
+        percentiles = self.profiler.get_percentiles(profilingtools.LOGIC)
+
+        self.assertAlmostEqual(percentiles[50], 0.05)
+        self.assertAlmostEqual(percentiles[90], 0.09)
+        self.assertAlmostEqual(percentiles[99], 0.1)
+        self.assertAlmostEqual(percentiles["max"], 0.1)
+
+    def test_format_stats_1(self):
+        """Test that there is a line for each phase that has been timed"""
+        self.profiler.timings[profilingtools.LOGIC].append(0.0123)
+
+        self.assertEqual(self.profiler.format_stats(),
+                         "logic: p50 12.3 ms, p90 12.3 ms, p99 12.3 ms, max 12.3 ms")
+
+class TestTrace(unittest.TestCase):
+    """
+    This test class tests tracing with the CycleProfiler class in Tools/profilingtools.py
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "trace.json")
+        self.profiler = profilingtools.CycleProfiler("G4", overrun_share=0.5)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+        del self.directory
+        del self.filename
+        del self.profiler
+
+    def do_cycle(self):
+        """Goes once around a fake main loop, with one query"""
+        self.profiler.start_cycle()
+        self.profiler.start_phase(profilingtools.LOGIC)
+        self.profiler.add_query(time.perf_counter(), time.perf_counter())
+        self.profiler.start_phase(profilingtools.WAIT)
+        self.profiler.end_cycle(15)
+
+    def test_start_trace_1(self):
+        """Test that the number of cycles is checked"""
+        for cycles in (0, -1, 1.5, True):
+            with self.assertRaises(ValueError):
+                self.profiler.start_trace(self.filename, cycles)
+
+    def test_trace_1(self):
+        """Test that the trace is written once the window of cycles is done"""
+        self.do_cycle()
+        self.profiler.start_trace(self.filename, 2)
+
+        self.do_cycle()
+        self.assertFalse(os.path.exists(self.filename))
+
+        self.do_cycle()
+
+        with open(self.filename, encoding="utf-8") as trace_file:
+            trace = json.load(trace_file)
+
+        events = trace["traceEvents"]
+
+        self.assertEqual(events[0]["ph"], "M")
+        self.assertTrue(all(event["ph"] == "X" for event in events[1:]))
+
+        #The database query sits inside the logic phase, which sits inside the cycle.
+        self.assertEqual([event["name"] for event in events[1:]],
+                         ["database", "logic", "wait", "cycle"] * 2)
+
+        self.assertEqual([event["args"] for event in events if event["name"] == "cycle"],
+                         [{"cycle": 1, "queries": 1}, {"cycle": 2, "queries": 1}])
+
+        #Nothing more is recorded.
+        self.do_cycle()
+        self.assertEqual(self.profiler.trace_events, [])
+
+    def test_stop_trace_1(self):
+        """Test that a trace can be stopped early, and that nothing happens if there isn't one"""
+        self.profiler.stop_trace()
+        self.assertFalse(os.path.exists(self.filename))
+
+        self.profiler.start_trace(self.filename, 20)
+        self.do_cycle()
+        self.profiler.stop_trace()
+
+        with open(self.filename, encoding="utf-8") as trace_file:
+            self.assertEqual(len(json.load(trace_file)["traceEvents"]), 5)
+
+class TestFormatDuration(unittest.TestCase):
+    """
+    This test class tests the format_duration() function in Tools/profilingtools.py
+    """
+
+    def test_format_duration_1(self):
+        """Test that durations are shown in milliseconds"""
+        for seconds, expected in ((0.0123, "12.3 ms"), (2, "2000 ms"), (0, "0 ms")):
+            self.assertEqual(profilingtools.format_duration(seconds), expected)
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Simulation Tools Unit Tests for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# pylint: disable=too-few-public-methods
+#
+# Reason (too-few-public-methods): Test classes don't need many public members.
+
+#Import modules
+import unittest
+import sys
+import os
+import copy
+import datetime
+import sqlite3
+import threading
+
+#Import other modules.
+sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
+
+import config
+from Tools import testingtools
+from Tools import simulationtools
+
+class TestLocaliseSettings(unittest.TestCase):
+    """
+    This test class tests the localise_settings() function in Tools/simulationtools.py
+    """
+
+    def setUp(self):
+        self.site_settings = copy.deepcopy(config.SITE_SETTINGS)
+
+    def tearDown(self):
+        config.SITE_SETTINGS = self.site_settings
+
+    def test_localise_settings_1(self):
+        """Test that every address is replaced with a loopback address"""
+        simulationtools.localise_settings(port_offset=1000)
+
+        for site_id, site_settings in config.SITE_SETTINGS.items():
+            self.assertTrue(site_settings["IPAddress"].startswith("127.0.0."))
+            self.assertTrue(site_settings["DBHost"].startswith("127.0.0."))
+
+            if site_id != "NAS":
+                self.assertEqual(site_settings["ServerAddress"], "127.0.0.25")
+                self.assertEqual(site_settings["ServerPort"],
+                                 self.site_settings[site_id]["ServerPort"] + 1000)
+
+        self.assertEqual(config.SITE_SETTINGS["G4"]["IPAddress"], "127.0.0.4")
+        self.assertEqual(config.SITE_SETTINGS["NAS"]["DBHost"], "127.0.0.1")
+
+    def test_localise_settings_2(self):
+        """Test that synthetic sites are added, with their own IDs, addresses and ports"""
+        simulationtools.localise_settings(extra_sites=3)
+
+        ports = [site_settings["ServerPort"] for site_settings in config.SITE_SETTINGS.values()
+                 if "ServerPort" in site_settings]
+
+        self.assertEqual(len(ports), len(set(ports)))
+
+        for number in range(1, 4):
+            site_id = "SYN"+str(number)
+            site_settings = config.SITE_SETTINGS[site_id]
+
+            self.assertEqual(site_settings["ID"], site_id)
+            self.assertEqual(site_settings["IPAddress"], "127.0.1."+str(number))
+            self.assertEqual(site_settings["ServerAddress"], "127.0.0.25")
+            self.assertEqual(list(site_settings["Probes"]),
+                             [site_id+":M0", site_id+":FS0", site_id+":FS1"])
+
+            self.assertEqual(site_settings["Probes"][site_id+":M0"]["ID"], site_id+":M0")
+            self.assertNotIn("ControlLogicFunction", site_settings)
+
+        #Each one subscribes to the next one's probes, so the NAS box forwards them.
+        self.assertIn("SYN2:M0", config.SITE_SETTINGS["SYN1"]["RemoteSensors"])
+        self.assertIn("SYN1:M0", config.SITE_SETTINGS["SYN3"]["RemoteSensors"])
+
+        #The template site's settings are untouched.
+        self.assertIn("G4:M0", config.SITE_SETTINGS["G4"]["Probes"])
+        self.assertNotIn("SYN2:M0", config.SITE_SETTINGS["G4"]["RemoteSensors"])
+
+    def test_localise_settings_3(self):
+        """Test that a single synthetic site subscribes to the template site's probes"""
+        simulationtools.localise_settings(extra_sites=1)
+
+        self.assertIn("G4:M0", config.SITE_SETTINGS["SYN1"]["RemoteSensors"])
+
+    def test_localise_settings_4(self):
+        """Test that invalid arguments are rejected"""
+        for extra_sites, port_offset in ((-1, 0), ("1", 0), (0, -1), (0, None)):
+            with self.assertRaises(ValueError):
+                simulationtools.localise_settings(extra_sites, port_offset)
+
+class TestBuildSimulator(unittest.TestCase):
+    """
+    This test class tests the build_simulator() function in Tools/simulationtools.py
+    """
+
+    def setUp(self):
+        self.clock = testingtools.ManualClock()
+
+    def tearDown(self):
+        del self.clock
+
+    def test_build_simulator_1(self):
+        """Test that G4's probe, float switches and pump share a tank"""
+        simulator = simulationtools.build_simulator("G4", self.clock)
+
+        self.assertEqual(len(simulator.models), 1)
+
+        tank = simulator.models[0]
+        self.assertEqual(tank.level, simulationtools.TANK_LEVEL)
+        self.assertEqual(len(tank.pumps), 1)
+
+        #The probe's voltages follow the tank.
+        settings = config.SITE_SETTINGS["G4"]["Probes"]["G4:M0"]
+        self.assertIn((settings["ADCAddress"], 0), simulator.voltages)
+
+        #Half full, so the high float switch is off and the low one is on.
+        self.assertFalse(simulator.get_input(config.SITE_SETTINGS["G4"]["Probes"]["G4:FS0"]["Pins"]))
+        self.assertTrue(simulator.get_input(config.SITE_SETTINGS["G4"]["Probes"]["G4:FS1"]["Pins"]))
+
+    def test_build_simulator_2(self):
+        """Test that the tanks fill, and then empty"""
+        simulator = simulationtools.build_simulator("G6", self.clock)
+        tank = simulator.models[0]
+
+        self.clock.advance(simulationtools.TANK_PERIOD)
+        simulator.update()
+
+        self.assertAlmostEqual(tank.level, simulationtools.TANK_LEVEL
+                               + simulationtools.TANK_RATE * simulationtools.TANK_PERIOD)
+
+        self.clock.advance(simulationtools.TANK_PERIOD)
+        simulator.update()
+
+        self.assertAlmostEqual(tank.level, simulationtools.TANK_LEVEL)
+
+    def test_build_simulator_3(self):
+        """Test that gate valves are simulated"""
+        simulator = simulationtools.build_simulator("VALVE4", self.clock)
+
+        self.assertEqual(len(simulator.models), 1)
+        self.assertIsInstance(simulator.models[0], testingtools.GateValveModel)
+
+class TestStandInDatabase(unittest.TestCase):
+    """
+    This test class tests the StandInDatabase class in Tools/simulationtools.py,
+    using the same queries as dbtools.
+    """
+
+    def setUp(self):
+        self.database = simulationtools.StandInDatabase(["NAS", "G4", "VALVE4"])
+
+    def tearDown(self):
+        del self.database
+
+    def test_readings_1(self):
+        """Test that readings can be stored and read back, with datetimes"""
+        for tick, second in ((1, 5), (2, 20)):
+            self.database.execute("""INSERT INTO `G4Readings`(`Probe ID`, `Tick`, """
+                                  + """`Measure Time`, `Value`, `Status`) VALUES('M0', '"""
+                                  + str(tick)+"""', '2020-09-30 00:00:"""+str(second)
+                                  + """', '500mm', 'OK');""")
+
+        rows = self.database.execute("""SELECT * FROM `G4Readings` WHERE `Probe ID` = 'M0' """
+                                     + """ORDER BY ID DESC LIMIT 0, 1;""")
+
+        self.assertEqual(rows, [(2, "M0", 2, datetime.datetime(2020, 9, 30, 0, 0, 20),
+                                 "500mm", "OK")])
+
+        rows = self.database.execute("""SELECT FLOOR(TIME_TO_SEC(`Measure Time`) / 15), """
+                                     + """COUNT(*), MIN(`Measure Time`), MAX(`Measure Time`) """
+                                     + """FROM `G4Readings` WHERE `Probe ID` = 'M0' AND """
+                                     + """`Measure Time` >= '2020-09-30 00:00:00' AND """
+                                     + """`Measure Time` < '2020-10-01 00:00:00' GROUP BY 1;""")
+
+        self.assertEqual([(row[0], row[1]) for row in rows], [(0, 1), (1, 1)])
+
+    def test_control_1(self):
+        """Test that devices can be locked and unlocked"""
+        self.database.execute("""DELETE FROM `VALVE4Control`;""")
+        self.database.execute("""INSERT INTO `VALVE4Control`(`Device ID`, `Device Status`, """
+                              + """`Request`, `Locked By`) VALUES('V4', 'Unlocked', 'None', """
+                              + """'None');""")
+
+        self.database.execute("""UPDATE `VALVE4Control` SET `Device Status` = 'Locked', """
+                              + """`Request` = '50%', `Locked By` = 'SUMP' WHERE `Device ID` """
+                              + """= 'V4';""")
+
+        rows = self.database.execute("""SELECT * FROM `VALVE4Control` WHERE `Device ID` = """
+                                     + """'V4' LIMIT 0, 1;""")
+
+        self.assertEqual(rows[0][2:], ("Locked", "50%", "SUMP"))
+
+    def test_tick_1(self):
+        """Test that ticks are stored with NOW(), and table repairs are ignored"""
+        self.assertEqual(self.database.execute("""REPAIR TABLE `SystemTick`;"""), [])
+
+        self.database.execute("""INSERT INTO `SystemTick`(`Tick`, `System Time`) """
+                              + """VALUES('5', NOW());""")
+
+        rows = self.database.execute("""SELECT * FROM `SystemTick` ORDER BY `ID` DESC """
+                                     + """LIMIT 0, 1;""")
+
+        self.assertEqual(rows[0][1], 5)
+        self.assertLess(abs((rows[0][2] - datetime.datetime.now()).total_seconds()), 5)
+
+        self.assertEqual(self.database.get_stats(), {"queries": 3, "errors": 0})
+
+    def test_errors_1(self):
+        """Test that errors are raised as sqlite3 errors, and counted"""
+        with self.assertRaises(sqlite3.Error):
+            self.database.execute("""SELECT * FROM `G6Readings`;""")
+
+        self.assertEqual(self.database.get_stats(), {"queries": 1, "errors": 1})
+
+class TestStandInMySQL(unittest.TestCase):
+    """
+    This test class tests the StandInMySQL class in Tools/simulationtools.py
+    """
+
+    def setUp(self):
+        simulationtools.DATABASE = simulationtools.StandInDatabase(["NAS"])
+
+        manager = simulationtools.DatabaseManager(address=("127.0.0.1", 0), authkey=b"test")
+        self.server = manager.get_server()
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.stop_event.set()
+        simulationtools.DATABASE = None
+
+        del self.server
+
+    def test_connect_1(self):
+        """Test that queries are sent to the shared database, like MySQLdb"""
+        mysql = simulationtools.StandInMySQL(self.server.address, b"test")
+
+        database = mysql.connect(host="127.0.0.1", port=3306, user="nasbox", passwd="river20",
+                                 connect_timeout=30, db="rivercontrolsystem")
+
+        cursor = database.cursor()
+        cursor.execute("""INSERT INTO `SystemTick`(`Tick`, `System Time`) """
+                       + """VALUES('5', NOW());""")
+
+        database.commit()
+
+        cursor.execute("""SELECT * FROM `SystemTick` ORDER BY `ID` DESC LIMIT 0, 1;""")
+        self.assertEqual(cursor.fetchall()[0][1], 5)
+
+        #Errors are raised as the module's errors.
+        with self.assertRaises(mysql._exceptions.Error): #pylint: disable=protected-access
+            cursor.execute("""SELECT * FROM `Nothing`;""")
+
+        cursor.close()
+        database.close()
+
+        self.assertEqual(simulationtools.DATABASE.get_stats(), {"queries": 3, "errors": 1})
+
+    def test_connect_2(self):
+        """Test that not being able to reach the database raises a database error"""
+        mysql = simulationtools.StandInMySQL(self.server.address, b"wrong")
+
+        with self.assertRaises(mysql._exceptions.Error): #pylint: disable=protected-access
+            mysql.connect(host="127.0.0.1")
+
+class TestSiteSimulation(unittest.TestCase):
+    """
+    This test class tests the statistics collected by the SiteSimulation class in
+    Tools/simulationtools.py
+    """
+
+    def setUp(self):
+        self.site_settings = copy.deepcopy(config.SITE_SETTINGS)
+        self.simulation = simulationtools.SiteSimulation(extra_sites=2)
+        self.simulation.start_time = 1000
+
+    def tearDown(self):
+        config.SITE_SETTINGS = self.site_settings
+
+        del self.simulation
+
+    @classmethod
+    def make_report(cls, site_id, report_time, readings, messages):
+        """Makes a report, as sent by SiteReporter"""
+        stats = {"messages_sent": messages, "messages_received": messages * 2,
+                 "bytes_sent": 0, "bytes_received": 0, "in_queue": messages,
+                 "out_queue": 0, "forward_queue": 0}
+
+        return {"site_id": site_id, "pid": 1, "time": report_time, "readings": readings,
+                "db_queue": 1, "sockets": {"Socket": stats}}
+
+    def test_get_report_1(self):
+        """Test that latency is measured from when each reading was first posted"""
+        reading_time = "2020-09-30 00:00:05.000000"
+
+        self.simulation._add_report(self.make_report( #pylint: disable=protected-access
+            "NAS", 1010, [("G4:M0", 1, reading_time, 1000.25)], 10))
+
+        self.simulation._add_report(self.make_report( #pylint: disable=protected-access
+            "G4", 1010, [("G4:M0", 1, reading_time, 1000.0), ("G6:FS0", 1, reading_time, 1000.0)],
+            0))
+
+        self.simulation._add_report(self.make_report( #pylint: disable=protected-access
+            "SUMP", 1010, [("G4:M0", 1, reading_time, 1000.5)], 0))
+
+        self.simulation._add_report(self.make_report( #pylint: disable=protected-access
+            "NAS", 1020, [], 30))
+
+        report = self.simulation.get_report()
+
+        self.assertEqual(report["latency_to_nas"]["count"], 1)
+        self.assertAlmostEqual(report["latency_to_nas"]["mean"], 0.25)
+        self.assertEqual(report["latency_to_sites"]["count"], 1)
+        self.assertAlmostEqual(report["latency_to_sites"]["max"], 0.5)
+
+        #NAS messages: 20 more sent and 40 more received in 10 seconds.
+        self.assertEqual(report["nas_messages"], (4, 2))
+        self.assertEqual(report["queues"]["NAS"], {"in_queue": 30, "out_queue": 0,
+                                                   "forward_queue": 0, "db_queue": 1})
+
+        #The report can be formatted.
+        self.assertIn("Latency to NAS box: mean 250 ms", simulationtools.format_report(report))
+
+    def test_init_1(self):
+        """Test that the synthetic sites are added, and invalid sites are rejected"""
+        self.assertIn("SYN2", self.simulation.sites)
+
+        with self.assertRaises(ValueError):
+            simulationtools.SiteSimulation(sites=["NAS", "G5"])
+
+class TestGetLatencyStats(unittest.TestCase):
+    """
+    This test class tests the get_latency_stats() function in Tools/simulationtools.py
+    """
+
+    def test_get_latency_stats_1(self):
+        """Test that latencies are summarised"""
+        self.assertEqual(simulationtools.get_latency_stats([]), {"count": 0})
+
+        stats = simulationtools.get_latency_stats([float(latency) for latency in range(100, 0, -1)])
+
+        self.assertEqual(stats["count"], 100)
+        self.assertEqual(stats["mean"], 50.5)
+        self.assertEqual(stats["p50"], 50)
+        self.assertEqual(stats["p95"], 95)
+        self.assertEqual(stats["max"], 100)
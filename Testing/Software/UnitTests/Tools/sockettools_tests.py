@@ -27,6 +27,8 @@ import time
 import threading
 import select
 import socket
+import pickle
+import datetime
 
 #Import other modules.
 sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
@@ -34,6 +36,10 @@ sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the
 import config
 import Tools
 from Tools import sockettools
+from Tools import coretools
+from Tools import clocktools
+from Tools import blackboardtools
+from Tools import batchtools
 
 #Import test data and functions.
 from . import sockettools_test_data as data
@@ -53,6 +59,7 @@ class TestSockets(unittest.TestCase):
 
         #Reset the site settings.
         config.SITE_SETTINGS = self.orig_site_settings
+        config.SEND_READING_BATCHES = False
 
         #Keep clearing this, because otherwise it gets filled up with sockets
         #from previous tests, and causes later tests to fail.
@@ -599,6 +606,90 @@ class TestSockets(unittest.TestCase):
 
         data.unpickled_data = []
 
+    def test_send_pending_messages_5(self):
+        """Test #5: Test that runs of readings are sent as one batch, if enabled."""
+        config.SEND_READING_BATCHES = True
+        data.unpickled_data = []
+
+        self.socket.underlying_socket = data.fake_socket_unpickle_data
+
+        readings = [coretools.Reading("2020-09-30 10:00:"+str(10 + tick), tick, "ST0:M0",
+                                      str(400 + tick), "OK") for tick in range(3)]
+
+        for reading in readings:
+            self.socket.write(reading)
+
+        self.socket.write("test")
+        self.socket.write(readings[0])
+
+        self.assertTrue(self.socket.send_pending_messages())
+
+        self.assertEqual(len(data.unpickled_data), 3)
+        self.assertIsInstance(data.unpickled_data[0], batchtools.ReadingBatch)
+        self.assertEqual(data.unpickled_data[0].to_readings(), readings)
+        self.assertEqual(data.unpickled_data[1:], ["test", readings[0]])
+        self.assertFalse(self.socket.out_queue)
+
+        self.socket.underlying_socket = None
+
+        data.unpickled_data = []
+
+    def test_send_pending_messages_6(self):
+        """Test #6: Test that readings are sent separately by default, for older sites."""
+        data.unpickled_data = []
+
+        self.socket.underlying_socket = data.fake_socket_unpickle_data
+
+        readings = [coretools.Reading("2020-09-30 10:00:"+str(10 + tick), tick, "ST0:M0",
+                                      str(400 + tick), "OK") for tick in range(3)]
+
+        for reading in readings:
+            self.socket.write(reading)
+
+        self.assertTrue(self.socket.send_pending_messages())
+
+        self.assertEqual(data.unpickled_data, readings)
+        self.assertFalse(self.socket.out_queue)
+
+        self.socket.underlying_socket = None
+
+        data.unpickled_data = []
+
+    def test_get_stats_1(self):
+        """Test #1: Test that messages are counted, with each reading in a batch counted."""
+        data.unpickled_data = []
+
+        self.socket.underlying_socket = data.fake_socket_unpickle_data
+
+        readings = [coretools.Reading("2020-09-30 10:00:"+str(10 + tick), tick, "ST0:M0",
+                                      str(400 + tick), "OK") for tick in range(3)]
+
+        for reading in readings:
+            self.socket.write(reading)
+
+        self.socket.write("test")
+
+        self.assertEqual(self.socket.get_stats()["out_queue"], 4)
+        self.assertTrue(self.socket.send_pending_messages())
+
+        stats = self.socket.get_stats()
+
+        self.assertEqual(stats["messages_sent"], 4)
+        self.assertGreater(stats["bytes_sent"], 0)
+        self.assertEqual(stats["out_queue"], 0)
+
+        self.socket._process_obj(pickle.dumps(batchtools.ReadingBatch(readings)))
+        self.socket._process_obj(pickle.dumps("test"))
+
+        stats = self.socket.get_stats()
+
+        self.assertEqual(stats["messages_received"], 4)
+        self.assertEqual(stats["in_queue"], 4)
+
+        self.socket.underlying_socket = None
+
+        data.unpickled_data = []
+
     def test_read_pending_messages_1(self):
         """Test #1: Test this works correctly when the connection was closed by the peer."""
         sockettools.select = data.select_ready
@@ -862,6 +953,115 @@ class TestSockets(unittest.TestCase):
 
         self.assertEqual(tuple(self.socket.in_queue), ())
 
+    def test__process_obj_3(self):
+        """Test #3: Test that subscribed readings go to the latest-readings store."""
+        reading = coretools.Reading(str(datetime.datetime.now()), 1, "G4:M0", "400mm", "OK")
+        other_reading = coretools.Reading(str(datetime.datetime.now()), 1, "G5:M0", "400mm", "OK")
+
+        try:
+            self.socket._process_obj(pickle.dumps(reading))
+            self.socket._process_obj(pickle.dumps(other_reading))
+
+            self.assertEqual(config.LATESTREADINGS.get("G4:M0"), reading)
+            self.assertEqual(tuple(self.socket.in_queue), (other_reading,))
+
+        finally:
+            config.LATESTREADINGS = blackboardtools.ReadingsBlackboard()
+
+    def test__process_obj_4(self):
+        """Test #4: Test that readings are routed to the subscriptions for their sensor."""
+        reading = coretools.Reading(str(datetime.datetime.now()), 1, "ST0:M0", "400mm", "OK")
+        other_reading = coretools.Reading(str(datetime.datetime.now()), 1, "ST0:M1", "400mm", "OK")
+        called_back = []
+
+        subscription = self.socket.subscribe("ST0:M0")
+        other_subscription = self.socket.subscribe("ST0:M0", callback=called_back.append)
+
+        self.socket._process_obj(pickle.dumps(reading))
+        self.socket._process_obj(pickle.dumps(other_reading))
+
+        self.assertEqual(subscription.read(), reading)
+        self.assertEqual(called_back, [reading])
+        self.assertEqual(tuple(self.socket.in_queue), (other_reading,))
+
+        #Once unsubscribed, readings go to the incoming queue again.
+        self.socket.unsubscribe(subscription)
+        self.socket.unsubscribe(other_subscription)
+        self.socket._process_obj(pickle.dumps(reading))
+
+        self.assertEqual(tuple(self.socket.in_queue), (other_reading, reading))
+        self.assertEqual(self.socket.subscriptions, {})
+
+    def test__process_obj_5(self):
+        """Test #5: Test that batches of readings are handled as separate readings."""
+        readings = [coretools.Reading("2020-09-30 10:00:"+str(10 + tick), tick, "ST0:M"+str(tick),
+                                      "400", "OK") for tick in range(3)]
+
+        subscription = self.socket.subscribe("ST0:M1")
+
+        self.socket._process_obj(pickle.dumps(batchtools.ReadingBatch(readings)))
+
+        self.assertEqual(subscription.read(), readings[1])
+        self.assertEqual(tuple(self.socket.in_queue), (readings[0], readings[2]))
+
+        #Corrupted batches should be ignored.
+        self.socket._process_obj(pickle.dumps(batchtools.ReadingBatch(readings))[:-20])
+
+        self.assertEqual(len(self.socket.in_queue), 2)
+
+class TestReadingSubscription(unittest.TestCase):
+    """
+    This test class tests the features of the ReadingSubscription class in
+    Tools/sockettools.py
+    """
+
+    def setUp(self):
+        #Make sure waits don't end immediately.
+        config.EXITING = False
+
+        self.subscription = sockettools.ReadingSubscription("ST0:M0")
+        self.reading = coretools.Reading(str(datetime.datetime.now()), 1, "ST0:M0", "400mm", "OK")
+
+    def tearDown(self):
+        del self.subscription
+        del self.reading
+
+    def test_wait_1(self):
+        """Test #1: Test that waits end as soon as a reading arrives."""
+        threading.Timer(0.2, self.subscription.deliver, args=(self.reading,)).start()
+
+        start = time.monotonic()
+
+        self.assertTrue(self.subscription.wait(10))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.subscription.read(), self.reading)
+
+        self.subscription.pop()
+        self.assertFalse(self.subscription.has_data())
+
+    def test_wait_2(self):
+        """Test #2: Test that waits time out when no readings arrive."""
+        start = time.monotonic()
+
+        self.assertFalse(self.subscription.wait(0.3))
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+
+    def test_wait_3(self):
+        """Test #3: Test that timeouts are in virtual time when a VirtualClock is used."""
+        clock = clocktools.VirtualClock(start=1601460000)
+        clocktools.set_clock(clock)
+
+        try:
+            start = time.monotonic()
+
+            self.assertFalse(self.subscription.wait(3600))
+
+            self.assertEqual(clock.monotonic(), 1601460000 + 3600)
+            self.assertLess(time.monotonic() - start, 5)
+
+        finally:
+            clocktools.set_clock(clocktools.RealClock())
+
 class TestSocketHandlerThread(unittest.TestCase):
     """
     This test class tests the features of the SocketsHandlerThread class in
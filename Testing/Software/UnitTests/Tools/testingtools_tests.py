@@ -22,9 +22,133 @@
 import unittest
 import sys
 import os
+import time
 
 #Import other modules.
 sys.path.insert(0, os.path.abspath('../../../')) #Need to be able to import the Tools module from here.
 
 import Tools
 import Tools.testingtools as testingtools
+from Tools import i2ctools
+
+class TestSimulator(unittest.TestCase):
+    """
+    This test class tests the hardware simulator in Tools/testingtools.py
+    """
+
+    def setUp(self):
+        self.clock = testingtools.ManualClock()
+        self.simulator = testingtools.Simulator(self.clock)
+        self.simulator.realtime = False
+
+        self.tank = testingtools.WaterTank(self.simulator, level=500)
+
+        testingtools.install(self.simulator)
+
+    def tearDown(self):
+        testingtools.install(None)
+
+        del self.clock
+        del self.simulator
+        del self.tank
+
+    def test_stubs_1(self):
+        """Test that the dummy classes are simple stubs without a simulator"""
+        testingtools.install(None)
+
+        self.assertTrue(testingtools.GPIO.input(15))
+        self.assertIsNone(testingtools.ADS.ADS1115(None, address=0x48))
+        self.assertEqual(testingtools.AnalogIn(None, testingtools.ADS.P0).voltage, 0)
+
+    def test_water_tank_1(self):
+        """Test that the level follows the pumps and scripted changes, and switches follow it"""
+        edges = []
+
+        self.tank.add_pump(5, -10)
+        testingtools.FloatSwitchModel(self.tank, 15, 400)
+        testingtools.GPIO.add_event_detect(15, testingtools.GPIO.FALLING, edges.append)
+
+        self.simulator.schedule(20, lambda simulator: self.tank.set_rate(5))
+
+        #The pump is active low, like the Motor class.
+        testingtools.GPIO.output(5, False)
+        self.clock.advance(5)
+
+        self.assertEqual(self.tank.get_level(), 450)
+        self.assertTrue(testingtools.GPIO.input(15))
+
+        self.clock.advance(10)
+
+        self.assertEqual(self.tank.get_level(), 350)
+        self.assertFalse(testingtools.GPIO.input(15))
+        self.assertEqual(edges, [15])
+
+        #Turn the pump off - the scripted rise starts 5 seconds later.
+        testingtools.GPIO.output(5, True)
+        self.clock.advance(10)
+
+        self.assertEqual(self.tank.get_level(), 375)
+
+    def test_hall_effect_probe_1(self):
+        """Test that the probe's voltages follow the level, through the real ADC backend"""
+        limits = ((0.11, 0.25, 0.44, 0.63, 0.805, 1.05, 1.36, 1.77, 2.25, 3.0),
+                  (0.05, 0.111, 0.251, 0.441, 0.631, 0.806, 1.051, 1.361, 1.771, 2.251))
+
+        testingtools.HallEffectProbeModel(self.tank, 0x48, limits)
+        backend = i2ctools.ADS1115Backend(None, testingtools.ADS, testingtools.AnalogIn)
+
+        for level, expected in ((525, [3.0, 2.072, 3.0, 3.0]), (538, [3.0] * 4),
+                                (975, [3.0, 3.0, 3.0, 0.3745])):
+
+            self.tank.set_level(level)
+
+            voltages = [voltage for voltage, _ in backend.read_channels(0x48, (0, 1, 2, 3),
+                                                                        1, 860)]
+
+            for voltage, expected_voltage in zip(voltages, expected):
+                self.assertAlmostEqual(voltage, expected_voltage)
+
+    def test_gate_valve_1(self):
+        """Test that the valve only moves while the clutch is engaged and the motor is on"""
+        valve = testingtools.GateValveModel(self.simulator, (17, 27, 19), 0x49)
+        backend = i2ctools.ADS1115Backend(None, testingtools.ADS, testingtools.AnalogIn)
+
+        testingtools.GPIO.output(17, testingtools.GPIO.HIGH)
+        self.clock.advance(2)
+
+        self.assertEqual(valve.position, 0)
+
+        testingtools.GPIO.output(19, testingtools.GPIO.HIGH)
+        self.clock.advance(4)
+
+        self.assertAlmostEqual(backend.read_channels(0x49, (0,), 1, 128)[0][0], 0.66)
+
+        testingtools.GPIO.output(17, testingtools.GPIO.LOW)
+        testingtools.GPIO.output(27, testingtools.GPIO.HIGH)
+        self.clock.advance(1)
+
+        self.simulator.update()
+        self.assertEqual(valve.position, 15)
+
+    def test_convert_1(self):
+        """Test that conversions can be made to fail, and take time in real time mode"""
+        bus = i2ctools.I2CBusManager(i2ctools.ADS1115Backend(None, testingtools.ADS,
+                                                             testingtools.AnalogIn))
+
+        self.simulator.set_voltage(0x48, 0, 1.5)
+        self.simulator.fail(0x48)
+
+        self.assertRaises(OSError, bus.read, 0x48, (0,))
+        self.assertEqual(bus.read(0x48, (0,))[0][0], 1.5)
+
+        self.simulator.error_rate = 1
+        self.assertRaises(OSError, bus.read, 0x48, (0,))
+        self.simulator.error_rate = 0
+
+        self.simulator.realtime = True
+        start = time.monotonic()
+
+        bus.read(0x48, (0, 1, 2, 3), data_rate=64)
+
+        self.assertGreaterEqual(time.monotonic() - start, 4 / 64)
+        self.assertEqual(len(self.simulator.conversions), 7)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Benchmarks for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This file is used to run the benchmarks for river control system, and compare the
+results with the stored baselines.
+"""
+
+#Import modules.
+import logging
+import getopt
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath('../../../'))
+sys.path.insert(0, os.path.abspath('../../'))
+
+import config
+
+#Set up the logger.
+logger = logging.getLogger('River System Control Software')
+
+#Log only critical message by default.
+LOGGER_LEVEL = logging.CRITICAL
+
+logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s: %(message)s',
+                    datefmt='%d/%m/%Y %I:%M:%S %p', level=LOGGER_LEVEL)
+
+#Where the baselines are kept by default.
+BASELINES = "Benchmarks/baselines.json"
+
+def usage():
+    """
+    This function is used to output help information to the standard output
+    if the user passes invalid/incorrect commandline arguments.
+
+    Usage:
+
+    >>> usage()
+    """
+
+    print("\nUsage: benchmarks.py [OPTION]\n\n")
+    print("Options:\n")
+    print("       -h, --help:                   Show this help message")
+    print("       -D, --debug                   Enable debug mode")
+    print("       -a, --all:                    Run all the benchmarks. The default.")
+    print("       --coretools:                  Run the benchmarks for the")
+    print("                                     coretools module.\n")
+    print("       --sockettools:                Run the benchmarks for the")
+    print("                                     sockettools module.\n")
+    print("       --devicemanagement:           Run the benchmarks for the")
+    print("                                     devicemanagement module.\n")
+    print("       --monitortools:               Run the benchmarks for the")
+    print("                                     monitortools module.\n")
+    print("       --dbtools:                    Run the benchmarks for the")
+    print("                                     dbtools module.\n")
+    print("       -l, --logic:                  Run the benchmarks for the")
+    print("                                     control logic.\n")
+    print("       -b, --baselines:              The baselines file to compare with")
+    print("                                     (default "+BASELINES+").\n")
+    print("       -s, --save:                   Save the results as the new baselines.")
+    print("                                     Only do this on the machine the")
+    print("                                     baselines were made on.\n")
+    print("       -t, --threshold:              How much slower than the baseline a")
+    print("                                     benchmark must be to count as a")
+    print("                                     regression, in percent (default 25).\n")
+    print("       -r, --repeat:                 How many times to run each benchmark")
+    print("                                     (default 5).\n")
+
+    print("benchmarks.py is released under the GNU GPL Version 3")
+    print("Version: "+config.VERSION+" ("+config.RELEASEDATE+")")
+    print("Copyright (C) Wimborne Model Town 2017-2022")
+
+if __name__ == "__main__":
+    #Check all cmdline options are valid.
+    try:
+        OPTIONS, ARGUMENTS = getopt.getopt(sys.argv[1:], "hDalb:st:r:",
+                                           ["help", "debug", "all", "coretools",
+                                            "sockettools", "devicemanagement", "monitortools",
+                                            "dbtools", "logic", "baselines=", "save",
+                                            "threshold=", "repeat="])
+
+    except getopt.GetoptError as err:
+        #Invalid option. Show the help message and then exit.
+        #Show the error.
+        print(str(err))
+        usage()
+        sys.exit(2)
+
+    #We have to handle options twice for this to work - a bit strange, but it works.
+    #Handle debugging mode here.
+    for o, a in OPTIONS:
+        if o in ["-D", "--debug"]:
+            LOGGER_LEVEL = logging.DEBUG
+
+    logger.setLevel(LOGGER_LEVEL)
+
+    #Import benchmark modules here so the logging level is right - debug mode will work.
+    from Tools import benchmarktools
+
+    from Benchmarks import coretools_benchmarks
+    from Benchmarks import sockettools_benchmarks
+    from Benchmarks import devicemanagement_benchmarks
+    from Benchmarks import monitortools_benchmarks
+    from Benchmarks import dbtools_benchmarks
+    from Benchmarks import logic_benchmarks
+
+    ALL_MODULES = [coretools_benchmarks, sockettools_benchmarks, devicemanagement_benchmarks,
+                   monitortools_benchmarks, dbtools_benchmarks, logic_benchmarks]
+
+    #Set up which benchmarks to run based on options given.
+    MODULES = []
+    BASELINES_FILE = BASELINES
+    SAVE = False
+    THRESHOLD = benchmarktools.DEFAULT_THRESHOLD
+    REPEAT = 5
+
+    for o, a in OPTIONS:
+        if o in ("-a", "--all"):
+            MODULES = list(ALL_MODULES)
+
+        elif o == "--coretools":
+            MODULES.append(coretools_benchmarks)
+
+        elif o == "--sockettools":
+            MODULES.append(sockettools_benchmarks)
+
+        elif o == "--devicemanagement":
+            MODULES.append(devicemanagement_benchmarks)
+
+        elif o == "--monitortools":
+            MODULES.append(monitortools_benchmarks)
+
+        elif o == "--dbtools":
+            MODULES.append(dbtools_benchmarks)
+
+        elif o in ("-l", "--logic"):
+            MODULES.append(logic_benchmarks)
+
+        elif o in ("-b", "--baselines"):
+            BASELINES_FILE = a
+
+        elif o in ("-s", "--save"):
+            SAVE = True
+
+        elif o in ("-t", "--threshold"):
+            THRESHOLD = float(a) / 100
+
+        elif o in ("-r", "--repeat"):
+            REPEAT = int(a)
+
+        elif o in ["-D", "--debug"]:
+            #Already handled above.
+            pass
+
+        elif o in ("-h", "--help"):
+            usage()
+            sys.exit()
+
+        else:
+            assert False, "unhandled option"
+
+    #Run all of them if none were specified.
+    if not MODULES:
+        MODULES = list(ALL_MODULES)
+
+    BENCHMARKS = []
+
+    for module in MODULES:
+        BENCHMARKS.extend(module.get_benchmarks())
+
+    print("Running "+str(len(BENCHMARKS))+" benchmarks. Please stand by...")
+
+    RESULTS = benchmarktools.run_benchmarks(BENCHMARKS, REPEAT)
+    COMPARISONS = benchmarktools.compare(RESULTS, benchmarktools.load_baselines(BASELINES_FILE),
+                                         THRESHOLD)
+
+    print(benchmarktools.format_report(COMPARISONS, THRESHOLD))
+
+    if SAVE:
+        benchmarktools.save_baselines(BASELINES_FILE, RESULTS)
+        print("Saved the results as the new baselines in "+BASELINES_FILE)
+
+    #Exit with a non-zero status if anything regressed or failed, for scripts.
+    if benchmarktools.get_regressions(COMPARISONS) or len(RESULTS) < len(BENCHMARKS):
+        sys.exit(1)
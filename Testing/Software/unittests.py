@@ -70,6 +70,28 @@ def usage():
     print("                                     monitortools module.\n")
     print("       --sockettools:                Run the tests for the")
     print("                                     sockettools module.\n")
+    print("       --archivetools:               Run the tests for the")
+    print("                                     archivetools module.\n")
+    print("       --historytools:               Run the tests for the")
+    print("                                     historytools module.\n")
+    print("       --housekeepingtools:          Run the tests for the")
+    print("                                     housekeepingtools module.\n")
+    print("       --backfilltools:              Run the tests for the")
+    print("                                     backfilltools module.\n")
+    print("       --batchtools:                 Run the tests for the")
+    print("                                     batchtools module.\n")
+    print("       --benchmarktools:             Run the tests for the")
+    print("                                     benchmarktools module.\n")
+    print("       --i2ctools:                   Run the tests for the")
+    print("                                     i2ctools module.\n")
+    print("       --blackboardtools:            Run the tests for the")
+    print("                                     blackboardtools module.\n")
+    print("       --clocktools:                 Run the tests for the")
+    print("                                     clocktools module.\n")
+    print("       --simulationtools:            Run the tests for the")
+    print("                                     simulationtools module.\n")
+    print("       --profilingtools:             Run the tests for the")
+    print("                                     profilingtools module.\n")
     print("       -l, --logic:                  Run the tests for the")
     print("                                     controllogic (integration)")
     print("                                     module.\n")
@@ -97,8 +119,12 @@ if __name__ == "__main__":
                                            ["help", "debug", "all", "coretools",
                                             "dbtools", "deviceobjects", "devicemanagement",
                                             "loggingtools", "testingtools", "monitortools",
-                                            "sockettools", "logic", "valvelogic", "naslogic",
-                                            "sumppilogic", "wbuttspilogic",
+                                            "sockettools", "archivetools", "historytools",
+                                            "housekeepingtools", "backfilltools",
+                                            "batchtools", "benchmarktools", "i2ctools",
+                                            "blackboardtools", "clocktools", "simulationtools",
+                                            "profilingtools", "logic",
+                                            "valvelogic", "naslogic", "sumppilogic", "wbuttspilogic",
                                             "stagepilogic", "temptopuplogic"])
 
     except getopt.GetoptError as err:
@@ -125,6 +151,17 @@ if __name__ == "__main__":
     from UnitTests.Tools import testingtools_tests
     from UnitTests.Tools import monitortools_tests
     from UnitTests.Tools import sockettools_tests
+    from UnitTests.Tools import archivetools_tests
+    from UnitTests.Tools import historytools_tests
+    from UnitTests.Tools import housekeepingtools_tests
+    from UnitTests.Tools import backfilltools_tests
+    from UnitTests.Tools import batchtools_tests
+    from UnitTests.Tools import benchmarktools_tests
+    from UnitTests.Tools import i2ctools_tests
+    from UnitTests.Tools import blackboardtools_tests
+    from UnitTests.Tools import clocktools_tests
+    from UnitTests.Tools import simulationtools_tests
+    from UnitTests.Tools import profilingtools_tests
 
     from UnitTests.Logic import controllogic_tests
     from UnitTests.Logic import valvelogic_tests
@@ -148,9 +185,13 @@ if __name__ == "__main__":
         if o in ("-a", "--all"):
             TEST_SUITES = [coretools_tests, deviceobjects_tests, devicemanagement_tests,
                            loggingtools_tests, testingtools_tests, monitortools_tests,
-                           sockettools_tests, controllogic_tests, valvelogic_tests,
-                           naslogic_tests, sumppilogic_tests, wbuttspilogic_tests,
-                           stagepilogic_tests, temptopuplogic_tests]
+                           sockettools_tests, archivetools_tests, historytools_tests,
+                           housekeepingtools_tests, backfilltools_tests, batchtools_tests,
+                           benchmarktools_tests, i2ctools_tests, blackboardtools_tests,
+                           clocktools_tests, simulationtools_tests, profilingtools_tests,
+                           controllogic_tests, valvelogic_tests, naslogic_tests,
+                           sumppilogic_tests, wbuttspilogic_tests, stagepilogic_tests,
+                           temptopuplogic_tests]
 
         elif o in ("-c", "--coretools"):
             TEST_SUITES.append(coretools_tests)
@@ -176,6 +217,39 @@ if __name__ == "__main__":
         elif o in ("--sockettools"):
             TEST_SUITES.append(sockettools_tests)
 
+        elif o in ("--archivetools"):
+            TEST_SUITES.append(archivetools_tests)
+
+        elif o in ("--historytools"):
+            TEST_SUITES.append(historytools_tests)
+
+        elif o in ("--housekeepingtools"):
+            TEST_SUITES.append(housekeepingtools_tests)
+
+        elif o in ("--backfilltools"):
+            TEST_SUITES.append(backfilltools_tests)
+
+        elif o in ("--batchtools"):
+            TEST_SUITES.append(batchtools_tests)
+
+        elif o in ("--benchmarktools"):
+            TEST_SUITES.append(benchmarktools_tests)
+
+        elif o in ("--i2ctools"):
+            TEST_SUITES.append(i2ctools_tests)
+
+        elif o in ("--blackboardtools"):
+            TEST_SUITES.append(blackboardtools_tests)
+
+        elif o in ("--clocktools"):
+            TEST_SUITES.append(clocktools_tests)
+
+        elif o in ("--simulationtools"):
+            TEST_SUITES.append(simulationtools_tests)
+
+        elif o in ("--profilingtools"):
+            TEST_SUITES.append(profilingtools_tests)
+
         elif o in ("-l", "--logic"):
             TEST_SUITES.append(controllogic_tests)
 
@@ -20,6 +20,74 @@ This is the Tools package for the river control system software. It
 forms the entirety of the framework for the program. There are four
 modules in here:
 
+archivetools.py
+===============
+
+This module contains the compact binary readings archive, which the monitors can
+write alongside the CSV readings files, and functions to load archives as NumPy
+arrays for analysis.
+
+Contains Classes:
+
+- ArchiveWriter
+
+backfilltools.py
+================
+
+This module contains the backfill thread, which fills gaps in the readings in the
+database from the local readings files, storing only the missing readings, in large
+batches, when the system is quiet.
+
+Contains Classes:
+
+- Backfill
+
+batchtools.py
+=============
+
+This module contains ReadingBatch, which holds many readings at once as columns of
+numbers, to make moving readings between the database, sockets and monitors in
+bulk cheaper.
+
+Contains Classes:
+
+- ReadingBatch
+
+benchmarktools.py
+=================
+
+This module contains the benchmark runner, which times the framework's hot paths,
+stores the results as baselines, and reports any benchmarks that have regressed.
+The benchmarks themselves are in Testing/Software/Benchmarks.
+
+Contains Classes:
+
+- Benchmark
+
+blackboardtools.py
+==================
+
+This module contains the latest-readings blackboard, which monitors and sockets
+post new readings to, and which the control logic reads the latest readings from.
+Each reading is given a sequence number, so readers can wait for changes.
+
+Contains Classes:
+
+- ReadingsBlackboard
+- Snapshot
+
+clocktools.py
+=============
+
+This module contains the clock service, which everything asks for the time and
+uses to wait. A virtual clock can be set instead of the real one, so tests and
+simulations can run a day of operation in seconds.
+
+Contains Classes:
+
+- RealClock
+- VirtualClock
+
 coretools.py
 ============
 
@@ -39,6 +107,34 @@ Contains Classes:
 
 - DatabaseConnection - to communicate with the database on the NAS box.
 
+historytools.py
+===============
+
+This module is used to read back the CSV readings files for offline analysis, as
+NumPy arrays, and to convert them to the binary readings archive.
+
+housekeepingtools.py
+====================
+
+This module contains the housekeeping thread, which compresses closed readings and
+log files, and removes the oldest ones to keep each directory within its quota.
+
+Contains Classes:
+
+- Housekeeping
+
+i2ctools.py
+===========
+
+This module contains the I2C bus manager, which the management threads use to read
+the ADCs on the shared I2C bus, so they take turns and their reads can be batched.
+
+Contains Classes:
+
+- ADS1115Backend
+- StandInBackend
+- I2CBusManager
+
 loggingtools.py
 ===============
 
@@ -58,16 +154,16 @@ monitortools.py
 ===============
 
 This module contains the monitoring tools used in the rest of the
-program. These take the form of classes that have methods executed
-as threads. This approach was decided because it stops the main
-program thread from blocking when taking readings, and allows us
-to take readings from many probes at once without any noticeable resulting
-delays/complexity. SocketsMonitor allows simple monitoring of probes
-over a network.
+program. Monitors take readings in the background, so the main program
+thread doesn't block when taking readings. A single SamplingScheduler
+thread takes readings for all the Monitors on their own intervals,
+handing slow readers to a small pool of worker threads. SocketsMonitor
+allows simple monitoring of probes over a network.
 
 Contains Classes:
 
 - BaseMonitorClass
+- SamplingScheduler
 - Monitor
 - SocketsMonitor (not currently in use by framework)
 
@@ -94,6 +190,33 @@ Contains Classes:
 - HallEffectDevice (for water-wheels)
 - HallEffectProbe (magnetic levels probe)
 
+profilingtools.py
+=================
+
+This module contains the control cycle profiler, which times each phase of every
+trip around the main loop, keeps rolling percentiles of them, warns when the control
+logic takes too much of the reading interval, and can write a Chrome trace of a
+window of cycles.
+
+Contains Classes:
+
+- CycleProfiler
+
+simulationtools.py
+==================
+
+This module runs the NAS box and every site on one machine, as separate processes
+talking over loopback sockets, with simulated hardware and an in-memory stand-in
+for the database, and reports reading latency, the NAS box's load, queue depths,
+and message rates. Extra synthetic sites can be added to test how it scales.
+
+Contains Classes:
+
+- StandInDatabase
+- StandInMySQL
+- SiteReporter
+- SiteSimulation
+
 sockettools.py
 ==============
 
@@ -118,7 +241,19 @@ testingtools.py
 
 This module defines some testing classes and functions that simulate hardware, in order for the
 control software to be run more easily in test deployments without real hardware, such as
-in virtual machines.
+in virtual machines. Install a Simulator to have the dummy GPIO and ADS classes follow
+simulated water levels, gate valves and float switches.
+
+Contains Classes:
+
+- GPIO
+- ADS
+- Simulator
+- ManualClock
+- WaterTank
+- HallEffectProbeModel
+- GateValveModel
+- FloatSwitchModel
 
 statetools.py
 =============
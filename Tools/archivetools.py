@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Archive Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the archivetools module, which contains the compact binary readings
+archive. This can optionally be written by the monitors alongside the CSV
+readings files (see the --archive option to main.py).
+
+There is one archive file for each sensor for each year, named
+<site_id>:<probe_id>-<yyyy>.rca, eg readings/G4:M0-2020.rca. Each file has
+a small header, followed by fixed-width records, one for each reading:
+
+==========  ========  =========================================================
+Field       Type      Contents
+==========  ========  =========================================================
+time        float64   The time of the reading, in seconds since the epoch.
+value       float64   The value. True/False are stored as 1/0, and NaN is used
+                      for values that aren't numbers.
+tick        uint32    The system tick.
+status      uint8     The status code (see STATUS_CODES).
+==========  ========  =========================================================
+
+The header contains an index of the first record for each day of the year, so
+a day's readings can be found without searching. Because the records have a
+fixed width, whole files can be memory-mapped and used as NumPy arrays
+directly, which makes loading a year of readings for one sensor very fast.
+
+NumPy is only needed to load archives, not to write them.
+
+.. module:: archivetools.py
+    :platform: Linux
+    :synopsis: The compact binary readings archive.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+from collections import namedtuple
+import datetime
+import struct
+import time
+import os
+import logging
+
+try:
+    #Only needed to load archives, which is done offline.
+    import numpy as np
+
+except ImportError:
+    np = None
+
+from Tools import clocktools
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+# ---------- FILE FORMAT ----------
+MAGIC = b"RCSA"
+VERSION = 1
+
+#Magic, version, record size, year, sensor ID.
+HEADER_FORMAT = "<4sHHH32s"
+
+#The first record of each day of the year (366 days, for leap years).
+INDEX_FORMAT = "<366I"
+INDEX_OFFSET = struct.calcsize(HEADER_FORMAT)
+
+#Used in the index for days that have no records.
+NO_RECORDS = 0xFFFFFFFF
+
+#The records start here, so they are nicely aligned.
+HEADER_SIZE = 1536
+
+#Time, value, tick, status, padding.
+RECORD_FORMAT = "<ddIB3x"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+#The status codes stored in the archive. Any status not listed here is stored as
+#STATUS_OTHER.
+STATUS_CODES = {"OK": 0, "FAULT DETECTED": 1}
+STATUS_OTHER = 255
+
+if np is not None:
+    #The NumPy equivalent of RECORD_FORMAT.
+    RECORD_DTYPE = np.dtype({"names": ["time", "value", "tick", "status"],
+                             "formats": ["<f8", "<f8", "<u4", "u1"],
+                             "offsets": [0, 8, 16, 20],
+                             "itemsize": RECORD_SIZE})
+
+#The header of an archive file. index is the tuple of the first record for each day.
+Header = namedtuple("Header", ["sensor_id", "year", "index"])
+
+# ---------- CONVERSION FUNCTIONS ----------
+def encode_value(value):
+    """
+    This function converts a reading value to the number stored in the archive.
+
+    Args:
+        value (str):        The value, as stored in a Reading, eg "400" or "True".
+
+    Returns:
+        float. The value, 1.0/0.0 for True/False, or NaN if it isn't a number.
+
+    Usage:
+        >>> encode_value("True")
+        >>> 1.0
+    """
+
+    if value == "True":
+        return 1.0
+
+    if value == "False":
+        return 0.0
+
+    try:
+        return float(value)
+
+    except ValueError:
+        #Some older values had units on the end, eg "400mm".
+        try:
+            return float(value.rstrip("abcdefghijklmnopqrstuvwxyz%ABCDEFGHIJKLMNOPQRSTUVWXYZ "))
+
+        except ValueError:
+            return float("nan")
+
+def encode_status(status):
+    """
+    This function converts a reading status to the code stored in the archive.
+    Any details after the status (eg "FAULT DETECTED: <detail>") are ignored.
+
+    Args:
+        status (str):       The status, eg "OK".
+
+    Returns:
+        int. The status code.
+
+    Usage:
+        >>> encode_status("FAULT DETECTED: Jammed")
+        >>> 1
+    """
+
+    return STATUS_CODES.get(status.split(":")[0], STATUS_OTHER)
+
+def get_archive_name(sensor_id, year, directory="readings"):
+    """
+    This function returns the name of the archive file for the given sensor and year.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+        year (int):             The year.
+
+    Named args:
+        directory[="readings"] (str):   The directory the archive is in.
+
+    Returns:
+        str. The file name.
+
+    Usage:
+        >>> get_archive_name("G4:M0", 2020)
+        >>> "readings/G4:M0-2020.rca"
+    """
+
+    return os.path.join(directory, sensor_id+"-"+str(year)+".rca")
+
+# ---------- WRITER ----------
+class ArchiveWriter:
+    """
+    This class is used by the monitors to write a sensor's readings to the archive.
+    Like the ReadingsWriter in monitortools, records are buffered and written every
+    flush_records records or flush_interval seconds, and when the archive is closed.
+
+    The right file for the year is opened automatically when readings are written,
+    so there is no need to call open() yourself. If a write fails, the records are
+    kept, and written when the file is next opened.
+
+    Documentation for the constructor for objects of type ArchiveWriter:
+
+    Args:
+        sensor_id (str):            The full ID of the sensor, eg "G4:M0".
+
+    Named args:
+        directory[="readings"] (str):       The directory to write archives to.
+        flush_records[=20] (int):           How many records to buffer.
+        flush_interval[=60] (float):        How long records can stay buffered,
+                                            in seconds.
+
+    Usage:
+        >>> archive = ArchiveWriter("G4:M0")
+    """
+
+    def __init__(self, sensor_id, directory="readings", flush_records=20, flush_interval=60):
+        """The constructor, as documented above"""
+        if len(sensor_id.encode("utf-8")) > 32:
+            raise ValueError("Sensor ID too long: "+sensor_id)
+
+        self.sensor_id = sensor_id
+        self.directory = directory
+
+        #The open archive file, and the year it is for.
+        self.file_handle = None
+        self.year = None
+
+        #The index of the open file, and the number of records in it.
+        self.index = None
+        self.record_count = 0
+
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+
+        #(day of the year, packed record) tuples waiting to be written, and when
+        #we last wrote them.
+        self.buffer = []
+        self.last_flush = clocktools.get_clock().monotonic()
+
+    def open(self, year):
+        """
+        This method opens (or creates) the archive file for the given year. If there
+        is already an archive file, any partly-written record at the end is removed.
+
+        Args:
+            year (int):         The year.
+
+        Throws:
+            OSError, if the file couldn't be opened or created.
+            ValueError, if the file exists but isn't an archive for this sensor.
+
+        Usage:
+            >>> <ArchiveWriter>.open(2020)
+        """
+
+        if not os.path.isdir(self.directory):
+            logger.debug("Creating readings folder...")
+            os.mkdir(self.directory)
+
+        file_name = get_archive_name(self.sensor_id, year, self.directory)
+
+        if os.path.isfile(file_name):
+            header = read_header(file_name)
+
+            if header.sensor_id != self.sensor_id or header.year != year:
+                raise ValueError("Archive "+file_name+" is for "+header.sensor_id
+                                 + " in "+str(header.year))
+
+            file_handle = open(file_name, "r+b")
+
+            #Ignore any partly-written record.
+            size = os.fstat(file_handle.fileno()).st_size
+            self.record_count = (size - HEADER_SIZE) // RECORD_SIZE
+            file_handle.truncate(HEADER_SIZE + (self.record_count * RECORD_SIZE))
+
+            self.index = list(header.index)
+
+        else:
+            logger.info("Creating readings archive "+file_name+"...")
+
+            file_handle = open(file_name, "w+b")
+
+            self.record_count = 0
+            self.index = [NO_RECORDS] * 366
+
+            try:
+                file_handle.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_SIZE,
+                                              year, self.sensor_id.encode("utf-8")))
+
+                file_handle.write(struct.pack(INDEX_FORMAT, *self.index))
+                file_handle.truncate(HEADER_SIZE)
+                file_handle.flush()
+
+            except OSError as error:
+                file_handle.close()
+                raise error
+
+        self.file_handle = file_handle
+        self.year = year
+
+    def write(self, reading):
+        """
+        This method adds a reading to the archive.
+
+        Args:
+            reading (Reading):      The reading.
+
+        Throws:
+            OSError, if writing to the file failed. The records are kept, and
+            written when the file is next opened.
+
+        Usage:
+            >>> <ArchiveWriter>.write(<Reading>)
+        """
+
+        try:
+            reading_time = datetime.datetime.fromtimestamp(reading.get_epoch())
+
+        except ValueError:
+            logger.warning("Archive for "+self.sensor_id+": Invalid reading time: "
+                           + reading.get_time()+", using the current time instead")
+
+            reading_time = datetime.datetime.now()
+
+        self.write_record(reading_time, reading.get_tick(), encode_value(reading.get_value()),
+                          encode_status(reading.get_status()))
+
+    def write_record(self, reading_time, tick, value, status):
+        """
+        This method adds a record to the archive. Records must be added in order
+        of time.
+
+        Args:
+            reading_time (datetime):    The (local) time of the reading.
+            tick (int):                 The system tick.
+            value (float):              The encoded value (see encode_value()).
+            status (int):               The status code (see encode_status()).
+
+        Throws:
+            OSError, if writing to the file failed. The records are kept, and
+            written when the file is next opened.
+
+        Usage:
+            >>> <ArchiveWriter>.write_record(<datetime>, 1, 400.0, 0)
+        """
+
+        if reading_time.year != self.year and self.file_handle is not None:
+            #Finish off the old year first.
+            self.close()
+
+            if self.buffer:
+                logger.error("Archive for "+self.sensor_id+": Dropping "+str(len(self.buffer))
+                             + " records that couldn't be written before the end of the year!")
+
+                self.buffer.clear()
+
+        if self.file_handle is None:
+            self.open(reading_time.year)
+
+        self.buffer.append((reading_time.timetuple().tm_yday - 1,
+                            struct.pack(RECORD_FORMAT, reading_time.timestamp(), value,
+                                        tick, status)))
+
+        if len(self.buffer) >= self.flush_records or \
+            clocktools.get_clock().monotonic() - self.last_flush >= self.flush_interval:
+
+            self.flush()
+
+    def flush(self):
+        """
+        This method writes any buffered records, and the index if it has changed,
+        to the file.
+
+        Throws:
+            OSError, if writing to the file failed. The records are kept, and
+            written when the file is next opened.
+
+        Usage:
+            >>> <ArchiveWriter>.flush()
+        """
+
+        if self.file_handle is None:
+            return
+
+        if self.buffer:
+            self.file_handle.seek(HEADER_SIZE + (self.record_count * RECORD_SIZE))
+            self.file_handle.write(b"".join(record for day, record in self.buffer))
+
+            #Record the first record for any new days in the index.
+            index_changed = False
+
+            for record_number, (day, record) in enumerate(self.buffer, self.record_count):
+                if self.index[day] == NO_RECORDS:
+                    self.index[day] = record_number
+                    index_changed = True
+
+            self.record_count += len(self.buffer)
+            self.buffer.clear()
+
+            #Write the index after the records, so it never points past the end of the file.
+            if index_changed:
+                self.file_handle.seek(INDEX_OFFSET)
+                self.file_handle.write(struct.pack(INDEX_FORMAT, *self.index))
+
+        self.file_handle.flush()
+        self.last_flush = clocktools.get_clock().monotonic()
+
+    def close(self, flush=True):
+        """
+        This method closes the archive file.
+
+        Named args:
+            flush[=True] (bool):    Whether to write any buffered records first. If
+                                    False, the records are kept, and written when
+                                    the file is next opened.
+
+        Usage:
+            >>> <ArchiveWriter>.close()
+        """
+
+        if self.file_handle is None:
+            return
+
+        if flush:
+            try:
+                self.flush()
+
+            except (OSError, ValueError):
+                logger.error("Couldn't write buffered records to the archive for "
+                             + self.sensor_id+" before closing it!")
+
+        try:
+            self.file_handle.close()
+
+        except OSError:
+            pass
+
+        self.file_handle = None
+        self.year = None
+
+# ---------- LOADER ----------
+def read_header(file_name):
+    """
+    This function reads the header of an archive file.
+
+    Args:
+        file_name (str):        The archive file.
+
+    Returns:
+        Header.
+
+    Throws:
+        OSError, if the file couldn't be read.
+        ValueError, if the file isn't an archive we can read.
+
+    Usage:
+        >>> read_header("readings/G4:M0-2020.rca")
+        >>> Header(sensor_id="G4:M0", year=2020, index=(0, 1440, ...))
+    """
+
+    with open(file_name, "rb") as archive:
+        data = archive.read(HEADER_SIZE)
+
+    if len(data) < HEADER_SIZE:
+        raise ValueError(file_name+" is too short to be a readings archive")
+
+    magic, version, record_size, year, sensor_id = struct.unpack_from(HEADER_FORMAT, data)
+
+    if magic != MAGIC:
+        raise ValueError(file_name+" is not a readings archive")
+
+    if version != VERSION or record_size != RECORD_SIZE:
+        raise ValueError(file_name+" is an unsupported archive version: "+str(version))
+
+    return Header(sensor_id.rstrip(b"\x00").decode("utf-8"), year,
+                  struct.unpack_from(INDEX_FORMAT, data, INDEX_OFFSET))
+
+def write_archive(sensor_id, year, records, directory="readings"):
+    """
+    This function writes a whole archive file at once, replacing the file if
+    it already exists. This is much faster than using an ArchiveWriter when
+    converting lots of old readings.
+
+    Args:
+        sensor_id (str):            The full ID of the sensor, eg "G4:M0".
+        year (int):                 The year.
+        records (numpy.ndarray):    The records, in order of time, with the same
+                                    fields as RECORD_DTYPE. They must all be in
+                                    the given year.
+
+    Named args:
+        directory[="readings"] (str):   The directory to write the archive to.
+
+    Returns:
+        str. The name of the archive file.
+
+    Throws:
+        RuntimeError, if NumPy isn't installed.
+        OSError, if the file couldn't be written.
+
+    Usage:
+        >>> write_archive("G4:M0", 2020, <records>)
+        >>> "readings/G4:M0-2020.rca"
+    """
+
+    if np is None:
+        raise RuntimeError("NumPy is needed to write whole readings archives")
+
+    records = np.asarray(records).astype(RECORD_DTYPE, copy=False)
+
+    #Work out the first record for each day from the (local) midnights.
+    midnights = [time.mktime((datetime.date(year, 1, 1)
+                              + datetime.timedelta(days=day)).timetuple())
+                 for day in range(367)]
+
+    firsts = np.searchsorted(records["time"], midnights, side="left")
+    index = np.where(firsts[:-1] < firsts[1:], firsts[:-1], NO_RECORDS)
+
+    if not os.path.isdir(directory):
+        os.mkdir(directory)
+
+    file_name = get_archive_name(sensor_id, year, directory)
+
+    with open(file_name, "wb") as archive:
+        archive.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, RECORD_SIZE,
+                                  year, sensor_id.encode("utf-8")))
+
+        archive.write(struct.pack(INDEX_FORMAT, *index.tolist()))
+        archive.truncate(HEADER_SIZE)
+        archive.seek(HEADER_SIZE)
+        archive.write(records.tobytes())
+
+    return file_name
+
+def load_archive(file_name, start=None, end=None):
+    """
+    This function loads the records from an archive file as a NumPy structured
+    array, with the fields "time", "value", "tick" and "status". The file is
+    memory-mapped rather than read, so this is very fast even for large files.
+
+    Args:
+        file_name (str):            The archive file.
+
+    Named args:
+        start[=None] (date):        The first day to load. Loads from the start
+                                    of the file if None.
+
+        end[=None] (date):          The last day to load (inclusive). Loads to the
+                                    end of the file if None.
+
+    Returns:
+        numpy.ndarray. The records, read-only.
+
+    Throws:
+        RuntimeError, if NumPy isn't installed.
+        OSError, if the file couldn't be read.
+        ValueError, if the file isn't an archive we can read.
+
+    Usage:
+        >>> records = load_archive("readings/G4:M0-2020.rca")
+        >>> records["value"].mean()
+        >>> 412.5
+    """
+
+    if np is None:
+        raise RuntimeError("NumPy is needed to load readings archives")
+
+    header = read_header(file_name)
+
+    #Ignore any partly-written record.
+    count = (os.path.getsize(file_name) - HEADER_SIZE) // RECORD_SIZE
+
+    first = 0
+    last = count
+
+    if start is not None:
+        first = _first_record_from(header.index, start.timetuple().tm_yday - 1, count)
+
+    if end is not None:
+        last = _first_record_from(header.index, end.timetuple().tm_yday, count)
+
+    if last <= first:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+
+    return np.memmap(file_name, dtype=RECORD_DTYPE, mode="r",
+                     offset=HEADER_SIZE + (first * RECORD_SIZE), shape=(last - first,))
+
+def load_year(sensor_id, year, directory="readings"):
+    """
+    This function loads all the records for a sensor in the given year.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+        year (int):             The year.
+
+    Named args:
+        directory[="readings"] (str):   The directory the archive is in.
+
+    Returns:
+        numpy.ndarray. The records, as load_archive() returns them.
+
+    Throws:
+        As load_archive().
+
+    Usage:
+        >>> records = load_year("G4:M0", 2020)
+    """
+
+    return load_archive(get_archive_name(sensor_id, year, directory))
+
+def _first_record_from(index, day, count):
+    """
+    Returns the number of the first record on or after the given day (numbered from 0),
+    or count if there are no records on or after that day.
+    """
+
+    for first_record in index[day:]:
+        if first_record != NO_RECORDS:
+            return min(first_record, count)
+
+    return count
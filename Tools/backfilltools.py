@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Backfill Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the backfilltools module, which contains the backfill thread. This fills
+gaps in the readings in the database (eg from when the NAS box couldn't be reached)
+using the local readings files, so the history on the NAS box is complete.
+
+For each of the last few days, the readings in the local files are compared with
+what the database has, using one aggregate query per sensor per day. Only the
+missing readings are then stored, in large batches, when the system is quiet.
+
+.. module:: backfilltools.py
+    :platform: Linux
+    :synopsis: Filling gaps in the database from the readings files.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+import threading
+import datetime
+import time
+import traceback
+import logging
+
+import config
+
+from Tools import coretools
+from Tools import clocktools
+from Tools import logiccoretools
+from Tools import historytools
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#How many days to look back for gaps. Today is not checked until tomorrow.
+BACKFILL_DAYS = 7
+
+#The size of the periods (in seconds) we compare with the database.
+BUCKET_SIZE = 60
+
+#How many readings to store at once.
+BATCH_SIZE = 500
+
+#We only backfill when CPU usage is below this (percent), and the database queue is empty.
+QUIET_CPU = 50
+
+#How long to wait after startup, and between runs, in seconds.
+START_DELAY = 600
+INTERVAL = 3600
+
+def is_quiet():
+    """
+    This function returns True if the database is connected and idle, and the
+    system isn't busy, so we can backfill without getting in the way.
+
+    Returns:
+        bool.
+
+    Usage:
+        >>> is_quiet()
+        >>> True
+    """
+
+    if config.DBCONNECTION is None or not config.DBCONNECTION.is_ready() \
+        or not config.DBCONNECTION.initialised() or config.DBCONNECTION.in_queue:
+
+        return False
+
+    try:
+        return config.CPU is None or float(config.CPU) < QUIET_CPU
+
+    except ValueError:
+        return True
+
+def find_missing(local_readings, coverage, tolerance, bucket_size=BUCKET_SIZE):
+    """
+    This function works out which local readings are missing from the database.
+
+    Readings in buckets the database has no readings for are all missing. In
+    buckets where the database has fewer readings than we do, the readings before
+    the first and after the last reading the database has are missing. This
+    catches the start and end of each outage.
+
+    Args:
+        local_readings (list):      (time, Reading) tuples for one day, as
+                                    historytools.read_readings() returns them.
+
+        coverage (dict):            The database's coverage for that day, as
+                                    get_readings_coverage() returns it.
+
+        tolerance (float):          How far apart (in seconds) a reading's time in
+                                    the file and in the database can be. The times
+                                    of "." readings in the files are estimates.
+
+    Named args:
+        bucket_size[=BUCKET_SIZE] (int):    The size of the buckets in coverage.
+
+    Returns:
+        list. The missing Reading objects.
+
+    Usage:
+        >>> find_missing(<local readings>, <coverage>, 7.5)
+        >>> [<Reading>, <Reading>]
+    """
+
+    #Group the local readings into the same buckets as the database.
+    buckets = {}
+
+    for reading_time, reading in local_readings:
+        local_time = datetime.datetime.fromtimestamp(reading_time)
+        seconds = (local_time.hour * 3600) + (local_time.minute * 60) + local_time.second
+
+        buckets.setdefault(seconds // bucket_size, []).append((reading_time, reading))
+
+    missing = []
+
+    for bucket, readings in sorted(buckets.items()):
+        if bucket not in coverage:
+            missing.extend(reading for reading_time, reading in readings)
+            continue
+
+        count, first, last = coverage[bucket]
+
+        if count >= len(readings):
+            continue
+
+        first = first.timestamp() - tolerance
+        last = last.timestamp() + tolerance
+
+        missing.extend(reading for reading_time, reading in readings
+                       if reading_time < first or reading_time > last)
+
+    return missing
+
+def backfill_day(sensor_id, date, directory="readings"):
+    """
+    This function fills any gaps in the database for a sensor on one day from the
+    readings files. The readings are stored in batches of BATCH_SIZE, waiting until
+    the system is quiet before each batch.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+        date (date):            The day.
+
+    Named args:
+        directory[="readings"] (str):   The directory the readings files are in.
+
+    Returns:
+        int. The number of readings that were stored, or None if we gave up
+        because we are exiting.
+
+    Throws:
+        RuntimeError, if the database couldn't be queried or written to.
+        OSError, if the readings files couldn't be read.
+
+    Usage:
+        >>> backfill_day("G4:M0", datetime.date(2020, 9, 30))
+        >>> 240
+    """
+
+    interval = historytools.get_default_interval(sensor_id)
+    local_readings = []
+
+    for file_name in historytools.find_files(sensor_id, directory, date, date):
+        local_readings.extend(historytools.read_readings(file_name, interval))
+
+    if not local_readings:
+        return 0
+
+    coverage = logiccoretools.get_readings_coverage(sensor_id.split(":")[1], date,
+                                                    BUCKET_SIZE)
+
+    #Skip any readings that would break the query.
+    missing = [reading for reading in find_missing(local_readings, coverage, interval / 2)
+               if "'" not in reading.as_csv() and "\\" not in reading.as_csv()]
+
+    for start in range(0, len(missing), BATCH_SIZE):
+        while not is_quiet():
+            if config.EXITING:
+                return None
+
+            clocktools.get_clock().sleep(1)
+
+        logiccoretools.store_readings(missing[start:start + BATCH_SIZE])
+
+    if missing:
+        logger.info("Backfill: Stored "+str(len(missing))+" missing readings for "
+                    + sensor_id+" on "+str(date))
+
+    return len(missing)
+
+class Backfill(threading.Thread):
+    """
+    This class starts a thread that fills gaps in the database from the readings
+    files every INTERVAL seconds, for the last BACKFILL_DAYS days. Once a day has
+    been checked, it isn't checked again.
+
+    Documentation for the constructor for objects of type Backfill:
+
+    Args:
+        monitors (list):        The monitors for the sensors to backfill.
+
+    Usage:
+        >>> backfill = Backfill(<monitors>)
+    """
+
+    def __init__(self, monitors):
+        """The constructor, as documented above"""
+        threading.Thread.__init__(self)
+
+        self.monitors = monitors
+
+        #The (sensor ID, date) pairs that we have finished.
+        self.done = set()
+
+        #Used to sleep between backfills, and woken by request_exit().
+        self.waiter = coretools.IntervalWaiter()
+
+        self.is_running = True
+
+        self.start()
+
+    def do_backfill(self):
+        """
+        This method checks each sensor for each of the last BACKFILL_DAYS days that
+        hasn't been checked yet, and fills any gaps.
+
+        Throws:
+            RuntimeError, if the database couldn't be queried or written to.
+
+        Usage:
+            >>> <Backfill>.do_backfill()
+        """
+
+        today = datetime.date.today()
+
+        for days_ago in range(BACKFILL_DAYS, 0, -1):
+            date = today - datetime.timedelta(days=days_ago)
+
+            for monitor in self.monitors:
+                sensor_id = monitor.get_site_id()+":"+monitor.get_probe_id()
+
+                if (sensor_id, date) in self.done:
+                    continue
+
+                if not is_quiet():
+                    return
+
+                try:
+                    stored = backfill_day(sensor_id, date)
+
+                except OSError:
+                    logger.error("Backfill: Couldn't read readings files for "+sensor_id
+                                 + " on "+str(date)+". Exception: \n\n"
+                                 + str(traceback.format_exc()))
+
+                    stored = 0
+
+                if stored is None:
+                    return
+
+                self.done.add((sensor_id, date))
+
+        #Forget the days we no longer check.
+        oldest = today - datetime.timedelta(days=BACKFILL_DAYS)
+        self.done = {(sensor_id, date) for sensor_id, date in self.done if date >= oldest}
+
+    def run(self):
+        """The main body of the thread"""
+        sleep = START_DELAY
+
+        try:
+            while not config.EXITING:
+                #Woken by request_exit(), so we respond to system teardown quickly.
+                self.waiter.wait_until(clocktools.get_clock().monotonic() + sleep)
+
+                if config.EXITING:
+                    break
+
+                try:
+                    self.do_backfill()
+
+                except RuntimeError:
+                    logger.error("Backfill: Database error, trying again later.")
+                    print("Backfill: Database error, trying again later.", level="error")
+
+                except Exception:
+                    logger.error("Backfill: Unexpected error: \n\n"
+                                 + str(traceback.format_exc()))
+
+                    print("Backfill: Unexpected error: \n\n"
+                          + str(traceback.format_exc()), level="error")
+
+                sleep = INTERVAL
+
+        finally:
+            #Signal that we have exited, even if something went wrong, so teardown
+            #doesn't wait forever.
+            self.is_running = False
+
+    #----- CONTROL METHODS -----
+    def wait_exit(self):
+        """
+        This method is used to wait for the backfill thread to exit.
+
+        This isn't a mandatory function as the backfill thread will tear down
+        automatically when config.EXITING is set to True.
+
+        Usage:
+            >>> <Backfill>.wait_exit()
+        """
+
+        while self.is_running:
+            time.sleep(0.5)
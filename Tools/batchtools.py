@@ -0,0 +1,699 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Reading Batch Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the batchtools module, which contains the ReadingBatch class. This holds
+many readings at once in columns (arrays of numbers), rather than as one Python
+object per reading, which makes moving lots of readings around much cheaper - eg
+when fetching readings from the database in bulk, replaying a socket's backlog
+after a reconnection, or exporting readings from an archive.
+
+Each reading is stored as:
+
+==========  ======  ==========================================================
+Column      Type    Meaning
+==========  ======  ==========================================================
+times       double  The time, in seconds since the epoch.
+ticks       int64   The system tick.
+sensors     uint16  The index of the full sensor ID in sensor_ids.
+values      double  The value, 1.0/0.0 for True/False, NaN if not a number.
+kinds       uint8   How to turn the value back into text (see KIND_*).
+statuses    uint8   The status code, as in archivetools.STATUS_CODES.
+==========  ======  ==========================================================
+
+Any text that can't be recreated exactly from the columns (eg "400mm", or
+"FAULT DETECTED: <detail>") is kept as well, so converting readings to a batch
+and back always gives the same readings.
+
+The columns are array.array objects. If NumPy is installed, filtering and
+comparisons are done with NumPy, without copying the columns.
+
+.. module:: batchtools.py
+    :platform: Linux
+    :synopsis: Columnar batches of readings.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+from array import array
+import datetime
+import operator
+import struct
+import json
+import math
+import sys
+import logging
+
+try:
+    #Makes filtering and comparisons faster, but isn't required.
+    import numpy as np
+
+except ImportError:
+    np = None
+
+from Tools import coretools
+from Tools import archivetools
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#How values are turned back into text.
+KIND_NUMBER = 0     #eg "400" or "12.5".
+KIND_BOOL = 1       #"True" or "False".
+KIND_TEXT = 2       #Anything else - the text is kept.
+
+#The text for each status code, when the status text isn't kept.
+STATUS_TEXTS = {code: text for text, code in archivetools.STATUS_CODES.items()}
+STATUS_UNKNOWN = "UNKNOWN"
+
+#The columns, and their array.array type codes, in the order they are serialised.
+COLUMNS = (("times", "d"), ("ticks", "q"), ("sensors", "H"), ("values", "d"),
+           ("kinds", "B"), ("statuses", "B"))
+
+#Magic, version, number of readings, length of the sensor IDs, length of the kept text.
+MAGIC = b"RCSB"
+VERSION = 1
+HEADER_FORMAT = "<4sHIII"
+
+#Comparisons that can be used with ReadingBatch.compare().
+OPERATORS = {"<": operator.lt, "<=": operator.le, "==": operator.eq,
+             "!=": operator.ne, ">=": operator.ge, ">": operator.gt}
+
+def format_number(value):
+    """
+    This function turns a numeric reading value back into text, as the probes
+    write it.
+
+    Args:
+        value (float):      The value.
+
+    Returns:
+        str.
+
+    Usage:
+        >>> format_number(400.0)
+        >>> "400"
+    """
+
+    if value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+def encode_value(text):
+    """
+    This function converts a reading value to the number and kind stored in a
+    batch.
+
+    Args:
+        text (str):         The value, eg "400" or "True".
+
+    Returns:
+        tuple. (value, kind, exact), where exact is False if the text can't be
+        recreated from value and kind, and must be kept.
+
+    Usage:
+        >>> encode_value("400mm")
+        >>> (400.0, 2, False)
+    """
+
+    if text in ("True", "False"):
+        return float(text == "True"), KIND_BOOL, True
+
+    value = archivetools.encode_value(text)
+
+    if not math.isnan(value) and format_number(value) == text:
+        return value, KIND_NUMBER, True
+
+    return value, KIND_TEXT, False
+
+class ReadingBatch:
+    """
+    This class holds a batch of readings in columns. See the module documentation
+    for the columns.
+
+    Batches can be created empty and added to, or created from Readings, a
+    readings archive, or serialised data. They can be filtered and compared
+    without creating a Reading for each row, and turned back into Readings
+    when needed. Batches pickle as their serialised data, so they can be sent
+    through Sockets.
+
+    Documentation for the constructor for objects of type ReadingBatch:
+
+    Named args:
+        readings[=()] (list):       Readings to start with.
+
+    Usage:
+        >>> batch = ReadingBatch(<list of Readings>)
+        >>> batch.filter(sensor_id="G4:M0").compare(">", 400)
+    """
+
+    def __init__(self, readings=()):
+        """The constructor, as documented above"""
+        for name, typecode in COLUMNS:
+            setattr(self, name, array(typecode))
+
+        #The full sensor IDs, and their index in sensor_ids.
+        self.sensor_ids = []
+        self.sensor_indexes = {}
+
+        #Text that can't be recreated from the columns, for each row:
+        #row -> [time text, value text, status text], with None for exact values.
+        self.texts = {}
+
+        self.extend(readings)
+
+    # ---------- ADDING READINGS ----------
+    def get_sensor_index(self, sensor_id):
+        """
+        This method returns the index used for the given sensor ID in the sensors
+        column, adding it if needed.
+
+        Args:
+            sensor_id (str):        The full sensor ID, eg "G4:M0".
+
+        Returns:
+            int.
+
+        Usage:
+            >>> <ReadingBatch>.get_sensor_index("G4:M0")
+            >>> 0
+        """
+
+        index = self.sensor_indexes.get(sensor_id)
+
+        if index is None:
+            index = len(self.sensor_ids)
+            self.sensor_ids.append(sensor_id)
+            self.sensor_indexes[sensor_id] = index
+
+        return index
+
+    def append_row(self, row):
+        """
+        This method adds a reading to the batch, from the values that would be
+        passed to Reading's constructor.
+
+        Args:
+            row (tuple):        The time, tick, full ID, value and status. The time
+                                may be text, seconds since the epoch, or a datetime.
+
+        Usage:
+            >>> <ReadingBatch>.append_row(("2020-09-30 10:00:00", 101, "G4:M0", "400", "OK"))
+        """
+
+        reading_time, tick, sensor_id, value_text, status_text = row
+        texts = [None, None, None]
+
+        #Work out the time, keeping the text if it isn't in the usual format.
+        if isinstance(reading_time, datetime.datetime):
+            epoch = reading_time.timestamp()
+
+        elif not isinstance(reading_time, str):
+            epoch = float(reading_time)
+
+        else:
+            try:
+                epoch = coretools.parse_time(reading_time)
+
+            except ValueError:
+                epoch = float("nan")
+
+            if math.isnan(epoch) or coretools.format_time(epoch) != reading_time:
+                texts[0] = reading_time
+
+        value, kind, exact = encode_value(value_text)
+
+        if not exact:
+            texts[1] = value_text
+
+        status = archivetools.encode_status(status_text)
+
+        if STATUS_TEXTS.get(status) != status_text:
+            texts[2] = status_text
+
+        if texts != [None, None, None]:
+            self.texts[len(self.times)] = texts
+
+        self.times.append(epoch)
+        self.ticks.append(tick)
+        self.sensors.append(self.get_sensor_index(sensor_id))
+        self.values.append(value)
+        self.kinds.append(kind)
+        self.statuses.append(status)
+
+    def append(self, reading):
+        """
+        This method adds a Reading to the batch.
+
+        Args:
+            reading (Reading):      The reading.
+
+        Usage:
+            >>> <ReadingBatch>.append(<Reading>)
+        """
+
+        self.append_row((reading.get_time(), reading.get_tick(), reading.get_id(),
+                         reading.get_value(), reading.get_status()))
+
+    def extend(self, readings):
+        """
+        This method adds some Readings to the batch.
+
+        Args:
+            readings (list):        The readings.
+
+        Usage:
+            >>> <ReadingBatch>.extend(<list of Readings>)
+        """
+
+        for reading in readings:
+            self.append(reading)
+
+    @classmethod
+    def from_archive(cls, file_name, start=None, end=None, bool_values=False):
+        """
+        This method exports readings from a readings archive as a batch, without
+        creating a Reading for each one. Only the status codes are stored in
+        archives, so statuses with details come back as eg "FAULT DETECTED".
+
+        Args:
+            file_name (str):            The archive file.
+
+        Named args:
+            start[=None] (date):        As for archivetools.load_archive().
+            end[=None] (date):          As for archivetools.load_archive().
+
+            bool_values[=False] (bool): True if the values are True/False, eg for
+                                        float switches.
+
+        Returns:
+            ReadingBatch.
+
+        Throws:
+            As for archivetools.load_archive().
+
+        Usage:
+            >>> ReadingBatch.from_archive("readings/G4:M0-2020.rca")
+            >>> <ReadingBatch>
+        """
+
+        header = archivetools.read_header(file_name)
+        records = archivetools.load_archive(file_name, start, end)
+
+        batch = cls()
+        batch.times.frombytes(records["time"].astype("=f8").tobytes())
+        batch.ticks.frombytes(records["tick"].astype("=i8").tobytes())
+        batch.values.frombytes(records["value"].astype("=f8").tobytes())
+        batch.statuses.frombytes(records["status"].astype("u1").tobytes())
+
+        count = len(records)
+        index = batch.get_sensor_index(header.sensor_id)
+
+        batch.sensors.extend([index] * count)
+
+        if bool_values:
+            batch.kinds.extend([KIND_BOOL] * count)
+
+        else:
+            #Values that aren't numbers can't be recreated.
+            batch.kinds.extend([KIND_NUMBER] * count)
+
+            for row in np.flatnonzero(np.isnan(records["value"])):
+                batch.kinds[row] = KIND_TEXT
+                batch.texts[int(row)] = [None, "", None]
+
+        return batch
+
+    # ---------- GETTING READINGS BACK ----------
+    def __len__(self):
+        """Returns the number of readings in the batch"""
+        return len(self.times)
+
+    def get_row(self, row, epoch_times=False):
+        """
+        This method returns the values that would be passed to Reading's
+        constructor for a reading in the batch.
+
+        Args:
+            row (int):                  The number of the reading.
+
+        Named args:
+            epoch_times[=False] (bool): Return the time in seconds since the epoch
+                                        where that is exact, rather than as text.
+
+        Returns:
+            tuple. The time, tick, full ID, value and status.
+
+        Throws:
+            IndexError, if there is no such reading.
+
+        Usage:
+            >>> <ReadingBatch>.get_row(0)
+            >>> ("2020-09-30 10:00:00", 101, "G4:M0", "400", "OK")
+        """
+
+        epoch = self.times[row]
+        texts = self.texts.get(row % len(self.times), (None, None, None))
+
+        time_text, value_text, status_text = texts
+
+        if time_text is None:
+            time_text = epoch if epoch_times else coretools.format_time(epoch)
+
+        if value_text is None:
+            if self.kinds[row] == KIND_BOOL:
+                value_text = str(self.values[row] != 0.0)
+
+            else:
+                value_text = format_number(self.values[row])
+
+        if status_text is None:
+            status_text = STATUS_TEXTS.get(self.statuses[row], STATUS_UNKNOWN)
+
+        return (time_text, self.ticks[row], self.sensor_ids[self.sensors[row]], value_text,
+                status_text)
+
+    def __getitem__(self, row):
+        """Returns a reading in the batch as a Reading"""
+        #Let the Reading format the time if and when it's needed.
+        return coretools.Reading.from_row(self.get_row(row, epoch_times=True))
+
+    def __iter__(self):
+        """Iterates over the readings in the batch as Readings"""
+        for row in range(len(self.times)):
+            yield self[row]
+
+    def to_readings(self):
+        """
+        This method returns all the readings in the batch as Readings.
+
+        Returns:
+            list.
+
+        Usage:
+            >>> <ReadingBatch>.to_readings()
+            >>> [<Reading>, <Reading>, ...]
+        """
+
+        return list(self)
+
+    # ---------- FILTERING AND COMPARISONS ----------
+    def get_column(self, name):
+        """
+        This method returns a column as a read-only NumPy array, without copying
+        it, or as the array.array if NumPy isn't installed.
+
+        Args:
+            name (str):         The column, eg "values".
+
+        Returns:
+            numpy.ndarray or array.array.
+
+        Usage:
+            >>> <ReadingBatch>.get_column("values").mean()
+            >>> 412.5
+        """
+
+        column = getattr(self, name)
+
+        if np is None:
+            return column
+
+        if not column:
+            return np.zeros(0, dtype=column.typecode)
+
+        view = np.frombuffer(column, dtype=column.typecode)
+        view.flags.writeable = False
+
+        return view
+
+    def compare(self, op, value):
+        """
+        This method compares the values of all the readings with a number.
+
+        Args:
+            op (str):           The comparison, one of OPERATORS, eg ">".
+            value (float):      The number to compare with.
+
+        Returns:
+            numpy.ndarray or list. True for each reading where the comparison is
+            True. Values that aren't numbers never compare equal.
+
+        Throws:
+            ValueError, if op isn't a known comparison.
+
+        Usage:
+            >>> <ReadingBatch>.compare(">", 400)
+            >>> array([False, True, True])
+        """
+
+        if op not in OPERATORS:
+            raise ValueError("Unknown comparison: "+str(op))
+
+        values = self.get_column("values")
+
+        if np is None:
+            return [OPERATORS[op](each_value, value) for each_value in values]
+
+        return OPERATORS[op](values, value)
+
+    def filter(self, sensor_id=None, start=None, end=None, status=None):
+        """
+        This method returns the readings that match all of the given conditions
+        as a new batch.
+
+        Named args:
+            sensor_id[=None] (str):     Only readings from this sensor, eg "G4:M0".
+            start[=None] (float):       Only readings at or after this time (epoch).
+            end[=None] (float):         Only readings before this time (epoch).
+            status[=None] (str):        Only readings with this status, eg "OK".
+
+        Returns:
+            ReadingBatch.
+
+        Usage:
+            >>> <ReadingBatch>.filter(sensor_id="G4:M0", status="OK")
+            >>> <ReadingBatch>
+        """
+
+        tests = []
+
+        if sensor_id is not None:
+            index = self.sensor_indexes.get(sensor_id, -1)
+            tests.append(("sensors", operator.eq, index))
+
+        if start is not None:
+            tests.append(("times", operator.ge, start))
+
+        if end is not None:
+            tests.append(("times", operator.lt, end))
+
+        if status is not None:
+            tests.append(("statuses", operator.eq, archivetools.encode_status(status)))
+
+        if np is not None:
+            mask = np.ones(len(self), dtype=bool)
+
+            for name, test, value in tests:
+                mask &= test(self.get_column(name), value)
+
+        else:
+            mask = [all(test(getattr(self, name)[row], value) for name, test, value in tests)
+                    for row in range(len(self))]
+
+        return self.select(mask)
+
+    def select(self, mask):
+        """
+        This method returns the readings where mask is True as a new batch.
+
+        Args:
+            mask (list):        True or False for each reading, as returned by
+                                compare(). A NumPy array of bools also works.
+
+        Returns:
+            ReadingBatch.
+
+        Throws:
+            ValueError, if mask isn't the same length as the batch.
+
+        Usage:
+            >>> <ReadingBatch>.select(<ReadingBatch>.compare(">", 400))
+            >>> <ReadingBatch>
+        """
+
+        if len(mask) != len(self):
+            raise ValueError("The mask must have one entry for each reading")
+
+        batch = ReadingBatch()
+        batch.sensor_ids = list(self.sensor_ids)
+        batch.sensor_indexes = dict(self.sensor_indexes)
+
+        if np is not None:
+            rows = np.flatnonzero(np.asarray(mask, dtype=bool))
+
+            for name, _ in COLUMNS:
+                getattr(batch, name).frombytes(self.get_column(name)[rows].tobytes())
+
+        else:
+            rows = [row for row, keep in enumerate(mask) if keep]
+
+            for name, typecode in COLUMNS:
+                column = getattr(self, name)
+                setattr(batch, name, array(typecode, [column[row] for row in rows]))
+
+        for new_row, row in enumerate(rows):
+            if int(row) in self.texts:
+                batch.texts[new_row] = list(self.texts[int(row)])
+
+        return batch
+
+    # ---------- SERIALISATION ----------
+    def to_bytes(self):
+        """
+        This method serialises the batch compactly.
+
+        Returns:
+            bytes.
+
+        Usage:
+            >>> <ReadingBatch>.to_bytes()
+            >>> b"RCSB..."
+        """
+
+        sensor_ids = "\n".join(self.sensor_ids).encode("utf-8")
+        texts = json.dumps(self.texts, separators=(",", ":")).encode("utf-8")
+
+        parts = [struct.pack(HEADER_FORMAT, MAGIC, VERSION, len(self), len(sensor_ids),
+                             len(texts)), sensor_ids, texts]
+
+        for name, _ in COLUMNS:
+            column = getattr(self, name)
+
+            #Always store the columns little-endian.
+            if sys.byteorder == "big":
+                column = array(column.typecode, column)
+                column.byteswap()
+
+            parts.append(column.tobytes())
+
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        This method creates a batch from the data returned by to_bytes().
+
+        Args:
+            data (bytes):       The serialised batch.
+
+        Returns:
+            ReadingBatch.
+
+        Throws:
+            ValueError, if the data isn't a batch we can read.
+
+        Usage:
+            >>> ReadingBatch.from_bytes(<bytes>)
+            >>> <ReadingBatch>
+        """
+
+        try:
+            magic, version, count, sensor_ids_size, texts_size = \
+                struct.unpack_from(HEADER_FORMAT, data)
+
+        except struct.error as err:
+            raise ValueError("Reading batch is too short") from err
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a reading batch we can read")
+
+        offset = struct.calcsize(HEADER_FORMAT)
+
+        batch = cls()
+
+        try:
+            sensor_ids = data[offset:offset + sensor_ids_size].decode("utf-8")
+            offset += sensor_ids_size
+
+            for sensor_id in sensor_ids.split("\n") if sensor_ids else []:
+                batch.get_sensor_index(sensor_id)
+
+            texts = json.loads(data[offset:offset + texts_size].decode("utf-8"))
+            batch.texts = {int(row): value for row, value in texts.items()}
+            offset += texts_size
+
+        except (UnicodeDecodeError, json.JSONDecodeError, AttributeError) as err:
+            raise ValueError("Reading batch is corrupted") from err
+
+        for name, typecode in COLUMNS:
+            column = getattr(batch, name)
+            size = count * column.itemsize
+
+            if len(data) < offset + size:
+                raise ValueError("Reading batch is too short")
+
+            column.frombytes(data[offset:offset + size])
+
+            if sys.byteorder == "big":
+                column.byteswap()
+
+            offset += size
+
+        if batch.sensors and max(batch.sensors) >= len(batch.sensor_ids):
+            raise ValueError("Reading batch is corrupted")
+
+        return batch
+
+    def __getstate__(self):
+        """Pickles the batch as its serialised data"""
+        return self.to_bytes()
+
+    def __setstate__(self, state):
+        """Restores the batch from its serialised data"""
+        self.__dict__.update(ReadingBatch.from_bytes(state).__dict__)
+
+    def __eq__(self, other):
+        """
+        Batches are equal if they contain the same readings, in the same order.
+        Unlike Readings, the times and ticks are compared as well.
+        """
+
+        if not isinstance(other, ReadingBatch):
+            return False
+
+        return [self.get_row(row) for row in range(len(self))] \
+            == [other.get_row(row) for row in range(len(other))]
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Benchmark Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the benchmarktools module, which times the framework's hot paths and compares
+the results with stored baselines, so that performance regressions are noticed.
+
+Each benchmark is a function that is called many times in a row. It is run a few
+times, and the best run is used for comparisons, because it is the least affected by
+whatever else the machine is doing. The garbage collector is disabled while timing.
+
+The benchmarks themselves are in Testing/Software/Benchmarks, and are run with
+Testing/Software/benchmarks.py.
+
+Usage:
+    >>> results = run_benchmarks([Benchmark("sum", lambda: sum(range(100)))])
+    >>> comparisons = compare(results, load_baselines("baselines.json"))
+    >>> print(format_report(comparisons))
+
+.. module:: benchmarktools.py
+    :platform: Linux
+    :synopsis: Benchmarks, with stored baselines and regression reports.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+import datetime
+import gc
+import json
+import os
+import platform
+import statistics
+import time
+import logging
+from collections import namedtuple
+
+import config
+
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#How much slower (or faster) than the baseline a benchmark has to be to be reported,
+#as a fraction of the baseline.
+DEFAULT_THRESHOLD = 0.25
+
+#How a benchmark's result compares with its baseline.
+REGRESSED = "REGRESSED"
+IMPROVED = "IMPROVED"
+UNCHANGED = "OK"
+NEW = "NEW"
+
+#A benchmark's result, compared with its baseline. change is the fractional change in
+#time per operation, eg 0.5 if it takes 50% longer. None if there is no baseline.
+Comparison = namedtuple("Comparison", ["name", "baseline", "result", "change", "status"])
+
+class Benchmark:
+    """
+    This class describes a benchmark.
+
+    Documentation for the constructor for objects of type Benchmark:
+
+    Args:
+        name (str):                 The name of the benchmark, eg
+                                    "coretools.Reading.as_csv".
+
+        function (function):        The code to time. Called with no arguments.
+
+    Named args:
+        number[=1000] (int):        How many times to call the function in each run.
+        operations[=1] (int):       How many operations each call does, eg messages
+                                    sent, so the results are per operation.
+
+        setup[=None] (function):    Called once before the benchmark is run.
+        teardown[=None] (function): Called once after the benchmark is run, even if
+                                    it failed.
+
+    Usage:
+        >>> Benchmark("coretools.Reading.as_csv", reading.as_csv, number=10000)
+    """
+
+    def __init__(self, name, function, number=1000, #pylint: disable=too-many-arguments
+                 operations=1, setup=None, teardown=None):
+        """The constructor, as documented above"""
+        if not isinstance(name, str) or name == "":
+            raise ValueError("Invalid benchmark name: "+str(name))
+
+        if not isinstance(number, int) or number <= 0:
+            raise ValueError("Invalid number of calls: "+str(number))
+
+        if not isinstance(operations, int) or operations <= 0:
+            raise ValueError("Invalid number of operations: "+str(operations))
+
+        self.name = name
+        self.function = function
+        self.number = number
+        self.operations = operations
+        self.setup = setup
+        self.teardown = teardown
+
+def measure(benchmark, repeat=5):
+    """
+    This function runs a benchmark, and returns its timings.
+
+    Args:
+        benchmark (Benchmark):      The benchmark.
+
+    Named args:
+        repeat[=5] (int):           How many runs to do.
+
+    Returns:
+        dict.       The "best" and "median" times per operation, in seconds.
+
+    Throws:
+        Anything the benchmark raises.
+
+    Usage:
+        >>> measure(<Benchmark>)
+        >>> {"best": 1.2e-06, "median": 1.3e-06}
+    """
+
+    if benchmark.setup is not None:
+        benchmark.setup()
+
+    gc_was_enabled = gc.isenabled()
+
+    try:
+        #Warm up any caches first.
+        benchmark.function()
+
+        gc.collect()
+        gc.disable()
+
+        times = []
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+
+            for _ in range(benchmark.number):
+                benchmark.function()
+
+            times.append((time.perf_counter() - start)
+                         / (benchmark.number * benchmark.operations))
+
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+        if benchmark.teardown is not None:
+            benchmark.teardown()
+
+    return {"best": min(times), "median": statistics.median(times)}
+
+def run_benchmarks(benchmarks, repeat=5):
+    """
+    This function runs the given benchmarks, logging the results as it goes. A
+    benchmark that fails is logged, and left out of the results.
+
+    Args:
+        benchmarks (list<Benchmark>):   The benchmarks.
+
+    Named args:
+        repeat[=5] (int):           How many runs to do for each benchmark.
+
+    Returns:
+        dict.       The timings for each benchmark, by name, as from measure().
+
+    Usage:
+        >>> run_benchmarks(<list<Benchmark>>)
+        >>> {"coretools.Reading.as_csv": {"best": 1.2e-06, "median": 1.3e-06}}
+    """
+
+    results = {}
+
+    for benchmark in benchmarks:
+        try:
+            results[benchmark.name] = measure(benchmark, repeat)
+
+        except Exception as error: #pylint: disable=broad-except
+            logger.error("Benchmark "+benchmark.name+" failed: "+str(error))
+            print("Benchmark "+benchmark.name+" failed: "+str(error), level="error")
+
+        else:
+            logger.info("Benchmark "+benchmark.name+": "
+                        + format_time(results[benchmark.name]["best"]))
+
+    return results
+
+def load_baselines(filename):
+    """
+    This function loads stored baselines.
+
+    Args:
+        filename (str):             The baselines file.
+
+    Returns:
+        dict.       The baseline timings for each benchmark, by name. Empty if there
+                    is no baselines file.
+
+    Throws:
+        ValueError, if the file isn't a valid baselines file.
+
+    Usage:
+        >>> load_baselines("Benchmarks/baselines.json")
+        >>> {"coretools.Reading.as_csv": {"best": 1.2e-06, "median": 1.3e-06}}
+    """
+
+    if not os.path.isfile(filename):
+        logger.warning("No baselines found at "+filename)
+        return {}
+
+    with open(filename, encoding="utf-8") as baselines_file:
+        try:
+            return json.load(baselines_file)["results"]
+
+        except (ValueError, KeyError, TypeError) as error:
+            raise ValueError("Invalid baselines file: "+filename) from error
+
+def save_baselines(filename, results):
+    """
+    This function stores results as the new baselines. Baselines for benchmarks that
+    aren't in the results are kept. The machine and Python version are recorded too,
+    because baselines are only meaningful on the machine they were made on.
+
+    Args:
+        filename (str):             The baselines file.
+        results (dict):             The results, as from run_benchmarks().
+
+    Usage:
+        >>> save_baselines("Benchmarks/baselines.json", <dict>)
+    """
+
+    baselines = load_baselines(filename)
+    baselines.update(results)
+
+    data = {"version": config.VERSION,
+            "created": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "machine": platform.platform()+" ("+platform.machine()+")",
+            "python": platform.python_version(),
+            "results": dict(sorted(baselines.items()))}
+
+    with open(filename, "w", encoding="utf-8") as baselines_file:
+        json.dump(data, baselines_file, indent=4)
+        baselines_file.write("\n")
+
+    logger.info("Saved baselines to "+filename)
+
+def compare(results, baselines, threshold=DEFAULT_THRESHOLD):
+    """
+    This function compares results with the baselines.
+
+    Args:
+        results (dict):             The results, as from run_benchmarks().
+        baselines (dict):           The baselines, as from load_baselines().
+
+    Named args:
+        threshold[=DEFAULT_THRESHOLD] (float):  How much the time per operation must
+                                                change by to count as a regression or
+                                                an improvement, as a fraction.
+
+    Returns:
+        list<Comparison>.   A comparison for each result, in the same order.
+
+    Usage:
+        >>> compare(<dict>, <dict>)
+        >>> [Comparison(name="coretools.Reading.as_csv", baseline=1.2e-06,
+        >>>             result=1.5e-06, change=0.25, status="OK")]
+    """
+
+    comparisons = []
+
+    for name, timings in results.items():
+        if name not in baselines:
+            comparisons.append(Comparison(name, None, timings["best"], None, NEW))
+            continue
+
+        baseline = baselines[name]["best"]
+        change = (timings["best"] - baseline) / baseline
+
+        if change > threshold:
+            status = REGRESSED
+
+        elif change < -threshold:
+            status = IMPROVED
+
+        else:
+            status = UNCHANGED
+
+        comparisons.append(Comparison(name, baseline, timings["best"], change, status))
+
+    return comparisons
+
+def get_regressions(comparisons):
+    """
+    This function returns the comparisons that are regressions.
+
+    Args:
+        comparisons (list<Comparison>):     The comparisons, as from compare().
+
+    Returns:
+        list<Comparison>.
+
+    Usage:
+        >>> get_regressions(<list<Comparison>>)
+        >>> []
+    """
+
+    return [comparison for comparison in comparisons if comparison.status == REGRESSED]
+
+def format_time(seconds):
+    """
+    This function formats a time per operation in the most readable unit.
+
+    Args:
+        seconds (float):            The time, in seconds.
+
+    Returns:
+        str.        The formatted time.
+
+    Usage:
+        >>> format_time(0.0000012)
+        >>> "1.2 us"
+    """
+
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6), ("ns", 1e-9)):
+        if seconds >= scale or unit == "ns":
+            return str(round(seconds / scale, 2))+" "+unit
+
+def format_report(comparisons, threshold=DEFAULT_THRESHOLD):
+    """
+    This function formats comparisons as a report to be printed.
+
+    Args:
+        comparisons (list<Comparison>):     The comparisons, as from compare().
+
+    Named args:
+        threshold[=DEFAULT_THRESHOLD] (float):  The threshold used for the comparisons.
+
+    Returns:
+        str.        The report.
+
+    Usage:
+        >>> print(format_report(<list<Comparison>>))
+    """
+
+    width = max([len(comparison.name) for comparison in comparisons] + [9])
+
+    lines = ["Benchmark".ljust(width)+"  "+"Baseline".rjust(10)+"  "+"Result".rjust(10)
+             + "  "+"Change".rjust(8)+"  Status"]
+
+    for comparison in comparisons:
+        if comparison.baseline is None:
+            baseline = change = "-"
+
+        else:
+            baseline = format_time(comparison.baseline)
+            change = str(round(comparison.change * 100, 1))+"%"
+
+            if comparison.change >= 0:
+                change = "+"+change
+
+        lines.append(comparison.name.ljust(width)+"  "+baseline.rjust(10)+"  "
+                     + format_time(comparison.result).rjust(10)+"  "+change.rjust(8)
+                     + "  "+comparison.status)
+
+    regressions = get_regressions(comparisons)
+
+    lines.append("")
+    lines.append(str(len(comparisons))+" benchmarks, "+str(len(regressions))
+                 + " regressed by more than "+str(round(threshold * 100))+"%.")
+
+    return "\n".join(lines)
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Blackboard Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the blackboardtools module, which contains the latest-readings
+blackboard. Monitors and sockets post new readings to it, and the
+control logic reads them from it, without having to pass readings
+through queues or lock each other out.
+
+Each posted reading is given a sequence number, so readers can tell
+whether anything has changed since they last looked, and wait for
+changes if they need to.
+
+.. module:: blackboardtools.py
+    :platform: Linux
+    :synopsis: The latest-readings blackboard.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+import threading
+import logging
+from collections import namedtuple
+from collections.abc import Mapping
+
+from Tools import clocktools
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#An entry on the blackboard: the reading, its sequence number, and the time it was posted.
+Entry = namedtuple("Entry", ["reading", "seq", "received"])
+
+class Snapshot(Mapping):
+    """
+    This class represents a read-only, consistent view of all the latest readings
+    on a ReadingsBlackboard at a point in time. It behaves like a dictionary of
+    Reading objects, keyed by sensor ID, so it can be passed straight to the control
+    logic functions.
+
+    You shouldn't need to create these yourself - use ReadingsBlackboard.snapshot().
+
+    Documentation for the constructor for objects of type Snapshot:
+
+    Args:
+        seq (int):              The blackboard sequence number this snapshot was taken at.
+        entries (dict):         The blackboard entries, keyed by sensor ID.
+
+    Usage:
+        >>> snapshot = Snapshot(<seq>, <entries>)
+    """
+
+    def __init__(self, seq, entries):
+        """The constructor, as documented above"""
+        self.seq = seq
+        self._entries = entries
+
+    def __getitem__(self, sensor_id):
+        return self._entries[sensor_id].reading
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_entry(self, sensor_id):
+        """
+        This method returns the blackboard entry for the given sensor, including
+        its sequence number and the time it was posted.
+
+        Args:
+            sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+        Returns:
+            Entry, or None if there is no reading for that sensor.
+
+        Usage:
+            >>> <Snapshot>.get_entry("G4:M0")
+        """
+
+        return self._entries.get(sensor_id)
+
+class ReadingsBlackboard:
+    """
+    This class is a thread-safe store for the latest reading from each sensor.
+
+    Writers post readings with post(), which gives each one a new sequence
+    number. Readers never take the lock - all the entries are replaced together
+    each time a reading is posted, so a reader always sees a consistent set of
+    readings, even while other threads are posting.
+
+    Documentation for the constructor for objects of type ReadingsBlackboard:
+
+    Usage:
+        >>> blackboard = ReadingsBlackboard()
+    """
+
+    def __init__(self):
+        """The constructor, as documented above"""
+        #Used by writers, and to wake up waiting readers.
+        self.condition = threading.Condition()
+
+        #The latest sequence number and entries. These are kept together in
+        #one tuple, and replaced rather than modified, so readers don't need the lock.
+        self._state = (0, {})
+
+    #---------- WRITER METHODS ----------
+    def post(self, reading):
+        """
+        This method posts a new reading to the blackboard, replacing the last reading
+        from the same sensor, and wakes up anything that is waiting for changes.
+
+        Args:
+            reading (Reading):      The new reading.
+
+        Returns:
+            int.        The sequence number given to the reading.
+
+        Usage:
+            >>> <ReadingsBlackboard>.post(<Reading>)
+            >>> 5
+        """
+
+        with self.condition:
+            seq, entries = self._state
+
+            seq += 1
+            entries = dict(entries)
+            entries[reading.get_id()] = Entry(reading, seq, clocktools.get_clock().time())
+
+            self._state = (seq, entries)
+            self.condition.notify_all()
+
+        return seq
+
+    def clear(self):
+        """
+        This method removes all the readings from the blackboard. The sequence
+        number is not reset, so readers still see this as a change.
+
+        Usage:
+            >>> <ReadingsBlackboard>.clear()
+        """
+
+        with self.condition:
+            self._state = (self._state[0] + 1, {})
+            self.condition.notify_all()
+
+    #---------- READER METHODS ----------
+    def get_seq(self):
+        """
+        This method returns the current sequence number of the blackboard. This is
+        the sequence number of the most recently posted reading.
+
+        Returns:
+            int.        The sequence number.
+
+        Usage:
+            >>> <ReadingsBlackboard>.get_seq()
+            >>> 5
+        """
+
+        return self._state[0]
+
+    def get_entry(self, sensor_id):
+        """
+        This method returns the latest entry for the given sensor.
+
+        Args:
+            sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+        Returns:
+            Entry, or None if there is no reading for that sensor.
+
+        Usage:
+            >>> <ReadingsBlackboard>.get_entry("G4:M0")
+            >>> Entry(reading=<Reading>, seq=5, received=1601467272.2)
+        """
+
+        return self._state[1].get(sensor_id)
+
+    def get(self, sensor_id):
+        """
+        This method returns the latest reading for the given sensor.
+
+        Args:
+            sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+        Returns:
+            Reading, or None if there is no reading for that sensor.
+
+        Usage:
+            >>> <ReadingsBlackboard>.get("G4:M0")
+            >>> <Reading>
+        """
+
+        entry = self._state[1].get(sensor_id)
+
+        if entry is None:
+            return None
+
+        return entry.reading
+
+    def snapshot(self):
+        """
+        This method returns a consistent view of all the latest readings.
+
+        Returns:
+            Snapshot.
+
+        Usage:
+            >>> readings = <ReadingsBlackboard>.snapshot()
+            >>> readings["G4:M0"]
+            >>> <Reading>
+        """
+
+        return Snapshot(*self._state)
+
+    def changed_since(self, seq):
+        """
+        This method returns the entries that have been posted since the given
+        sequence number.
+
+        Args:
+            seq (int):          The sequence number we last saw.
+
+        Returns:
+            dict.       The new entries, keyed by sensor ID.
+
+        Usage:
+            >>> <ReadingsBlackboard>.changed_since(3)
+            >>> {"G4:M0": Entry(reading=<Reading>, seq=5, received=1601467272.2)}
+        """
+
+        return {sensor_id: entry for sensor_id, entry in self._state[1].items()
+                if entry.seq > seq}
+
+    def wait_for_change(self, seq, timeout=None):
+        """
+        This method waits until something is posted after the given sequence number,
+        or until the timeout expires.
+
+        Args:
+            seq (int):          The sequence number we last saw.
+
+        Named args:
+            timeout[=None] (float): The maximum time to wait, in seconds. None means
+                                    wait forever.
+
+        Returns:
+            int.        The current sequence number. This is the same as seq if
+                        we timed out.
+
+        Usage:
+            >>> <ReadingsBlackboard>.wait_for_change(5, timeout=10)
+            >>> 6
+        """
+
+        with self.condition:
+            self.condition.wait_for(lambda: self._state[0] != seq, timeout)
+
+            return self._state[0]
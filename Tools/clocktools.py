@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Clock Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the clocktools module, which contains the clock service. Everything in the
+framework that needs the time, or needs to wait, asks the clock returned by
+get_clock() rather than using the time and datetime modules directly.
+
+Normally this is a RealClock, which just uses the system clocks. For soak tests,
+performance tests, and checking the control logic, a VirtualClock can be set with
+set_clock() instead. Virtual time only moves when every thread that is using the
+clock is waiting, and then jumps straight to the earliest deadline, so a simulated
+day of operation can run in seconds.
+
+.. note::
+    This module doesn't use rcs_print, because coretools imports it.
+
+.. module:: clocktools.py
+    :platform: Linux
+    :synopsis: The clock service, with real and virtual time.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+import datetime
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+class RealClock:
+    """
+    This class is the normal clock, which uses the system clocks.
+
+    Usage:
+        >>> clock = RealClock()
+        >>> clock.time()
+        >>> 1601460010.5
+    """
+
+    def time(self): #pylint: disable=no-self-use
+        """
+        This method returns the time, in seconds since the epoch, like time.time().
+        """
+
+        return time.time()
+
+    def monotonic(self): #pylint: disable=no-self-use
+        """
+        This method returns a time that never goes backwards, for measuring
+        intervals, like time.monotonic().
+        """
+
+        return time.monotonic()
+
+    def now(self): #pylint: disable=no-self-use
+        """
+        This method returns the local date and time, like datetime.datetime.now().
+        """
+
+        return datetime.datetime.now()
+
+    def sleep(self, seconds): #pylint: disable=no-self-use
+        """
+        This method sleeps for the given number of seconds, like time.sleep().
+        """
+
+        time.sleep(seconds)
+
+    def wait(self, condition, timeout): #pylint: disable=no-self-use
+        """
+        This method waits on a condition, like condition.wait(). The caller must
+        hold the condition.
+
+        Args:
+            condition (Condition):  The condition.
+            timeout (float):        The longest to wait for, in seconds.
+
+        Returns:
+            bool. False if the timeout passed, True otherwise.
+
+        Usage:
+            >>> with condition:
+            >>>     <RealClock>.wait(condition, 10)
+        """
+
+        return condition.wait(timeout)
+
+class VirtualClock:
+    """
+    This class is a discrete-event clock. Time stands still while any thread that
+    uses the clock is busy, and when they are all waiting, it jumps to the
+    earliest deadline they are waiting for.
+
+    A thread that has waited on the clock before, but is now blocked on something
+    else (eg a socket), would stop time forever. To avoid this, if time hasn't
+    moved for idle_time real seconds, it moves anyway.
+
+    Documentation for the constructor for objects of type VirtualClock:
+
+    Named args:
+        start[=None] (float):           The time to start at, in seconds since the
+                                        epoch. Now if None.
+
+        idle_time[=0.1] (float):        How long to wait, in real seconds, before
+                                        moving time on while a thread is busy.
+
+    Usage:
+        >>> set_clock(VirtualClock())
+    """
+
+    def __init__(self, start=None, idle_time=0.1):
+        """The constructor, as documented above"""
+        if start is None:
+            start = time.time()
+
+        self._time = start
+        self.idle_time = idle_time
+
+        #Protects everything below.
+        self.lock = threading.Lock()
+
+        #The threads that use the clock, and the (deadline, condition) each waiting
+        #one is waiting for.
+        self.participants = {}
+        self.waiting = {}
+
+    def time(self):
+        """
+        This method returns the virtual time, in seconds since the epoch.
+        """
+
+        return self._time
+
+    def monotonic(self):
+        """
+        This method returns the virtual time, which never goes backwards.
+        """
+
+        return self._time
+
+    def now(self):
+        """
+        This method returns the virtual local date and time.
+        """
+
+        return datetime.datetime.fromtimestamp(self._time)
+
+    def sleep(self, seconds):
+        """
+        This method waits until the given number of virtual seconds have passed.
+        """
+
+        condition = threading.Condition()
+        deadline = self._time + seconds
+
+        with condition:
+            while self._time < deadline:
+                self.wait(condition, deadline - self._time)
+
+    def register(self):
+        """
+        This method marks the calling thread as using the clock, so time doesn't
+        move while it is busy. Threads are registered the first time they wait
+        anyway, but threads that start together should register before any of
+        them waits, or the first one to wait will run on ahead.
+
+        Usage:
+            >>> <VirtualClock>.register()
+        """
+
+        thread = threading.current_thread()
+
+        with self.lock:
+            self.participants[thread.ident] = thread
+
+    def advance(self, seconds):
+        """
+        This method moves time forward, waking any threads whose deadlines have
+        passed. Useful in tests.
+
+        Args:
+            seconds (float):        How far to move time, in seconds.
+
+        Usage:
+            >>> <VirtualClock>.advance(60)
+        """
+
+        with self.lock:
+            self._time += seconds
+            conditions = self._get_due_conditions()
+
+        self._notify(conditions)
+
+    def wait(self, condition, timeout):
+        """
+        This method waits on a condition until it is notified, or the virtual
+        timeout passes. The caller must hold the condition.
+
+        Args:
+            condition (Condition):  The condition.
+            timeout (float):        The longest to wait for, in virtual seconds.
+
+        Returns:
+            bool. False if the timeout passed, True otherwise.
+
+        Usage:
+            >>> with condition:
+            >>>     <VirtualClock>.wait(condition, 10)
+        """
+
+        thread = threading.current_thread()
+
+        with self.lock:
+            deadline = self._time + timeout
+            self.participants[thread.ident] = thread
+            self.waiting[thread.ident] = (deadline, condition)
+
+            conditions = self._try_advance(force=False)
+
+        try:
+            self._notify(conditions)
+
+            while self._time < deadline:
+                start = self._time
+
+                if condition.wait(self.idle_time):
+                    return self._time < deadline
+
+                #Nothing happened for a while. Move time on if it's stuck.
+                if self._time == start:
+                    with self.lock:
+                        conditions = self._try_advance(force=True)
+
+                    self._notify(conditions)
+
+            return False
+
+        finally:
+            with self.lock:
+                del self.waiting[thread.ident]
+
+    def _try_advance(self, force):
+        """
+        PRIVATE, implementation detail.
+
+        Moves time to the earliest deadline if every thread using the clock is
+        waiting (or if force is True), and returns the conditions to notify.
+        Called with the lock held.
+        """
+
+        #Forget about threads that have exited.
+        for ident, thread in list(self.participants.items()):
+            if not thread.is_alive():
+                del self.participants[ident]
+                self.waiting.pop(ident, None)
+
+        if not self.waiting or (not force and len(self.waiting) < len(self.participants)):
+            return []
+
+        self._time = max(self._time, min(deadline for deadline, _ in self.waiting.values()))
+
+        return self._get_due_conditions()
+
+    def _get_due_conditions(self):
+        """
+        PRIVATE, implementation detail.
+
+        Returns the conditions of the waiting threads whose deadlines have passed.
+        Called with the lock held.
+        """
+
+        return [condition for deadline, condition in self.waiting.values()
+                if deadline <= self._time]
+
+    @classmethod
+    def _notify(cls, conditions):
+        """
+        PRIVATE, implementation detail.
+
+        Wakes the threads waiting on the given conditions. A condition that is
+        held by another thread is skipped rather than waited for, to avoid
+        deadlocks - its waiter will notice the new time within idle_time.
+        """
+
+        for condition in conditions:
+            #pylint: disable=consider-using-with
+            if condition.acquire(blocking=False):
+                try:
+                    condition.notify_all()
+
+                finally:
+                    condition.release()
+
+#The clock used by the framework.
+CLOCK = RealClock()
+
+def get_clock():
+    """
+    This function returns the clock in use.
+
+    Returns:
+        RealClock or VirtualClock.
+
+    Usage:
+        >>> get_clock().time()
+        >>> 1601460010.5
+    """
+
+    return CLOCK
+
+def set_clock(clock):
+    """
+    This function sets the clock used by the framework. This should be done before
+    anything is started.
+
+    Args:
+        clock (RealClock or VirtualClock):  The clock to use.
+
+    Usage:
+        >>> set_clock(VirtualClock())
+    """
+
+    global CLOCK #pylint: disable=global-statement
+
+    CLOCK = clock
+    logger.info("Using "+type(clock).__name__)
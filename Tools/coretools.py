@@ -40,6 +40,8 @@ import time
 import threading
 import subprocess
 import logging
+import weakref
+import datetime
 import os.path
 
 #Extra imports.
@@ -50,6 +52,8 @@ sys.path.insert(0, os.path.abspath('..'))
 
 import config
 
+from Tools import clocktools
+
 #These are injected from main.py to avoid a circular import problem.
 sockettools = None #pylint: disable=invalid-name
 dbtools = None #pylint: disable=invalid-name
@@ -71,6 +75,52 @@ def reconfigure_logger():
     for _handler in logging.getLogger('River System Control Software').handlers:
         logger.addHandler(_handler)
 
+#Marks cached Reading values that haven't been worked out yet.
+_NOT_PARSED = object()
+
+#Units that can be on the end of numeric reading values, eg "400mm".
+_UNIT_CHARACTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ% "
+
+def format_time(epoch):
+    """
+    This function formats a time as it is shown in readings - the local time, in
+    the same format as str(datetime.datetime.now()), without microseconds if
+    there aren't any.
+
+    Args:
+        epoch (float):      The time, in seconds since the epoch.
+
+    Returns:
+        str.
+
+    Usage:
+        >>> format_time(1601456400)
+        >>> "2020-09-30 10:00:00"
+    """
+
+    return datetime.datetime.fromtimestamp(epoch).isoformat(" ")
+
+def parse_time(time_text):
+    """
+    This function does the opposite of format_time(). Any time in ISO format
+    is accepted.
+
+    Args:
+        time_text (str):    The time, eg "2020-09-30 10:00:00".
+
+    Returns:
+        float. The time, in seconds since the epoch.
+
+    Throws:
+        ValueError, if the time couldn't be understood.
+
+    Usage:
+        >>> parse_time("2020-09-30 10:00:00")
+        >>> 1601456400.0
+    """
+
+    return datetime.datetime.fromisoformat(time_text).timestamp()
+
 class Reading:
     """
     This class is used to represent a reading. Each reading has an ID, a time,
@@ -84,8 +134,9 @@ class Reading:
                                     construct a subclass. There are no
                                     subclasses of Reading at this time.
 
-        reading_time (str):         The time of the reading. Format as returned
-                                    from running str(datetime.datetime.now()).
+        reading_time (str/float):   The time of the reading. Either seconds since
+                                    the epoch (eg from time.time()), or text as
+                                    returned from running str(datetime.datetime.now()).
 
         reading_tick (int):         The system tick number at the time the reading
                                     was taken. A positive integer.
@@ -121,17 +172,36 @@ class Reading:
         >>> reading_2 != reading_3
 
         With ease.
+
+    .. note::
+        Readings are created, compared and pickled very often, so they use
+        __slots__, split the ID once, and cache the value as a number or a
+        bool the first time it is asked for. Use from_row() for values that
+        have already been checked (eg from the database).
+
+        The time is kept as seconds since the epoch, and only turned into text
+        (or text turned into seconds) the first time it is asked for. Use
+        get_epoch() to compare or sort readings by time.
     """
 
+    __slots__ = ("_time", "_epoch", "_tick", "_id", "_value", "_status", "_group_id",
+                 "_sensor_id", "_numeric_value", "_bool_value")
+
     # ---------- CONSTRUCTORS ----------
     def __init__(self, reading_time, reading_tick, reading_id, reading_value, reading_status): #pylint: disable=too-many-arguments
         """This is the constructor as defined above"""
         #Set some semi-private variables.
-        #Check the time is a string.
-        if not isinstance(reading_time, str):
-            raise ValueError("reading_time argument must be of type str")
+        #Check the time is a string or a number.
+        if isinstance(reading_time, str):
+            self._time = reading_time
+            self._epoch = _NOT_PARSED
+
+        elif isinstance(reading_time, (int, float)) and not isinstance(reading_time, bool):
+            self._time = _NOT_PARSED
+            self._epoch = reading_time
 
-        self._time = reading_time
+        else:
+            raise ValueError("reading_time argument must be of type str, int or float")
 
         #Check the tick is valid.
         if not isinstance(reading_tick, int) or \
@@ -144,16 +214,18 @@ class Reading:
 
         self._tick = reading_tick
 
-        #Check the ID is valid.
-        if not isinstance(reading_id, str) \
-            or ":" not in reading_id \
-            or len(reading_id.split(":")) != 2 \
-            or reading_id.split(":")[0] == "" \
-            or reading_id.split(":")[1] == "":
+        #Check the ID is valid, splitting it as we go.
+        if not isinstance(reading_id, str):
+            raise ValueError("Invalid ID: "+str(reading_id))
+
+        group_id, colon, sensor_id = reading_id.partition(":")
 
+        if not colon or not group_id or not sensor_id or ":" in sensor_id:
             raise ValueError("Invalid ID: "+str(reading_id))
 
         self._id = reading_id
+        self._group_id = group_id
+        self._sensor_id = sensor_id
 
         #Check the value is valid.
         if not isinstance(reading_value, str):
@@ -167,6 +239,72 @@ class Reading:
 
         self._status = reading_status
 
+        #Worked out when first asked for.
+        self._numeric_value = _NOT_PARSED
+        self._bool_value = _NOT_PARSED
+
+    @classmethod
+    def from_row(cls, row):
+        """
+        This method creates a Reading from values that are already known to be
+        valid, eg from the database, without checking them again.
+
+        Args:
+            row (tuple):        The time, tick, full ID, value and status, in the
+                                same order and with the same types as for the
+                                constructor.
+
+        Returns:
+            Reading.
+
+        Usage:
+            >>> Reading.from_row(("2020-09-30 10:00:00", 101, "G4:M0", "400", "OK"))
+            >>> <Reading>
+        """
+
+        reading = cls.__new__(cls)
+        reading_time, reading._tick, reading._id, reading._value, reading._status = row
+
+        if isinstance(reading_time, str):
+            reading._time = reading_time
+            reading._epoch = _NOT_PARSED
+
+        else:
+            reading._time = _NOT_PARSED
+            reading._epoch = reading_time
+
+        reading._group_id, _, reading._sensor_id = reading._id.partition(":")
+        reading._numeric_value = _NOT_PARSED
+        reading._bool_value = _NOT_PARSED
+
+        return reading
+
+    # ---------- PICKLING METHODS ----------
+    def __getstate__(self):
+        """
+        This method returns the state to pickle. This is the same as before we used
+        __slots__, so readings can still be sent between pis running older versions.
+        """
+
+        return {"_time": self.get_time(), "_tick": self._tick, "_id": self._id,
+                "_value": self._value, "_status": self._status}
+
+    def __setstate__(self, state):
+        """
+        This method restores the state from a pickle, as returned by __getstate__.
+        """
+
+        self._time = state["_time"]
+        self._epoch = _NOT_PARSED
+        self._tick = state["_tick"]
+        self._id = state["_id"]
+        self._value = state["_value"]
+        self._status = state["_status"]
+
+        self._group_id, _, self._sensor_id = self._id.partition(":")
+        self._numeric_value = _NOT_PARSED
+        self._bool_value = _NOT_PARSED
+
     # ---------- INFO GETTER METHODS ----------
     def get_id(self):
         """
@@ -189,7 +327,7 @@ class Reading:
             >>> "G4"
         """
 
-        return self._id.split(":")[0]
+        return self._group_id
 
     def get_sensor_id(self):
         """
@@ -200,7 +338,7 @@ class Reading:
             >>> "M0"
         """
 
-        return self._id.split(":")[1]
+        return self._sensor_id
 
     def get_tick(self):
         """
@@ -215,15 +353,43 @@ class Reading:
 
     def get_time(self):
         """
-        This method returns the time when this reading was taken.
+        This method returns the time when this reading was taken, as text.
 
         Usage:
             >>> get_time()
             >>> "2018-04-11 21:51:36.821528"
         """
 
+        if self._time is _NOT_PARSED:
+            self._time = format_time(self._epoch)
+
         return self._time
 
+    def get_epoch(self):
+        """
+        This method returns the time when this reading was taken, in seconds since
+        the epoch.
+
+        Throws:
+            ValueError, if the reading was created with a time we can't understand.
+
+        Usage:
+            >>> get_epoch()
+            >>> 1523479896.821528
+        """
+
+        if self._epoch is _NOT_PARSED:
+            try:
+                self._epoch = parse_time(self._time)
+
+            except ValueError:
+                self._epoch = None
+
+        if self._epoch is None:
+            raise ValueError("Reading time is not a valid time: "+self._time)
+
+        return self._epoch
+
     def get_value(self):
         """
         This method returns the value for this reading.
@@ -235,6 +401,58 @@ class Reading:
 
         return self._value
 
+    def get_numeric_value(self):
+        """
+        This method returns the value for this reading as a number, without any
+        units on the end. Integers are returned as int, everything else as float.
+
+        Throws:
+            ValueError, if the value isn't a number.
+
+        Usage:
+            >>> get_numeric_value()
+            >>> 600
+        """
+
+        if self._numeric_value is _NOT_PARSED:
+            text = self._value.rstrip(_UNIT_CHARACTERS)
+
+            try:
+                self._numeric_value = int(text)
+
+            except ValueError:
+                try:
+                    self._numeric_value = float(text)
+
+                except ValueError:
+                    self._numeric_value = None
+
+        if self._numeric_value is None:
+            raise ValueError("Reading value is not a number: "+self._value)
+
+        return self._numeric_value
+
+    def get_bool_value(self):
+        """
+        This method returns the value for this reading as a bool, eg for float
+        switches.
+
+        Throws:
+            ValueError, if the value isn't "True" or "False".
+
+        Usage:
+            >>> get_bool_value()
+            >>> True
+        """
+
+        if self._bool_value is _NOT_PARSED:
+            self._bool_value = {"True": True, "False": False}.get(self._value)
+
+        if self._bool_value is None:
+            raise ValueError("Reading value is not True or False: "+self._value)
+
+        return self._bool_value
+
     def get_status(self):
         """
         This method returns the status for this reading.
@@ -313,7 +531,7 @@ class Reading:
             >>> and status: FAULT DETECTED
         """
 
-        return ("Reading at time " + self._time
+        return ("Reading at time " + self.get_time()
                 + ", and tick " + str(self._tick)
                 + ", from probe: " + self._id
                 + ", with value: " + self._value
@@ -336,7 +554,7 @@ class Reading:
             >>> reading_1.as_csv()
             >>> "2018-06-11 11:04:01.635548,101,G4:M0,500,OK"
         """
-        return (self._time
+        return (self.get_time()
                 + "," + str(self._tick)
                 + "," + self._id
                 + "," + self._value
@@ -358,6 +576,9 @@ class SyncTime(threading.Thread):
         self.site_id = site_id
         self.is_running = True
 
+        #Woken by request_exit(), so we tear down quickly.
+        self.waiter = IntervalWaiter()
+
         self.start()
 
     def run(self):
@@ -411,11 +632,7 @@ class SyncTime(threading.Thread):
                 sleep = 86400
 
             #Respond to system teardown quickly.
-            count = 0
-
-            while count < sleep and not config.EXITING:
-                count += 1
-                time.sleep(1)
+            self.waiter.wait_until(clocktools.get_clock().monotonic() + sleep)
 
         #Signal that we have exited.
         self.is_running = False
@@ -446,6 +663,9 @@ class MonitorLoad(threading.Thread):
         threading.Thread.__init__(self)
         self.is_running = True
 
+        #Woken by request_exit(), so we tear down quickly.
+        self.waiter = IntervalWaiter(30)
+
         self.start()
 
     def run(self):
@@ -454,6 +674,8 @@ class MonitorLoad(threading.Thread):
         psutil.cpu_percent()
 
         while not config.EXITING:
+            start = clocktools.get_clock().monotonic()
+
             try:
                 cpu_percent = str(round(psutil.cpu_percent(), 2))
                 used_memory_pct = str(psutil.virtual_memory().percent)
@@ -475,12 +697,7 @@ class MonitorLoad(threading.Thread):
                 config.MEM = used_memory_pct
 
             #Respond to system teardown quickly.
-            sleep = 30
-            count = 0
-
-            while count < sleep and not config.EXITING:
-                count += 1
-                time.sleep(1)
+            self.waiter.wait(start)
 
         #Signal that we have exited.
         self.is_running = False
@@ -500,6 +717,172 @@ class MonitorLoad(threading.Thread):
         while self.is_running:
             time.sleep(0.5)
 
+# -------------------- WAITING FUNCTIONS AND CLASSES --------------------
+#All the IntervalWaiters, so request_exit() can wake them.
+_WAITERS = weakref.WeakSet()
+
+#How often waiters check config.EXITING, in case it was set directly rather than
+#with request_exit().
+EXIT_CHECK_INTERVAL = 10
+
+class IntervalWaiter:
+    """
+    This class is used to wait for a reading interval, or until a deadline,
+    without waking up every second to check if anything has changed.
+
+    Waits end exactly at the deadline, as soon as the interval is changed so the
+    deadline has passed, as soon as wake() is called (eg when a reading or message
+    arrives), or as soon as request_exit() is called.
+
+    Documentation for the constructor for objects of type IntervalWaiter:
+
+    Named args:
+        interval[=0] (float):           The interval to wait for, in seconds.
+
+        condition[=None] (Condition):   The condition to wait on. Pass one in if
+                                        other state is protected by it. A new one
+                                        is created if None.
+
+    Usage:
+        >>> waiter = IntervalWaiter(15)
+    """
+
+    def __init__(self, interval=0, condition=None):
+        """The constructor, as documented above"""
+        if condition is None:
+            condition = threading.Condition()
+
+        self.condition = condition
+        self.interval = interval
+
+        #Set by wake(), and cleared when a wait returns because of it.
+        self.woken = False
+
+        _WAITERS.add(self)
+
+    def set_interval(self, interval):
+        """
+        This method changes the interval, with immediate effect on any wait in
+        progress.
+
+        Args:
+            interval (float):       The new interval, in seconds.
+
+        Usage:
+            >>> <IntervalWaiter>.set_interval(30)
+        """
+
+        with self.condition:
+            self.interval = interval
+            self.condition.notify_all()
+
+    def wake(self):
+        """
+        This method ends the current wait early. If nothing is waiting, the next
+        wait returns straight away instead.
+
+        Usage:
+            >>> <IntervalWaiter>.wake()
+        """
+
+        with self.condition:
+            self.woken = True
+            self.condition.notify_all()
+
+    def wait(self, start=None):
+        """
+        This method waits until the interval has passed since start.
+
+        Named args:
+            start[=None] (float):   When the interval started, from the monotonic()
+                                    method of the clock. Now if None.
+
+        Returns:
+            bool.
+
+                True  --    We were woken early, or we are exiting.
+                False --    The interval has passed.
+
+        Usage:
+            >>> <IntervalWaiter>.wait()
+            >>> False
+        """
+
+        if start is None:
+            start = clocktools.get_clock().monotonic()
+
+        return self._wait(lambda: start + self.interval)
+
+    def wait_until(self, deadline):
+        """
+        This method waits until the given deadline.
+
+        Args:
+            deadline (float):       The deadline, from the monotonic() method of the
+                                    clock. If None, wait until we are woken.
+
+        Returns:
+            bool.
+
+                True  --    We were woken early, or we are exiting.
+                False --    The deadline has passed.
+
+        Usage:
+            >>> <IntervalWaiter>.wait_until(clocktools.get_clock().monotonic() + 10)
+            >>> False
+        """
+
+        return self._wait(lambda: deadline)
+
+    def _wait(self, get_deadline):
+        """
+        PRIVATE, implementation detail.
+
+        Waits until the deadline returned by get_deadline, which is checked again
+        every time we are notified, so changes to the interval take effect.
+        """
+
+        clock = clocktools.get_clock()
+
+        with self.condition:
+            while not config.EXITING:
+                if self.woken:
+                    self.woken = False
+                    return True
+
+                deadline = get_deadline()
+                timeout = EXIT_CHECK_INTERVAL
+
+                if deadline is not None:
+                    remaining = deadline - clock.monotonic()
+
+                    if remaining <= 0:
+                        return False
+
+                    timeout = min(timeout, remaining)
+
+                clock.wait(self.condition, timeout)
+
+        return True
+
+def request_exit():
+    """
+    This function sets config.EXITING, and wakes everything that is waiting
+    with an IntervalWaiter so the software tears down straight away.
+
+    Usage:
+        >>> request_exit()
+    """
+
+    config.EXITING = True
+
+    for waiter in list(_WAITERS):
+        with waiter.condition:
+            waiter.condition.notify_all()
+
+#Used by wait_for_next_reading_interval(), and woken by the sockets when messages arrive.
+MAIN_LOOP_WAITER = IntervalWaiter()
+
 # -------------------- DATABASE FUNCTIONS AND CLASSES --------------------
 #NB: Moved to /Tools/dbtools.py
 
@@ -595,6 +978,22 @@ def setup_devices(site_id, dictionary="Probes"):
             device.set_depths([device_settings["Depths100s"], device_settings["Depths25s"],
                                device_settings["Depths50s"], device_settings["Depths75s"]])
 
+            #Optional - default to 2 Hz, and 860 samples per second.
+            if "sampleRate" in device_settings:
+                device.set_sample_rate(device_settings["sampleRate"])
+
+            if "dataRate" in device_settings:
+                device.set_data_rate(device_settings["dataRate"])
+
+            #Optional - default to a median filter over 5 levels, with a hysteresis of 2.
+            #Either filter setting can be given without the other.
+            if "filterMode" in device_settings or "filterSize" in device_settings:
+                device.set_filter(device_settings.get("filterMode", device.filter_mode),
+                                  device_settings.get("filterSize", device.filter_size))
+
+            if "hysteresis" in device_settings:
+                device.set_hysteresis(device_settings["hysteresis"])
+
             device.start_thread()
 
         elif _type == "Motor":
@@ -621,6 +1020,10 @@ def setup_devices(site_id, dictionary="Probes"):
             device.set_ref_voltage(device_settings["refVoltage"])
             device.set_i2c_address(device_settings["ADCAddress"])
 
+            #Optional - defaults to 10 Hz.
+            if "controlRate" in device_settings:
+                device.set_control_rate(device_settings["controlRate"])
+
             device.start_thread()
 
         else:
@@ -682,18 +1085,21 @@ def wait_for_tick(nas_socket):
         print("Could not get tick within 180 seconds!", level="error")
 
 # -------------------- MAIN LOOP FUNCTIONS --------------------
-def get_local_readings(monitors, readings):
+def get_local_readings(monitors):
     """
-    This function gets all the readings from the local monitors and adds them
-    to the local readings list.
+    This function checks that all the local monitors are still running, prints
+    and logs any new readings from them, and returns a consistent view of the
+    latest readings from the blackboard for the control logic functions.
 
     Args:
         monitors (list of BaseMonitorClass):     The monitors.
-        readings (list of Reading):              The local readings list.
+
+    Returns:
+        blackboardtools.Snapshot. The latest readings, keyed by sensor ID.
 
     Usage:
 
-        >>> get_local_readings(list<BaseMonitorClass>, list<Reading>)
+        >>> readings = get_local_readings(list<BaseMonitorClass>)
     """
 
     for monitor in monitors:
@@ -711,64 +1117,135 @@ def get_local_readings(monitors, readings):
 
             continue
 
-        #Check for new readings.
-        reading = get_and_handle_new_reading(monitor, "test")
-
-        #Ignore empty readings.
-        if reading is None:
+        #Check for a new reading.
+        if not monitor.has_data():
             continue
 
-        #Keep all the readings we get, for the control logic functions.
-        #Only some of the control logic functions use these.
-        readings[reading.get_id()] = reading
+        last_reading = monitor.get_previous_reading()
+        reading = monitor.get_reading()
+
+        #Check if the reading is different to the last reading.
+        if reading == last_reading:
+            #Write a . to each file.
+            logger.info(".")
+            print(".", level="none", end='') #Disable newline when printing this message.
+
+        else:
+            #Write any new readings to the file and to stdout.
+            logger.info(str(reading))
 
-def get_and_handle_new_reading(monitor, _type):
+            print(reading)
+
+    #Flush buffers.
+    sys.stdout.flush()
+
+    return config.LATESTREADINGS.snapshot()
+
+def get_subscribers(sensor_id):
     """
-    This function is used to get, handle, and return new readings from the
-    monitors. It checks each monitor to see if there is data, then prints
-    and logs it if needed.
+    This function returns the sites that have asked for readings from the given
+    sensor, using the "RemoteSensors" setting in config.SITE_SETTINGS.
 
     Args:
-        monitor (BaseMonitorClass):     The monitor we're checking.
-        _type (str):                    The type of probe we're monitoring.
+        sensor_id (str):            The full ID of the sensor, eg "G4:M0".
 
     Returns:
-        A Reading object.
+        list<str>.      The IDs of the subscribing sites.
 
     Usage:
 
-        >>> get_and_handle_new_reading(<BaseMonitorClass>, "test")
+        >>> get_subscribers("G4:M0")
+        >>> ["SUMP", "G6"]
     """
 
-    reading = None
+    return [site_id for site_id, site_settings in config.SITE_SETTINGS.items()
+            if sensor_id in site_settings.get("RemoteSensors", ())]
 
-    while monitor.has_data():
-        last_reading = monitor.get_previous_reading()
+def publish_reading(reading):
+    """
+    This function posts a new reading to the latest-readings blackboard, and, if
+    any other sites subscribe to this sensor, sends it to the NAS box to be forwarded
+    to them.
 
-        reading = monitor.get_reading()
+    Args:
+        reading (Reading):          The new reading.
 
-        #Check if the reading is different to the last reading.
-        if reading == last_reading:
-            #Write a . to each file.
-            logger.info(".")
-            print(".", level="none", end='') #Disable newline when printing this message.
+    Usage:
 
-        else:
-            #Write any new readings to the file and to stdout.
-            logger.info(str(reading))
+        >>> publish_reading(<Reading>)
+    """
 
-            print(reading)
+    config.LATESTREADINGS.post(reading)
+
+    if config.SITE_ID != "NAS" and get_subscribers(reading.get_id()):
+        for _socket in config.SOCKETSLIST:
+            _socket.write(reading)
+
+def forward_reading(reading):
+    """
+    This function is used on the NAS box to forward a reading received from one
+    of the pis to each site that subscribes to that sensor. On the other pis, it
+    just posts the reading to the latest-readings blackboard.
+
+    Args:
+        reading (Reading):          The reading to forward.
+
+    Usage:
+
+        >>> forward_reading(<Reading>)
+    """
+
+    config.LATESTREADINGS.post(reading)
+
+    if config.SITE_ID != "NAS":
+        return
+
+    for site_id in get_subscribers(reading.get_id()):
+        for _socket in config.SOCKETSLIST:
+            if _socket.server_address == config.SITE_SETTINGS[site_id]["IPAddress"]:
+                _socket.write(reading)
+
+def push_control_state(site_id, sensor_id, state):
+    """
+    This function pushes a new control state for the given device to the site
+    that owns it, so that site can react straight away instead of waiting to
+    poll the database.
+
+    On the NAS box, the message is written to the owning site's socket. On the
+    other pis, it is sent to the NAS box, which forwards it on.
+
+    Args:
+        site_id (str):              The site that holds the device.
+        sensor_id (str):            The device whose state has changed.
+        state (tuple):              The new (status, request, locked by) state.
+
+    Usage:
+
+        >>> push_control_state("VALVE4", "V4", ("Locked", "50%", "SUMP"))
+    """
+
+    #If we own the device, just store the new state.
+    if site_id == config.SITE_ID:
+        config.CONTROLSTATES[sensor_id] = tuple(state)
+        return
+
+    msg = site_id+" State: "+sensor_id+" "+" ".join(state)
 
-        #Flush buffers.
-        sys.stdout.flush()
+    for _socket in config.SOCKETSLIST:
+        if config.SITE_ID != "NAS" or \
+            _socket.server_address == config.SITE_SETTINGS[site_id]["IPAddress"]:
 
-    return reading
+            _socket.write(msg)
 
 def wait_for_next_reading_interval(reading_interval, site_id, nas_socket):
     """
     This function keeps watching for new messages coming from other sites while
     we count down the reading interval.
 
+    If the NAS box pushes a new control state for one of our devices, we return
+    early so the control logic can act on it immediately. We sleep until a message
+    arrives on one of the sockets, rather than checking every second.
+
     Args:
         reading_interval:           The reading interval.
         site_id:                    The site id.
@@ -779,25 +1256,30 @@ def wait_for_next_reading_interval(reading_interval, site_id, nas_socket):
         >>> wait_for_next_reading_interval(30, "SUMP", <Socket>)
     """
     #Keep watching for new messages from the socket while we count down the
-    #reading interval.
-    asked_for_tick = False
-    count = 0
+    #reading interval. We are woken as soon as a message arrives.
+    waiter = MAIN_LOOP_WAITER
+
+    for _socket in config.SOCKETSLIST:
+        _socket.add_waiter(waiter)
+
+    clock = clocktools.get_clock()
+    deadline = clock.monotonic() + reading_interval
+    asked_for_tick = site_id == "NAS"
+    state_changed = False
 
-    while count < reading_interval:
-        #This way, if our reading interval changes,
-        #the code will respond to the change immediately.
-        #Check if we have a new reading interval.
-        if not asked_for_tick and (reading_interval - count) < 10 and site_id != "NAS":
+    while True:
+        if not asked_for_tick and deadline - clock.monotonic() < 10:
             #Get the latest system tick if we're in the last 10 seconds of the interval.
             asked_for_tick = True
             nas_socket.write("Tick?")
 
         for _socket in config.SOCKETSLIST:
-            if _socket.has_data():
+            while _socket.has_data():
                 data = _socket.read()
 
+                #Leave anything else (eg readings) for the monitors.
                 if not isinstance(data, str):
-                    continue
+                    break
 
                 #-------------------- SYSTEM TICK HANDLING --------------------
                 if data == "Tick?" and site_id == "NAS":
@@ -814,10 +1296,37 @@ def wait_for_next_reading_interval(reading_interval, site_id, nas_socket):
                     print("New tick: "+data.split(" ")[1])
                     logger.info("New tick: "+data.split(" ")[1])
 
+                #-------------------- CONTROL STATE HANDLING --------------------
+                elif data.split(" ")[0] == site_id and " State: " in data:
+                    #Store the new state of one of our devices.
+                    try:
+                        _, _, sensor_id, status, request, locked_by = data.split(" ")
+
+                    except ValueError:
+                        logger.error("Invalid control state message: "+data)
+
+                    else:
+                        config.CONTROLSTATES[sensor_id] = (status, request, locked_by)
+                        state_changed = True
+
+                        logger.info("New control state for "+sensor_id+": "
+                                    + ", ".join(config.CONTROLSTATES[sensor_id]))
+
                 _socket.pop()
 
-        time.sleep(1)
-        count += 1
+        #Let the control logic act on new control states straight away.
+        if state_changed or config.EXITING:
+            return
+
+        #Sleep until the next message, the time to ask for the tick, or the deadline.
+        if asked_for_tick:
+            wake_at = deadline
+
+        else:
+            wake_at = deadline - 10
+
+        if not waiter.wait_until(wake_at) and wake_at == deadline:
+            return
 
 
 # -------------------- SITEWIDE UPDATER PREPARATION FUNCTIONS --------------------
@@ -927,7 +1436,7 @@ def prepare_sitewide_actions(site_id): #FIXME
     #NOTE: Actually shutting down/rebooting/applying the update is done later after most of
     #      the framework has been torn down.
     if at_least_one_action:
-        config.EXITING = True
+        request_exit()
 
 def prepare_shutdown(site_id): #FIXME
     """
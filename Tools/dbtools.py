@@ -50,6 +50,8 @@ sys.path.insert(0, os.path.abspath('..'))
 import config
 
 from Tools import coretools
+from Tools import batchtools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 logger = logging.getLogger(__name__)
@@ -129,6 +131,13 @@ class DatabaseConnection(threading.Thread):
         #at the same time.
         self.client_lock = threading.RLock()
 
+        #Used to wake the database thread when a query is queued, the client when
+        #its result is ready, and the database thread again when the client has
+        #the result. All are also woken by request_exit().
+        self.queue_waiter = coretools.IntervalWaiter()
+        self.result_waiter = coretools.IntervalWaiter()
+        self.done_waiter = coretools.IntervalWaiter()
+
         config.DBCONNECTION = self
 
     def start_thread(self):
@@ -143,7 +152,8 @@ class DatabaseConnection(threading.Thread):
 
         #Setup to avoid errors.
         database = cursor = None
-        count = 0
+        clock = clocktools.get_clock()
+        next_peer_check = clock.monotonic() + 60
 
         #First we need to find our connection settings from the config file.
         user = config.SITE_SETTINGS[self.site_id]["DBUser"]
@@ -166,12 +176,12 @@ class DatabaseConnection(threading.Thread):
 
                     #Set the query result to "Error" to stop excessive hangs when
                     #trying to execute queries when there is no connection.
-                    self.result = "Error"
+                    self._set_result("Error")
 
                     #Keep clearing the queue until we're reconnected as well.
                     self.in_queue.clear()
 
-                    time.sleep(10)
+                    clocktools.get_clock().sleep(10)
                     continue
 
                 #Otherwise, we are now connected.
@@ -189,8 +199,8 @@ class DatabaseConnection(threading.Thread):
                 continue
 
             #Check if peer is alive roughly every 60 seconds.
-            if count > 60:
-                count = 0
+            if clock.monotonic() >= next_peer_check:
+                next_peer_check = clock.monotonic() + 60
 
                 if not self.peer_alive():
                     #We need to reconnect.
@@ -198,7 +208,7 @@ class DatabaseConnection(threading.Thread):
                     logger.error("DatabaseConnection: Connection lost! Reconnecting...")
 
                     #Drop the queries so we can try again or move on without deadlocking.
-                    self.result = "Error"
+                    self._set_result("Error")
                     self.in_queue.clear()
 
                     self.is_connected = False
@@ -215,7 +225,7 @@ class DatabaseConnection(threading.Thread):
                     logger.error("DatabaseConnection: Connection lost! Reconnecting...")
 
                     #Drop the queries so we can try again or move on without deadlocking.
-                    self.result = "Error"
+                    self._set_result("Error")
                     self.in_queue.clear()
 
                     self.is_connected = False
@@ -234,10 +244,8 @@ class DatabaseConnection(threading.Thread):
                         database.commit()
 
                         #If there's no error by this point, we succeeded.
-                        self.result = "Success"
-
-                        while not self.client_thread_done:
-                            time.sleep(0.01)
+                        self._set_result("Success")
+                        self._wait_for_client()
 
                         #Make sure the result is cleared at this point.
                         self.result = None
@@ -250,10 +258,8 @@ class DatabaseConnection(threading.Thread):
                         self.client_thread_done = False
 
                         cursor.execute(query)
-                        self.result = cursor.fetchall()
-
-                        while not self.client_thread_done:
-                            time.sleep(0.01)
+                        self._set_result(cursor.fetchall())
+                        self._wait_for_client()
 
                         #Make sure the result is cleared at this point.
                         self.result = None
@@ -266,11 +272,9 @@ class DatabaseConnection(threading.Thread):
                                  + "Error was: "+str(error))
 
                     #Drop the query so we can try again or move on without deadlocking.
-                    self.result = "Error"
+                    self._set_result("Error")
                     self.in_queue.popleft()
-
-                    while not self.client_thread_done:
-                        time.sleep(0.01)
+                    self._wait_for_client()
 
                     #Break out so we can check the connection again.
                     self.is_connected = False
@@ -282,8 +286,8 @@ class DatabaseConnection(threading.Thread):
                     logger.debug("DatabaseConnection: Done.")
                     self.in_queue.popleft()
 
-            count += 1
-            time.sleep(1)
+            #Woken by do_query(), so queries don't wait for the next pass.
+            self.queue_waiter.wait_until(clock.monotonic() + 1)
 
         #Do clean up.
         self._cleanup(database, cursor)
@@ -291,6 +295,26 @@ class DatabaseConnection(threading.Thread):
         self.is_running = False
 
     #-------------------- CONVENIENCE METHODS -------------------
+    def _set_result(self, result):
+        """
+        PRIVATE, implementation detail.
+
+        Sets the result of the current query, and wakes the client waiting for it.
+        """
+
+        self.result = result
+        self.result_waiter.wake()
+
+    def _wait_for_client(self):
+        """
+        PRIVATE, implementation detail.
+
+        Waits until the client has taken the result of the current query.
+        """
+
+        while not self.client_thread_done and not config.EXITING:
+            self.done_waiter.wait_until(None)
+
     def peer_alive(self):
         """
         Used to ping peer once at other end of the connection to check if it is still up.
@@ -378,7 +402,7 @@ class DatabaseConnection(threading.Thread):
 
             self._cleanup(database, cursor)
 
-            time.sleep(10)
+            clocktools.get_clock().sleep(10)
 
         except Exception:
             logger.error("DatabaseConnection: Unexpected error while connecting: "+str(error)
@@ -386,7 +410,7 @@ class DatabaseConnection(threading.Thread):
 
             self._cleanup(database, cursor)
 
-            time.sleep(10)
+            clocktools.get_clock().sleep(10)
 
         else:
             #We are connected!
@@ -509,6 +533,7 @@ class DatabaseConnection(threading.Thread):
         if not self.is_connected:
             raise RuntimeError("Database not connected")
 
+        start = time.perf_counter()
         count = 0
 
         while count <= retries and self.is_connected:
@@ -517,17 +542,23 @@ class DatabaseConnection(threading.Thread):
                 self.client_lock.acquire()
 
             self.in_queue.append(query)
+            self.queue_waiter.wake()
 
             #Wait until the query is processed.
-            while self.result is None:
-                time.sleep(0.01)
+            while self.result is None and not config.EXITING:
+                self.result_waiter.wait_until(None)
 
-            #Store the results.
+            #Store the results. If we're exiting, the query might not have been done.
             result = self.result
+
+            if result is None:
+                result = "Error"
+
             self.result = None
 
             #Signal that the database thread can safely continue.
             self.client_thread_done = True
+            self.done_waiter.wake()
 
             if threading.current_thread() is not self.db_thread:
                 self.client_lock.release()
@@ -539,6 +570,10 @@ class DatabaseConnection(threading.Thread):
             else:
                 break
 
+        #Let the profiler know how long the query took, if the control logic made it.
+        if config.PROFILER is not None:
+            config.PROFILER.add_query(start, time.perf_counter())
+
         #Throw RuntimeError if the query still failed.
         if result == "Error":
             raise RuntimeError("Query Failed")
@@ -642,9 +677,15 @@ class DatabaseConnection(threading.Thread):
 
                 continue
 
+            #MySQLdb returns the measure time as a datetime. Keep it as it is otherwise.
+            reading_time = reading_data[3]
+
+            if isinstance(reading_time, datetime.datetime):
+                reading_time = reading_time.timestamp()
+
             try:
-                #Convert the result to a Reading object.
-                readings.append(coretools.Reading(str(reading_data[3]), reading_data[2],
+                #Convert the result to a Reading object, which checks the other columns.
+                readings.append(coretools.Reading(reading_time, reading_data[2],
                                                   site_id+":"+reading_data[1], reading_data[4],
                                                   reading_data[5]))
 
@@ -654,6 +695,70 @@ class DatabaseConnection(threading.Thread):
 
         return readings
 
+    def get_readings_batch(self, site_id, start, end, retries=3):
+        """
+        This method returns all the readings from all the sensors at the given site
+        between two times, as one ReadingBatch. This is much cheaper than
+        get_n_latest_readings() for large numbers of readings, because no Reading
+        objects are created. Use ReadingBatch.filter() to pick out one sensor.
+
+        Args:
+            site_id (str).              The site we want the readings from.
+            start (datetime).           The time of the first reading to return.
+            end (datetime).             Only return readings from before this time.
+
+        Named args:
+            retries[=3] (int).          The number of times to retry before giving up
+                                        and raising an error.
+
+        Returns:
+            ReadingBatch. The readings, oldest first.
+
+        Throws:
+            RuntimeError, if the query failed too many times.
+
+        Usage:
+            >>> get_readings_batch("G4", datetime(2020, 9, 30), datetime(2020, 10, 1))
+            >>> <ReadingBatch>
+        """
+
+        if not isinstance(site_id, str) or \
+            site_id == "" or \
+            site_id not in config.SITE_SETTINGS:
+
+            raise ValueError("Invalid site ID: "+str(site_id))
+
+        if not isinstance(start, datetime.datetime) or \
+            not isinstance(end, datetime.datetime) or \
+            end < start:
+
+            raise ValueError("Invalid time range: "+str(start)+" to "+str(end))
+
+        query = """SELECT * FROM `"""+site_id+"""Readings` WHERE `Measure Time` >= '""" \
+                + str(start)+"""' AND `Measure Time` < '"""+str(end) \
+                + """' ORDER BY `Measure Time`, ID;"""
+
+        result = self.do_query(query, retries)
+
+        batch = batchtools.ReadingBatch()
+
+        for reading_data in result:
+            #Do some checks on each dataset before we use it.
+            if len(reading_data) != 6:
+                continue
+
+            #The types of the other columns are enforced by the database.
+            try:
+                batch.append_row((reading_data[3], reading_data[2],
+                                  site_id+":"+reading_data[1], reading_data[4],
+                                  reading_data[5]))
+
+            except (IndexError, TypeError, ValueError):
+                #Values must be invalid. Ignore and deliver as many good readings as possible.
+                pass
+
+        return batch
+
     def get_state(self, site_id, sensor_id, retries=3):
         """
         This method queries the state of the given sensor/device. Information is returned
@@ -836,6 +941,9 @@ class DatabaseConnection(threading.Thread):
 
         self.do_query(query, retries)
 
+        #Push the new state to the site that owns the device.
+        coretools.push_control_state(site_id, sensor_id, ("Locked", request, self.site_id))
+
         #Log the event as well.
         self.log_event("Taking control of "+site_id+":"+sensor_id
                        + ", Request: "+request)
@@ -897,6 +1005,9 @@ class DatabaseConnection(threading.Thread):
 
         self.do_query(query, retries)
 
+        #Push the new state to the site that owns the device.
+        coretools.push_control_state(site_id, sensor_id, ("Unlocked", "None", "None"))
+
         #Log the event as well.
         self.log_event("Releasing control of "+site_id+":"+sensor_id)
 
@@ -940,7 +1051,7 @@ class DatabaseConnection(threading.Thread):
 
         query = """INSERT INTO `EventLog`(`Site ID`, `Severity`, `Event`, `Device Time`)""" \
                 + """VALUES('"""+self.site_id+"""', '"""+severity+"""', '"""+event \
-                + """', '"""+str(datetime.datetime.now())+"""');"""
+                + """', '"""+str(clocktools.get_clock().now())+"""');"""
 
         self.do_query(query, retries)
 
@@ -1105,6 +1216,111 @@ class DatabaseConnection(threading.Thread):
 
         self.do_query(query, retries)
 
+    def store_readings(self, readings, retries=3):
+        """
+        This method stores lots of readings in the database with a single query.
+        This is much faster than storing them one at a time, so it is used to fill
+        gaps in the database from the readings files (see backfilltools.py).
+
+        Args:
+            readings (list<Reading>).   The readings to store.
+
+        Named args:
+            retries[=3] (int).          The number of times to retry before giving up
+                                        and raising an error.
+
+        Throws:
+            RuntimeError, if the query failed too many times.
+
+        Usage:
+            >>> store_readings([<Reading>, <Reading>])
+            >>>
+        """
+
+        if not readings:
+            return
+
+        for reading in readings:
+            if not isinstance(reading, coretools.Reading):
+                raise ValueError("Invalid reading object: "+str(reading))
+
+        values = []
+
+        for reading in readings:
+            values.append("""('"""+reading.get_sensor_id()+"""', """+str(reading.get_tick()) \
+                          + """, '"""+reading.get_time()+"""', '"""+reading.get_value() \
+                          + """', '"""+reading.get_status()+"""')""")
+
+        query = """INSERT INTO `"""+self.site_id+"""Readings`(`Probe ID`, `Tick`, """ \
+                + """`Measure Time`, `Value`, `Status`) VALUES """+", ".join(values)+""";"""
+
+        self.do_query(query, retries)
+
+    def get_readings_coverage(self, sensor_id, date, bucket_size=60, retries=3):
+        """
+        This method returns how many readings the database has for the given sensor
+        at this site on the given day, split into buckets of bucket_size seconds, and
+        the times of the first and last readings in each bucket. This is done with
+        a single aggregate query, so whole days can be compared with the readings
+        files cheaply.
+
+        Args:
+            sensor_id (str).            The sensor, eg "M0".
+            date (date).                The day.
+
+        Named args:
+            bucket_size[=60] (int).     The size of the buckets, in seconds.
+            retries[=3] (int).          The number of times to retry before giving up
+                                        and raising an error.
+
+        Returns:
+            dict. (count, first time, last time) tuples, keyed by bucket number (the
+            number of bucket_size periods since midnight). Buckets with no readings
+            are left out.
+
+        Throws:
+            RuntimeError, if the query failed too many times.
+
+        Usage:
+            >>> get_readings_coverage("M0", datetime.date(2020, 9, 30))
+            >>> {0: (4, datetime(2020, 9, 30, 0, 0, 5), datetime(2020, 9, 30, 0, 0, 50)), ...}
+        """
+
+        if not isinstance(sensor_id, str) or \
+            sensor_id == "" or \
+            (self.site_id+":"+sensor_id not in config.SITE_SETTINGS[self.site_id]["Devices"] and \
+             self.site_id+":"+sensor_id not in config.SITE_SETTINGS[self.site_id]["Probes"]):
+
+            raise ValueError("Invalid sensor ID: "+str(sensor_id))
+
+        if not isinstance(bucket_size, int) or bucket_size <= 0:
+            raise ValueError("Invalid bucket size: "+str(bucket_size))
+
+        start = date.strftime("%Y-%m-%d")+" 00:00:00"
+        end = (date + datetime.timedelta(days=1)).strftime("%Y-%m-%d")+" 00:00:00"
+
+        query = """SELECT FLOOR(TIME_TO_SEC(`Measure Time`) / """+str(bucket_size)+"""), """ \
+                + """COUNT(*), MIN(`Measure Time`), MAX(`Measure Time`) FROM `"""+self.site_id \
+                + """Readings` WHERE `Probe ID` = '"""+sensor_id+"""' AND `Measure Time` >= '""" \
+                + start+"""' AND `Measure Time` < '"""+end+"""' GROUP BY 1;"""
+
+        result = self.do_query(query, retries)
+
+        coverage = {}
+
+        for bucket_data in result:
+            try:
+                first = datetime.datetime.fromisoformat(str(bucket_data[2]))
+                last = datetime.datetime.fromisoformat(str(bucket_data[3]))
+
+                coverage[int(bucket_data[0])] = (int(bucket_data[1]), first, last)
+
+            except (IndexError, TypeError, ValueError):
+                #Values must be invalid. Ignore this bucket.
+                pass
+
+        return coverage
+
     #----- CONTROL METHODS -----
     def wait_exit(self):
         """
@@ -37,10 +37,15 @@ import threading
 import time
 import sys
 import logging
+import statistics
+from collections import deque, Counter
 
 #Import modules.
 import config
 
+from Tools import coretools
+from Tools import clocktools
+from Tools import i2ctools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 #Use logger here too.
@@ -99,6 +104,179 @@ def reconfigure_logger():
     for _handler in logging.getLogger('River System Control Software').handlers:
         logger.addHandler(_handler)
 
+#The I2C bus manager, shared by all the management threads. Created when first needed.
+BUS_MANAGER = None
+
+def get_bus_manager():
+    """
+    This function returns the I2C bus manager, creating it if needed.
+
+    Returns:
+        i2ctools.I2CBusManager.
+
+    Usage:
+        >>> get_bus_manager()
+        >>> <I2CBusManager>
+    """
+
+    global BUS_MANAGER #pylint: disable=global-statement
+
+    if BUS_MANAGER is None:
+        BUS_MANAGER = i2ctools.I2CBusManager(i2ctools.ADS1115Backend(I2C, ADS, AnalogIn))
+
+    return BUS_MANAGER
+
+#The results of looking up a hall effect probe voltage in the probe's bands.
+BAND_MATCHED = "Matched"
+NO_BAND_MATCHED = "No band matched"
+AMBIGUOUS_BAND = "Ambiguous"
+
+#The filters that can be used to smooth hall effect probe levels.
+MEDIAN_FILTER = "median"
+MAJORITY_FILTER = "majority"
+
+#The distance between adjacent levels on a hall effect probe, in mm.
+LEVEL_STEP = 25
+
+#Gate valve controller settings.
+#How often to check the position when the valve isn't moving, in seconds.
+HOLD_INTERVAL = 1
+
+#How far (in %) the valve must drift outside its tolerance before it is moved again.
+HYSTERESIS = 1
+
+#How close (in %) to its tolerance the valve must be before the motor is pulsed.
+SLOW_ZONE = 5
+
+#How long the valve must stay within tolerance before the clutch is disengaged, in seconds.
+SETTLE_TIME = 2
+
+#How long the valve can go without moving before it is considered stalled, in seconds.
+STALL_TIME = 3
+
+#The longest a move can take, in seconds.
+MOVE_TIMEOUT = 120
+
+#The number of moves to keep statistics for.
+MOVE_HISTORY = 20
+
+#Gate valve controller states.
+IDLE_STATE = "Idle"
+MOVING_STATE = "Moving"
+SETTLING_STATE = "Settling"
+FAULT_STATE = "Fault"
+
+class LevelFilter:
+    """
+    This class smooths the levels read from a hall effect probe, so that noise at
+    the boundary between two levels doesn't make the reported level flicker.
+
+    The most recent levels are kept in a ring buffer, and either the median or the
+    most common level in the buffer is chosen. If the chosen level is adjacent to
+    the one being reported (within LEVEL_STEP mm), it is only reported once it has
+    been chosen for hysteresis samples in a row. Bigger changes are reported
+    straight away.
+
+    Documentation for the constructor for objects of type LevelFilter:
+
+    Named args:
+        mode[=MEDIAN_FILTER] (str):     MEDIAN_FILTER, or MAJORITY_FILTER.
+        size[=5] (int):                 The number of levels to keep.
+        hysteresis[=2] (int):           The number of samples in a row an adjacent
+                                        level must be chosen for.
+
+    Usage:
+        >>> level_filter = LevelFilter(MAJORITY_FILTER, 7)
+    """
+
+    def __init__(self, mode=MEDIAN_FILTER, size=5, hysteresis=2):
+        """The constructor, as documented above"""
+        self.mode = mode
+        self.hysteresis = hysteresis
+
+        #The most recent levels, with -1 where no level could be found.
+        self.samples = deque(maxlen=size)
+
+        #The level being reported, or None if we don't have one yet.
+        self.level = None
+
+        #The adjacent level that was chosen, and how many times in a row.
+        self.candidate = None
+        self.candidate_count = 0
+
+    def add(self, level):
+        """
+        This method adds a level to the buffer, and returns the filtered level.
+
+        Args:
+            level (int):            The level read, in mm, or -1 if no level could
+                                    be found.
+
+        Returns:
+            int. The filtered level, or None if no level has been found yet.
+
+        Usage:
+            >>> <LevelFilter>.add(475)
+            >>> 450
+        """
+
+        self.samples.append(level)
+
+        levels = [sample for sample in self.samples if sample != -1]
+
+        if not levels:
+            return self.level
+
+        if self.mode == MAJORITY_FILTER:
+            #Choose the most common level. In a tie, choose the most recent.
+            counts = Counter(levels)
+            most = max(counts.values())
+            chosen = next(sample for sample in reversed(levels) if counts[sample] == most)
+
+        else:
+            chosen = statistics.median_low(levels)
+
+        if self.level is None or chosen == self.level \
+            or abs(chosen - self.level) > LEVEL_STEP:
+
+            self.level = chosen
+            self.candidate = None
+            self.candidate_count = 0
+
+        else:
+            #Adjacent level - wait until it has been chosen enough times in a row.
+            if chosen == self.candidate:
+                self.candidate_count += 1
+
+            else:
+                self.candidate = chosen
+                self.candidate_count = 1
+
+            if self.candidate_count >= self.hysteresis:
+                self.level = chosen
+                self.candidate = None
+                self.candidate_count = 0
+
+        return self.level
+
+    def get_confidence(self):
+        """
+        This method returns the confidence in the filtered level - the fraction of
+        the levels in the buffer that agree with it.
+
+        Returns:
+            float. From 0 (no agreement, or no level yet) to 1 (all agree).
+
+        Usage:
+            >>> <LevelFilter>.get_confidence()
+            >>> 0.8
+        """
+
+        if self.level is None or not self.samples:
+            return 0
+
+        return self.samples.count(self.level) / len(self.samples)
+
 class ManageHallEffectProbe(threading.Thread):
     """
     This class is used to repeatedly poll the level of the hall effect probe, and
@@ -106,6 +284,14 @@ class ManageHallEffectProbe(threading.Thread):
     no longer use the hardware interrupts as with the old hall effect probe - this
     one uses an ADC.
 
+    The probe is read at its own sample rate, independent of the monitor's reading
+    interval. Each scan reads all four channels back to back in one request to the
+    bus manager, at the probe's data rate, and the time each channel was read is
+    kept so the spread of each scan can be checked - see get_scan_stats().
+
+    The levels are smoothed with a LevelFilter, using the probe's filter settings,
+    before they are made available to the monitor.
+
     Documentation for the constructor for objects of type ManageHallEffectProbe:
 
     Args:
@@ -123,24 +309,35 @@ class ManageHallEffectProbe(threading.Thread):
         #Initialise the thread.
         threading.Thread.__init__(self)
 
-        # Create the ADC object using the I2C bus
-        self.ads = ADS.ADS1115(I2C, address=i2c_address)
+        #The ADC is read through the shared I2C bus manager.
+        self.bus = get_bus_manager()
+        self.i2c_address = i2c_address
 
         #Make the probe object available to the rest of the class.
         self.probe = probe
 
-        #Create a lock (or mutex) for the A2D.
-        self.ads_lock = threading.RLock()
-
-        # Create four single-ended inputs on channels 0 to 3
-        self.chan0 = AnalogIn(self.ads, ADS.P0)
-        self.chan1 = AnalogIn(self.ads, ADS.P1)
-        self.chan2 = AnalogIn(self.ads, ADS.P2)
-        self.chan3 = AnalogIn(self.ads, ADS.P3)
-
         #For debugging.
         self.count = 0
 
+        #The time (from time.monotonic()) each channel was read in the last scan.
+        self.scan_times = None
+
+        #Statistics for the scans.
+        self.scans = 0
+        self.scan_errors = 0
+        self.total_spread = 0
+        self.max_spread = 0
+
+        #The number of times each band lookup result has occurred, and the last one.
+        self.lookup_counts = {BAND_MATCHED: 0, NO_BAND_MATCHED: 0, AMBIGUOUS_BAND: 0}
+        self.last_lookup = None
+
+        #Smooths the levels before they are reported.
+        self.level_filter = LevelFilter(*probe.get_filter(), probe.get_hysteresis())
+
+        #Used to sleep between scans.
+        self.waiter = coretools.IntervalWaiter()
+
         self.is_running = True
         self.start()
 
@@ -149,23 +346,30 @@ class ManageHallEffectProbe(threading.Thread):
         The main body of the management thread for this probe.
         """
 
-        while not config.EXITING:
-            new_reading = self.get_level()
+        clock = clocktools.get_clock()
+        next_scan = clock.monotonic()
 
-            if new_reading == -1:
-                #No Sensors Triggered - leave the reading as it was.
-                logger.debug("Between levels (no sensors triggered) or unable to get voltage")
+        while not config.EXITING:
+            new_reading = self.level_filter.add(self.get_level())
 
-            else:
-                #Only update this if we got a meaningful reading from the ADS.
-                #Aka at least 1 sensor triggered.
+            #Only update this once we have got a meaningful reading from the ADS.
+            #Aka at least 1 sensor triggered. Otherwise, leave the reading as it
+            #was - get_level() logs why.
+            if new_reading is not None:
                 self.probe._current_reading = new_reading
 
-            time.sleep(0.5)
+            self.probe._confidence = self.level_filter.get_confidence()
 
             if config.DEBUG:
                 self.count += 1
 
+            #Scan at a fixed rate. If we fell behind, skip the missed scans rather
+            #than trying to catch up.
+            next_scan += 1 / self.probe.get_sample_rate()
+            next_scan = max(next_scan, clock.monotonic())
+
+            self.waiter.wait_until(next_scan)
+
         #Signal that we have exited.
         self.is_running = False
 
@@ -183,21 +387,17 @@ class ManageHallEffectProbe(threading.Thread):
         """
 
         #Initialise Lists and variables to hold the working values in each column.
-        #Actual voltages
-        v_meas = []
-
         #Compensated values - prefill with 4 zeros.
         v_comp = [0, 0, 0, 0]
 
-        #Measure the voltage in each chain
+        #Measure the voltage in each chain, all in one request.
         try:
-            self.ads_lock.acquire()
-            v_meas.append(self.chan0.voltage)
-            v_meas.append(self.chan1.voltage)
-            v_meas.append(self.chan2.voltage)
-            v_meas.append(self.chan3.voltage)
+            results = self.bus.read(self.i2c_address, (0, 1, 2, 3),
+                                    data_rate=self.probe.get_data_rate())
 
         except OSError:
+            self.scan_errors += 1
+
             #An I/O error occured when trying to read from the A/D.
             logger.error("OSError \n\n"+str(traceback.format_exc())
                          + "\n\nwhile running. Continuing...")
@@ -208,8 +408,14 @@ class ManageHallEffectProbe(threading.Thread):
             #The current reading is invalid so flag an error.
             return False, False
 
-        finally:
-            self.ads_lock.release()
+        v_meas = [voltage for voltage, _ in results]
+        self.scan_times = [read_time for _, read_time in results]
+
+        spread = self.scan_times[-1] - self.scan_times[0]
+
+        self.scans += 1
+        self.total_spread += spread
+        self.max_spread = max(self.max_spread, spread)
 
         #Do 10 minutes of probe voltage dumping if we're in debug mode.
         if config.DEBUG:
@@ -263,8 +469,6 @@ class ManageHallEffectProbe(threading.Thread):
 
         """
 
-        count = 0
-
         #The value to return. This defaults to -1 if we couldn't detect
         #the level.
         level = -1
@@ -275,19 +479,20 @@ class ManageHallEffectProbe(threading.Thread):
         if v_comp is False:
             return -1
 
-        while count < self.probe.length:
-            #Now test the channel with the dip to see if any of the
-            #sensors are triggered
+        #Now test the channel with the dip to see if any of the sensors are triggered.
+        band, result = self.probe.find_band(v_comp[min_column])
 
-            if (v_comp[min_column] <= self.probe.high_limits[count]) \
-                and (v_comp[min_column] >= self.probe.low_limits[count]):
+        if result == BAND_MATCHED:
+            level = self.probe.depths[min_column][band]
 
-                level = self.probe.depths[min_column][count]
+        #Only log when the result changes, so noisy probes don't fill the log.
+        self.lookup_counts[result] += 1
 
-            else:
-                logger.debug("Possible faulty probe - no limits passed")
+        if result != self.last_lookup:
+            logger.debug("Band lookup ("+self.probe.get_id()+"): "+result+" for "
+                         + str(v_comp[min_column])+"V in column "+str(min_column))
 
-            count += 1
+            self.last_lookup = result
 
         #Print level that corresponds to the voltage if we're in debug mode.
         #Do this only for the first 1200 readings to avoid spamming the log too much.
@@ -299,6 +504,47 @@ class ManageHallEffectProbe(threading.Thread):
 
         return level
 
+    def get_lookup_stats(self):
+        """
+        This method returns the number of times each band lookup result has
+        occurred. A high proportion of ambiguous results, or results where no
+        band matched while the float should be at a sensor, suggests a noisy or
+        faulty probe, or limits that need adjusting.
+
+        Returns:
+            dict. The count for each of BAND_MATCHED, NO_BAND_MATCHED and
+            AMBIGUOUS_BAND.
+
+        Usage:
+            >>> <ManageHallEffectProbe>.get_lookup_stats()
+            >>> {"Matched": 95, "No band matched": 4, "Ambiguous": 1}
+        """
+
+        return dict(self.lookup_counts)
+
+    def get_scan_stats(self):
+        """
+        This method returns statistics for the scans of the probe's four channels.
+
+        Returns:
+            dict. With the keys:
+
+                scans:              The number of successful scans.
+                errors:             The number of scans that failed.
+                mean_spread:        The mean time between reading the first and last
+                                    channels, in seconds.
+                max_spread:         The longest time between reading the first and
+                                    last channels, in seconds.
+
+        Usage:
+            >>> <ManageHallEffectProbe>.get_scan_stats()
+            >>> {"scans": 100, "errors": 0, "mean_spread": 0.006, "max_spread": 0.01}
+        """
+
+        return {"scans": self.scans, "errors": self.scan_errors,
+                "mean_spread": self.total_spread / self.scans if self.scans else 0,
+                "max_spread": self.max_spread}
+
     #----- CONTROL METHODS -----
     def wait_exit(self):
         """
@@ -319,6 +565,24 @@ class ManageGateValve(threading.Thread):
     This class is used to energise and position the Actuator Motor that drives a Gate Valve
     to control the flow of water in the system.
 
+    The valve is positioned by a closed-loop controller that runs at the valve's
+    control rate while it is moving, and checks the position once every
+    HOLD_INTERVAL seconds otherwise:
+
+    - The motor stops as soon as the valve is within tolerance of the requested
+      position (the deadband), and only starts again if the valve drifts more than
+      HYSTERESIS % outside it, or a new position is requested.
+    - Within SLOW_ZONE % of the deadband, the motor is pulsed on and off to reduce
+      overshoot.
+    - Once the valve has stayed within tolerance for SETTLE_TIME seconds, the move
+      is finished, and the clutch is disengaged.
+    - If the valve stops moving for STALL_TIME seconds, or the move takes longer than
+      MOVE_TIMEOUT seconds, the motor is stopped and the clutch disengaged until a
+      new position is requested.
+
+    The time to reach the target, the overshoot, and the number of ADC reads are
+    recorded for each move - see get_move_stats().
+
     Documentation for the constructor for objects of type ManageGateValve:
 
     Args:
@@ -336,8 +600,9 @@ class ManageGateValve(threading.Thread):
         #Store a reference to the GateValve object.
         self.valve = valve
 
-        # Create the ADC object using the I2C bus
-        self.ads = ADS.ADS1115(I2C, address=i2c_address)
+        #The ADC is read through the shared I2C bus manager.
+        self.bus = get_bus_manager()
+        self.i2c_address = i2c_address
 
         #Set the valve closed initially.
         self.percentage = 0
@@ -351,8 +616,21 @@ class ManageGateValve(threading.Thread):
         #Initial value. Calculated from the percentage requested.
         self.low_limit = 0
 
-        #Create a lock (or mutex) for the A2D.
-        self.ads_lock = threading.RLock()
+        #The number of times the A2D has been read.
+        self.adc_reads = 0
+
+        #The state of the controller - one of the *_STATE constants.
+        self.state = IDLE_STATE
+
+        #The position requested when the controller last started a move, or was idle.
+        self.last_target = None
+
+        #The move in progress, if any, and the most recent moves.
+        self.move = None
+        self.moves = deque(maxlen=MOVE_HISTORY)
+
+        #Used to sleep between control steps, and woken when a new position is requested.
+        self.waiter = coretools.IntervalWaiter()
 
         self.is_running = True
 
@@ -360,72 +638,235 @@ class ManageGateValve(threading.Thread):
 
     def run(self):
         """This is the part of the code that runs in the thread"""
+        clock = clocktools.get_clock()
 
         while not config.EXITING:
-            self.actual_position = self._get_position()
-            self.calculate_limits()
+            delay = self.control_step(clock.monotonic(), self._get_position())
+            self.waiter.wait_until(clock.monotonic() + delay)
+
+        self.motor_stop()
+        self.clutch_disengage()
+
+        if self.move is not None:
+            self.finish_move(clock.monotonic(), "cancelled")
+
+        #Signal that we have exited.
+        self.is_running = False
 
-            logger.debug("ManageGateValve: Actual position: "+str(self.actual_position)
-                         + " type: "+str(type(self.actual_position)))
+    def control_step(self, now, position):
+        """
+        This method runs one step of the controller, and sets the motor and clutch
+        outputs.
 
-            logger.debug("ManageGateValve: High limit: "+str(self.high_limit)
-                         + " type: "+str(type(self.high_limit)))
+        Args:
+            now (float).                The current time, from the clock's monotonic().
+            position (int).             The measured position, or -1 if it couldn't
+                                        be read.
 
-            logger.debug("ManageGateValve: Low limit: "+str(self.low_limit)
-                         + " type: "+str(type(self.low_limit)))
+        Returns:
+            float. The time to wait before the next step, in seconds.
 
-            if ((self.actual_position <= self.high_limit
-                 and self.actual_position >= self.low_limit)
-                    or (self.actual_position == -1)):
+        Usage:
+            >>> control_step(clocktools.get_clock().monotonic(), 50)
+            >>> 0.1
+        """
 
-                #Hold current position
-                logger.debug("ManageGateValve: Hold at "+str(self.actual_position))
-                GPIO.output(self.valve.forward_pin, GPIO.LOW)
-                GPIO.output(self.valve.reverse_pin, GPIO.LOW)
-                time.sleep(1)
+        control_period = 1 / self.valve.control_rate
 
-            elif self.actual_position < self.low_limit:
-                #Open the valve
-                logger.debug("ManageGateValve: Open valve a bit.")
+        self.actual_position = position
 
-                #Enable the motor.
-                self.clutch_engage()
-                GPIO.output(self.valve.forward_pin, GPIO.HIGH)
-                GPIO.output(self.valve.reverse_pin, GPIO.LOW)
+        if position == -1:
+            #Don't drive the motor blind. Try again on the next step.
+            self.motor_stop()
+            return control_period if self.state != IDLE_STATE else HOLD_INTERVAL
 
-            elif self.actual_position > self.high_limit:
-                #Close the valve.
-                logger.debug("ManageGateValve: Close valve a bit.")
+        self.calculate_limits()
 
-                #Enable the motor.
-                self.clutch_engage()
-                GPIO.output(self.valve.forward_pin, GPIO.LOW)
-                GPIO.output(self.valve.reverse_pin, GPIO.HIGH)
+        #Start a new move if a new position was requested.
+        if self.move is not None and self.move["target"] != self.percentage:
+            self.motor_stop()
+            self.clutch_disengage()
+            self.finish_move(now, "cancelled")
+            self.state = IDLE_STATE
 
-            else:
-                #FIXME Is this a good way to handle this situation?
-                logger.critical("ManageGateValve: Critical error: valve is not "
-                                + "in any of the three states!")
+        if self.state in (IDLE_STATE, FAULT_STATE):
+            new_target = self.percentage != self.last_target
+            outside = not self.low_limit <= position <= self.high_limit
+            drifted = position < self.low_limit - HYSTERESIS \
+                or position > self.high_limit + HYSTERESIS
+
+            #After a fault, wait for a new position to be requested.
+            if self.state == FAULT_STATE and not new_target:
+                return HOLD_INTERVAL
+
+            if not ((new_target and outside) or drifted):
+                self.state = IDLE_STATE
+                self.last_target = self.percentage
+                return HOLD_INTERVAL
+
+            self.start_move(now, position)
+
+        self.update_move(position)
+
+        if self.low_limit <= position <= self.high_limit:
+            #Within tolerance - stop, and wait for the valve to settle.
+            self.motor_stop()
+
+            if self.state == MOVING_STATE:
+                self.state = SETTLING_STATE
+                self.move["settle_start"] = now
+
+                if self.move["time_to_target"] is None:
+                    self.move["time_to_target"] = now - self.move["start_time"]
+
+            elif now - self.move["settle_start"] >= SETTLE_TIME:
+                self.clutch_disengage()
+                self.finish_move(now, "settled")
+                self.state = IDLE_STATE
+                return HOLD_INTERVAL
+
+            return control_period
+
+        #Outside tolerance - check for stalls and timeouts before driving the motor.
+        if self.state == SETTLING_STATE:
+            self.state = MOVING_STATE
+            self.move["progress_time"] = now
+
+        if now - self.move["start_time"] > MOVE_TIMEOUT:
+            return self.stop_move(now, "timeout")
+
+        if abs(position - self.move["progress_position"]) >= 1:
+            self.move["progress_position"] = position
+            self.move["progress_time"] = now
+
+        elif now - self.move["progress_time"] > STALL_TIME:
+            return self.stop_move(now, "stalled")
 
-                logger.critical("ManageGateValve: Actual position: "+str(self.actual_position)
-                                +" type: "+str(type(self.actual_position)))
+        #Pulse the motor when we're close, to avoid overshooting.
+        distance = max(self.low_limit - position, position - self.high_limit)
+        self.move["steps"] += 1
 
-                logger.critical("ManageGateValve: High limit: "+str(self.high_limit)
-                                +" type: "+str(type(self.high_limit)))
+        if distance <= SLOW_ZONE and self.move["steps"] % 2 == 0:
+            self.motor_stop()
 
-                logger.critical("ManageGateValve: Low limit: "+str(self.low_limit)
-                                +" type: "+str(type(self.low_limit)))
+        elif position < self.low_limit:
+            self.motor_open()
 
-                logger.critical("ManageGateValve: Shutting down river system software!")
+        else:
+            self.motor_close()
+
+        return control_period
+
+    def start_move(self, now, position):
+        """
+        This method starts recording a new move, and engages the clutch.
+
+        Args:
+            now (float).                The current time, from the clock's monotonic().
+            position (int).             The measured position.
+
+        Usage:
+            >>> start_move(clocktools.get_clock().monotonic(), 50)
+        """
+
+        logger.debug("ManageGateValve: Moving "+self.valve.get_id()+" from "+str(position)
+                     + " to "+str(self.percentage))
+
+        self.move = {"target": self.percentage, "start_position": position,
+                     "end_position": position, "start_time": now, "time_to_target": None,
+                     "settle_start": None, "overshoot": 0, "start_adc_reads": self.adc_reads - 1,
+                     "adc_reads": 1, "progress_position": position, "progress_time": now,
+                     "steps": 0, "result": None}
 
-                config.EXITING = True
+        self.state = MOVING_STATE
+        self.last_target = self.percentage
+        self.clutch_engage()
 
-                break
+    def update_move(self, position):
+        """
+        This method updates the overshoot and ADC read count for the current move.
+
+        Args:
+            position (int).             The measured position.
 
+        Usage:
+            >>> update_move(50)
+        """
+
+        self.move["end_position"] = position
+        self.move["adc_reads"] = self.adc_reads - self.move["start_adc_reads"]
+
+        if self.move["start_position"] < self.move["target"]:
+            overshoot = position - self.move["target"]
+
+        else:
+            overshoot = self.move["target"] - position
+
+        self.move["overshoot"] = max(self.move["overshoot"], overshoot)
+
+    def stop_move(self, now, result):
+        """
+        This method stops a move that has failed, and disengages the clutch. The valve
+        isn't moved again until a new position is requested.
+
+        Args:
+            now (float).                The current time, from the clock's monotonic().
+            result (str).               Why the move failed, eg "stalled".
+
+        Returns:
+            float. The time to wait before the next step, in seconds.
+
+        Usage:
+            >>> stop_move(clocktools.get_clock().monotonic(), "stalled")
+            >>> 1
+        """
+
+        self.motor_stop()
         self.clutch_disengage()
 
-        #Signal that we have exited.
-        self.is_running = False
+        logger.error("ManageGateValve: "+self.valve.get_id()+" "+result+" at "
+                     + str(self.actual_position)+"% while moving to "
+                     + str(self.percentage)+"%! Waiting for a new position...")
+
+        print("Gate valve "+self.valve.get_id()+" "+result+" at "+str(self.actual_position)
+              + "% while moving to "+str(self.percentage)+"%!", level="error")
+
+        self.finish_move(now, result)
+        self.state = FAULT_STATE
+
+        return HOLD_INTERVAL
+
+    def finish_move(self, now, result):
+        """
+        This method finishes recording the current move.
+
+        Args:
+            now (float).                The current time, from the clock's monotonic().
+            result (str).               How the move finished: "settled", "stalled",
+                                        "timeout", or "cancelled".
+
+        Usage:
+            >>> finish_move(clocktools.get_clock().monotonic(), "settled")
+        """
+
+        move = self.move
+        self.move = None
+
+        move["result"] = result
+        move["duration"] = now - move["start_time"]
+
+        for key in ("start_adc_reads", "progress_position", "progress_time", "steps",
+                    "settle_start"):
+
+            del move[key]
+
+        self.moves.append(move)
+
+        logger.info("ManageGateValve: "+self.valve.get_id()+" move to "+str(move["target"])
+                    + "% "+result+" at "+str(move["end_position"])+"% after "
+                    + str(round(move["duration"], 1))+" seconds. Time to target: "
+                    + str(move["time_to_target"])+", overshoot: "+str(move["overshoot"])
+                    + "%, ADC reads: "+str(move["adc_reads"]))
 
     def calculate_limits(self):
         """
@@ -442,48 +883,38 @@ class ManageGateValve(threading.Thread):
             >>> calculate_limits()
         """
 
-        if self.actual_position != self.percentage:
-            if (self.percentage + self.valve.pos_tolerance) > \
-               (self.valve.max_open - self.valve.pos_tolerance):
+        if (self.percentage + self.valve.pos_tolerance) > \
+           (self.valve.max_open - self.valve.pos_tolerance):
 
-                self.high_limit = self.valve.max_open
-                #Subtract 6 to make sure the valve can close, but doesn't strain the
-                #motor if alignment isn't perfect.
-                self.low_limit = self.valve.max_open - 6
+            self.high_limit = self.valve.max_open
+            #Subtract 6 to make sure the valve can close, but doesn't strain the
+            #motor if alignment isn't perfect.
+            self.low_limit = self.valve.max_open - 6
 
-            elif self.percentage - self.valve.pos_tolerance < self.valve.min_open:
-                self.low_limit = self.valve.min_open
-                #Add 1 to make sure the valve can close, but doesn't strain the
-                #motor if alignment isn't perfect.
-                self.high_limit = self.valve.min_open + 2
+        elif self.percentage - self.valve.pos_tolerance < self.valve.min_open:
+            self.low_limit = self.valve.min_open
+            #Add 1 to make sure the valve can close, but doesn't strain the
+            #motor if alignment isn't perfect.
+            self.high_limit = self.valve.min_open + 2
 
-            else:
-                #Set the High Limit to the required percentage
-                self.high_limit = self.percentage + self.valve.pos_tolerance
+        else:
+            #Set the High Limit to the required percentage
+            self.high_limit = self.percentage + self.valve.pos_tolerance
 
-                #Set the Low Limit to the required percentage
-                self.low_limit = self.percentage - self.valve.pos_tolerance
+            #Set the Low Limit to the required percentage
+            self.low_limit = self.percentage - self.valve.pos_tolerance
 
     #-------------------- GETTER METHODS --------------------
     def _get_position(self):
         """
         This method queries the A2D to get the gate valve's position.
 
-        .. warning::
-            Do NOT run this method outside of the management thread.
-            Doing so can cause a deadlock. There are safety measures
-            built in to prevent this, but it can still happen.
         """
 
-        #Create the Analog reading object to read Ch 0 of the A/D
-        chan = AnalogIn(self.ads, ADS.P0)
-
         try:
             #Get voltage reading for channel 0 (the position pot slider)
-            logger.debug("ManageGateValve: About to read voltage")
-            self.ads_lock.acquire()
-            voltage_0 = chan.voltage
-            logger.debug("ManageGateValve: Read voltage")
+            self.adc_reads += 1
+            voltage_0 = self.bus.read(self.i2c_address, (0,))[0][0]
 
         except OSError:
             #An I/O error occured when trying to read from the A/D.
@@ -496,9 +927,6 @@ class ManageGateValve(threading.Thread):
             #The current reading is invalid so flag an error.
             return -1
 
-        finally:
-            self.ads_lock.release()
-
         #Actual position as a percentage at the time of reading.
         actual_position = int((voltage_0/self.valve.ref_voltage*100))
 
@@ -522,6 +950,31 @@ class ManageGateValve(threading.Thread):
 
         return self.percentage
 
+    def get_move_stats(self):
+        """
+        Returns the statistics for the most recent moves, oldest first.
+
+        Returns:
+            list. A dictionary for each move, with the keys:
+
+                target:             The requested position.
+                start_position:     The position at the start of the move.
+                end_position:       The position at the end of the move.
+                start_time:         When the move started, from the clock's monotonic().
+                duration:           How long the move took, in seconds.
+                time_to_target:     How long it took to get within tolerance, in
+                                    seconds, or None if it never did.
+                overshoot:          How far past the target the valve went, in %.
+                adc_reads:          The number of times the position was read.
+                result:             "settled", "stalled", "timeout", or "cancelled".
+
+        Usage:
+            >>> get_move_stats()
+            >>> [{"target": 50, "start_position": 0, ..., "result": "settled"}]
+        """
+
+        return [dict(move) for move in self.moves]
+
     #-------------------- SETTER METHODS --------------------
     def set_position(self, percentage):
         """
@@ -544,6 +997,42 @@ class ManageGateValve(threading.Thread):
 
         self.percentage = percentage
 
+        #Start moving straight away, rather than at the next position check.
+        self.waiter.wake()
+
+    def motor_open(self):
+        """
+        This method drives the motor to open the valve.
+
+        Usage:
+            >>> motor_open()
+        """
+
+        GPIO.output(self.valve.forward_pin, GPIO.HIGH)
+        GPIO.output(self.valve.reverse_pin, GPIO.LOW)
+
+    def motor_close(self):
+        """
+        This method drives the motor to close the valve.
+
+        Usage:
+            >>> motor_close()
+        """
+
+        GPIO.output(self.valve.forward_pin, GPIO.LOW)
+        GPIO.output(self.valve.reverse_pin, GPIO.HIGH)
+
+    def motor_stop(self):
+        """
+        This method stops the motor.
+
+        Usage:
+            >>> motor_stop()
+        """
+
+        GPIO.output(self.valve.forward_pin, GPIO.LOW)
+        GPIO.output(self.valve.reverse_pin, GPIO.LOW)
+
     def clutch_engage(self):
         """
         This method engages the clutch, in order for the motor to be able to move
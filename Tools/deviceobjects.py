@@ -35,14 +35,18 @@ from the rest of the program.
 """
 
 #Standard Imports.
-import time
+import bisect
 import sys
 import logging
+import statistics
+from collections import deque
 
 #Import modules.
 import config
 
 from Tools import devicemanagement as device_mgmt
+from Tools import clocktools
+from Tools import i2ctools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
 
 #Use logger here too.
@@ -139,6 +143,7 @@ class BaseDeviceClass:
         self._pins = []                     #Needs to be set/deleted.
         self._reverse_pins = []             #Needs to be set/deleted.
         self.mgmt_thread = None            #Holds a reference to the management thread, if any.
+        self.slow_reader = False            #True if get_reading() blocks for a long time.
 
     # ---------- INFO GETTER METHODS ----------
     def get_device_id(self):
@@ -573,11 +578,19 @@ class FloatSwitch(BaseDeviceClass):
 
         return bool(GPIO.input(self._pin) == self._active_state), "OK"
 
+#The number of edges a HallEffectDevice keeps the times of.
+EDGE_BUFFER_SIZE = 1000
+
 class HallEffectDevice(BaseDeviceClass):
     """
     This class is used to represent a hall effect device (as in what you may
     find in a water wheel).
 
+    Once the pin is set, every falling edge is timestamped (with the monotonic()
+    method of the clock) into a ring buffer of the last EDGE_BUFFER_SIZE edges, so the RPM can be worked
+    out straight away from the edges in a sliding window, rather than counting
+    edges for a few seconds every time a reading is taken.
+
     .. note::
         Currently, this class has no facility to convert RPM into a flow rate.
         The data is available but this hasn't been implemented.
@@ -598,24 +611,129 @@ class HallEffectDevice(BaseDeviceClass):
 
         #Set some semi-private variables.
         self._num_detections = 0                  #Internal use only.
+        self._edges = deque(maxlen=EDGE_BUFFER_SIZE) #Internal use only.
+
+        self.window = 5                           #The sliding window for the RPM, in seconds.
 
     # ---------- PRIVATE METHODS ----------
     def _increment_num_detections(self, channel): #pylint: disable=unused-argument
         """
         PRIVATE, implementation detail.
 
-        Called when a falling edge is detected. Adds 1 to the number of
-        falling edges detected.
+        Called when a falling edge is detected. Records the time of the edge, and
+        adds 1 to the number of falling edges detected.
         """
 
+        self._edges.append(clocktools.get_clock().monotonic())
         self._num_detections += 1
 
+    def _get_edges(self):
+        """
+        PRIVATE, implementation detail.
+
+        Returns the times of the edges in the sliding window, and the time between
+        each of them.
+        """
+
+        start = clocktools.get_clock().monotonic() - self.window
+
+        #Copy the buffer first - edges can be added by the GPIO thread at any time.
+        edges = [edge for edge in list(self._edges) if edge >= start]
+
+        return edges, [later - earlier for earlier, later in zip(edges, edges[1:])]
+
+    # ---------- SETTERS ----------
+    def set_pins(self, pins, _input=True):
+        """Wrapper for BaseDeviceClass that also starts counting edges on the pin."""
+        super().set_pins(pins, _input)
+
+        #Automatically call our function whenever a falling edge is detected.
+        GPIO.add_event_detect(self._pin, GPIO.FALLING, callback=self._increment_num_detections)
+
+    def set_window(self, window):
+        """
+        This method sets the sliding window the RPM is worked out over. Longer
+        windows give steadier readings, and shorter ones respond faster.
+
+        Args:
+            window (float):         The window, in seconds. Must be more than 0, and
+                                    no more than 300.
+
+        Usage:
+            >>> set_window(10)
+        """
+
+        if not isinstance(window, (int, float)) or \
+            isinstance(window, bool) or \
+            window <= 0 or \
+            window > 300:
+
+            raise ValueError("Invalid value for window: "+str(window))
+
+        self.window = window
+
+    # ---------- GETTERS ----------
+    def get_window(self):
+        """
+        This method returns the sliding window the RPM is worked out over.
+
+        Returns:
+            float. The window, in seconds.
+
+        Usage:
+            >>> get_window()
+            >>> 5
+        """
+
+        return self.window
+
+    def get_stats(self):
+        """
+        This method returns statistics for the edges in the sliding window.
+
+        Returns:
+            dict. With the keys:
+
+                edges:              The number of edges in the window.
+                min_period:         The shortest time between edges, in seconds.
+                max_period:         The longest time between edges, in seconds.
+                mean_period:        The mean time between edges, in seconds.
+                jitter:             The standard deviation of the time between
+                                    edges, in seconds.
+
+            The periods are None if there are fewer than 2 edges in the window, and
+            the jitter is None if there are fewer than 3.
+
+        Usage:
+            >>> get_stats()
+            >>> {"edges": 5, "min_period": 1.19, "max_period": 1.22, ...}
+        """
+
+        edges, periods = self._get_edges()
+
+        stats = {"edges": len(edges), "min_period": None, "max_period": None,
+                 "mean_period": None, "jitter": None}
+
+        if periods:
+            stats.update(min_period=min(periods), max_period=max(periods),
+                         mean_period=statistics.mean(periods))
+
+        if len(periods) > 1:
+            stats["jitter"] = statistics.stdev(periods)
+
+        return stats
+
     # ---------- CONTROL METHODS ----------
     def get_reading(self):
         """
         This method returns the rate at which the hall effect device (water
-        wheel) is rotating, in RPM. Takes readings for 5 seconds for accuracy,
-        and then averages the result.
+        wheel) is rotating, in RPM, from the edges in the sliding window. This
+        returns straight away.
+
+        The RPM is worked out from the mean time between edges. If it has been
+        longer than that since the last edge, the wheel has slowed down, so the
+        time since the last edge is used instead. Fewer than 2 edges in the window
+        counts as 0 RPM.
 
         .. note::
             Currently no fault checking is performed, so the string part of the return value
@@ -639,20 +757,15 @@ class HallEffectDevice(BaseDeviceClass):
             >>> (50, "OK")
 
         """
-        self._num_detections = 0
 
-        #Automatically call our function when a falling edge is detected.
-        GPIO.add_event_detect(self._pin, GPIO.FALLING, callback=self._increment_num_detections)
-
-        time.sleep(5)
+        edges, periods = self._get_edges()
 
-        #Stop calling our function.
-        GPIO.remove_event_detect(self._pin)
+        if not periods:
+            return 0, "OK"
 
-        #Multiply by 12 to get rpm.
-        rpm = self._num_detections * 12
+        period = max(statistics.mean(periods), clocktools.get_clock().monotonic() - edges[-1])
 
-        return rpm, "OK"
+        return round(60 / period), "OK"
 
 class HallEffectProbe(BaseDeviceClass):
     """
@@ -679,18 +792,117 @@ class HallEffectProbe(BaseDeviceClass):
 
         #Set some semi-private variables.
         self._current_reading = 0                  #Internal use only.
+        self._confidence = 0                       #Internal use only.
 
         self.high_limits = None                    #The high limits to be used with this probe.
         self.low_limits = None                     #The low limits to be used with this probe.
         self.depths = None                         #The multidimensional list of 4 rows or depths.
         self.length = None                         #The number of sensors in each stack.
+        self.bands = None                          #(low, high, index) for each band, sorted.
+        self.band_lows = None                      #The low limit of each band, sorted.
         self.i2c_address = None                    #The i2c address of the probe.
+        self.sample_rate = 2                       #How often to read the probe, in Hz.
+        self.data_rate = 860                       #The ADC data rate, in samples per second.
+        self.filter_mode = device_mgmt.MEDIAN_FILTER   #How levels are smoothed.
+        self.filter_size = 5                       #The number of levels to smooth over.
+        self.hysteresis = 2                        #Samples needed to move to an adjacent level.
         self.mgmt_thread = True                   #We do have a management thread.
 
     def start_thread(self):
         """Start the thread to keep polling the probe."""
         self.mgmt_thread = device_mgmt.ManageHallEffectProbe(self, self.i2c_address)
 
+    def set_sample_rate(self, sample_rate):
+        """
+        This method sets how often the probe is read. This is independent of the
+        monitor's reading interval - the monitor just takes the most recent level.
+
+        Args:
+            sample_rate (float):        The sample rate in Hz. Must be more than 0, and no
+                                        more than 20.
+
+        Usage:
+            >>> set_sample_rate(4)
+        """
+
+        if not isinstance(sample_rate, (int, float)) or \
+            isinstance(sample_rate, bool) or \
+            sample_rate <= 0 or \
+            sample_rate > 20:
+
+            raise ValueError("Invalid value for sample_rate: "+str(sample_rate))
+
+        self.sample_rate = sample_rate
+
+    def set_data_rate(self, data_rate):
+        """
+        This method sets the ADC data rate used to read the probe. Higher rates
+        take less time on the bus, so the four channels are read closer together.
+
+        Args:
+            data_rate (int):            The data rate in samples per second. Must be one
+                                        of i2ctools.DATA_RATES.
+
+        Usage:
+            >>> set_data_rate(475)
+        """
+
+        if not isinstance(data_rate, int) or \
+            isinstance(data_rate, bool) or \
+            data_rate not in i2ctools.DATA_RATES:
+
+            raise ValueError("Invalid value for data_rate: "+str(data_rate))
+
+        self.data_rate = data_rate
+
+    def set_filter(self, filter_mode, filter_size):
+        """
+        This method sets how the levels read from the probe are smoothed. See
+        devicemanagement.LevelFilter.
+
+        Args:
+            filter_mode (str):          device_mgmt.MEDIAN_FILTER, or
+                                        device_mgmt.MAJORITY_FILTER.
+            filter_size (int):          The number of levels to smooth over. Must be
+                                        between 1 (no smoothing) and 50.
+
+        Usage:
+            >>> set_filter("majority", 7)
+        """
+
+        if filter_mode not in (device_mgmt.MEDIAN_FILTER, device_mgmt.MAJORITY_FILTER) or \
+            not isinstance(filter_size, int) or \
+            isinstance(filter_size, bool) or \
+            filter_size < 1 or \
+            filter_size > 50:
+
+            raise ValueError("Invalid filter: "+str(filter_mode)+", "+str(filter_size))
+
+        self.filter_mode = filter_mode
+        self.filter_size = filter_size
+
+    def set_hysteresis(self, hysteresis):
+        """
+        This method sets how many samples in a row an adjacent level must be read
+        for before it is reported.
+
+        Args:
+            hysteresis (int):           The number of samples. Must be between 1 (no
+                                        hysteresis) and 10.
+
+        Usage:
+            >>> set_hysteresis(3)
+        """
+
+        if not isinstance(hysteresis, int) or \
+            isinstance(hysteresis, bool) or \
+            hysteresis < 1 or \
+            hysteresis > 10:
+
+            raise ValueError("Invalid value for hysteresis: "+str(hysteresis))
+
+        self.hysteresis = hysteresis
+
     def set_address(self, i2c_address):
         """
         This method is used to import the address this probe will use. The calling code must
@@ -710,6 +922,10 @@ class HallEffectProbe(BaseDeviceClass):
         This method is used to import the limits this probe will use. The calling code must
         already have established these from config.py
 
+        Each high and low limit pair is a voltage band for one sensor in the stack. The
+        bands are sorted, so find_band() can look voltages up quickly. Bands may share
+        a boundary, but must not overlap.
+
         Args:
             high_limits (list(float):          The high limits to be used with this probe.
             low_limits (list(float)):          The low limits to be used with this probe.
@@ -743,9 +959,19 @@ class HallEffectProbe(BaseDeviceClass):
             if not limit > low_limits[high_limits.index(limit)]:
                 raise ValueError("Invalid limits: "+str(high_limits)+", "+str(low_limits))
 
+        #Check that the bands don't overlap.
+        bands = sorted(zip(low_limits, high_limits, range(len(high_limits))))
+
+        for previous_band, band in zip(bands, bands[1:]):
+            if band[0] < previous_band[1]:
+                raise ValueError("Overlapping limits: "+str(high_limits)+", "+str(low_limits))
+
         self.high_limits = high_limits
         self.low_limits = low_limits
 
+        self.bands = bands
+        self.band_lows = [band[0] for band in bands]
+
     def set_depths(self, depths):
         """
         This method is used to import the depth precision values this probe support. The
@@ -827,6 +1053,118 @@ class HallEffectProbe(BaseDeviceClass):
 
         return self.depths
 
+    def find_band(self, voltage):
+        """
+        This method finds the band (the sensor in the stack) that a compensated
+        voltage is in. The limits must have been set.
+
+        Args:
+            voltage (float):            The compensated voltage.
+
+        Returns:
+            tuple(int, str).
+
+            int:
+                The index of the band, for use with the depths, or -1 if there
+                wasn't exactly one match.
+
+            str:
+                The result.
+
+                device_mgmt.BAND_MATCHED    -- The voltage is in one band.
+                device_mgmt.NO_BAND_MATCHED -- The voltage isn't in any band.
+                device_mgmt.AMBIGUOUS_BAND  -- The voltage is on the boundary between
+                                               two bands.
+
+        Usage:
+            >>> find_band(0.2)
+            >>> (1, "Matched")
+        """
+
+        #Only the band starting at or below the voltage can contain it.
+        position = bisect.bisect_right(self.band_lows, voltage)
+
+        if position == 0 or voltage > self.bands[position - 1][1]:
+            return -1, device_mgmt.NO_BAND_MATCHED
+
+        #If it's on the boundary, the band below contains it too.
+        if position > 1 and self.bands[position - 2][1] == voltage:
+            return -1, device_mgmt.AMBIGUOUS_BAND
+
+        return self.bands[position - 1][2], device_mgmt.BAND_MATCHED
+
+    def get_sample_rate(self):
+        """
+        This method returns how often the probe is read.
+
+        Returns:
+            float. The sample rate in Hz.
+
+        Usage:
+            >>> get_sample_rate()
+            >>> 2
+        """
+
+        return self.sample_rate
+
+    def get_data_rate(self):
+        """
+        This method returns the ADC data rate used to read the probe.
+
+        Returns:
+            int. The data rate in samples per second.
+
+        Usage:
+            >>> get_data_rate()
+            >>> 860
+        """
+
+        return self.data_rate
+
+    def get_filter(self):
+        """
+        This method returns how the levels read from the probe are smoothed.
+
+        Returns:
+            tuple(str, int). The filter mode, and the number of levels smoothed over.
+
+        Usage:
+            >>> get_filter()
+            >>> ("median", 5)
+        """
+
+        return self.filter_mode, self.filter_size
+
+    def get_hysteresis(self):
+        """
+        This method returns how many samples in a row an adjacent level must be
+        read for before it is reported.
+
+        Returns:
+            int. The number of samples.
+
+        Usage:
+            >>> get_hysteresis()
+            >>> 2
+        """
+
+        return self.hysteresis
+
+    def get_confidence(self):
+        """
+        This method returns the confidence in the level returned by get_reading() -
+        the fraction of the recent levels read that agree with it.
+
+        Returns:
+            float. From 0 (no agreement) to 1 (all agree).
+
+        Usage:
+            >>> get_confidence()
+            >>> 0.8
+        """
+
+        return self._confidence
+
     # ---------- CONTROL METHODS ----------
     def get_reading(self):
         """
@@ -843,7 +1181,8 @@ class HallEffectProbe(BaseDeviceClass):
             tuple(int, str)
 
             int:
-                The level of the float.
+                The level of the float, smoothed as set with set_filter() and
+                set_hysteresis().
 
             str:
                 Fault checking status.
@@ -876,6 +1215,7 @@ class GateValve(BaseDeviceClass):
 
         self.ref_voltage = None #Reference voltage.
         self.i2c_address = None #The hardware address for the A2D (ADC)
+        self.control_rate = 10 #How often to check the position while moving, in Hz.
         self.mgmt_thread = True                   #We do have a management thread.
 
     def set_pins(self, pins, _input=False):
@@ -987,6 +1327,26 @@ class GateValve(BaseDeviceClass):
 
         self.i2c_address = i2c_address
 
+    def set_control_rate(self, control_rate):
+        """
+        This method sets how often the position is checked while the valve is moving.
+
+        Args:
+            control_rate(int). The control rate in Hz. Must be between 1 and 50.
+
+        Usage:
+
+            >>> set_control_rate(10)
+        """
+        if not isinstance(control_rate, int) or \
+            isinstance(control_rate, bool) or \
+            control_rate < 1 or \
+            control_rate > 50:
+
+            raise ValueError("Invalid value for control_rate: "+str(control_rate))
+
+        self.control_rate = control_rate
+
     def start_thread(self):
         """Start the thread to manage the thread."""
         self.mgmt_thread = device_mgmt.ManageGateValve(self, self.i2c_address)
@@ -1051,6 +1411,21 @@ class GateValve(BaseDeviceClass):
         """
         return self.ref_voltage
 
+    def get_control_rate(self):
+        """
+        This method returns how often the position is checked while the valve is moving.
+
+        Returns:
+
+            int. The control rate in Hz.
+
+        Usage:
+
+            >>> get_control_rate()
+            >>> 10
+        """
+        return self.control_rate
+
     def get_requested_position(self):
         """
         This method returns the most recent requested position for the gate valve.
@@ -0,0 +1,571 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# History Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the historytools module, which is used to read back the CSV readings
+files that the monitors write, for offline analysis, or to convert them to the
+binary readings archive (see archivetools.py).
+
+The readings files contain a "Start Time" banner and a CSV header each time the
+file is (re)opened, and any warnings the monitor wrote. A "." after a reading means
+that another reading was taken with the same value. These are expanded using the
+reading interval, so every reading that was taken is returned.
+
+Readings are returned as columns - a dictionary of NumPy arrays - which can be
+used directly, or passed to pandas.DataFrame(). They can also be returned as
+Reading objects, for example to fill gaps in the database (see backfilltools.py).
+
+NumPy is only needed for the columns.
+
+.. module:: historytools.py
+    :platform: Linux
+    :synopsis: Tools to read historical readings files.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+from array import array
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import datetime
+import itertools
+import gzip
+import glob
+import os
+import logging
+
+try:
+    #Only needed to read files into columns, which is done offline.
+    import numpy as np
+
+except ImportError:
+    np = None
+
+import config
+
+from Tools import coretools
+from Tools import archivetools
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#The reading interval to use if the site isn't in config.py.
+DEFAULT_INTERVAL = 15
+
+#The names of the columns that are returned.
+COLUMNS = ("time", "tick", "value", "status")
+
+# ---------- FINDING FILES ----------
+def get_default_interval(sensor_id):
+    """
+    This function returns the default reading interval for the site the given
+    sensor is at, from config.py.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+    Returns:
+        int. The reading interval, in seconds.
+
+    Usage:
+        >>> get_default_interval("G4:M0")
+        >>> 15
+    """
+
+    site_id = sensor_id.split(":")[0]
+
+    try:
+        return config.SITE_SETTINGS[site_id]["Default Interval"]
+
+    except KeyError:
+        return DEFAULT_INTERVAL
+
+def get_file_date(file_name):
+    """
+    This function returns the date of a readings file, from its name.
+
+    Args:
+        file_name (str):        The readings file, eg "readings/G4:M0-2020-09-30.csv".
+
+    Returns:
+        date, or None if the name isn't that of a readings file.
+
+    Usage:
+        >>> get_file_date("readings/G4:M0-2020-09-30.csv")
+        >>> datetime.date(2020, 9, 30)
+    """
+
+    name = os.path.basename(file_name)
+
+    if name.endswith(".gz"):
+        name = name[:-3]
+
+    if not name.endswith(".csv"):
+        return None
+
+    try:
+        return datetime.datetime.strptime(name[-14:-4], "%Y-%m-%d").date()
+
+    except ValueError:
+        return None
+
+def find_files(sensor_id, directory="readings", start=None, end=None):
+    """
+    This function finds the readings files for a sensor, including any that have
+    been compressed, in date order.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+    Named args:
+        directory[="readings"] (str):   The directory the files are in.
+        start[=None] (date):            The first day to include. All days if None.
+        end[=None] (date):              The last day to include (inclusive). All days
+                                        if None.
+
+    Returns:
+        list. The file names.
+
+    Usage:
+        >>> find_files("G4:M0", start=datetime.date(2020, 9, 1))
+        >>> ["readings/G4:M0-2020-09-01.csv", "readings/G4:M0-2020-09-02.csv.gz", ...]
+    """
+
+    files = []
+
+    for file_name in glob.glob(os.path.join(glob.escape(directory),
+                                            glob.escape(sensor_id)+"-*.csv*")):
+
+        date = get_file_date(file_name)
+
+        if date is None \
+            or (start is not None and date < start) \
+            or (end is not None and date > end):
+
+            continue
+
+        files.append((date, file_name))
+
+    return [file_name for date, file_name in sorted(files)]
+
+# ---------- PARSING ----------
+def _new_columns():
+    """Returns empty columns to append to"""
+    return {"time": array("d"), "tick": array("q"), "value": array("d"), "status": array("B")}
+
+def _to_numpy(columns):
+    """Converts columns of arrays to NumPy arrays"""
+    return {"time": np.frombuffer(columns["time"], dtype=np.float64),
+            "tick": np.frombuffer(columns["tick"], dtype=np.int64),
+            "value": np.frombuffer(columns["value"], dtype=np.float64),
+            "status": np.frombuffer(columns["status"], dtype=np.uint8)}
+
+#A reading from a readings file, with the number of "."s after it, and the time of the
+#next reading (None if the monitor was restarted, or this is the end of the file).
+Run = namedtuple("Run", ["time", "time_text", "tick", "sensor_id", "value", "status",
+                         "repeats", "next_time"])
+
+def _open(file_name):
+    """Opens a readings file for reading, decompressing it if needed"""
+    if file_name.endswith(".gz"):
+        return gzip.open(file_name, "rt", encoding="utf-8", errors="replace")
+
+    return open(file_name, "r", encoding="utf-8", errors="replace")
+
+def iter_runs(file_name):
+    """
+    This generator streams the readings in a readings file. Each reading is
+    returned with the number of "."s after it (the readings with the same value
+    that followed it). Lines that can't be understood are skipped, and counted in
+    the log.
+
+    Args:
+        file_name (str):            The readings file. It may be gzip-compressed
+                                    (ending in .gz).
+
+    Yields:
+        Run. The time is in seconds since the epoch, and time_text, value and
+        status are as they were written in the file.
+
+    Throws:
+        OSError, if the file couldn't be read.
+
+    Usage:
+        >>> for run in iter_runs("readings/G4:M0-2020-09-30.csv"):
+        >>>     ...
+    """
+
+    #The last reading, and the number of "."s after it, waiting for the next reading.
+    row = None
+    repeats = 0
+    bad_lines = 0
+
+    with _open(file_name) as readings_file:
+        for line in readings_file:
+            line = line.strip()
+
+            if not line or line.startswith("TIME,") or line.startswith("WARNING"):
+                continue
+
+            if line.startswith("Start Time:"):
+                #The monitor was restarted, so don't spread the last "." run up to
+                #the next reading.
+                if row is not None:
+                    yield Run(*row, repeats, None)
+
+                row = None
+                repeats = 0
+                continue
+
+            stripped = line.rstrip(".")
+            new_repeats = len(line) - len(stripped)
+
+            if not stripped:
+                #Only "."s.
+                if row is None:
+                    bad_lines += 1
+
+                else:
+                    repeats += new_repeats
+
+                continue
+
+            try:
+                reading_time, tick, sensor_id, value, status = stripped.split(",", 4)
+                new_row = (datetime.datetime.fromisoformat(reading_time).timestamp(),
+                           reading_time, int(tick), sensor_id, value, status)
+
+            except ValueError:
+                bad_lines += 1
+                continue
+
+            if row is not None:
+                yield Run(*row, repeats, new_row[0])
+
+            row = new_row
+            repeats = new_repeats
+
+    if row is not None:
+        yield Run(*row, repeats, None)
+
+    if bad_lines:
+        logger.warning("Skipped "+str(bad_lines)+" lines that couldn't be read in "
+                       + file_name)
+
+def _get_spacing(run, interval):
+    """
+    Returns the time between the readings in a run. This is the reading interval,
+    unless the run would go past the next reading, in which case the run is spread
+    evenly before it.
+    """
+
+    if run.next_time is not None and run.repeats and \
+        run.time + (run.repeats * interval) >= run.next_time:
+
+        return (run.next_time - run.time) / (run.repeats + 1)
+
+    return interval
+
+def parse_file(file_name, interval=None):
+    """
+    This function reads a readings file into columns. The file is streamed rather
+    than being read all at once.
+
+    Args:
+        file_name (str):            The readings file. It may be gzip-compressed
+                                    (ending in .gz).
+
+    Named args:
+        interval[=None] (float):    The reading interval, in seconds, used to
+                                    expand the "." runs. If None, the default
+                                    for the site (from config.py) is used.
+
+    Returns:
+        dict. The columns, as NumPy arrays:
+
+            "time":     The times of the readings, in seconds since the epoch.
+            "tick":     The system ticks.
+            "value":    The values, as archivetools.encode_value() returns them.
+            "status":   The status codes, as archivetools.encode_status() returns them.
+
+    Throws:
+        RuntimeError, if NumPy isn't installed.
+        OSError, if the file couldn't be read.
+
+    Usage:
+        >>> columns = parse_file("readings/G4:M0-2020-09-30.csv")
+        >>> columns["value"].max()
+        >>> 635.0
+    """
+
+    if np is None:
+        raise RuntimeError("NumPy is needed to read readings files into columns")
+
+    if interval is None:
+        interval = get_default_interval(os.path.basename(file_name).split("-")[0])
+
+    columns = _new_columns()
+
+    for run in iter_runs(file_name):
+        spacing = _get_spacing(run, interval)
+        count = run.repeats + 1
+
+        columns["time"].extend(run.time + (number * spacing) for number in range(count))
+        columns["tick"].extend(range(run.tick, run.tick + count))
+        columns["value"].extend(itertools.repeat(archivetools.encode_value(run.value), count))
+        columns["status"].extend(itertools.repeat(archivetools.encode_status(run.status),
+                                                  count))
+
+    return _to_numpy(columns)
+
+def read_readings(file_name, interval=None):
+    """
+    This function reads a readings file as Reading objects, keeping the values and
+    statuses as they were written. The times of the readings from the "." runs
+    are worked out as for parse_file(). This doesn't need NumPy.
+
+    Args:
+        file_name (str):            The readings file. It may be gzip-compressed
+                                    (ending in .gz).
+
+    Named args:
+        interval[=None] (float):    As for parse_file().
+
+    Returns:
+        list. (time, Reading) tuples, where time is in seconds since the epoch.
+
+    Throws:
+        OSError, if the file couldn't be read.
+
+    Usage:
+        >>> read_readings("readings/G4:M0-2020-09-30.csv")
+        >>> [(1601463672.0, <Reading>), ...]
+    """
+
+    if interval is None:
+        interval = get_default_interval(os.path.basename(file_name).split("-")[0])
+
+    readings = []
+
+    for run in iter_runs(file_name):
+        spacing = _get_spacing(run, interval)
+
+        readings.append((run.time, coretools.Reading(run.time_text, run.tick, run.sensor_id,
+                                                     run.value, run.status)))
+
+        for number in range(1, run.repeats + 1):
+            reading_time = run.time + (number * spacing)
+
+            #Whole seconds, as in the readings files.
+            readings.append((reading_time, coretools.Reading(int(reading_time), run.tick + number,
+                                                             run.sensor_id, run.value,
+                                                             run.status)))
+
+    return readings
+
+def concatenate(parts):
+    """
+    This function joins columns (eg from several days) together, in order of time.
+
+    Args:
+        parts (list):       The columns to join.
+
+    Returns:
+        dict. The joined columns.
+
+    Usage:
+        >>> columns = concatenate([<columns>, <columns>])
+    """
+
+    if not parts:
+        return _to_numpy(_new_columns())
+
+    columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+
+    #Sort if needed, eg if the clock was changed.
+    if np.any(np.diff(columns["time"]) < 0):
+        order = np.argsort(columns["time"], kind="stable")
+        columns = {name: column[order] for name, column in columns.items()}
+
+    return columns
+
+def parse_files(file_names, interval=None, processes=None):
+    """
+    This function reads lots of readings files at once, using a pool of processes.
+
+    Args:
+        file_names (list):          The readings files.
+
+    Named args:
+        interval[=None] (float):    As for parse_file().
+        processes[=None] (int):     How many processes to use. If None, one per CPU
+                                    is used. If 1, the files are read in this process.
+
+    Returns:
+        dict. The columns for all the files, as parse_file() returns them, in order
+        of time.
+
+    Throws:
+        OSError, if any of the files couldn't be read.
+
+    Usage:
+        >>> columns = parse_files(find_files("G4:M0"))
+    """
+
+    if processes == 1 or len(file_names) <= 1:
+        parts = [parse_file(file_name, interval) for file_name in file_names]
+
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            parts = list(executor.map(parse_file, file_names,
+                                      itertools.repeat(interval), chunksize=4))
+
+    return concatenate(parts)
+
+def load_sensor(sensor_id, directory="readings", start=None, end=None, interval=None,
+                processes=None):
+    """
+    This function reads all the readings files for a sensor.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+    Named args:
+        directory[="readings"] (str):   As for find_files().
+        start[=None] (date):            As for find_files().
+        end[=None] (date):              As for find_files().
+        interval[=None] (float):        As for parse_file().
+        processes[=None] (int):         As for parse_files().
+
+    Returns:
+        dict. The columns, as parse_file() returns them, in order of time.
+
+    Usage:
+        >>> import pandas
+        >>> frame = pandas.DataFrame(load_sensor("G4:M0"))
+    """
+
+    return parse_files(find_files(sensor_id, directory, start, end), interval, processes)
+
+# ---------- CONVERSION ----------
+def to_records(columns):
+    """
+    This function converts columns to archive records (see archivetools.RECORD_DTYPE).
+
+    Args:
+        columns (dict):     The columns, as parse_file() returns them.
+
+    Returns:
+        numpy.ndarray. The records.
+
+    Usage:
+        >>> records = to_records(<columns>)
+    """
+
+    records = np.zeros(len(columns["time"]), dtype=archivetools.RECORD_DTYPE)
+
+    for name in COLUMNS:
+        records[name] = columns[name]
+
+    return records
+
+def convert_to_archive(sensor_id, directory="readings", output_directory=None, start=None,
+                       end=None, interval=None, processes=None, overwrite=False):
+    """
+    This function converts the readings files for a sensor to archive files, one
+    for each year.
+
+    .. warning::
+        Archives for years that have files outside the start and end dates will
+        only contain the readings between those dates.
+
+    Args:
+        sensor_id (str):        The full ID of the sensor, eg "G4:M0".
+
+    Named args:
+        directory[="readings"] (str):       As for find_files().
+        output_directory[=None] (str):      The directory to write the archives to.
+                                            Same as directory if None.
+
+        start[=None] (date):                As for find_files().
+        end[=None] (date):                  As for find_files().
+        interval[=None] (float):            As for parse_file().
+        processes[=None] (int):             As for parse_files().
+        overwrite[=False] (bool):           Whether to replace existing archives. If False,
+                                            years that already have archives are skipped.
+
+    Returns:
+        list. The archive files that were written.
+
+    Throws:
+        OSError, if any of the files couldn't be read or written.
+
+    Usage:
+        >>> convert_to_archive("G4:M0")
+        >>> ["readings/G4:M0-2020.rca", "readings/G4:M0-2021.rca"]
+    """
+
+    if output_directory is None:
+        output_directory = directory
+
+    records = to_records(load_sensor(sensor_id, directory, start, end, interval, processes))
+    archives = []
+
+    if not records.size:
+        return archives
+
+    first_year = datetime.datetime.fromtimestamp(records["time"][0]).year
+    last_year = datetime.datetime.fromtimestamp(records["time"][-1]).year
+
+    for year in range(first_year, last_year + 1):
+        #Find the records in this year.
+        bounds = [datetime.datetime(year, 1, 1).timestamp(),
+                  datetime.datetime(year + 1, 1, 1).timestamp()]
+
+        first, last = np.searchsorted(records["time"], bounds, side="left")
+
+        if first == last:
+            continue
+
+        if not overwrite and \
+            os.path.isfile(archivetools.get_archive_name(sensor_id, year, output_directory)):
+
+            logger.warning("Not replacing the existing "+str(year)+" archive for "+sensor_id)
+            continue
+
+        archives.append(archivetools.write_archive(sensor_id, year, records[first:last],
+                                                   output_directory))
+
+    return archives
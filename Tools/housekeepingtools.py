@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Housekeeping Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the housekeepingtools module, which contains the housekeeping thread.
+This compresses old readings files and rotated log files, and removes the oldest
+ones when there are too many, so the SD cards don't fill up.
+
+Only closed files are touched - never today's readings files, the current log
+file, or any file a monitor or log handler still has open. Files are compressed
+slowly, at low priority, so sampling isn't disturbed.
+
+.. module:: housekeepingtools.py
+    :platform: Linux
+    :synopsis: Compression and removal of old readings and log files.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+from collections import namedtuple
+import threading
+import shutil
+import gzip
+import time
+import os
+import re
+import traceback
+import logging
+
+import config
+
+from Tools import coretools
+from Tools import clocktools
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#The files we look after: daily readings files, and rotated log files, compressed or not.
+READINGS_FILE = re.compile(r".+-\d{4}-\d{2}-\d{2}\.csv(\.gz)?$")
+LOG_FILE = re.compile(r".+\.log\.\d{4}-\d{2}-\d{2}(_\d{2}-\d{2}(-\d{2})?)?(\.gz)?$")
+
+#The most space (in bytes) and the oldest files (in days) allowed in each directory.
+Quota = namedtuple("Quota", ["max_size", "max_age"])
+
+QUOTAS = {
+    "readings": Quota(512 * 1024 * 1024, 365),
+    "logs": Quota(128 * 1024 * 1024, 90)
+}
+
+#Files modified more recently than this (in seconds) are never touched.
+MIN_AGE = 3600
+
+#The fastest we will read files to compress them, in bytes per second.
+RATE_LIMIT = 256 * 1024
+
+#The size of the chunks we compress at once.
+CHUNK_SIZE = 64 * 1024
+
+#How long to wait after startup, and between runs, in seconds.
+START_DELAY = 300
+INTERVAL = 3600
+
+# ---------- FILE FUNCTIONS ----------
+def find_files(directory):
+    """
+    This function finds the readings and rotated log files in a directory that
+    housekeeping looks after, oldest first.
+
+    Args:
+        directory (str):        The directory.
+
+    Returns:
+        list. (modification time, size, path) tuples.
+
+    Usage:
+        >>> find_files("readings")
+        >>> [(1601467272.2, 4096, "readings/G4:M0-2020-09-30.csv.gz"), ...]
+    """
+
+    files = []
+
+    try:
+        entries = list(os.scandir(directory))
+
+    except OSError:
+        return files
+
+    for entry in entries:
+        if not (READINGS_FILE.match(entry.name) or LOG_FILE.match(entry.name)):
+            continue
+
+        try:
+            stat = entry.stat()
+
+        except OSError:
+            #Deleted while we were looking.
+            continue
+
+        if entry.is_file():
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    files.sort()
+
+    return files
+
+def compress_file(file_name, rate_limit=RATE_LIMIT):
+    """
+    This function compresses a file with gzip, keeping its modification time, and
+    removes the original. It reads the file slowly (no faster than rate_limit) so
+    other I/O isn't held up.
+
+    If the file changes while it is being compressed, or config.EXITING is set, the
+    compressed copy is thrown away and the original is left alone. If there is
+    already a compressed file with the same name (eg after a crash), both are left
+    alone, and a warning is logged.
+
+    Args:
+        file_name (str):        The file to compress.
+
+    Named args:
+        rate_limit[=RATE_LIMIT] (int):      The fastest to read the file, in bytes per
+                                            second.
+
+    Returns:
+        bool. True if the file was compressed, otherwise False.
+
+    Throws:
+        OSError, if the file couldn't be read or the compressed copy couldn't be written.
+
+    Usage:
+        >>> compress_file("readings/G4:M0-2020-09-30.csv")
+        >>> True
+    """
+
+    if os.path.exists(file_name+".gz"):
+        logger.warning("Housekeeping: Not compressing "+file_name+", because "+file_name
+                       + ".gz already exists. Please check which one to keep.")
+
+        return False
+
+    stat = os.stat(file_name)
+    temp_name = file_name+".gz.part"
+    completed = False
+
+    try:
+        with open(file_name, "rb") as original, gzip.open(temp_name, "wb") as compressed:
+            start = time.monotonic()
+            done = 0
+
+            while not config.EXITING:
+                chunk = original.read(CHUNK_SIZE)
+
+                if not chunk:
+                    completed = True
+                    break
+
+                compressed.write(chunk)
+                done += len(chunk)
+
+                #Keep to the rate limit.
+                delay = (done / rate_limit) - (time.monotonic() - start)
+
+                if delay > 0:
+                    time.sleep(delay)
+
+        new_stat = os.stat(file_name)
+
+        if not completed or new_stat.st_mtime != stat.st_mtime \
+            or new_stat.st_size != stat.st_size:
+
+            return False
+
+        os.utime(temp_name, (stat.st_atime, stat.st_mtime))
+        os.replace(temp_name, file_name+".gz")
+        os.remove(file_name)
+
+        return True
+
+    finally:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+
+def enforce_quota(directory, quota, in_use=(), now=None):
+    """
+    This function removes the oldest files that housekeeping looks after in a
+    directory, until none are older than the quota's maximum age, and they take
+    up no more than its maximum size. Files that are in use, or that have been
+    modified in the last MIN_AGE seconds, are never removed.
+
+    Args:
+        directory (str):        The directory.
+        quota (Quota):          The quota.
+
+    Named args:
+        in_use[=()] (set):      The absolute paths of files that are in use.
+        now[=None] (float):     The time to work out ages from. The current time if None.
+
+    Returns:
+        list. The files that were removed.
+
+    Usage:
+        >>> enforce_quota("logs", Quota(128 * 1024 * 1024, 90))
+        >>> ["logs/rivercontrolsystem.log.2020-06-30.gz"]
+    """
+
+    if now is None:
+        now = time.time()
+
+    files = find_files(directory)
+
+    #Files we can't remove still count towards the quota.
+    total_size = sum(size for mtime, size, path in files)
+    removed = []
+
+    for mtime, size, path in files:
+        if now - mtime <= quota.max_age * 86400 and total_size <= quota.max_size:
+            break
+
+        if os.path.abspath(path) in in_use or now - mtime < MIN_AGE:
+            continue
+
+        try:
+            os.remove(path)
+
+        except OSError:
+            logger.error("Housekeeping: Couldn't remove "+path)
+            continue
+
+        total_size -= size
+        removed.append(path)
+
+    return removed
+
+# ---------- HOUSEKEEPING THREAD ----------
+class Housekeeping(threading.Thread):
+    """
+    This class starts a low-priority thread that compresses closed readings and log
+    files, and enforces the quotas, every INTERVAL seconds.
+
+    Documentation for the constructor for objects of type Housekeeping:
+
+    Named args:
+        monitors[=()] (list):       The monitors, so we can avoid their open readings files.
+        handlers[=()] (list):       The logging handlers, so we can avoid open log files.
+        quotas[=QUOTAS] (dict):     The quota for each directory.
+
+    Usage:
+        >>> housekeeping = Housekeeping(monitors=<monitors>, handlers=<handlers>)
+    """
+
+    def __init__(self, monitors=(), handlers=(), quotas=None):
+        """The constructor, as documented above"""
+        threading.Thread.__init__(self)
+
+        self.monitors = monitors
+        self.handlers = handlers
+
+        if quotas is None:
+            quotas = QUOTAS
+
+        self.quotas = quotas
+
+        #Used to sleep between passes, and woken by request_exit().
+        self.waiter = coretools.IntervalWaiter()
+
+        self.is_running = True
+
+        self.start()
+
+    def get_files_in_use(self):
+        """
+        This method returns the absolute paths of all the files that are open in the
+        monitors and logging handlers.
+
+        Returns:
+            set.
+
+        Usage:
+            >>> <Housekeeping>.get_files_in_use()
+            >>> {"/home/pi/rivercontrolsystem/readings/G4:M0-2020-09-30.csv", ...}
+        """
+
+        in_use = set()
+
+        for monitor in self.monitors:
+            if monitor.writer.current_file_name is not None:
+                in_use.add(os.path.abspath(monitor.writer.current_file_name))
+
+        for each_handler in self.handlers:
+            if hasattr(each_handler, "baseFilename"):
+                in_use.add(os.path.abspath(each_handler.baseFilename))
+
+        return in_use
+
+    def do_housekeeping(self):
+        """
+        This method compresses any closed files that need it, and enforces the quotas.
+
+        Usage:
+            >>> <Housekeeping>.do_housekeeping()
+        """
+
+        for directory, quota in self.quotas.items():
+            #Check what is in use for each directory, in case files were rotated.
+            in_use = self.get_files_in_use()
+            now = time.time()
+
+            for mtime, size, path in find_files(directory):
+                if config.EXITING:
+                    return
+
+                if path.endswith(".gz") or now - mtime < MIN_AGE \
+                    or os.path.abspath(path) in in_use:
+
+                    continue
+
+                logger.debug("Housekeeping: Compressing "+path+"...")
+
+                try:
+                    compress_file(path)
+
+                except OSError:
+                    logger.error("Housekeeping: Couldn't compress "+path+". Exception: \n\n"
+                                 + str(traceback.format_exc()))
+
+            for path in enforce_quota(directory, quota, in_use):
+                logger.info("Housekeeping: Removed "+path+" to stay within the quota.")
+
+        #Log how much space is left, in case the quotas are too big for the card.
+        try:
+            free = shutil.disk_usage(".").free
+
+        except OSError:
+            pass
+
+        else:
+            logger.info("Housekeeping: "+str(round(free / (1024 * 1024)))+" MB free.")
+
+    def run(self):
+        """The main body of the thread"""
+        #Run at the lowest priority. This only affects this thread on Linux.
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+
+        except (AttributeError, OSError):
+            pass
+
+        sleep = START_DELAY
+
+        while not config.EXITING:
+            #Woken by request_exit(), so we respond to system teardown quickly.
+            self.waiter.wait_until(clocktools.get_clock().monotonic() + sleep)
+
+            if config.EXITING:
+                break
+
+            try:
+                self.do_housekeeping()
+
+            except Exception:
+                logger.error("Housekeeping: Unexpected error: \n\n"
+                             + str(traceback.format_exc()))
+
+                print("Housekeeping: Unexpected error: \n\n"
+                      + str(traceback.format_exc()), level="error")
+
+            sleep = INTERVAL
+
+        #Signal that we have exited.
+        self.is_running = False
+
+    #----- CONTROL METHODS -----
+    def wait_exit(self):
+        """
+        This method is used to wait for the housekeeping thread to exit.
+
+        This isn't a mandatory function as the housekeeping thread will tear down
+        automatically when config.EXITING is set to True.
+
+        Usage:
+            >>> <Housekeeping>.wait_exit()
+        """
+
+        while self.is_running:
+            time.sleep(0.5)
@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# I2C Bus Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the i2ctools module, which contains the I2C bus manager. All the
+ADS1115 ADCs on a pi (eg for hall effect probes and gate valves) share one
+I2C bus, so rather than each management thread talking to the bus whenever it
+likes, they ask the bus manager to read channels for them.
+
+The bus manager:
+
+- Serves the chips in turn, so one busy device can't hold up the others.
+- Batches requests for the same chip, so that if two threads want the same
+  channel at the same time, it is only converted once.
+- Keeps statistics for each chip, such as the read latency and error rate.
+
+There is no separate thread for the bus - whichever thread gets the bus next
+does the reads for everyone that is waiting, in turn.
+
+The hardware is accessed through a backend. ADS1115Backend uses the Adafruit
+ADS1x15 library, and StandInBackend returns voltages set by the tests, with
+optional delays and errors.
+
+.. module:: i2ctools.py
+    :platform: Linux
+    :synopsis: Shared access to the I2C bus for the ADCs.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+from collections import deque
+import threading
+import time
+import traceback
+import logging
+
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#The ADS1115's defaults: +/-4.096V, and 128 samples per second.
+DEFAULT_GAIN = 1
+DEFAULT_DATA_RATE = 128
+
+#The data rates the ADS1115 supports, in samples per second.
+DATA_RATES = (8, 16, 32, 64, 128, 250, 475, 860)
+
+# ---------- BACKENDS ----------
+class ADS1115Backend:
+    """
+    This class reads ADS1115 chips using the Adafruit ADS1x15 library (or the
+    dummy versions in testingtools).
+
+    Documentation for the constructor for objects of type ADS1115Backend:
+
+    Args:
+        i2c (busio.I2C):            The I2C bus.
+        ads_module (module):        adafruit_ads1x15.ads1115, or testingtools.ADS.
+        analog_in (class):          adafruit_ads1x15.analog_in.AnalogIn, or
+                                    testingtools.AnalogIn.
+
+    Usage:
+        >>> backend = ADS1115Backend(I2C, ADS, AnalogIn)
+    """
+
+    def __init__(self, i2c, ads_module, analog_in):
+        """The constructor, as documented above"""
+        self.i2c = i2c
+        self.ads_module = ads_module
+        self.analog_in = analog_in
+
+        #The chip, and its channels, for each address. Created when first used.
+        self.chips = {}
+        self.channels = {}
+
+    def get_channel(self, address, channel):
+        """
+        This method returns the AnalogIn object for a channel, creating it (and the
+        chip) if needed.
+
+        Args:
+            address (int):          The address of the chip.
+            channel (int):          The channel, 0 to 3.
+
+        Returns:
+            AnalogIn.
+
+        Usage:
+            >>> <ADS1115Backend>.get_channel(0x48, 0)
+            >>> <AnalogIn>
+        """
+
+        if address not in self.chips:
+            self.chips[address] = self.ads_module.ADS1115(self.i2c, address=address)
+
+        if (address, channel) not in self.channels:
+            self.channels[(address, channel)] = \
+                self.analog_in(self.chips[address], getattr(self.ads_module, "P"+str(channel)))
+
+        return self.channels[(address, channel)]
+
+    def read_channels(self, address, channels, gain, data_rate):
+        """
+        This method reads the given channels of a chip, one after the other.
+
+        Args:
+            address (int):          The address of the chip.
+            channels (tuple):       The channels to read, eg (0, 1, 2, 3).
+            gain (float):           The gain, as accepted by the Adafruit library.
+            data_rate (int):        The data rate, in samples per second.
+
+        Returns:
+            list. A (voltage, time) tuple for each channel, with the time (from
+            time.monotonic()) that the conversion finished.
+
+        Throws:
+            OSError, if the chip couldn't be read.
+
+        Usage:
+            >>> <ADS1115Backend>.read_channels(0x48, (0, 1), 1, 128)
+            >>> [(1.2, 100.01), (3.1, 100.02)]
+        """
+
+        results = []
+
+        for channel in channels:
+            analog_in = self.get_channel(address, channel)
+            chip = self.chips[address]
+
+            #Only change the settings if we need to.
+            if chip is not None and (chip.gain != gain or chip.data_rate != data_rate):
+                chip.gain = gain
+                chip.data_rate = data_rate
+
+            results.append((analog_in.voltage, time.monotonic()))
+
+        return results
+
+class StandInBackend:
+    """
+    This class stands in for the ADCs in tests. The voltage for each channel can
+    be a number, or a function that is called with the time of the read. Reads can
+    be made to take time, and to fail.
+
+    Documentation for the constructor for objects of type StandInBackend:
+
+    Named args:
+        conversion_time[=0] (float):    How long each channel takes to read, in
+                                        seconds.
+
+    Usage:
+        >>> backend = StandInBackend()
+        >>> backend.set_voltage(0x48, 0, 3.3)
+    """
+
+    def __init__(self, conversion_time=0):
+        """The constructor, as documented above"""
+        self.conversion_time = conversion_time
+
+        #Voltages for each (address, channel).
+        self.voltages = {}
+
+        #The number of reads that will fail for each address.
+        self.failures = {}
+
+        #Each read done, as (address, channels, gain, data_rate).
+        self.reads = []
+
+    def set_voltage(self, address, channel, voltage):
+        """
+        This method sets the voltage returned for a channel.
+
+        Args:
+            address (int):          The address of the chip.
+            channel (int):          The channel, 0 to 3.
+            voltage (float):        The voltage, or a function that returns it.
+
+        Usage:
+            >>> <StandInBackend>.set_voltage(0x48, 0, 3.3)
+        """
+
+        self.voltages[(address, channel)] = voltage
+
+    def fail(self, address, count=1):
+        """
+        This method makes the next count reads from a chip fail with OSError.
+
+        Args:
+            address (int):          The address of the chip.
+
+        Named args:
+            count[=1] (int):        The number of reads that will fail.
+
+        Usage:
+            >>> <StandInBackend>.fail(0x48)
+        """
+
+        self.failures[address] = self.failures.get(address, 0) + count
+
+    def read_channels(self, address, channels, gain, data_rate):
+        """
+        This method returns the voltages for the given channels. See
+        ADS1115Backend.read_channels().
+        """
+
+        self.reads.append((address, tuple(channels), gain, data_rate))
+
+        if self.failures.get(address, 0) > 0:
+            self.failures[address] -= 1
+            raise OSError("Stand-in read failure for address "+hex(address))
+
+        results = []
+
+        for channel in channels:
+            if self.conversion_time:
+                time.sleep(self.conversion_time)
+
+            voltage = self.voltages.get((address, channel), 0.0)
+            now = time.monotonic()
+
+            if callable(voltage):
+                voltage = voltage(now)
+
+            results.append((voltage, now))
+
+        return results
+
+# ---------- BUS MANAGER ----------
+class ReadRequest:
+    """
+    This class holds a request to read some channels of a chip, and the results.
+    These are created by I2CBusManager.
+
+    Documentation for the constructor for objects of type ReadRequest:
+
+    Args:
+        address (int):              The address of the chip.
+        channels (tuple):           The channels to read.
+        gain (float):               The gain.
+        data_rate (int):            The data rate, in samples per second.
+
+    Usage:
+        >>> request = ReadRequest(0x48, (0, 1, 2, 3), 1, 128)
+    """
+
+    def __init__(self, address, channels, gain, data_rate):
+        """The constructor, as documented above"""
+        self.address = address
+        self.channels = tuple(channels)
+        self.gain = gain
+        self.data_rate = data_rate
+
+        self.submit_time = time.monotonic()
+
+        #Set when the request has been served.
+        self.done = False
+        self.results = None
+        self.error = None
+
+class I2CBusManager:
+    """
+    This class owns the I2C bus, and reads channels from the ADCs on it for any
+    thread that asks. See the module documentation for how requests are
+    scheduled.
+
+    Documentation for the constructor for objects of type I2CBusManager:
+
+    Args:
+        backend (ADS1115Backend):   The backend used to access the chips.
+
+    Usage:
+        >>> bus = I2CBusManager(ADS1115Backend(I2C, ADS, AnalogIn))
+        >>> bus.read(0x48, (0, 1, 2, 3))
+        >>> [(1.2, 100.01), (3.1, 100.02), (3.2, 100.03), (3.1, 100.04)]
+    """
+
+    def __init__(self, backend):
+        """The constructor, as documented above"""
+        self.backend = backend
+
+        #Protects everything below.
+        self.condition = threading.Condition()
+
+        #Waiting requests for each address, and the addresses in the order they will
+        #be served.
+        self.pending = {}
+        self.queue = deque()
+
+        #True while a thread is using the bus.
+        self.busy = False
+
+        #Statistics for each address.
+        self.stats = {}
+
+    def read(self, address, channels, gain=DEFAULT_GAIN, data_rate=DEFAULT_DATA_RATE):
+        """
+        This method reads the given channels of a chip, waiting for the bus if
+        needed.
+
+        Args:
+            address (int):              The address of the chip.
+            channels (tuple):           The channels to read, eg (0, 1, 2, 3).
+
+        Named args:
+            gain[=1] (float):           The gain, as accepted by the Adafruit library.
+            data_rate[=128] (int):      The data rate, in samples per second.
+
+        Returns:
+            list. A (voltage, time) tuple for each channel, in the same order as
+            channels, with the time (from time.monotonic()) that the conversion
+            finished.
+
+        Throws:
+            OSError, if the chip couldn't be read.
+
+        Usage:
+            >>> <I2CBusManager>.read(0x48, (0,))
+            >>> [(1.2, 100.01)]
+        """
+
+        request = ReadRequest(address, channels, gain, data_rate)
+
+        with self.condition:
+            if address not in self.pending:
+                self.pending[address] = []
+                self.queue.append(address)
+
+            self.pending[address].append(request)
+
+            while not request.done:
+                if self.busy:
+                    self.condition.wait()
+                    continue
+
+                #It's our turn to use the bus - serve the next chip in the queue,
+                #which may not be ours.
+                self.busy = True
+                next_address = self.queue.popleft()
+                batch = self.pending.pop(next_address)
+
+                self.condition.release()
+
+                try:
+                    self._serve(next_address, batch)
+
+                finally:
+                    self.condition.acquire()
+                    self.busy = False
+                    self.condition.notify_all()
+
+        if request.error is not None:
+            raise OSError(request.error)
+
+        return request.results
+
+    def _serve(self, address, batch):
+        """
+        PRIVATE, implementation detail.
+
+        Reads the channels for all the requests for one chip, reading each channel
+        only once for each combination of settings.
+        """
+
+        #Group the requests by settings, keeping the order they arrived in.
+        groups = {}
+
+        for request in batch:
+            groups.setdefault((request.gain, request.data_rate), []).append(request)
+
+        for (gain, data_rate), requests in groups.items():
+            channels = []
+
+            for request in requests:
+                channels.extend(channel for channel in request.channels
+                                if channel not in channels)
+
+            try:
+                results = dict(zip(channels, self.backend.read_channels(address, channels, gain,
+                                                                        data_rate)))
+                error_text = None
+
+            except OSError as error:
+                logger.error("I2CBusManager: Error reading ADC at "+hex(address)+": "
+                             + str(error))
+
+                results = None
+                error_text = str(error)
+
+            except Exception as error: #pylint: disable=broad-except
+                #Eg a RuntimeError or ValueError from the ADC library. The other
+                #requests in this batch have been taken off the queue, so they must
+                #still be answered, or their threads would wait forever.
+                logger.error("I2CBusManager: Unexpected error reading ADC at "+hex(address)
+                             + ": \n\n"+str(traceback.format_exc()))
+
+                results = None
+                error_text = str(error)
+
+            self._record(address, requests, len(channels), error_text)
+
+            for request in requests:
+                if results is None:
+                    request.error = error_text
+
+                else:
+                    request.results = [results[channel] for channel in request.channels]
+
+                request.done = True
+
+    def _record(self, address, requests, conversions, error):
+        """
+        PRIVATE, implementation detail.
+
+        Updates the statistics for a batch of requests for a chip.
+        """
+
+        now = time.monotonic()
+
+        with self.condition:
+            stats = self.stats.setdefault(address, {"requests": 0, "errors": 0,
+                                                    "conversions": 0, "total_latency": 0,
+                                                    "max_latency": 0})
+
+            stats["conversions"] += conversions
+
+            for request in requests:
+                latency = now - request.submit_time
+
+                stats["requests"] += 1
+                stats["total_latency"] += latency
+                stats["max_latency"] = max(stats["max_latency"], latency)
+
+                if error is not None:
+                    stats["errors"] += 1
+
+    def get_stats(self):
+        """
+        This method returns the statistics for each chip.
+
+        Returns:
+            dict. A dictionary for each address, with the keys:
+
+                requests:           The number of requests served.
+                conversions:        The number of channels read. This is less than
+                                    the number of channels requested if requests
+                                    were batched together.
+                errors:             The number of requests that failed.
+                error_rate:         errors / requests.
+                mean_latency:       The mean time from request to result, in seconds.
+                max_latency:        The longest time from request to result, in seconds.
+
+        Usage:
+            >>> <I2CBusManager>.get_stats()
+            >>> {0x48: {"requests": 100, "errors": 1, "error_rate": 0.01, ...}}
+        """
+
+        with self.condition:
+            return {address: {"requests": stats["requests"],
+                              "conversions": stats["conversions"], "errors": stats["errors"],
+                              "error_rate": stats["errors"] / stats["requests"],
+                              "mean_latency": stats["total_latency"] / stats["requests"],
+                              "max_latency": stats["max_latency"]}
+                    for address, stats in self.stats.items()}
@@ -34,6 +34,7 @@ import logging
 
 import config
 
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin, unused-import
 
 logger = logging.getLogger(__name__)
@@ -52,10 +53,17 @@ def reconfigure_logger():
     for _handler in logging.getLogger('River System Control Software').handlers:
         logger.addHandler(_handler)
 
+#How old (in seconds) a reading on the latest-readings blackboard can be before we
+#fall back to asking the database.
+MAX_READING_AGE = 60
+
 def get_latest_reading(site_id, sensor_id, retries=3):
     """
     This method returns the latest reading for the given sensor at the given site.
 
+    If we have a recent enough reading on the latest-readings blackboard (see
+    coretools.publish_reading()), that is returned without querying the database.
+
     Args:
         site_id (str).            The site we want the reading from.
         sensor_id (str).          The sensor we want the reading for.
@@ -81,6 +89,11 @@ def get_latest_reading(site_id, sensor_id, retries=3):
 
     """
 
+    entry = config.LATESTREADINGS.get_entry(site_id+":"+sensor_id)
+
+    if entry is not None and clocktools.get_clock().time() - entry.received < MAX_READING_AGE:
+        return entry.reading
+
     return config.DBCONNECTION.get_latest_reading(site_id, sensor_id, retries)
 
 def get_n_latest_readings(site_id, sensor_id, number, retries=3):
@@ -113,6 +126,33 @@ def get_n_latest_readings(site_id, sensor_id, number, retries=3):
 
     return config.DBCONNECTION.get_n_latest_readings(site_id, sensor_id, number, retries)
 
+def get_readings_batch(site_id, start, end, retries=3):
+    """
+    This method returns all the readings from all the sensors at the given site
+    between two times, as one ReadingBatch.
+
+    Args:
+        site_id (str).              The site we want the readings from.
+        start (datetime).           The time of the first reading to return.
+        end (datetime).             Only return readings from before this time.
+
+    Named args:
+        retries[=3] (int).          The number of times to retry before giving up
+                                    and raising an error.
+
+    Returns:
+        ReadingBatch. The readings, oldest first.
+
+    Throws:
+        RuntimeError, if the query failed too many times.
+
+    Usage:
+        >>> get_readings_batch("G4", datetime(2020, 9, 30), datetime(2020, 10, 1))
+        >>> <ReadingBatch>
+    """
+
+    return config.DBCONNECTION.get_readings_batch(site_id, start, end, retries)
+
 def get_state(site_id, sensor_id, retries=3):
     """
     This method queries the state of the given sensor/device. Information is returned
@@ -368,3 +408,51 @@ def store_reading(reading, retries=3):
     """
 
     return config.DBCONNECTION.store_reading(reading, retries)
+
+def store_readings(readings, retries=3):
+    """
+    This method stores lots of readings in the database with a single query.
+
+    Args:
+        readings (list<Reading>).   The readings to store.
+
+    Named args:
+        retries[=3] (int).          The number of times to retry before giving up
+                                    and raising an error.
+
+    Throws:
+        RuntimeError, if the query failed too many times.
+
+    Usage:
+        >>> store_readings([<Reading>, <Reading>])
+        >>>
+    """
+
+    return config.DBCONNECTION.store_readings(readings, retries)
+
+def get_readings_coverage(sensor_id, date, bucket_size=60, retries=3):
+    """
+    This method returns how many readings the database has for the given sensor
+    at this site on the given day, split into buckets of bucket_size seconds.
+
+    Args:
+        sensor_id (str).            The sensor, eg "M0".
+        date (date).                The day.
+
+    Named args:
+        bucket_size[=60] (int).     The size of the buckets, in seconds.
+        retries[=3] (int).          The number of times to retry before giving up
+                                    and raising an error.
+
+    Returns:
+        dict. (count, first time, last time) tuples, keyed by bucket number.
+
+    Throws:
+        RuntimeError, if the query failed too many times.
+
+    Usage:
+        >>> get_readings_coverage("M0", datetime.date(2020, 9, 30))
+        >>> {0: (4, datetime(2020, 9, 30, 0, 0, 5), datetime(2020, 9, 30, 0, 0, 50)), ...}
+    """
+
+    return config.DBCONNECTION.get_readings_coverage(sensor_id, date, bucket_size, retries)
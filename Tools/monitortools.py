@@ -33,6 +33,9 @@ a bit more of the complexity away.
 """
 
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
 import time
 import os
 import traceback
@@ -44,6 +47,8 @@ import config
 
 from Tools import logiccoretools
 from Tools import coretools
+from Tools import archivetools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 logger = logging.getLogger(__name__)
@@ -63,6 +68,211 @@ def reconfigure_logger():
         logger.addHandler(_handler)
 
 # ---------- BASE CLASS ----------
+#How many records to buffer before writing them to a readings file.
+FLUSH_RECORDS = 20
+
+#The longest time (in seconds) records can stay buffered before they are written.
+FLUSH_INTERVAL = 60
+
+class ReadingsWriter:
+    """
+    This class is used by the monitors to write readings files. Records are
+    buffered, and written to the file every FLUSH_RECORDS records or every
+    FLUSH_INTERVAL seconds (whichever is first), and when the file is closed.
+    This saves a lot of writes to the SD card compared to flushing every record.
+
+    It also keeps track of when the file needs to be rotated (at midnight),
+    and can tell whether the file has been deleted, without checking the
+    path every time.
+
+    Documentation for the constructor for objects of type ReadingsWriter:
+
+    Args:
+        file_name (str):            The file name to use, without the date and
+                                    extension, eg "readings/G4:M0".
+
+    Named args:
+        flush_records[=FLUSH_RECORDS] (int):        How many records to buffer.
+        flush_interval[=FLUSH_INTERVAL] (float):    How long records can stay buffered,
+                                                    in seconds.
+
+    Usage:
+        >>> writer = ReadingsWriter("readings/G4:M0")
+    """
+
+    def __init__(self, file_name, flush_records=FLUSH_RECORDS, flush_interval=FLUSH_INTERVAL):
+        """The constructor, as documented above"""
+        #The file name the readings file will have (plus the date it was
+        #created)
+        self.file_name = file_name
+        self.current_file_name = None
+
+        #A reference to the file handle of the open readings file.
+        self.file_handle = None
+
+        #The time the readings file will expire, in seconds since the epoch.
+        self.rotation_deadline = None
+
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+
+        #Records waiting to be written, and when we last wrote them.
+        self.buffer = []
+        self.last_flush = clocktools.get_clock().monotonic()
+
+    def open(self):
+        """
+        This method is used to create / update the readings file. The file will be
+        opened in append mode, and a CSV header and start time will be written
+        straight away.
+
+        The name for the file will be <file_name>-<yyyy-mm-dd>.csv
+
+        For example: readings/G4:M0-2020-09-30.csv
+
+        Any records that were still buffered when the last file was closed are
+        written to the new file.
+
+        Throws:
+            OSError, if the start time and CSV header couldn't be written.
+
+        Usage:
+            >>> <ReadingsWriter>.open()
+        """
+
+        #Create the readings directory if it doesn't exist.
+        if not os.path.isdir("readings"):
+            logger.debug("Creating readings folder...")
+            os.mkdir("readings")
+
+        #Time format: yyyy-mm-dd
+        today = clocktools.get_clock().now().date()
+
+        #Open in append mode, just in case the file is already here.
+        self.current_file_name = self.file_name+"-"+today.strftime("%Y-%m-%d")+".csv"
+        self.file_handle = open(self.current_file_name, "a", encoding="utf-8")
+
+        try:
+            #Write the start time and the CSV header.
+            self.file_handle.write("\n\nStart Time: "+str(clocktools.get_clock().now())+"\n\n")
+            self.file_handle.write("\nTIME,SYSTEM TICK,ID,VALUE,STATUS\n")
+            self.file_handle.flush()
+
+        except (OSError, IOError) as error:
+            logger.error("Exception \n\n"+str(traceback.format_exc())
+                         + "\n\nwhile running!")
+
+            print("Exception \n\n"+str(traceback.format_exc())
+                  +"\n\nwhile running!", level="error")
+
+            #Make sure the file is closed.
+            self.file_handle.close()
+
+            #Raise the error, because we don't want to continue when this fails.
+            raise error
+
+        #Rotate the readings file at midnight tonight.
+        tomorrow = today + datetime.timedelta(days=1)
+        self.rotation_deadline = time.mktime(tomorrow.timetuple())
+
+    def write(self, record):
+        """
+        This method adds a record to the buffer, and writes the buffer to the file
+        if there are enough records waiting, or they have been waiting long enough.
+
+        Args:
+            record (str):       The text to write.
+
+        Throws:
+            OSError, if writing to the file failed. The records are kept in the
+            buffer, so they can be written to a new file.
+
+        Usage:
+            >>> <ReadingsWriter>.write("\\n2020-09-30 12:01:12,1,G4:M0,400mm,OK")
+        """
+
+        self.buffer.append(record)
+
+        if len(self.buffer) >= self.flush_records or \
+            clocktools.get_clock().monotonic() - self.last_flush >= self.flush_interval:
+
+            self.flush()
+
+    def flush(self):
+        """
+        This method writes any buffered records to the file.
+
+        Throws:
+            OSError, if writing to the file failed. The records are kept in the
+            buffer, so they can be written to a new file.
+
+        Usage:
+            >>> <ReadingsWriter>.flush()
+        """
+
+        if self.buffer:
+            self.file_handle.write("".join(self.buffer))
+            self.buffer.clear()
+
+        self.file_handle.flush()
+        self.last_flush = clocktools.get_clock().monotonic()
+
+    def rotation_due(self):
+        """
+        This method returns True if it is time to rotate the readings file.
+
+        Usage:
+            >>> <ReadingsWriter>.rotation_due()
+            >>> False
+        """
+
+        return clocktools.get_clock().time() >= self.rotation_deadline
+
+    def file_deleted(self):
+        """
+        This method returns True if the open readings file has been deleted (or
+        moved out of the way and deleted). This checks the link count of the open
+        file, so we don't need to look up the path every time.
+
+        Usage:
+            >>> <ReadingsWriter>.file_deleted()
+            >>> False
+        """
+
+        try:
+            return os.fstat(self.file_handle.fileno()).st_nlink == 0
+
+        except (OSError, ValueError):
+            #The file handle is broken or closed, so treat it as gone.
+            return True
+
+    def close(self, flush=True):
+        """
+        This method closes the readings file.
+
+        Named args:
+            flush[=True] (bool):    Whether to write any buffered records to the file
+                                    first. If False, the records are kept, and written
+                                    to the next file that is opened.
+
+        Usage:
+            >>> <ReadingsWriter>.close()
+        """
+
+        if flush:
+            try:
+                self.flush()
+
+            except (OSError, ValueError):
+                logger.error("Couldn't write buffered readings to "+str(self.current_file_name)
+                             + " before closing it!")
+
+        try:
+            self.file_handle.close()
+
+        except OSError:
+            pass
+
 class BaseMonitorClass(threading.Thread):
     """
     This is a base monitor class that all other monitors
@@ -102,23 +312,24 @@ class BaseMonitorClass(threading.Thread):
         self.site_id = site_id
         self.probe_id = probe_id
 
-        #The file name the readings file will have (plus the time it was
-        #created)
-        self.file_name = "readings/"+self.site_id+":"+self.probe_id
-        self.current_file_name = None
+        #Writes the readings file.
+        self.writer = ReadingsWriter("readings/"+self.site_id+":"+self.probe_id)
 
-        #A reference to the file handle of the open readings file.
-        self.file_handle = None
+        #Writes the binary readings archive, if enabled.
+        self.archive = None
 
-        #The time the readings file will expire.
-        self.midnight_tonight = None
+        if config.ARCHIVE_READINGS:
+            self.archive = archivetools.ArchiveWriter(self.site_id+":"+self.probe_id)
 
         #Default reading interval. This will be overridden by the site-wide
         #interval later.
         self.reading_interval = 0
 
-        #The outgoing queue for readings collected by this thread.
-        self.queue = deque()
+        #The IntervalWaiter this monitor's thread sleeps on, if any.
+        self.waiter = None
+
+        #The sequence number of the last reading we returned from get_reading().
+        self.last_seq = 0
 
         #Queue for readings that couldn't be sent to the database.
         self.db_queue = deque()
@@ -162,9 +373,9 @@ class BaseMonitorClass(threading.Thread):
 
     def get_reading(self):
         """
-        This method returns the oldest reading on the queue (so that
-        if there are multiple readings they are read in the correct
-        order), and deletes it from the queue.
+        This method returns the latest reading from this monitor's probe on the
+        readings blackboard, as long as it hasn't been returned before. Any readings
+        that were replaced on the blackboard before we got to them are skipped.
 
         The reading ID is a combination of the site ID and the
         sensor ID.
@@ -185,9 +396,15 @@ class BaseMonitorClass(threading.Thread):
             >>> reading_id, time, reading, status = <BaseMonitorClassObject>.get_reading()
         """
 
-        self.prev_reading = self.queue[0]
+        entry = config.LATESTREADINGS.get_entry(self.site_id+":"+self.probe_id)
+
+        if entry is None or entry.seq <= self.last_seq:
+            raise IndexError("No new reading")
+
+        self.prev_reading = entry.reading
+        self.last_seq = entry.seq
 
-        return self.queue.popleft()
+        return entry.reading
 
     def get_previous_reading(self):
         """
@@ -227,9 +444,9 @@ class BaseMonitorClass(threading.Thread):
 
     def has_data(self):
         """
-        This method returns True if the monitor has data sat on
-        its readings queue waiting to be read. False if the queue
-        is empty.
+        This method returns True if there is a reading from this monitor's
+        probe on the readings blackboard that hasn't been read with get_reading()
+        yet. Otherwise, False.
 
         Returns:
             bool.
@@ -241,7 +458,9 @@ class BaseMonitorClass(threading.Thread):
             >>> state = <BaseMonitorClassObject>.has_data()
         """
 
-        return bool(len(self.queue))
+        entry = config.LATESTREADINGS.get_entry(self.site_id+":"+self.probe_id)
+
+        return entry is not None and entry.seq > self.last_seq
 
     #---------- SETTERS ----------
     def set_reading_interval(self, interval):
@@ -267,53 +486,16 @@ class BaseMonitorClass(threading.Thread):
         The file will be opened in append mode, and
         a CSV header and start time will be written.
 
-        The name for the file will be readings/<site_id>:<probe_name>.csv
+        The name for the file will be readings/<site_id>:<probe_name>-<yyyy-mm-dd>.csv
 
-        For example: readings/G4:M0.csv
+        For example: readings/G4:M0-2020-09-30.csv
 
         Usage:
             >>> <BaseMonitorClassObject>.create_file_handle()
 
         """
 
-        #Create the readings directory if it doesn't exist.
-        if not os.path.isdir("readings"):
-            logger.debug("Creating readings folder...")
-            os.mkdir("readings")
-
-        #Time format: yyyy-mm-dd hh:mm:ss
-        the_time = time.strftime("%Y-%m-%d", time.localtime())
-
-        #Open in append mode, just in case the file is already here.
-        self.current_file_name = self.file_name+"-"+the_time+".csv"
-        self.file_handle = open(self.current_file_name, "a", encoding="utf-8")
-
-        try:
-            #Write the start time and the CSV header.
-            self.file_handle.write("\n\nStart Time: "+str(datetime.datetime.now())+"\n\n")
-            self.file_handle.write("\nTIME,SYSTEM TICK,ID,VALUE,STATUS\n")
-            self.file_handle.flush()
-
-        except (OSError, IOError) as error:
-            logger.error("Exception \n\n"+str(traceback.format_exc())
-                         + "\n\nwhile running!")
-
-            print("Exception \n\n"+str(traceback.format_exc())
-                  +"\n\nwhile running!", level="error")
-
-            #Make sure the file is closed.
-            self.file_handle.close()
-
-            #Raise the error, because we don't want to continue when this fails.
-            raise error
-
-        #Set the expiration time to midnight so we can rotate readings files.
-        #This uses the datetime class cos it's easier to compare times that way.
-        midnight = datetime.time(hour=23, minute=59, second=59)
-        current_time = datetime.datetime.now()
-
-        self.midnight_tonight = datetime.datetime.combine(current_time.date(),
-                                                          midnight)
+        self.writer.open()
 
     def handle_reading(self, reading, previous_reading):
         """
@@ -378,18 +560,16 @@ class BaseMonitorClass(threading.Thread):
                 logger.debug("Monitor for "+self.site_id+":"+self.probe_id
                              + ": New reading, same value as last time.")
 
-                self.file_handle.write(".")
+                self.writer.write(".")
 
             else:
                 #Write it to the readings file.
                 logger.debug("Monitor for "+self.site_id+":"+self.probe_id
                              + ": New reading, new value: "+reading.get_value())
 
-                self.file_handle.write("\n"+reading.as_csv())
-
                 previous_reading = reading
 
-            self.file_handle.flush()
+                self.writer.write("\n"+reading.as_csv())
 
         except OSError:
             logger.error("Couldn't write to readings file! "
@@ -400,8 +580,34 @@ class BaseMonitorClass(threading.Thread):
 
             write_failed = True
 
+        if self.archive is not None:
+            try:
+                self.archive.write(reading)
+
+            except (OSError, ValueError):
+                #The CSV files are still being written, so just try again next time.
+                logger.error("Monitor for "+self.site_id+":"+self.probe_id
+                             + ": Couldn't write to readings archive! Exception: \n\n"
+                             + str(traceback.format_exc()))
+
+                self.archive.close(flush=False)
+
         return previous_reading, write_failed
 
+    def close_files(self):
+        """
+        This method writes any buffered readings, and closes the readings file
+        and the archive.
+
+        Usage:
+            >>> <BaseMonitorClassObject>.close_files()
+        """
+
+        self.writer.close()
+
+        if self.archive is not None:
+            self.archive.close()
+
     def manage_rotation(self, write_failed, previous_reading):
         """
         This method handles rotating the readings file, and recreating it if needed, for
@@ -427,18 +633,16 @@ class BaseMonitorClass(threading.Thread):
         should_continue = False
 
         #Check if the readings file is still there.
-        readings_file_exists = os.path.isfile(self.current_file_name)
-
-        #Check if it's time to rotate the readings file.
-        timediff = datetime.datetime.now() - self.midnight_tonight
+        readings_file_exists = not self.writer.file_deleted()
 
         #If it's time, or the previous file is gone, create a new
         #readings file.
-        if timediff.days > -1 or \
+        if self.writer.rotation_due() or \
             not readings_file_exists or \
             write_failed:
 
-            self.file_handle.close()
+            #Keep any buffered readings for the new file if the old one is unusable.
+            self.writer.close(flush=readings_file_exists and not write_failed)
             self.create_file_handle()
             previous_reading = None
 
@@ -449,8 +653,7 @@ class BaseMonitorClass(threading.Thread):
             print("Monitor for "+self.site_id+":"+self.probe_id
                   + ": Readings file gone! Creating new one...", level="error")
 
-            self.file_handle.write("WARNING: Previous readings file was "
-                                   + "deleted.\n")
+            self.writer.write("WARNING: Previous readings file was deleted.\n")
 
             #Take a new reading immediately.
             should_continue = True
@@ -462,7 +665,7 @@ class BaseMonitorClass(threading.Thread):
             print("Monitor for "+self.site_id+":"+self.probe_id
                   + ": Can't write to readings file! Creating new one...", level="error")
 
-            self.file_handle.write("WARNING: Couldn't write to previous readings file.\n")
+            self.writer.write("WARNING: Couldn't write to previous readings file.\n")
 
             #Take a new reading immediately.
             should_continue = True
@@ -484,15 +687,284 @@ class BaseMonitorClass(threading.Thread):
         #Helps thread to react faster.
         self.reading_interval = 0
 
+        if self.waiter is not None:
+            self.waiter.wake()
+
         while self.running:
             time.sleep(0.5)
 
+# ---------- Sampling Scheduler for Monitors ----------
+#The shared scheduler that takes readings for all the Monitors. Use get_scheduler().
+_SCHEDULER = None
+
+def get_scheduler():
+    """
+    This function returns the scheduler that takes readings for all the
+    Monitors, creating and starting a new one if needed (eg if the last one
+    has exited).
+
+    Returns:
+        SamplingScheduler.
+
+    Usage:
+        >>> scheduler = get_scheduler()
+    """
+
+    global _SCHEDULER #pylint: disable=global-statement
+
+    if _SCHEDULER is None or not _SCHEDULER.accepting:
+        _SCHEDULER = SamplingScheduler()
+
+    return _SCHEDULER
+
+class SamplingScheduler(threading.Thread):
+    """
+    This is a single thread that takes readings for all of the Monitors on
+    this pi, each one on its own reading interval. It keeps a heap of the times
+    each monitor is next due, and sleeps until the earliest one, rather than
+    having a thread per monitor waking up every second.
+
+    Probes that block for a long time when taking readings (slow readers) are
+    handed to a small pool of worker threads, so they don't hold up the other
+    monitors.
+
+    You shouldn't need to create one of these yourself - Monitors use
+    get_scheduler() to find the shared one.
+
+    Documentation for the constructor for objects of type SamplingScheduler:
+
+    Named args:
+        workers[=2] (int):          The number of worker threads for slow readers.
+
+    Invokes:
+        self.start() - starts the scheduler thread.
+
+    Usage:
+        >>> scheduler = SamplingScheduler()
+    """
+
+    def __init__(self, workers=2):
+        """The constructor, as documented above"""
+        threading.Thread.__init__(self)
+
+        #Protects the heap, and is used to wake the thread when it changes.
+        self.condition = threading.Condition()
+        self.waiter = coretools.IntervalWaiter(condition=self.condition)
+
+        #Heap of (due time, tie-breaker, monitor), using monotonic times from the clock.
+        self.heap = []
+        self.counter = itertools.count()
+
+        #All the monitors we are taking readings for.
+        self.monitors = []
+
+        #Worker threads for slow readers.
+        self.workers = ThreadPoolExecutor(max_workers=workers)
+
+        self.running = False
+
+        #Set to False once we've stopped taking readings for good.
+        self.accepting = True
+
+        self.start()
+
+    def add_monitor(self, monitor):
+        """
+        This method adds a monitor to the scheduler. The first reading is taken
+        straight away.
+
+        Args:
+            monitor (Monitor):      The monitor to take readings for.
+
+        Returns:
+            bool.
+
+                True  --    The monitor was added.
+                False --    The scheduler is exiting, so the monitor wasn't added.
+
+        Usage:
+            >>> <SamplingScheduler>.add_monitor(<Monitor>)
+            >>> True
+        """
+
+        with self.condition:
+            if not self.accepting:
+                return False
+
+            self.monitors.append(monitor)
+            self._schedule(monitor, clocktools.get_clock().monotonic())
+
+        return True
+
+    def reschedule(self, monitor):
+        """
+        This method works out when the given monitor is next due again, after its
+        reading interval has changed. If the monitor is busy taking a reading, the
+        new reading interval will be used when it finishes.
+
+        Args:
+            monitor (Monitor):      The monitor whose reading interval has changed.
+
+        Usage:
+            >>> <SamplingScheduler>.reschedule(<Monitor>)
+        """
+
+        with self.condition:
+            if monitor.busy or monitor not in self.monitors:
+                return
+
+            self._schedule(monitor, monitor.last_reading_time + monitor.reading_interval)
+
+    def is_running(self):
+        """
+        This method returns True if the scheduler is running, else False.
+
+        Usage:
+            >>> <SamplingScheduler>.is_running()
+            >>> True
+        """
+
+        return self.running
+
+    def _schedule(self, monitor, due):
+        """
+        PRIVATE, implementation detail.
+
+        Pushes the next due time for the monitor onto the heap, and wakes the
+        scheduler thread. Any earlier entry for this monitor becomes stale, and is
+        skipped. Must be called with self.condition held.
+        """
+
+        monitor.next_due = due
+        heapq.heappush(self.heap, (due, next(self.counter), monitor))
+        self.waiter.wake()
+
+    def _pop_due_monitors(self):
+        """
+        PRIVATE, implementation detail.
+
+        Pops all the monitors that are due now off the heap, and marks them as busy.
+        Must be called with self.condition held.
+        """
+
+        now = clocktools.get_clock().monotonic()
+        due_monitors = []
+
+        while self.heap and self.heap[0][0] <= now:
+            due, _, monitor = heapq.heappop(self.heap)
+
+            #Skip stale entries, left behind when monitors are rescheduled.
+            if due != monitor.next_due or monitor.busy or not monitor.running:
+                continue
+
+            monitor.busy = True
+            due_monitors.append(monitor)
+
+        return due_monitors
+
+    def _take_reading(self, monitor):
+        """
+        PRIVATE, implementation detail.
+
+        Takes a reading for the given monitor, and schedules the next one.
+        Stops the monitor if anything goes wrong.
+        """
+
+        start = clocktools.get_clock().monotonic()
+
+        try:
+            should_continue = monitor.take_reading()
+
+        except Exception:
+            #Log all of these errors to the log file.
+            logger.error("Exception \n\n"+str(traceback.format_exc())
+                         + "\n\nwhile running!")
+
+            print("Exception \n\n"+str(traceback.format_exc())
+                  +"\n\nwhile running!", level="error")
+
+            with self.condition:
+                monitor.busy = False
+                self.monitors.remove(monitor)
+
+            monitor.stop()
+            return
+
+        with self.condition:
+            monitor.busy = False
+            monitor.last_reading_time = start
+
+            if config.EXITING:
+                return
+
+            #Take a new reading immediately if asked, otherwise wait for the interval.
+            if should_continue:
+                self._schedule(monitor, clocktools.get_clock().monotonic())
+
+            else:
+                self._schedule(monitor, start + monitor.reading_interval)
+
+    def run(self):
+        """
+        This method is the body of the thread. It sleeps until the next monitor is
+        due, takes readings for all the monitors that are due, and then repeats
+        until config.EXITING is set.
+
+        Usage:
+
+            .. warning::
+                Only call me from within a constructor with start(). Do **NOT** call
+                me with run().
+
+            >>> self.start()
+        """
+
+        self.running = True
+
+        while not config.EXITING:
+            with self.condition:
+                due_monitors = self._pop_due_monitors()
+
+                if not due_monitors:
+                    #Sleep until the next monitor is due, or the heap changes.
+                    deadline = None
+
+                    if self.heap:
+                        deadline = self.heap[0][0]
+
+                    self.waiter.wait_until(deadline)
+                    continue
+
+            for monitor in due_monitors:
+                if monitor.slow_reader:
+                    self.workers.submit(self._take_reading, monitor)
+
+                else:
+                    self._take_reading(monitor)
+
+        #Wait for any slow readers to finish, then stop all the monitors.
+        self.workers.shutdown(wait=True)
+
+        with self.condition:
+            self.accepting = False
+            monitors = list(self.monitors)
+            self.monitors.clear()
+
+        for monitor in monitors:
+            monitor.stop()
+
+        self.running = False
+
 # ---------- Universal Monitor for all probe types ----------
 class Monitor(BaseMonitorClass):
     """
-    This is the universal monitor thread that is used to monitor all probe
+    This is the universal monitor that is used to monitor all probe
     types. It inherits from BaseMonitorClass. This is quite a simple class.
 
+    Rather than running its own thread, the monitor is added to the shared
+    SamplingScheduler, which calls take_reading() every <reading_interval>
+    seconds until config.EXITING is set.
+
     Documentation for constructor for objects of type Monitor:
 
     Args:
@@ -508,7 +980,7 @@ class Monitor(BaseMonitorClass):
 
     Invokes:
         Constructor for BaseMonitorClass.
-        self.start() - starts the monitor thread.
+        get_scheduler().add_monitor(self) - starts taking readings.
 
     Usage:
         >>> monitor = Monitor(<aProbeObject>, <aReadingInterval>, <anID>)
@@ -521,86 +993,96 @@ class Monitor(BaseMonitorClass):
         self.reading_interval = reading_interval
         self.reading_func = probe.get_reading
 
-        self.start()
+        #Slow readers are handed to the scheduler's worker threads.
+        self.slow_reader = getattr(probe, "slow_reader", False)
 
-    def run(self):
-        """
-        This method is the body of the thread. It does some setup and then
-        enters a monitor loop, where it checks for readings and adds them
-        to the queue at every interval of <reading_interval> seconds long.
+        #The last reading written to the readings file (not the same as prev_reading,
+        #which is for external users).
+        self.last_file_reading = None
 
-        The loop will continue to run until either it has taken the number
-        of readings that was asked of it, or it is asked to exit.
+        #Used by the scheduler.
+        self.busy = False
+        self.next_due = None
+        self.last_reading_time = clocktools.get_clock().monotonic()
 
-        Usage:
+        #Set up the readings file.
+        self.create_file_handle()
 
-            .. warning::
-                Only call me from within a constructor with start(). Do **NOT** call
-                me with run(), and **ABSOLUTELY DO NOT** call me outside a constructor
-                for objects of this type.
+        self.running = True
 
-            .. warning::
-                Doing the above could cause any number of strange and unstable
-                situations to occur. Running self.start() is the only way (with the
-                threading library) to start a new thread.
+        #If the scheduler is exiting, we stop straight away as well.
+        self.scheduler = get_scheduler()
 
-            >>> self.start()
+        if not self.scheduler.add_monitor(self):
+            self.stop()
+
+    def set_reading_interval(self, interval):
+        """
+        This method sets the reading interval, with immediate effect (ie, if
+        the monitor is currently waiting using the reading interval, it will
+        NOT continue to wait for the whole length of the old reading interval).
+
+        Args:
+            interval:   New reading interval, in seconds.
 
+        Usage:
+            >>> <Monitor>.set_reading_interval(<AnInteger>)
         """
 
-        previous_reading = None #NB: Just to use here, rather then self.prev_reading,
-                                #which is for external users.
-        self.running = True
+        self.reading_interval = interval
+        self.scheduler.reschedule(self)
 
-        write_failed = False
+    def take_reading(self):
+        """
+        This method takes a single reading from the probe, posts it to the
+        readings blackboard, and writes it to the readings file and database.
+        It is called by the scheduler - you shouldn't need to call it yourself.
 
-        #Set up the readings file.
-        self.create_file_handle()
+        Returns:
+            bool.
 
-        try:
-            while not config.EXITING:
-                the_reading, status_text = self.reading_func()
+                True  --    Take another reading immediately (eg the readings
+                            file had to be recreated).
+                False --    Wait for the reading interval as usual.
 
-                #Construct a Reading object to hold this info.
-                #Args in order: Time, Tick, ID, Value, Status
-                reading = coretools.Reading(time.strftime("%Y-%m-%d %H:%M:%S", time.localtime()),
-                                            config.TICK,
-                                            self.probe.get_id(),
-                                            str(the_reading), status_text)
+        Usage:
+            >>> <Monitor>.take_reading()
+            >>> False
+        """
 
-                #Add it to the queue.
-                self.queue.append(reading)
+        the_reading, status_text = self.reading_func()
 
-                previous_reading, write_failed = self.handle_reading(reading, previous_reading)
+        #Construct a Reading object to hold this info.
+        #Args in order: Time, Tick, ID, Value, Status
+        #Whole seconds, as in the readings files.
+        reading = coretools.Reading(int(clocktools.get_clock().time()),
+                                    config.TICK,
+                                    self.probe.get_id(),
+                                    str(the_reading), status_text)
 
-                previous_reading, should_continue = self.manage_rotation(write_failed,
-                                                                         previous_reading)
+        #Post it to the blackboard, and send it to any sites that want it.
+        coretools.publish_reading(reading)
 
-                if should_continue:
-                    continue
+        self.last_file_reading, write_failed = self.handle_reading(reading,
+                                                                   self.last_file_reading)
 
-                #Take readings every however often it is.
-                #I know we could use a long time.sleep(),
-                #but this MUST be responsive to changes in the reading interval.
-                count = 0
+        self.last_file_reading, should_continue = self.manage_rotation(write_failed,
+                                                                       self.last_file_reading)
 
-                while count < self.reading_interval:
-                    #This way, if our reading interval changes,
-                    #the code will respond to the change immediately.
-                    time.sleep(1)
-                    count += 1
+        return should_continue
 
-        except Exception:
-            #Log all of these errors to the log file.
-            logger.error("Exception \n\n"+str(traceback.format_exc())
-                         + "\n\nwhile running!")
+    def stop(self):
+        """
+        This method is called by the scheduler when the monitor stops, either
+        because config.EXITING was set, or because an error occurred.
 
-            print("Exception \n\n"+str(traceback.format_exc())
-                  +"\n\nwhile running!", level="error")
+        Usage:
+            >>> <Monitor>.stop()
+        """
 
         logger.debug("Monitor for "+self.site_id+":"+self.probe_id+": Exiting...")
 
-        self.file_handle.close()
+        self.close_files()
         self.running = False
 
 # ---------- Universal Sockets Monitor for all probe types over Sockets ----------
@@ -614,6 +1096,10 @@ class SocketsMonitor(BaseMonitorClass):
         This class may eventually be removed  as it is no longer used, seeing as
         we now have the database in the NAS box for storing readings.
 
+    The monitor subscribes to its probe's readings on the socket, so it only
+    ever sees its own readings, and several monitors can share one socket
+    without waiting for each other.
+
     Documentation for constructor for objects of type SocketsMonitor:
 
     Args:
@@ -639,13 +1125,17 @@ class SocketsMonitor(BaseMonitorClass):
         self.socket = socket
         self.probe_id = probe_id
 
+        #Only this probe's readings are routed to us.
+        self.subscription = self.socket.subscribe(self.site_id+":"+self.probe_id)
+        self.waiter = self.subscription.waiter
+
         self.start()
 
     def run(self):
         """
         This method is the body of the thread. It does some setup and then
-        enters a monitor loop, where it checks for readings and adds them
-        to the queue every second (to avoid delays in logging over the network).
+        enters a monitor loop, where it checks for readings and posts them
+        to the readings blackboard as soon as they arrive on the socket.
 
         The loop will continue to run until it is asked to exit.
 
@@ -676,40 +1166,27 @@ class SocketsMonitor(BaseMonitorClass):
 
         try:
             while not config.EXITING:
-                while self.socket.has_data():
-                    try:
-                        reading = self.socket.read()
-
-                    except IndexError:
-                        break
-
-                    if not isinstance(reading, coretools.Reading):
-                        break
-
-                    #Check the reading is from the right probe.
-                    #NB: Could check site ID, but we'll have a socket for each one, so a non-issue.
-                    if reading.get_sensor_id() == self.probe_id:
-                        previous_reading, write_failed = self.handle_reading(reading,
-                                                                             previous_reading)
+                #Sleep until a reading arrives.
+                if not self.subscription.wait():
+                    continue
 
-                        previous_reading, should_continue = self.manage_rotation(write_failed,
-                                                                                 previous_reading)
+                reading = self.subscription.read()
 
-                        if should_continue:
-                            continue
+                previous_reading, write_failed = self.handle_reading(reading,
+                                                                     previous_reading)
 
-                        #Remove the reading from the socket's queue.
-                        self.socket.pop()
+                previous_reading, should_continue = self.manage_rotation(write_failed,
+                                                                         previous_reading)
 
-                        #Add it to the queue.
-                        self.queue.append(reading)
+                #Handle the same reading again if the readings file was recreated.
+                if should_continue:
+                    continue
 
-                    else:
-                        #Wait a bit for the other monitor(s) to pick it up.
-                        time.sleep(0.1)
+                #Remove the reading from our queue.
+                self.subscription.pop()
 
-                #Check every 1 second (prevent delays in logging at sump pi end).
-                time.sleep(1)
+                #Post it to the blackboard.
+                config.LATESTREADINGS.post(reading)
 
         except Exception:
             #Log all of these errors to the log file.
@@ -721,5 +1198,6 @@ class SocketsMonitor(BaseMonitorClass):
 
         logger.debug("SocketsMonitor for "+self.site_id+":"+self.probe_id+": Exiting...")
 
-        self.file_handle.close()
+        self.socket.unsubscribe(self.subscription)
+        self.close_files()
         self.running = False
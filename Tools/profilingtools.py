@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Profiling Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the profilingtools module, which contains the control cycle profiler. main.py
+times each phase of every trip around its main loop - getting the local readings,
+running the control logic (and, separately, the database queries the logic makes),
+and waiting for the next reading interval - and the profiler keeps rolling
+percentiles of each, so we can tell when a site's cycle is close to overrunning
+its reading interval.
+
+A warning is logged whenever the control logic takes more than
+config.LOGIC_OVERRUN_SHARE of the reading interval. A summary of the percentiles
+is logged every window of cycles.
+
+The profiler can also record a trace of a window of cycles, which is written as
+Chrome trace JSON, and can be viewed in chrome://tracing or https://ui.perfetto.dev.
+See the --trace option in main.py.
+
+Phases are timed with time.perf_counter(), not the clock service, because the point
+is to measure how long the code really takes, even when virtual time is in use.
+
+Usage:
+    >>> profiler = CycleProfiler("G4")
+    >>> profiler.start_cycle()
+    >>> profiler.start_phase(LOGIC)
+    >>> profiler.end_phase()
+    >>> profiler.end_cycle(15)
+
+.. module:: profilingtools.py
+    :platform: Linux
+    :synopsis: The control cycle profiler.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+import json
+import math
+import os
+import threading
+import time
+import logging
+from collections import deque
+
+import config
+
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#The phases of the main loop. DATABASE is the time spent in database queries made
+#by the control logic, which is included in LOGIC too. CYCLE is the whole trip
+#around the loop.
+READINGS = "readings"
+LOGIC = "logic"
+DATABASE = "database"
+WAIT = "wait"
+CYCLE = "cycle"
+
+PHASES = (READINGS, LOGIC, DATABASE, WAIT, CYCLE)
+
+#The number of cycles the percentiles are worked out over, and that a summary is
+#logged after.
+DEFAULT_WINDOW = 100
+
+#The percentiles reported.
+PERCENTILES = (50, 90, 99)
+
+class CycleProfiler:
+    """
+    This class times the phases of the main loop, as described in the module
+    documentation. It should be used from the thread that runs the main loop.
+
+    Documentation for the constructor for objects of type CycleProfiler:
+
+    Args:
+        site_id (str):              The ID of the site being profiled.
+
+    Named args:
+        window[=DEFAULT_WINDOW] (int):      The number of cycles to keep timings for.
+
+        overrun_share[=None] (float):       The share of the reading interval the
+                                            control logic can take before a warning
+                                            is logged. If None,
+                                            config.LOGIC_OVERRUN_SHARE is used.
+
+    Usage:
+        >>> CycleProfiler("G4")
+    """
+
+    def __init__(self, site_id, window=DEFAULT_WINDOW, overrun_share=None):
+        """The constructor, as documented above"""
+        if overrun_share is None:
+            overrun_share = config.LOGIC_OVERRUN_SHARE
+
+        if not isinstance(window, int) or isinstance(window, bool) or window <= 0:
+            raise ValueError("Invalid window: "+str(window))
+
+        if not isinstance(overrun_share, (int, float)) or overrun_share <= 0:
+            raise ValueError("Invalid overrun share: "+str(overrun_share))
+
+        self.site_id = site_id
+        self.window = window
+        self.overrun_share = overrun_share
+
+        #Protects the timings and counts, which get_stats() can be called for from
+        #any thread.
+        self.lock = threading.Lock()
+
+        #The durations of each phase, in seconds, for the last window cycles.
+        self.timings = {phase: deque(maxlen=window) for phase in PHASES}
+
+        self.cycles = 0
+        self.overruns = 0
+
+        #The thread running the main loop, and the cycle and phase in progress.
+        self.thread = None
+        self.cycle_start = None
+        self.phase = None
+        self.phase_start = None
+
+        #The durations of the phases in this cycle, and the number of database queries.
+        self.durations = {}
+        self.queries = 0
+
+        #The trace being recorded, if any.
+        self.trace_file = None
+        self.trace_cycles = 0
+        self.trace_start = None
+        self.trace_events = []
+
+    def start_cycle(self):
+        """
+        This method marks the start of a trip around the main loop.
+
+        Usage:
+            >>> <CycleProfiler>.start_cycle()
+        """
+
+        self.thread = threading.current_thread()
+        self.cycle_start = time.perf_counter()
+        self.durations = {}
+        self.queries = 0
+
+    def start_phase(self, phase):
+        """
+        This method marks the start of a phase of the cycle, ending the phase in
+        progress, if there is one.
+
+        Args:
+            phase (str):            The phase, eg LOGIC.
+
+        Usage:
+            >>> <CycleProfiler>.start_phase(LOGIC)
+        """
+
+        self.end_phase()
+
+        self.phase = phase
+        self.phase_start = time.perf_counter()
+
+    def end_phase(self):
+        """
+        This method marks the end of the phase in progress.
+
+        Usage:
+            >>> <CycleProfiler>.end_phase()
+        """
+
+        if self.phase is None:
+            return
+
+        end = time.perf_counter()
+
+        self.durations[self.phase] = self.durations.get(self.phase, 0) + end - self.phase_start
+        self._add_trace_event(self.phase, self.phase_start, end)
+
+        self.phase = None
+
+    def add_query(self, start, end):
+        """
+        This method records a database query. It is called by
+        DatabaseConnection.do_query(), and queries are only counted if they are made
+        by the control logic.
+
+        Args:
+            start (float):          When the query started, from time.perf_counter().
+            end (float):            When it finished, from time.perf_counter().
+
+        Usage:
+            >>> <CycleProfiler>.add_query(<float>, <float>)
+        """
+
+        if self.phase != LOGIC or threading.current_thread() is not self.thread:
+            return
+
+        self.durations[DATABASE] = self.durations.get(DATABASE, 0) + end - start
+        self.queries += 1
+
+        self._add_trace_event(DATABASE, start, end)
+
+    def end_cycle(self, reading_interval):
+        """
+        This method marks the end of a trip around the main loop, records the
+        timings, and logs a warning if the control logic took too long.
+
+        Args:
+            reading_interval (float):       The reading interval for this cycle, in
+                                            seconds.
+
+        Usage:
+            >>> <CycleProfiler>.end_cycle(15)
+        """
+
+        if self.cycle_start is None:
+            return
+
+        self.end_phase()
+
+        end = time.perf_counter()
+        self.durations[CYCLE] = end - self.cycle_start
+
+        #The database time is only meaningful if the logic ran.
+        if LOGIC in self.durations:
+            self.durations.setdefault(DATABASE, 0)
+
+        self._add_trace_event(CYCLE, self.cycle_start, end, {"cycle": self.cycles,
+                                                             "queries": self.queries})
+
+        with self.lock:
+            for phase, duration in self.durations.items():
+                self.timings[phase].append(duration)
+
+            self.cycles += 1
+
+        self.cycle_start = None
+
+        logic_time = self.durations.get(LOGIC, 0)
+
+        if logic_time > reading_interval * self.overrun_share:
+            with self.lock:
+                self.overruns += 1
+
+            message = "Control logic for "+self.site_id+" took " \
+                      + format_duration(logic_time)+" ("+format_duration(self.durations[DATABASE]) \
+                      + " in "+str(self.queries)+" database queries), more than " \
+                      + str(round(self.overrun_share * 100))+"% of the " \
+                      + str(reading_interval)+" second reading interval!"
+
+            logger.warning(message)
+            print(message, level="warning")
+
+        if self.cycles % self.window == 0:
+            logger.info("Cycle timings for "+self.site_id+" over the last "
+                        + str(self.window)+" cycles:\n"+self.format_stats())
+
+        if self.trace_file is not None and self.cycles - self.trace_start >= self.trace_cycles:
+            self.stop_trace()
+
+    def get_percentiles(self, phase):
+        """
+        This method returns the percentiles for a phase, over the last window cycles.
+
+        Args:
+            phase (str):            The phase, eg LOGIC.
+
+        Returns:
+            dict.       The duration in seconds for each of PERCENTILES, and "max".
+                        Empty if the phase hasn't been timed yet.
+
+        Usage:
+            >>> <CycleProfiler>.get_percentiles(LOGIC)
+            >>> {50: 0.012, 90: 0.03, 99: 0.2, "max": 0.2}
+        """
+
+        with self.lock:
+            durations = sorted(self.timings[phase])
+
+        if not durations:
+            return {}
+
+        percentiles = {}
+
+        #Nearest-rank percentiles.
+        for percentile in PERCENTILES:
+            percentiles[percentile] = durations[max(math.ceil(percentile / 100
+                                                              * len(durations)) - 1, 0)]
+
+        percentiles["max"] = durations[-1]
+
+        return percentiles
+
+    def get_stats(self):
+        """
+        This method returns the profiler's statistics.
+
+        Returns:
+            dict. With:
+
+            - "site_id".
+            - "cycles" - the number of cycles profiled.
+            - "overruns" - the number of cycles the control logic took too long in.
+            - "phases" - the percentiles for each phase that has been timed, as
+              from get_percentiles().
+
+        Usage:
+            >>> <CycleProfiler>.get_stats()
+            >>> {"site_id": "G4", "cycles": 100, "overruns": 0, "phases": {...}}
+        """
+
+        phases = {}
+
+        for phase in PHASES:
+            percentiles = self.get_percentiles(phase)
+
+            if percentiles:
+                phases[phase] = percentiles
+
+        with self.lock:
+            return {"site_id": self.site_id, "cycles": self.cycles,
+                    "overruns": self.overruns, "phases": phases}
+
+    def format_stats(self):
+        """
+        This method formats the percentiles for each phase, to be logged.
+
+        Returns:
+            str.        A line for each phase that has been timed.
+
+        Usage:
+            >>> <CycleProfiler>.format_stats()
+            >>> "logic: p50 12.0 ms, p90 30.0 ms, p99 200.0 ms, max 200.0 ms\\n..."
+        """
+
+        lines = []
+
+        for phase, percentiles in self.get_stats()["phases"].items():
+            lines.append(phase+": "
+                         + ", ".join(["p"+str(percentile)+" "
+                                      + format_duration(percentiles[percentile])
+                                      for percentile in PERCENTILES])
+                         + ", max "+format_duration(percentiles["max"]))
+
+        return "\n".join(lines)
+
+    # ---------- Tracing ----------
+    def start_trace(self, filename, cycles):
+        """
+        This method starts recording a trace of the next few cycles. When they are
+        done, the trace is written to the given file as Chrome trace JSON.
+
+        Args:
+            filename (str):         Where to write the trace.
+            cycles (int):           The number of cycles to trace.
+
+        Throws:
+            ValueError, if cycles isn't a positive int.
+
+        Usage:
+            >>> <CycleProfiler>.start_trace("trace.json", 20)
+        """
+
+        if not isinstance(cycles, int) or isinstance(cycles, bool) or cycles <= 0:
+            raise ValueError("Invalid number of cycles: "+str(cycles))
+
+        self.trace_file = filename
+        self.trace_cycles = cycles
+        self.trace_start = self.cycles
+        self.trace_events = [{"name": "process_name", "ph": "M", "pid": os.getpid(),
+                              "args": {"name": self.site_id}}]
+
+        logger.info("Tracing the next "+str(cycles)+" cycles to "+filename+"...")
+
+    def stop_trace(self):
+        """
+        This method stops recording the trace, and writes it to the file. Does
+        nothing if a trace isn't being recorded.
+
+        Usage:
+            >>> <CycleProfiler>.stop_trace()
+        """
+
+        if self.trace_file is None:
+            return
+
+        filename = self.trace_file
+        self.trace_file = None
+
+        try:
+            with open(filename, "w", encoding="utf-8") as trace_file:
+                json.dump({"traceEvents": self.trace_events, "displayTimeUnit": "ms"},
+                          trace_file)
+
+        except OSError as error:
+            logger.error("Couldn't write the cycle trace to "+filename+": "+str(error))
+            print("Couldn't write the cycle trace to "+filename+": "+str(error),
+                  level="error")
+
+        else:
+            logger.info("Wrote the cycle trace to "+filename)
+
+        self.trace_events = []
+
+    def _add_trace_event(self, name, start, end, args=None):
+        """
+        PRIVATE, implementation detail.
+
+        Adds a complete event to the trace, if one is being recorded.
+        """
+
+        if self.trace_file is None:
+            return
+
+        event = {"name": name, "cat": self.site_id, "ph": "X", "pid": os.getpid(),
+                 "tid": self.thread.ident, "ts": start * 1000000,
+                 "dur": (end - start) * 1000000}
+
+        if args is not None:
+            event["args"] = args
+
+        self.trace_events.append(event)
+
+def format_duration(seconds):
+    """
+    This function formats a duration in milliseconds, for logging.
+
+    Args:
+        seconds (float):            The duration, in seconds.
+
+    Returns:
+        str.        The formatted duration.
+
+    Usage:
+        >>> format_duration(0.0123)
+        >>> "12.3 ms"
+    """
+
+    return str(round(seconds * 1000, 1))+" ms"
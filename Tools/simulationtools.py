@@ -0,0 +1,1088 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Simulation Tools for the River System Control and Monitoring Software
+# Copyright (C) 2017-2022 Wimborne Model Town
+# This program is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License version 3 or,
+# at your option, any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+#pylint: disable=logging-not-lazy
+#
+#Reason (logging-not-lazy): Harder to understand the logging statements that way.
+
+"""
+This is the simulationtools module, which runs the whole river system on one machine,
+for load and latency testing. The NAS box and every site in config.SITE_SETTINGS are
+started as separate processes, each running main.run() as it would on the pis, but:
+
+- Every 192.168.0.x address is replaced with the loopback address 127.0.0.x, so the
+  sites talk to each other over loopback sockets.
+- The hardware on each site is simulated with testingtools, with a tank for each
+  hall effect probe that slowly fills and empties.
+- The MySQL database is replaced with an in-memory sqlite database, shared by all the
+  sites through a multiprocessing manager.
+
+Extra synthetic sites (copies of G4) can be added, to see how the NAS box copes with
+more pis than we have today.
+
+Each site sends statistics back to the harness every few seconds - when each reading
+was posted on its blackboard, and the message counts and queue depths from its sockets
+and database connection. SiteSimulation uses these to report the end-to-end latency of
+readings, the NAS box's CPU and memory use, queue depths, and message rates.
+
+.. note::
+    This is meant to be run on a development machine, not on the pis. It still needs
+    the MySQLdb module to be importable, and the ping command to be available.
+
+Usage:
+    >>> simulation = SiteSimulation(extra_sites=10)
+    >>> simulation.start()
+    >>> simulation.update()
+    >>> print(format_report(simulation.get_report()))
+    >>> simulation.stop()
+
+.. module:: simulationtools.py
+    :platform: Linux
+    :synopsis: Runs the whole river system on one machine, for load and latency testing.
+
+.. moduleauthor:: Hamish McIntyre-Bhatty <contact@hamishmb.com>
+
+"""
+
+import copy
+import datetime
+import math
+import multiprocessing
+import os
+import queue
+import signal
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+import zlib
+import logging
+from multiprocessing.managers import BaseManager
+
+import psutil
+
+import config
+from Tools import testingtools
+
+from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+for handler in logging.getLogger('River System Control Software').handlers:
+    logger.addHandler(handler)
+
+def reconfigure_logger():
+    """
+    Reconfigures the logging level for this module.
+    """
+
+    logger.setLevel(logging.getLogger('River System Control Software').getEffectiveLevel())
+
+    for _handler in logging.getLogger('River System Control Software').handlers:
+        logger.addHandler(_handler)
+
+#How often each site reports its statistics, in seconds.
+REPORT_INTERVAL = 10
+
+#The site that synthetic sites are copied from.
+TEMPLATE_SITE = "G4"
+
+#The simulated tanks start half full, and fill and empty at this rate, in mm per second,
+#changing direction every TANK_PERIOD seconds.
+TANK_LEVEL = 500
+TANK_RATE = 1
+TANK_PERIOD = 300
+
+#The rate each pump changes the level in its tank at, in mm per second.
+PUMP_RATE = -2
+
+#The levels the low and high float switches trigger at, in mm.
+LOW_FLOAT_SWITCH_LEVEL = 100
+HIGH_FLOAT_SWITCH_LEVEL = 900
+
+#The temperatures the simulated NAS box reports, in degrees C (system board, HDD 0, HDD 1).
+STANDIN_TEMPERATURES = ("35", "38", "37")
+
+#The tables in the database, as created by the real database's setup scripts.
+READINGS_TABLE = """CREATE TABLE `{}Readings` (`ID` INTEGER PRIMARY KEY AUTOINCREMENT, """ \
+                 + """`Probe ID` TEXT, `Tick` INTEGER, `Measure Time` DATETIME, """ \
+                 + """`Value` TEXT, `Status` TEXT);"""
+
+CONTROL_TABLE = """CREATE TABLE `{}Control` (`ID` INTEGER PRIMARY KEY AUTOINCREMENT, """ \
+                + """`Device ID` TEXT, `Device Status` TEXT, `Request` TEXT, """ \
+                + """`Locked By` TEXT);"""
+
+SYSTEM_TABLES = (
+    """CREATE TABLE `SystemStatus` (`ID` INTEGER PRIMARY KEY AUTOINCREMENT, """
+    + """`System ID` TEXT, `Pi Status` TEXT, `Software Status` TEXT, """
+    + """`Current Action` TEXT);""",
+
+    """CREATE TABLE `SystemTick` (`ID` INTEGER PRIMARY KEY AUTOINCREMENT, """
+    + """`Tick` INTEGER, `System Time` DATETIME);""",
+
+    """CREATE TABLE `EventLog` (`ID` INTEGER PRIMARY KEY AUTOINCREMENT, """
+    + """`Site ID` TEXT, `Severity` TEXT, `Event` TEXT, `Device Time` DATETIME);""",
+)
+
+# ---------- SITE SETTINGS ----------
+def get_loopback_address(address):
+    """
+    This function returns the loopback address that stands in for a site's address,
+    eg 127.0.0.4 for 192.168.0.4. Other addresses are returned unchanged.
+
+    Args:
+        address (str):              The address.
+
+    Returns:
+        str.        The loopback address.
+
+    Usage:
+        >>> get_loopback_address("192.168.0.4")
+        >>> "127.0.0.4"
+    """
+
+    if not address.startswith("192.168.0."):
+        return address
+
+    return "127.0.0."+address.split(".")[-1]
+
+def localise_settings(extra_sites=0, port_offset=0):
+    """
+    This function changes config.SITE_SETTINGS so every site runs on this machine -
+    every address is replaced with a loopback address, and the server ports can be
+    moved out of the way of anything else that's running.
+
+    It also adds the given number of synthetic sites, copied from TEMPLATE_SITE, with
+    the IDs SYN1, SYN2, and so on, and the addresses 127.0.1.1, 127.0.1.2, and so on.
+    Each one subscribes to the same sensors as the template site, and to the probes of
+    the next synthetic site, so that the NAS box has readings to forward for all of
+    them.
+
+    Named args:
+        extra_sites[=0] (int):      The number of synthetic sites to add.
+        port_offset[=0] (int):      Added to every site's server port.
+
+    Throws:
+        ValueError, if the arguments aren't valid.
+
+    Usage:
+        >>> localise_settings(extra_sites=10, port_offset=1000)
+    """
+
+    if not isinstance(extra_sites, int) or extra_sites < 0:
+        raise ValueError("Invalid number of extra sites: "+str(extra_sites))
+
+    if not isinstance(port_offset, int) or port_offset < 0:
+        raise ValueError("Invalid port offset: "+str(port_offset))
+
+    for site_settings in config.SITE_SETTINGS.values():
+        site_settings["IPAddress"] = get_loopback_address(site_settings["IPAddress"])
+        site_settings["DBHost"] = get_loopback_address(site_settings["DBHost"])
+
+        if "ServerAddress" in site_settings:
+            site_settings["ServerAddress"] = get_loopback_address(site_settings["ServerAddress"])
+            site_settings["ServerPort"] += port_offset
+
+    template = copy.deepcopy(config.SITE_SETTINGS[TEMPLATE_SITE])
+
+    for number in range(1, extra_sites+1):
+        site_id = "SYN"+str(number)
+
+        config.SITE_SETTINGS[site_id] = _make_synthetic_site(template, site_id, number,
+                                                             port_offset)
+
+    #Subscribe each synthetic site to the next one's probes.
+    for number in range(1, extra_sites+1):
+        next_id = "SYN"+str(number % extra_sites + 1)
+
+        if next_id == "SYN"+str(number):
+            next_id = TEMPLATE_SITE
+
+        config.SITE_SETTINGS["SYN"+str(number)]["RemoteSensors"] += \
+            list(config.SITE_SETTINGS[next_id]["Probes"])
+
+def _make_synthetic_site(template, site_id, number, port_offset):
+    """
+    PRIVATE, implementation detail.
+
+    Returns the settings for a synthetic site, copied from the template site's.
+    """
+
+    site_settings = copy.deepcopy(template)
+
+    site_settings["ID"] = site_id
+    site_settings["Name"] = template["Name"]+" (synthetic "+str(number)+")"
+    site_settings["IPAddress"] = "127.0.1."+str(number)
+    site_settings["RemoteSensors"] = list(template.get("RemoteSensors", ()))
+    site_settings["ServerPort"] = 31000 + number + port_offset
+    site_settings["SocketName"] = "Synthetic Site "+str(number)+" Socket"
+    site_settings["SocketID"] = "SYNSOCK"+str(number)
+
+    #The control logic refers to the template site's devices, so don't run it.
+    site_settings.pop("ControlLogicFunction", None)
+    site_settings.pop("ControlLogicSetupFunction", None)
+
+    for dictionary in ("Probes", "Devices"):
+        renamed = {}
+
+        for device_id, device_settings in site_settings[dictionary].items():
+            device_id = site_id+":"+device_id.split(":")[1]
+            device_settings["ID"] = device_id
+            renamed[device_id] = device_settings
+
+        site_settings[dictionary] = renamed
+
+    return site_settings
+
+# ---------- HARDWARE ----------
+def build_simulator(site_id, clock=time.monotonic):
+    """
+    This function builds a simulation of the hardware at a site. Each hall effect
+    probe gets a tank, which slowly fills and empties, and the float switches and pumps
+    listed after it are put in the same tank. Gate valves are simulated on their own.
+
+    Args:
+        site_id (str):              The site ID.
+
+    Named args:
+        clock[=time.monotonic] (function):  The simulator's clock.
+
+    Returns:
+        testingtools.Simulator.     The simulator, ready to be installed.
+
+    Usage:
+        >>> testingtools.install(build_simulator("G4"))
+    """
+
+    simulator = testingtools.Simulator(clock, seed=zlib.crc32(site_id.encode("utf-8")))
+    site_settings = config.SITE_SETTINGS[site_id]
+    tank = None
+
+    for probe_settings in site_settings["Probes"].values():
+        if probe_settings["Type"] == "Hall Effect Probe":
+            tank = testingtools.WaterTank(simulator, level=TANK_LEVEL)
+            tank.set_rate(TANK_RATE)
+            _schedule_reversal(simulator, tank)
+
+            testingtools.HallEffectProbeModel(tank, probe_settings["ADCAddress"],
+                                              (probe_settings["HighLimits"],
+                                               probe_settings["LowLimits"]))
+
+        elif probe_settings["Type"] == "Float Switch" and tank is not None:
+            if "Low" in probe_settings["Name"]:
+                trigger_level = LOW_FLOAT_SWITCH_LEVEL
+
+            else:
+                trigger_level = HIGH_FLOAT_SWITCH_LEVEL
+
+            testingtools.FloatSwitchModel(tank, probe_settings["Pins"], trigger_level)
+
+    for device_settings in site_settings["Devices"].values():
+        if device_settings["Type"] == "Gate Valve":
+            testingtools.GateValveModel(simulator, device_settings["Pins"],
+                                        device_settings["ADCAddress"])
+
+        elif device_settings["Type"] == "Motor" and tank is not None:
+            tank.add_pump(device_settings["Pins"], PUMP_RATE)
+
+    return simulator
+
+def _schedule_reversal(simulator, tank):
+    """
+    PRIVATE, implementation detail.
+
+    Makes the tank change between filling and emptying every TANK_PERIOD seconds.
+    """
+
+    def reverse(_simulator):
+        tank.rate = -tank.rate
+        _schedule_reversal(simulator, tank)
+
+    simulator.schedule(TANK_PERIOD, reverse)
+
+# ---------- DATABASE ----------
+class StandInDatabase:
+    """
+    This class stands in for the MySQL database, using an in-memory sqlite database
+    with the same tables. sqlite understands almost all of the queries that dbtools
+    makes - the few MySQL functions it doesn't have are added, and table repairs are
+    ignored.
+
+    Documentation for the constructor for objects of type StandInDatabase:
+
+    Args:
+        site_ids (list<str>):       The sites to create tables for.
+
+    Usage:
+        >>> database = StandInDatabase(config.SITE_SETTINGS)
+        >>> database.execute("SELECT * FROM `SystemTick`;")
+        >>> []
+    """
+
+    def __init__(self, site_ids):
+        """The constructor, as documented above"""
+        sqlite3.register_converter("DATETIME", _to_datetime)
+
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False,
+                                          detect_types=sqlite3.PARSE_DECLTYPES)
+
+        self.connection.create_function("NOW", 0, _now)
+        self.connection.create_function("FLOOR", 1, math.floor)
+        self.connection.create_function("TIME_TO_SEC", 1, _time_to_sec)
+
+        #Protects the connection and the counts.
+        self.lock = threading.Lock()
+
+        self.queries = 0
+        self.errors = 0
+
+        for query in SYSTEM_TABLES:
+            self.connection.execute(query)
+
+        for site_id in site_ids:
+            self.connection.execute(READINGS_TABLE.format(site_id))
+            self.connection.execute(CONTROL_TABLE.format(site_id))
+
+        self.connection.commit()
+
+    def execute(self, query):
+        """
+        This method runs a query.
+
+        Args:
+            query (str):            The query, as sent to MySQL.
+
+        Returns:
+            list<tuple>.    The rows returned, if any.
+
+        Throws:
+            sqlite3.Error, if the query failed.
+
+        Usage:
+            >>> <StandInDatabase>.execute("SELECT * FROM `SystemTick`;")
+            >>> [(1, 5, datetime(2020, 9, 30, 0, 0, 5))]
+        """
+
+        with self.lock:
+            self.queries += 1
+
+            if query.lstrip().upper().startswith("REPAIR TABLE"):
+                return []
+
+            try:
+                cursor = self.connection.execute(query)
+                rows = cursor.fetchall()
+                self.connection.commit()
+
+            except sqlite3.Error:
+                self.errors += 1
+                raise
+
+            return rows
+
+    def get_stats(self):
+        """
+        This method returns the number of queries run, and the number that failed.
+
+        Returns:
+            dict.       With the keys "queries" and "errors".
+
+        Usage:
+            >>> <StandInDatabase>.get_stats()
+            >>> {"queries": 1024, "errors": 0}
+        """
+
+        with self.lock:
+            return {"queries": self.queries, "errors": self.errors}
+
+def _to_datetime(value):
+    """
+    PRIVATE, implementation detail.
+
+    Converts a DATETIME column to a datetime, like MySQLdb does.
+    """
+
+    try:
+        return datetime.datetime.fromisoformat(value.decode("utf-8"))
+
+    except ValueError:
+        return value.decode("utf-8")
+
+def _now():
+    """
+    PRIVATE, implementation detail.
+
+    MySQL's NOW() function.
+    """
+
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def _time_to_sec(value):
+    """
+    PRIVATE, implementation detail.
+
+    MySQL's TIME_TO_SEC() function, for DATETIME values.
+    """
+
+    hours, minutes, seconds = str(value).split(" ")[-1].split(":")
+
+    return int(hours) * 3600 + int(minutes) * 60 + int(float(seconds))
+
+#The database shared by all the sites, in the harness process.
+DATABASE = None
+
+def get_database():
+    """
+    This function returns the database shared by all the sites. Used by the
+    DatabaseManager.
+    """
+
+    return DATABASE
+
+class DatabaseManager(BaseManager):
+    """
+    This class shares the StandInDatabase in the harness process with the sites.
+    """
+
+DatabaseManager.register("get_database", callable=get_database)
+
+class StandInMySQL:
+    """
+    This class stands in for the MySQLdb module in each site's process, and sends
+    the queries to the StandInDatabase in the harness process. It only does what
+    dbtools needs.
+
+    Documentation for the constructor for objects of type StandInMySQL:
+
+    Args:
+        address (tuple):            The address of the DatabaseManager.
+        authkey (bytes):            The DatabaseManager's authentication key.
+
+    Usage:
+        >>> dbtools.mysql = StandInMySQL(("127.0.0.1", 50000), b"key")
+    """
+
+    #Errors from the database, as caught by dbtools.
+    _exceptions = types.SimpleNamespace(Error=sqlite3.Error)
+
+    def __init__(self, address, authkey):
+        """The constructor, as documented above"""
+        self.address = address
+        self.authkey = authkey
+
+    def connect(self, **kwargs): #pylint: disable=unused-argument
+        """
+        This method connects to the database. The arguments for MySQL are ignored.
+
+        Returns:
+            StandInConnection.
+
+        Throws:
+            sqlite3.Error, if the harness can't be reached.
+
+        Usage:
+            >>> <StandInMySQL>.connect(host="127.0.0.25", port=3306, ...)
+        """
+
+        manager = DatabaseManager(address=self.address, authkey=self.authkey)
+
+        try:
+            manager.connect()
+
+        except (OSError, multiprocessing.AuthenticationError) as error:
+            raise sqlite3.OperationalError("Can't reach the database: "+str(error)) from error
+
+        return StandInConnection(manager.get_database())
+
+class StandInConnection:
+    """
+    This class stands in for a MySQLdb connection.
+
+    Documentation for the constructor for objects of type StandInConnection:
+
+    Args:
+        database (StandInDatabase):     The database, or a proxy for it.
+    """
+
+    def __init__(self, database):
+        """The constructor, as documented above"""
+        self.database = database
+
+    def cursor(self):
+        """
+        This method returns a cursor for the connection.
+        """
+
+        return StandInCursor(self.database)
+
+    def commit(self):
+        """
+        This method does nothing, because every query is committed when it is run.
+        """
+
+    def close(self):
+        """
+        This method does nothing, because there is nothing to close.
+        """
+
+class StandInCursor:
+    """
+    This class stands in for a MySQLdb cursor.
+
+    Documentation for the constructor for objects of type StandInCursor:
+
+    Args:
+        database (StandInDatabase):     The database, or a proxy for it.
+    """
+
+    def __init__(self, database):
+        """The constructor, as documented above"""
+        self.database = database
+        self.rows = []
+
+    def execute(self, query):
+        """
+        This method runs a query.
+        """
+
+        try:
+            self.rows = self.database.execute(query)
+
+        except (EOFError, OSError) as error:
+            raise sqlite3.OperationalError("Lost the database: "+str(error)) from error
+
+    def fetchall(self):
+        """
+        This method returns the rows from the last query.
+        """
+
+        return tuple(self.rows)
+
+    def close(self):
+        """
+        This method does nothing, because there is nothing to close.
+        """
+
+# ---------- SITE PROCESSES ----------
+def run_site(site_id, options, stats_queue):
+    """
+    This function runs a site in a process started by SiteSimulation. It sets up the
+    simulated hardware and database, and then calls main.run() as if the site had
+    been started with "main.py -i <site_id> -t -q".
+
+    Args:
+        site_id (str):              The site ID.
+        options (dict):             The simulation's options - "extra_sites",
+                                    "port_offset", "directory", "db_address",
+                                    "authkey" and "report_interval".
+
+        stats_queue (Queue):        Where to send the site's statistics.
+    """
+
+    #Only stop when the harness asks, not when CTRL-C is pressed in its terminal.
+    os.setpgrp()
+
+    directory = os.path.join(options["directory"], site_id)
+    os.makedirs(os.path.join(directory, "logs"), exist_ok=True)
+    os.chdir(directory)
+
+    output = open("output.txt", "w", encoding="utf-8", buffering=1) #pylint: disable=consider-using-with
+    sys.stdout = sys.stderr = output
+
+    config.TESTING = True
+    localise_settings(options["extra_sites"], options["port_offset"])
+    testingtools.install(build_simulator(site_id))
+
+    #These can only be imported now that we're in testing mode.
+    import main #pylint: disable=import-outside-toplevel
+    from Tools import dbtools #pylint: disable=import-outside-toplevel
+    from Logic import naslogic #pylint: disable=import-outside-toplevel
+
+    dbtools.mysql = StandInMySQL(options["db_address"], options["authkey"])
+
+    #temperature_monitor only exists on the NAS box itself.
+    naslogic.get_temperatures = get_standin_temperatures
+
+    sys.argv = ["main.py", "-i", site_id, "-t", "-q"]
+    main.logger, main.handler = main.init_logging()
+
+    SiteReporter(site_id, stats_queue, options["report_interval"])
+
+    main.run()
+
+def get_standin_temperatures():
+    """
+    This function stands in for naslogic.get_temperatures() in the simulated NAS box.
+
+    Returns:
+        tuple. STANDIN_TEMPERATURES.
+    """
+
+    return STANDIN_TEMPERATURES
+
+class SiteReporter(threading.Thread):
+    """
+    This class starts a thread in each site's process that sends the site's statistics
+    to the harness every report interval. Each report is a dictionary with:
+
+    - "site_id", "pid" and "time".
+    - "readings" - each reading posted on the blackboard since the last report, as
+      (sensor ID, tick, time, time posted).
+    - "sockets" - the get_stats() for each socket.
+    - "db_queue" - the number of queries waiting for the database.
+
+    Documentation for the constructor for objects of type SiteReporter:
+
+    Args:
+        site_id (str):              The site ID.
+        stats_queue (Queue):        Where to send the statistics.
+        interval (float):           How often to send them, in seconds.
+
+    Usage:
+        >>> SiteReporter("G4", <Queue>, 10)
+    """
+
+    def __init__(self, site_id, stats_queue, interval):
+        """The constructor, as documented above"""
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.site_id = site_id
+        self.stats_queue = stats_queue
+        self.interval = interval
+
+        self.start()
+
+    def run(self):
+        """The main body of the thread"""
+        seq = 0
+        readings = []
+        next_report = time.monotonic() + self.interval
+
+        while not config.EXITING:
+            timeout = max(next_report - time.monotonic(), 0)
+
+            if config.LATESTREADINGS.wait_for_change(seq, timeout) != seq:
+                for sensor_id, entry in config.LATESTREADINGS.changed_since(seq).items():
+                    readings.append((sensor_id, entry.reading.get_tick(),
+                                     entry.reading.get_time(), entry.received))
+
+                    seq = max(seq, entry.seq)
+
+            if time.monotonic() >= next_report:
+                self.stats_queue.put(self.get_report(readings))
+                readings = []
+                next_report += self.interval
+
+    def get_report(self, readings):
+        """
+        This method returns a report of the site's statistics, as documented above.
+
+        Args:
+            readings (list):        The readings posted since the last report.
+
+        Returns:
+            dict.       The report.
+        """
+
+        if config.DBCONNECTION is not None:
+            db_queue = len(config.DBCONNECTION.in_queue)
+
+        else:
+            db_queue = 0
+
+        return {"site_id": self.site_id, "pid": os.getpid(), "time": time.time(),
+                "readings": readings, "db_queue": db_queue,
+                "sockets": {_socket.name: _socket.get_stats()
+                            for _socket in list(config.SOCKETSLIST)}}
+
+# ---------- HARNESS ----------
+class SiteSimulation:
+    """
+    This class runs the NAS box and the sites as separate processes, and collects
+    their statistics. See the module documentation.
+
+    Documentation for the constructor for objects of type SiteSimulation:
+
+    Named args:
+        sites[=None] (list<str>):   The sites to run. All of them if None, plus any
+                                    synthetic sites.
+
+        extra_sites[=0] (int):      The number of synthetic sites to add.
+        port_offset[=0] (int):      Added to every site's server port.
+        directory[=None] (str):     Where each site keeps its readings files, logs and
+                                    output. A temporary directory if None.
+
+    Usage:
+        >>> simulation = SiteSimulation(extra_sites=10)
+    """
+
+    def __init__(self, sites=None, extra_sites=0, port_offset=0, directory=None):
+        """The constructor, as documented above"""
+        localise_settings(extra_sites, port_offset)
+
+        if sites is None:
+            sites = list(config.SITE_SETTINGS)
+
+        for site_id in sites:
+            if site_id not in config.SITE_SETTINGS:
+                raise ValueError("Invalid site ID: "+str(site_id))
+
+        if directory is None:
+            directory = tempfile.mkdtemp(prefix="rivercontrolsystem-")
+
+        self.sites = sites
+        self.options = {"extra_sites": extra_sites, "port_offset": port_offset,
+                        "directory": directory, "authkey": os.urandom(16),
+                        "report_interval": REPORT_INTERVAL}
+
+        self.context = multiprocessing.get_context("spawn")
+        self.stats_queue = self.context.Queue()
+        self.server = None
+        self.processes = {}
+
+        self.start_time = None
+
+        #Readings as posted by the sites that took them, keyed by (sensor ID, tick,
+        #time), and as posted by the NAS box and other sites, as (key, site ID, posted).
+        self.originals = {}
+        self.copies = []
+
+        #The latest and busiest socket statistics from each site, and the first and
+        #latest reports, used to work out message rates.
+        self.sockets = {}
+        self.busiest = {}
+        self.db_queues = {}
+        self.first_reports = {}
+        self.last_reports = {}
+
+        #The NAS box's CPU and memory use, as (time, CPU %, RSS in bytes).
+        self.nas_samples = []
+
+    def start(self):
+        """
+        This method starts the shared database and the sites. The NAS box is started
+        first.
+
+        Usage:
+            >>> <SiteSimulation>.start()
+        """
+
+        global DATABASE #pylint: disable=global-statement
+
+        DATABASE = StandInDatabase(list(config.SITE_SETTINGS))
+
+        manager = DatabaseManager(address=("127.0.0.1", 0), authkey=self.options["authkey"])
+
+        self.server = manager.get_server()
+        self.options["db_address"] = self.server.address
+
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.start_time = time.time()
+
+        for site_id in sorted(self.sites, key=lambda site_id: site_id != "NAS"):
+            logger.info("SiteSimulation: Starting "+site_id+"...")
+            print("Starting "+site_id+"...")
+
+            process = self.context.Process(target=run_site, name=site_id,
+                                           args=(site_id, self.options, self.stats_queue))
+
+            process.start()
+            self.processes[site_id] = process
+
+        logger.info("SiteSimulation: Sites are keeping their files in "
+                    + self.options["directory"])
+
+        print("Sites are keeping their files in "+self.options["directory"])
+
+    def update(self):
+        """
+        This method collects any statistics the sites have sent, and samples the NAS
+        box's CPU and memory use. Call it at least every report interval.
+
+        Usage:
+            >>> <SiteSimulation>.update()
+        """
+
+        while True:
+            try:
+                self._add_report(self.stats_queue.get_nowait())
+
+            except queue.Empty:
+                break
+
+        if "NAS" in self.processes and self.processes["NAS"].is_alive():
+            try:
+                process = psutil.Process(self.processes["NAS"].pid)
+                self.nas_samples.append((time.time(), process.cpu_percent(interval=0.5),
+                                         process.memory_info().rss))
+
+            except psutil.Error:
+                pass
+
+    def _add_report(self, report):
+        """
+        PRIVATE, implementation detail.
+
+        Adds a report from one of the sites to the statistics.
+        """
+
+        site_id = report["site_id"]
+
+        for sensor_id, tick, reading_time, posted in report["readings"]:
+            key = (sensor_id, tick, reading_time)
+
+            if sensor_id.split(":")[0] == site_id:
+                self.originals[key] = posted
+
+            else:
+                self.copies.append((key, site_id, posted))
+
+        self.sockets[site_id] = report["sockets"]
+        self.db_queues[site_id] = max(self.db_queues.get(site_id, 0), report["db_queue"])
+
+        busiest = self.busiest.setdefault(site_id, {})
+
+        for stats in report["sockets"].values():
+            for name in ("in_queue", "out_queue", "forward_queue"):
+                busiest[name] = max(busiest.get(name, 0), stats[name])
+
+        self.first_reports.setdefault(site_id, report)
+        self.last_reports[site_id] = report
+
+    def get_report(self):
+        """
+        This method returns a report of the statistics collected so far.
+
+        Returns:
+            dict. With the keys:
+
+            - "duration" - how long the simulation has been running, in seconds.
+            - "sites" and "running" - the number of sites started, and still running.
+            - "latency_to_nas" and "latency_to_sites" - the latency of readings from the
+              site that took them to the NAS box, and to the sites that subscribe to
+              them, in seconds, as from get_latency_stats().
+            - "nas_cpu" and "nas_memory" - the NAS box's mean and peak CPU use in %,
+              and its latest and peak memory use in MB.
+            - "nas_messages" - the rates the NAS box is receiving and sending messages
+              at, per second.
+            - "queues" - the peak in, out and forward queue depths, and the peak
+              database queue depth, at each site.
+            - "database" - the database's statistics.
+
+        Usage:
+            >>> <SiteSimulation>.get_report()
+        """
+
+        to_nas = []
+        to_sites = []
+
+        for key, site_id, posted in self.copies:
+            if key in self.originals:
+                latency = posted - self.originals[key]
+
+                if site_id == "NAS":
+                    to_nas.append(latency)
+
+                else:
+                    to_sites.append(latency)
+
+        report = {"duration": time.time() - self.start_time if self.start_time else 0,
+                  "sites": len(self.processes),
+                  "running": sum(process.is_alive() for process in self.processes.values()),
+                  "latency_to_nas": get_latency_stats(to_nas),
+                  "latency_to_sites": get_latency_stats(to_sites),
+                  "nas_cpu": None, "nas_memory": None, "nas_messages": None,
+                  "queues": {site_id: dict(busiest, db_queue=self.db_queues[site_id])
+                             for site_id, busiest in self.busiest.items()},
+                  "database": DATABASE.get_stats() if DATABASE is not None else None}
+
+        if self.nas_samples:
+            cpu = [sample[1] for sample in self.nas_samples]
+            memory = [sample[2] / 1000000 for sample in self.nas_samples]
+
+            report["nas_cpu"] = (statistics.mean(cpu), max(cpu))
+            report["nas_memory"] = (memory[-1], max(memory))
+
+        if "NAS" in self.first_reports:
+            report["nas_messages"] = self._get_message_rates("NAS")
+
+        return report
+
+    def _get_message_rates(self, site_id):
+        """
+        PRIVATE, implementation detail.
+
+        Returns the rates a site received and sent messages at between its first and
+        latest reports, per second.
+        """
+
+        first = self.first_reports[site_id]
+        last = self.last_reports[site_id]
+
+        elapsed = last["time"] - first["time"]
+
+        if elapsed <= 0:
+            return None
+
+        rates = []
+
+        for name in ("messages_received", "messages_sent"):
+            count = sum(stats[name] for stats in last["sockets"].values()) \
+                    - sum(stats[name] for stats in first["sockets"].values())
+
+            rates.append(count / elapsed)
+
+        return tuple(rates)
+
+    def stop(self):
+        """
+        This method asks each site to tear down, as if CTRL-C had been pressed, and
+        waits for them to exit. The NAS box is stopped last.
+
+        Usage:
+            >>> <SiteSimulation>.stop()
+        """
+
+        self._stop_processes([process for site_id, process in self.processes.items()
+                              if site_id != "NAS"])
+
+        if "NAS" in self.processes:
+            self._stop_processes([self.processes["NAS"]])
+
+        self.update()
+
+        #Stop sharing the database.
+        if self.server is not None:
+            self.server.stop_event.set()
+
+    @classmethod
+    def _stop_processes(cls, processes):
+        """
+        PRIVATE, implementation detail.
+
+        Interrupts the given site processes, and waits for them to exit. A site that
+        is still waiting to start up (eg for the system tick) just stops waiting the
+        first time, so they are interrupted twice, and terminated if that fails.
+        """
+
+        for _ in range(2):
+            processes = [process for process in processes if process.is_alive()]
+
+            for process in processes:
+                logger.info("SiteSimulation: Stopping "+process.name+"...")
+                print("Stopping "+process.name+"...")
+
+                os.kill(process.pid, signal.SIGINT)
+
+            deadline = time.monotonic() + 60
+
+            for process in processes:
+                process.join(max(deadline - time.monotonic(), 0))
+
+        for process in processes:
+            if process.is_alive():
+                logger.error("SiteSimulation: "+process.name+" didn't exit. Terminating it...")
+                print(process.name+" didn't exit. Terminating it...", level="error")
+
+                process.terminate()
+                process.join()
+
+def get_latency_stats(latencies):
+    """
+    This function summarises a list of latencies.
+
+    Args:
+        latencies (list<float>):    The latencies, in seconds.
+
+    Returns:
+        dict.       The "count", "mean", "p50", "p95" and "max" latencies, or just the
+                    count if there are none.
+
+    Usage:
+        >>> get_latency_stats([0.1, 0.2, 0.3])
+        >>> {"count": 3, "mean": 0.2, "p50": 0.2, "p95": 0.3, "max": 0.3}
+    """
+
+    if not latencies:
+        return {"count": 0}
+
+    latencies = sorted(latencies)
+
+    return {"count": len(latencies),
+            "mean": statistics.mean(latencies),
+            "p50": latencies[int(0.5 * (len(latencies) - 1))],
+            "p95": latencies[int(0.95 * (len(latencies) - 1))],
+            "max": latencies[-1]}
+
+def format_report(report):
+    """
+    This function formats a report from SiteSimulation.get_report() to be printed.
+
+    Args:
+        report (dict):              The report.
+
+    Returns:
+        str.        The formatted report.
+
+    Usage:
+        >>> print(format_report(<SiteSimulation>.get_report()))
+    """
+
+    lines = ["After "+str(round(report["duration"]))+" seconds, "+str(report["running"])
+             + " of "+str(report["sites"])+" sites are running."]
+
+    for name, title in (("latency_to_nas", "Latency to NAS box"),
+                        ("latency_to_sites", "Latency to subscribers")):
+
+        stats = report[name]
+
+        if stats["count"]:
+            lines.append(title+": "+", ".join(key+" "+str(round(stats[key] * 1000))+" ms"
+                                              for key in ("mean", "p50", "p95", "max"))
+                         + " ("+str(stats["count"])+" readings)")
+
+        else:
+            lines.append(title+": no readings yet")
+
+    if report["nas_cpu"] is not None:
+        lines.append("NAS box CPU: mean "+str(round(report["nas_cpu"][0], 1))+"%, peak "
+                     + str(round(report["nas_cpu"][1], 1))+"%")
+
+        lines.append("NAS box memory: "+str(round(report["nas_memory"][0], 1))+" MB, peak "
+                     + str(round(report["nas_memory"][1], 1))+" MB")
+
+    if report["nas_messages"] is not None:
+        lines.append("NAS box messages: "+str(round(report["nas_messages"][0], 2))
+                     + " received/s, "+str(round(report["nas_messages"][1], 2))+" sent/s")
+
+    if report["database"] is not None:
+        lines.append("Database: "+str(report["database"]["queries"])+" queries, "
+                     + str(report["database"]["errors"])+" errors")
+
+    lines.append("Peak queue depths (in/out/forward/database):")
+
+    for site_id, queues in sorted(report["queues"].items()):
+        lines.append("    "+site_id+": "+"/".join(str(queues.get(name, 0)) for name in
+                                                  ("in_queue", "out_queue", "forward_queue",
+                                                   "db_queue")))
+
+    return "\n".join(lines)
@@ -39,8 +39,19 @@ between hosts just by specifying the destination, and sending the
 message to another host that is connected directly to the
 destination host.
 
-The forwarding feature is not currently used as of August 2022,
-but it may be useful in the future.
+The forwarding feature is used to push control state changes to the
+pis that own the devices, and to pass on readings to the pis that
+subscribe to them.
+
+Runs of readings waiting to be sent (eg after a reconnection) can be sent
+as one ReadingBatch, and are split back into readings when they arrive.
+Sending batches is off unless config.SEND_READING_BATCHES is set, because
+sites running older versions can't unpickle them.
+
+Readings that arrive for a particular sensor can also be routed to
+their own queue with Sockets.subscribe(), so that each consumer only
+sees its own readings, and isn't held up by anything else on the
+incoming queue.
 
 .. module:: sockettools.py
     :platform: Linux
@@ -51,6 +62,7 @@ but it may be useful in the future.
 """
 
 from collections import deque
+from itertools import islice
 import socket
 import select
 import threading
@@ -63,6 +75,9 @@ import _pickle
 
 import config
 
+from Tools import coretools
+from Tools import clocktools
+from Tools import batchtools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 
 logger = logging.getLogger(__name__)
@@ -81,6 +96,9 @@ def reconfigure_logger():
     for _handler in logging.getLogger('River System Control Software').handlers:
         logger.addHandler(_handler)
 
+#The most readings to send in one batch.
+MAX_BATCH_SIZE = 500
+
 # ---------- Sockets Class ----------
 class Sockets:
     """
@@ -151,6 +169,19 @@ class Sockets:
         self.out_queue = deque()
         self.forward_queue = deque()
 
+        #IntervalWaiters to wake when the incoming queue changes.
+        self.waiters = []
+
+        #ReadingSubscriptions for each sensor ID.
+        self.subscriptions = {}
+
+        #Counts of the messages (each reading in a batch counts as one) and bytes that
+        #have been sent and received, for get_stats().
+        self.messages_sent = 0
+        self.messages_received = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
         #Add this sockets object to the list.
         config.SOCKETSLIST.append(self)
 
@@ -345,6 +376,37 @@ class Sockets:
 
         return self.handler_exited
 
+    def get_stats(self):
+        """
+        This method returns the message counts and queue depths for this socket,
+        eg so message rates can be worked out.
+
+        Returns:
+            dict, with these keys:
+
+                messages_sent:      The number of messages sent. Each reading in a
+                                    batch counts as one message.
+                messages_received:  The number of messages received.
+                bytes_sent:         The number of bytes sent.
+                bytes_received:     The number of bytes received.
+                in_queue:           The number of messages waiting to be read.
+                out_queue:          The number of messages waiting to be sent.
+                forward_queue:      The number of messages waiting to be forwarded.
+
+        Usage:
+
+            >>> get_stats()
+            >>> {"messages_sent": 10, "messages_received": 12, ...}
+        """
+
+        return {"messages_sent": self.messages_sent,
+                "messages_received": self.messages_received,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "in_queue": len(self.in_queue),
+                "out_queue": len(self.out_queue),
+                "forward_queue": len(self.forward_queue)}
+
     # ---------- Controller Functions ----------
     def start_handler(self):
         """
@@ -624,6 +686,87 @@ class Sockets:
 
         self.out_queue.append(data)
 
+    def add_waiter(self, waiter):
+        """
+        This method registers an IntervalWaiter to be woken whenever a message is
+        added to or removed from the incoming queue, so you don't need to poll
+        has_data(). Registering the same waiter again does nothing.
+
+        Args:
+            waiter (IntervalWaiter):    The waiter.
+
+        Usage:
+
+            >>> add_waiter(<IntervalWaiter>)
+        """
+
+        if waiter not in self.waiters:
+            self.waiters.append(waiter)
+
+    def remove_waiter(self, waiter):
+        """
+        This method stops an IntervalWaiter being woken by this socket.
+
+        Args:
+            waiter (IntervalWaiter):    The waiter.
+
+        Usage:
+
+            >>> remove_waiter(<IntervalWaiter>)
+        """
+
+        if waiter in self.waiters:
+            self.waiters.remove(waiter)
+
+    def subscribe(self, sensor_id, callback=None):
+        """
+        This method subscribes to readings for a sensor that arrive on this socket.
+        From now on, they go to the returned subscription rather than the incoming
+        queue.
+
+        Args:
+            sensor_id (str):            The full ID of the sensor, eg "G4:M0".
+
+        Named args:
+            callback[=None] (function): If given, this is called with each reading
+                                        instead of it being queued. It runs in the
+                                        handler thread, so it must be quick.
+
+        Returns:
+            ReadingSubscription.
+
+        Usage:
+
+            >>> subscribe("G4:M0")
+            >>> <ReadingSubscription>
+        """
+
+        subscription = ReadingSubscription(sensor_id, callback)
+        self.subscriptions.setdefault(sensor_id, []).append(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        This method cancels a subscription from subscribe(). Readings for the sensor
+        go to the incoming queue again if there are no other subscriptions for it.
+
+        Args:
+            subscription (ReadingSubscription):     The subscription.
+
+        Usage:
+
+            >>> unsubscribe(<ReadingSubscription>)
+        """
+
+        subscriptions = self.subscriptions.get(subscription.sensor_id, [])
+
+        if subscription in subscriptions:
+            subscriptions.remove(subscription)
+
+        if not subscriptions:
+            self.subscriptions.pop(subscription.sensor_id, None)
+
     def has_data(self):
         """
         This method returns True if there's data on the queue to read, else False.
@@ -679,6 +822,7 @@ class Sockets:
                          + "): Clearing oldest element of IncomingQueue...")
 
             self.in_queue.popleft()
+            self._wake_waiters()
 
     # ---------- Other Functions ----------
     def send_pending_messages(self):
@@ -708,17 +852,32 @@ class Sockets:
                 logger.info("Sockets.send_pending_messages(): ("+self.name
                             + "): Sending data...")
 
+                msg = self.out_queue[0]
+                count = 0
+
+                #Send runs of readings (eg after reconnecting) as one batch, if every
+                #site can unpickle them.
+                if config.SEND_READING_BATCHES:
+                    count = self._count_queued_readings()
+
+                if count > 1:
+                    msg = batchtools.ReadingBatch(islice(self.out_queue, count))
+
                 #Use pickle to serialize everything.
                 #We can easily delimit things with ENDMSG.
-                data = pickle.dumps(self.out_queue[0])
+                data = pickle.dumps(msg)
 
                 self.underlying_socket.sendall(data+b"ENDMSG")
 
-                #Remove the oldest message from message queue.
+                self.messages_sent += max(count, 1)
+                self.bytes_sent += len(data) + 6
+
+                #Remove the oldest message(s) from message queue.
                 logger.debug("Sockets.send_pending_messages(): ("+self.name
                              + "): Clearing front of out_queue...")
 
-                self.out_queue.popleft()
+                for _ in range(max(count, 1)):
+                    self.out_queue.popleft()
 
         except _pickle.PicklingError:
             #Unable to pickle the object!
@@ -741,6 +900,24 @@ class Sockets:
         logger.debug("Sockets.send_pending_messages(): ("+self.name+"): Done.")
         return True
 
+    def _count_queued_readings(self):
+        """
+        Implementation detail.
+
+        Returns the number of Readings at the front of the outgoing queue, up to
+        MAX_BATCH_SIZE.
+        """
+
+        count = 0
+
+        for msg in islice(self.out_queue, MAX_BATCH_SIZE):
+            if not isinstance(msg, coretools.Reading):
+                break
+
+            count += 1
+
+        return count
+
     def forward_messages(self):
         """
         Implementation detail.
@@ -892,13 +1069,53 @@ class Sockets:
         try:
             msg = pickle.loads(obj)
 
-        except (_pickle.UnpicklingError, TypeError, EOFError):
+        except (_pickle.UnpicklingError, TypeError, EOFError, ValueError):
             logger.error("Sockets._process_obj(): ("+self.name
                          + "): Error unpickling data from socket: "+str(obj))
 
             print("Unpickling error ("+self.name+"): "+str(obj), level="error")
             return
 
+        self.bytes_received += len(obj)
+
+        #Batches of readings are handled as if each reading was sent separately.
+        if isinstance(msg, batchtools.ReadingBatch):
+            logger.debug("Sockets._process_obj(): ("+self.name
+                         + "): Received a batch of "+str(len(msg))+" readings")
+
+            self.messages_received += len(msg)
+
+            for reading in msg:
+                self._route_msg(reading)
+
+        else:
+            self.messages_received += 1
+            self._route_msg(msg)
+
+    def _route_msg(self, msg):
+        """
+        Used to push an unpickled message to the right queue.
+
+        Args:
+            msg (Any).          The message.
+        """
+
+        #Readings that other sites subscribe to go to the latest-readings blackboard,
+        #and are forwarded to the subscribers if we're the NAS box.
+        if isinstance(msg, coretools.Reading) and coretools.get_subscribers(msg.get_id()):
+            logger.debug("Sockets._process_obj(): ("+self.name
+                         + "): Forwarding reading for "+msg.get_id()+"...")
+
+            coretools.forward_reading(msg)
+            return
+
+        #Readings that are subscribed to on this socket go to the subscribers' queues.
+        if isinstance(msg, coretools.Reading) and msg.get_id() in self.subscriptions:
+            for subscription in list(self.subscriptions.get(msg.get_id(), [])):
+                subscription.deliver(msg)
+
+            return
+
         if isinstance(msg, str):
             potential_siteid = msg.split(" ")[0].replace("*", "")
 
@@ -924,6 +1141,144 @@ class Sockets:
             else:
                 self.in_queue.append(msg)
 
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        """
+        Used to wake the registered waiters when the incoming queue changes.
+        """
+
+        for waiter in list(self.waiters):
+            waiter.wake()
+
+class ReadingSubscription:
+    """
+    This class holds the readings for one sensor that have arrived on a socket,
+    for one subscriber. Create these with Sockets.subscribe().
+
+    Readings are either passed to the callback as they arrive, or queued so they
+    can be read in the same way as with Sockets (has_data(), read(), and pop()).
+    wait() sleeps until there is a reading to read.
+
+    Documentation for the constructor for objects of type ReadingSubscription:
+
+    Args:
+        sensor_id (str):            The full ID of the sensor, eg "G4:M0".
+
+    Named args:
+        callback[=None] (function): As for Sockets.subscribe().
+
+    Usage:
+        >>> subscription = ReadingSubscription("G4:M0")
+    """
+
+    def __init__(self, sensor_id, callback=None):
+        """The constructor, as documented above."""
+        self.sensor_id = sensor_id
+        self.callback = callback
+
+        self.queue = deque()
+
+        #Woken when a reading is queued.
+        self.waiter = coretools.IntervalWaiter()
+
+    def deliver(self, reading):
+        """
+        This method passes a new reading to the subscriber.
+        Should only be used by Sockets.
+
+        Args:
+            reading (Reading):      The reading.
+
+        Usage:
+
+            >>> deliver(<Reading>)
+        """
+
+        if self.callback is not None:
+            try:
+                self.callback(reading)
+
+            except Exception:
+                logger.error("ReadingSubscription.deliver(): ("+self.sensor_id
+                             + "): Error in callback:\n\n"+str(traceback.format_exc()))
+
+            return
+
+        self.queue.append(reading)
+        self.waiter.wake()
+
+    def has_data(self):
+        """
+        This method returns True if there's a reading to read, else False.
+
+        Usage:
+
+            >>> has_data()
+            >>> True
+        """
+
+        return bool(self.queue)
+
+    def read(self):
+        """
+        This method returns the oldest reading, without removing it.
+
+        Throws:
+            IndexError, if there are no readings to read.
+
+        Returns:
+            Reading.
+
+        Usage:
+
+            >>> read()
+            >>> <Reading>
+        """
+
+        return self.queue[0]
+
+    def pop(self):
+        """
+        This method removes the oldest reading, if there is one.
+
+        Usage:
+
+            >>> pop()
+        """
+
+        if self.queue:
+            self.queue.popleft()
+
+    def wait(self, timeout=None):
+        """
+        This method waits until there is a reading to read, the timeout runs out,
+        or we are exiting.
+
+        Named args:
+            timeout[=None] (float):     The longest to wait, in seconds. Wait until
+                                        there is a reading if None.
+
+        Returns:
+            bool. True if there is a reading to read, else False.
+
+        Usage:
+
+            >>> wait(10)
+            >>> True
+        """
+
+        deadline = None
+
+        if timeout is not None:
+            deadline = clocktools.get_clock().monotonic() + timeout
+
+        while not self.queue and not config.EXITING:
+            if not self.waiter.wait_until(deadline):
+                break
+
+        return bool(self.queue)
+
 class SocketHandlerThread(threading.Thread):
     """
     This is the class that provides our handler thread for
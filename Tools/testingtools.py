@@ -21,6 +21,30 @@ in virtual machines.
 
 The classes in this module override RPi.GPIO and parts of the adafruit_ads1x15.ads1115 module.
 
+On their own, they are simple stubs - inputs are always True, and voltages are always 0.
+If a Simulator is installed with install(), they are backed by it instead, so the
+device classes and management threads can be run realistically off-target, eg to
+benchmark or profile them:
+
+- Water tanks, with levels that change at a set rate, and pumps that fill or empty
+  them when their GPIO pins are set.
+- Hall effect probes, with ADC voltages that follow the level in a tank.
+- Gate valves, with a position potentiometer that moves when the forward and reverse
+  pins are set, and the clutch is engaged.
+- Float switches, with inputs that follow the level in a tank.
+- I2C conversions that take as long as they would on the ADS1115, and can be made
+  to fail.
+
+Changes can be scripted to happen at set times with Simulator.schedule(). The
+simulator uses time.monotonic() by default, but can be given a ManualClock
+instead, so that tests are deterministic.
+
+Usage:
+    >>> simulator = Simulator()
+    >>> tank = WaterTank(simulator, level=500)
+    >>> HallEffectProbeModel(tank, 0x48, (high_limits, low_limits))
+    >>> install(simulator)
+
 .. module:: testingtools.py
     :platform: Linux
     :synopsis: Allows the river control system to be run more easily in virtual machines.
@@ -29,24 +53,58 @@ The classes in this module override RPi.GPIO and parts of the adafruit_ads1x15.a
 
 """
 
+import heapq
+import random
+import threading
+import time
+
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin,unused-import
 
 ads = 0
 
+#The simulator backing the dummy classes, if any.
+SIMULATOR = None
+
+#The voltage on a hall effect probe channel when no sensor is triggered.
+REST_VOLTAGE = 3.0
+
+#The distance between the sensors on a hall effect probe, in mm.
+SENSOR_SPACING = 25
+
+def install(simulator):
+    """
+    This function makes the dummy GPIO and ADS classes use the given simulator.
+
+    Args:
+        simulator (Simulator):      The simulator to use, or None to go back to
+                                    the simple stubs.
+
+    Usage:
+        >>> install(Simulator())
+    """
+
+    global SIMULATOR #pylint: disable=global-statement
+
+    SIMULATOR = simulator
+
 class GPIO:
-    BCM = 0
+    BCM = 11
 
     #Input and output.
-    IN = 0
+    IN = 1
     OUT = 0
 
     #High and low.
-    HIGH = 0
+    HIGH = 1
     LOW = 0
 
     #Falling and rising edges.
-    FALLING = 0
-    RISING = 0
+    FALLING = 32
+    RISING = 31
+
+    @classmethod
+    def setmode(cls, mode):
+        pass
 
     @classmethod
     def setup(cls, pin, mode):
@@ -54,33 +112,760 @@ class GPIO:
 
     @classmethod
     def output(cls, pin, state):
-        pass
+        if SIMULATOR is not None:
+            SIMULATOR.set_output(pin, state)
 
     @classmethod
     def input(cls, pin):
+        if SIMULATOR is not None:
+            return SIMULATOR.get_input(pin)
+
         return True
 
     @classmethod
     def add_event_detect(cls, pin, mode, callback):
-        pass
+        if SIMULATOR is not None:
+            SIMULATOR.add_event_detect(pin, mode, callback)
 
     @classmethod
     def remove_event_detect(cls, pin):
+        if SIMULATOR is not None:
+            SIMULATOR.remove_event_detect(pin)
+
+    @classmethod
+    def cleanup(cls):
         pass
 
 class ADS:
     #Pins.
     P0 = 0
-    P1 = 0
-    P2 = 0
-    P3 = 0
+    P1 = 1
+    P2 = 2
+    P3 = 3
 
     #Voltage.
     voltage = 0
 
     @classmethod
     def ADS1115(cls, i2c, address=None):
-        pass
+        if SIMULATOR is not None:
+            return SimulatedADS1115(address)
+
+        return None
 
 def AnalogIn(ads2, pin):
+    if isinstance(ads2, SimulatedADS1115):
+        return SimulatedAnalogIn(ads2, pin)
+
     return ADS
+
+class SimulatedADS1115:
+    """
+    This class stands in for an ADS1115 chip when a simulator is installed. It
+    holds the settings the ADS1115Backend changes.
+
+    Documentation for the constructor for objects of type SimulatedADS1115:
+
+    Args:
+        address (int):              The address of the chip.
+
+    Usage:
+        >>> chip = SimulatedADS1115(0x48)
+    """
+
+    def __init__(self, address):
+        """The constructor, as documented above"""
+        self.address = address
+        self.gain = 1
+        self.data_rate = 128
+
+class SimulatedAnalogIn:
+    """
+    This class stands in for one channel of an ADS1115 chip when a simulator is
+    installed. Each read of the voltage is a conversion done by the simulator.
+
+    Documentation for the constructor for objects of type SimulatedAnalogIn:
+
+    Args:
+        chip (SimulatedADS1115):    The chip.
+        channel (int):              The channel, 0 to 3.
+
+    Usage:
+        >>> channel = SimulatedAnalogIn(<SimulatedADS1115>, 0)
+    """
+
+    def __init__(self, chip, channel):
+        """The constructor, as documented above"""
+        self.chip = chip
+        self.channel = channel
+
+    @property
+    def voltage(self):
+        """The voltage on the channel, read through the installed simulator."""
+        return SIMULATOR.convert(self.chip.address, self.channel, self.chip.data_rate)
+
+# ---------- SIMULATOR ----------
+class ManualClock:
+    """
+    This class is a clock that only moves when told to, so simulations can be run
+    deterministically. Call it to get the time.
+
+    Documentation for the constructor for objects of type ManualClock:
+
+    Named args:
+        start[=0] (float):          The time to start at, in seconds.
+
+    Usage:
+        >>> clock = ManualClock()
+        >>> clock.advance(5)
+        >>> clock()
+        >>> 5
+    """
+
+    def __init__(self, start=0):
+        """The constructor, as documented above"""
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        """
+        This method moves the clock forward.
+
+        Args:
+            seconds (float):        How far to move it, in seconds.
+
+        Usage:
+            >>> <ManualClock>.advance(0.5)
+        """
+
+        self.now += seconds
+
+class Simulator:
+    """
+    This class simulates the hardware on a pi. See the module documentation.
+
+    The simulation is brought up to date whenever anything is read from it, or
+    when update() is called, so there is no separate thread.
+
+    Documentation for the constructor for objects of type Simulator:
+
+    Named args:
+        clock[=time.monotonic] (function):  Returns the time, in seconds.
+        seed[=0] (int):                     The seed for the noise and random errors.
+
+    Usage:
+        >>> simulator = Simulator()
+        >>> simulator = Simulator(ManualClock(), seed=42)
+    """
+
+    def __init__(self, clock=time.monotonic, seed=0):
+        """The constructor, as documented above"""
+        self.clock = clock
+        self.random = random.Random(seed)
+
+        #Protects everything below.
+        self.lock = threading.RLock()
+
+        self.last_update = clock()
+
+        #True while the simulation is being updated.
+        self.updating = False
+
+        #The models, updated in the order they were added.
+        self.models = []
+
+        #Scripted changes, as (time, order, function).
+        self.events = []
+        self.event_count = 0
+
+        #The state of each output pin, and each input pin with no source.
+        self.outputs = {}
+        self.inputs = {}
+
+        #Functions that return the state of input pins, and the edge callbacks.
+        self.input_sources = {}
+        self.callbacks = {}
+
+        #Voltages (or functions that return them) for each (address, channel).
+        self.voltages = {}
+
+        #I2C timing and errors. If realtime is True, each conversion takes as long
+        #as it would on an ADS1115, plus the bus delay.
+        self.realtime = True
+        self.bus_delay = 0
+        self.failures = {}
+        self.error_rate = 0
+
+        #Each conversion done, as (time, address, channel).
+        self.conversions = []
+
+    # ---------- SCRIPTING ----------
+    def add_model(self, model):
+        """
+        This method adds a model, which will have its step() method called with
+        the time that has passed whenever the simulation is updated.
+
+        Args:
+            model:                  The model.
+
+        Usage:
+            >>> <Simulator>.add_model(<WaterTank>)
+        """
+
+        with self.lock:
+            self.models.append(model)
+
+    def schedule(self, delay, function):
+        """
+        This method schedules a change to the simulation.
+
+        Args:
+            delay (float):          How long from now to make the change, in seconds.
+            function (function):    Called with the simulator to make the change.
+
+        Usage:
+            >>> <Simulator>.schedule(60, lambda simulator: tank.set_rate(-2))
+        """
+
+        with self.lock:
+            self.event_count += 1
+            heapq.heappush(self.events, (self.clock() + delay, self.event_count, function))
+
+    def update(self):
+        """
+        This method brings the simulation up to the current time, running any
+        scheduled changes that are due, and calling any edge callbacks.
+
+        Usage:
+            >>> <Simulator>.update()
+        """
+
+        with self.lock:
+            #Scheduled changes often call methods that update the simulation, but
+            #it is already as up to date as it should be.
+            if self.updating:
+                return
+
+            self.updating = True
+
+            try:
+                now = self.clock()
+
+                #Step to each change that is due, then make it.
+                while self.events and self.events[0][0] <= now:
+                    event_time, _, function = heapq.heappop(self.events)
+                    self._step(event_time)
+                    function(self)
+
+                self._step(now)
+
+            finally:
+                self.updating = False
+
+    def _step(self, now):
+        """
+        PRIVATE, implementation detail.
+
+        Moves the models forward to the given time, and checks the inputs for edges.
+        """
+
+        delta = now - self.last_update
+
+        if delta > 0:
+            for model in self.models:
+                model.step(delta)
+
+            self.last_update = now
+
+        for pin, source in self.input_sources.items():
+            self._set_input(pin, bool(source()))
+
+    # ---------- GPIO ----------
+    def set_output(self, pin, state):
+        """
+        This method sets the state of an output pin. Called by GPIO.output().
+
+        Args:
+            pin (int):              The BCM pin number.
+            state (bool):           The state.
+
+        Usage:
+            >>> <Simulator>.set_output(17, GPIO.HIGH)
+        """
+
+        with self.lock:
+            #Bring everything up to date, so the change takes effect from now.
+            self.update()
+            self.outputs[pin] = bool(state)
+
+    def get_output(self, pin):
+        """
+        This method returns the state of an output pin.
+
+        Args:
+            pin (int):              The BCM pin number.
+
+        Returns:
+            bool. The state, or None if it hasn't been set.
+
+        Usage:
+            >>> <Simulator>.get_output(17)
+            >>> True
+        """
+
+        with self.lock:
+            return self.outputs.get(pin)
+
+    def set_input(self, pin, state):
+        """
+        This method sets the state of an input pin, calling any edge callbacks.
+
+        Args:
+            pin (int):              The BCM pin number.
+            state (bool):           The state.
+
+        Usage:
+            >>> <Simulator>.set_input(15, False)
+        """
+
+        with self.lock:
+            self._set_input(pin, bool(state))
+
+    def add_input_source(self, pin, source):
+        """
+        This method makes an input pin follow a function, eg of a tank level.
+
+        Args:
+            pin (int):              The BCM pin number.
+            source (function):      Returns the state of the pin.
+
+        Usage:
+            >>> <Simulator>.add_input_source(15, lambda: tank.level > 900)
+        """
+
+        with self.lock:
+            self.input_sources[pin] = source
+            self._set_input(pin, bool(source()))
+
+    def get_input(self, pin):
+        """
+        This method returns the state of an input pin. Called by GPIO.input().
+
+        Args:
+            pin (int):              The BCM pin number.
+
+        Returns:
+            bool. The state, True if it hasn't been set.
+
+        Usage:
+            >>> <Simulator>.get_input(15)
+            >>> True
+        """
+
+        with self.lock:
+            self.update()
+            return self.inputs.get(pin, True)
+
+    def add_event_detect(self, pin, edge, callback):
+        """
+        This method registers a callback for edges on an input pin. Called by
+        GPIO.add_event_detect().
+
+        Args:
+            pin (int):              The BCM pin number.
+            edge (int):             GPIO.FALLING or GPIO.RISING.
+            callback (function):    Called with the pin number.
+
+        Usage:
+            >>> <Simulator>.add_event_detect(15, GPIO.FALLING, <function>)
+        """
+
+        with self.lock:
+            self.callbacks[pin] = (edge, callback)
+
+    def remove_event_detect(self, pin):
+        """
+        This method removes the edge callback for a pin. Called by
+        GPIO.remove_event_detect().
+
+        Args:
+            pin (int):              The BCM pin number.
+
+        Usage:
+            >>> <Simulator>.remove_event_detect(15)
+        """
+
+        with self.lock:
+            self.callbacks.pop(pin, None)
+
+    def _set_input(self, pin, state):
+        """
+        PRIVATE, implementation detail.
+
+        Sets an input, and calls its callback if there was a matching edge.
+        """
+
+        old_state = self.inputs.get(pin, True)
+        self.inputs[pin] = state
+
+        if pin in self.callbacks and state != old_state:
+            edge, callback = self.callbacks[pin]
+
+            if edge == (GPIO.RISING if state else GPIO.FALLING):
+                callback(pin)
+
+    # ---------- I2C ----------
+    def set_voltage(self, address, channel, voltage):
+        """
+        This method sets the voltage on an ADC channel.
+
+        Args:
+            address (int):          The address of the chip.
+            channel (int):          The channel, 0 to 3.
+            voltage (float):        The voltage, or a function that returns it.
+
+        Usage:
+            >>> <Simulator>.set_voltage(0x48, 0, 3.3)
+        """
+
+        with self.lock:
+            self.voltages[(address, channel)] = voltage
+
+    def fail(self, address, count=1):
+        """
+        This method makes the next count conversions on a chip fail with OSError.
+        See also error_rate, for random failures.
+
+        Args:
+            address (int):          The address of the chip.
+
+        Named args:
+            count[=1] (int):        The number of conversions that will fail.
+
+        Usage:
+            >>> <Simulator>.fail(0x48)
+        """
+
+        with self.lock:
+            self.failures[address] = self.failures.get(address, 0) + count
+
+    def convert(self, address, channel, data_rate):
+        """
+        This method does a conversion on an ADC channel. Called when the voltage
+        of a SimulatedAnalogIn is read.
+
+        Args:
+            address (int):          The address of the chip.
+            channel (int):          The channel, 0 to 3.
+            data_rate (int):        The data rate, in samples per second.
+
+        Returns:
+            float. The voltage.
+
+        Throws:
+            OSError, if the conversion was made to fail.
+
+        Usage:
+            >>> <Simulator>.convert(0x48, 0, 128)
+            >>> 3.3
+        """
+
+        #Take as long as the real thing, without holding up other threads.
+        if self.realtime:
+            time.sleep((1 / data_rate) + self.bus_delay)
+
+        with self.lock:
+            self.update()
+            self.conversions.append((self.clock(), address, channel))
+
+            if self.failures.get(address, 0) > 0:
+                self.failures[address] -= 1
+                raise OSError("Simulated I2C error for address "+hex(address))
+
+            if self.error_rate and self.random.random() < self.error_rate:
+                raise OSError("Simulated I2C error for address "+hex(address))
+
+            voltage = self.voltages.get((address, channel), 0.0)
+
+            if callable(voltage):
+                voltage = voltage()
+
+            return voltage
+
+# ---------- MODELS ----------
+class WaterTank:
+    """
+    This class models a body of water, such as a butts group or the sump. The level
+    changes at a set rate, plus the rate of any pumps that are on.
+
+    Documentation for the constructor for objects of type WaterTank:
+
+    Args:
+        simulator (Simulator):      The simulator to add the tank to.
+
+    Named args:
+        level[=0] (float):          The starting level, in mm.
+        max_level[=1000] (float):   The highest the level can go, in mm.
+
+    Usage:
+        >>> tank = WaterTank(<Simulator>, level=500)
+    """
+
+    def __init__(self, simulator, level=0, max_level=1000):
+        """The constructor, as documented above"""
+        self.simulator = simulator
+        self.level = level
+        self.max_level = max_level
+
+        #The rate the level changes at with no pumps on, in mm per second.
+        self.rate = 0
+
+        #(pin, rate, on_state) for each pump.
+        self.pumps = []
+
+        simulator.add_model(self)
+
+    def set_level(self, level):
+        """
+        This method sets the level.
+
+        Args:
+            level (float):          The level, in mm.
+
+        Usage:
+            >>> <WaterTank>.set_level(200)
+        """
+
+        with self.simulator.lock:
+            self.simulator.update()
+            self.level = level
+
+    def get_level(self):
+        """
+        This method returns the current level.
+
+        Returns:
+            float. The level, in mm.
+
+        Usage:
+            >>> <WaterTank>.get_level()
+            >>> 500
+        """
+
+        with self.simulator.lock:
+            self.simulator.update()
+            return self.level
+
+    def set_rate(self, rate):
+        """
+        This method sets the rate the level changes at with no pumps on.
+
+        Args:
+            rate (float):           The rate, in mm per second. Negative if the level
+                                    is falling.
+
+        Usage:
+            >>> <WaterTank>.set_rate(-0.5)
+        """
+
+        with self.simulator.lock:
+            self.simulator.update()
+            self.rate = rate
+
+    def add_pump(self, pin, rate, on_state=False):
+        """
+        This method adds a pump (or valve) that changes the level while its GPIO
+        pin is in its on state.
+
+        Args:
+            pin (int):              The BCM pin that controls the pump.
+            rate (float):           The rate the pump changes the level at, in mm per
+                                    second. Negative if it empties the tank.
+
+        Named args:
+            on_state[=False] (bool):    The pin state that turns the pump on. The
+                                        Motor class is active low.
+
+        Usage:
+            >>> <WaterTank>.add_pump(5, -2)
+        """
+
+        with self.simulator.lock:
+            self.pumps.append((pin, rate, on_state))
+
+    def step(self, seconds):
+        """
+        This method moves the model forward. Called by the simulator.
+
+        Args:
+            seconds (float):        The time that has passed.
+        """
+
+        rate = self.rate
+
+        for pin, pump_rate, on_state in self.pumps:
+            if self.simulator.get_output(pin) == on_state:
+                rate += pump_rate
+
+        self.level = min(max(self.level + (rate * seconds), 0), self.max_level)
+
+class HallEffectProbeModel:
+    """
+    This class models a hall effect probe in a water tank, setting the voltages on
+    the four channels of its ADC from the level.
+
+    When the level is within sensor_range mm of a sensor, the channel for that
+    sensor dips so that its compensated voltage is in the middle of the sensor's
+    band. Otherwise, all the channels are at REST_VOLTAGE. Gaussian noise of noise
+    volts is added to each channel.
+
+    Documentation for the constructor for objects of type HallEffectProbeModel:
+
+    Args:
+        tank (WaterTank):           The tank the probe is in.
+        address (int):              The address of the probe's ADC.
+        limits (tuple):             The high limits, and the low limits, as set on
+                                    the HallEffectProbe.
+
+    Usage:
+        >>> HallEffectProbeModel(<WaterTank>, 0x48, (high_limits, low_limits))
+    """
+
+    def __init__(self, tank, address, limits):
+        """The constructor, as documented above"""
+        self.tank = tank
+        self.simulator = tank.simulator
+        self.high_limits, self.low_limits = limits
+
+        self.sensor_range = 5
+        self.noise = 0
+
+        for channel in range(4):
+            self.simulator.set_voltage(address, channel,
+                                       lambda channel=channel: self.get_voltage(channel))
+
+    def get_voltage(self, channel):
+        """
+        This method returns the voltage on a channel for the current level.
+
+        Args:
+            channel (int):          The channel, 0 to 3.
+
+        Returns:
+            float. The voltage.
+
+        Usage:
+            >>> <HallEffectProbeModel>.get_voltage(0)
+            >>> 3.0
+        """
+
+        voltage = REST_VOLTAGE
+
+        #The nearest sensor, and the band and column it is in.
+        sensor = round(self.tank.level / SENSOR_SPACING) * SENSOR_SPACING
+        band = int(sensor // 100)
+        column = int((sensor % 100) // SENSOR_SPACING)
+
+        if abs(self.tank.level - sensor) <= self.sensor_range \
+            and band < len(self.high_limits) and column == channel:
+
+            voltage -= (self.high_limits[band] + self.low_limits[band]) / 2
+
+        if self.noise:
+            voltage += self.simulator.random.gauss(0, self.noise)
+
+        return voltage
+
+class GateValveModel:
+    """
+    This class models a motorised gate valve. While the clutch pin is high, the
+    position moves at rate % per second towards open when the forward pin is high,
+    and towards closed when the reverse pin is high. The position potentiometer is
+    on channel 0 of the valve's ADC. Set stuck to True to simulate a stall.
+
+    Documentation for the constructor for objects of type GateValveModel:
+
+    Args:
+        simulator (Simulator):      The simulator to add the valve to.
+        pins (tuple(int)):          The forward, reverse and clutch pins, as set on
+                                    the GateValve.
+        address (int):              The address of the valve's ADC.
+
+    Usage:
+        >>> valve = GateValveModel(<Simulator>, (17, 27, 19), 0x48)
+    """
+
+    def __init__(self, simulator, pins, address):
+        """The constructor, as documented above"""
+        self.simulator = simulator
+        self.forward_pin, self.reverse_pin, self.clutch_pin = pins
+
+        self.position = 0
+        self.rate = 5
+        self.ref_voltage = 3.3
+        self.stuck = False
+
+        simulator.add_model(self)
+        simulator.set_voltage(address, 0, lambda: self.position / 100 * self.ref_voltage)
+
+    def step(self, seconds):
+        """
+        This method moves the model forward. Called by the simulator.
+
+        Args:
+            seconds (float):        The time that has passed.
+        """
+
+        if self.stuck or not self.simulator.get_output(self.clutch_pin):
+            return
+
+        forward = self.simulator.get_output(self.forward_pin)
+        reverse = self.simulator.get_output(self.reverse_pin)
+
+        if forward and not reverse:
+            self.position = min(self.position + (self.rate * seconds), 100)
+
+        elif reverse and not forward:
+            self.position = max(self.position - (self.rate * seconds), 0)
+
+class FloatSwitchModel:
+    """
+    This class models a float switch in a water tank. Its input is high while
+    the level is at or above the trigger level (or low, if active_state is False).
+
+    Documentation for the constructor for objects of type FloatSwitchModel:
+
+    Args:
+        tank (WaterTank):           The tank the switch is in.
+        pin (int):                  The BCM pin the switch is on.
+        trigger_level (float):      The level the switch triggers at, in mm.
+
+    Usage:
+        >>> FloatSwitchModel(<WaterTank>, 15, 950)
+    """
+
+    def __init__(self, tank, pin, trigger_level):
+        """The constructor, as documented above"""
+        self.tank = tank
+        self.trigger_level = trigger_level
+        self.active_state = True
+
+        tank.simulator.add_input_source(pin, self.get_state)
+
+    def get_state(self):
+        """
+        This method returns the state of the switch's input.
+
+        Returns:
+            bool. The state.
+
+        Usage:
+            >>> <FloatSwitchModel>.get_state()
+            >>> False
+        """
+
+        triggered = self.tank.level >= self.trigger_level
+
+        return triggered if self.active_state else not triggered
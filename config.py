@@ -115,8 +115,10 @@ Socket Numbers where applicable:
 
 Notes:
 
-1.  Remote probes are monitored using the configuration too - the control logic
-for each pi uses the database to query readings for each probe it is interested in.
+1.  Remote probes are monitored using the configuration too - each site lists
+the remote probes its control logic uses under "RemoteSensors", and the NAS box
+forwards fresh readings for them as they arrive. The database is only queried
+when we have no recent reading for a probe.
 
 2.  Any section of the configuration can be empty, for example,
 there are no devices to control at a particular site (like the G4 site).
@@ -169,6 +171,14 @@ SOCKETSLIST = []
 #Current system tick.
 TICK = 0
 
+#Latest control states for this site's devices, as pushed to us by the NAS box.
+#Keyed by sensor ID, with (status, request, locked by) tuples, as get_state() returns.
+CONTROLSTATES = {}
+
+#Blackboard of the latest readings from local probes and the remote probes we subscribe
+#to (see the "RemoteSensors" setting below). Set up below, once Tools has been imported.
+LATESTREADINGS = None
+
 #A strange approach, but it works and means we can import the modules for doc generation
 #without error. It also doesn't relax the checks on our actual deployments.
 if not "TESTING" in globals():
@@ -194,6 +204,27 @@ EXITING = False
 #Signals whether we are in debug mode.
 DEBUG = False
 
+#Whether the monitors should write the binary readings archive as well as the
+#CSV readings files (see Tools/archivetools.py).
+ARCHIVE_READINGS = False
+
+#Whether runs of readings are sent to other sites as one ReadingBatch (see
+#Tools/batchtools.py). Sites running older versions can't unpickle batches, so only
+#turn this on once every site has been updated. Batches are always accepted.
+SEND_READING_BATCHES = False
+
+#The control cycle profiler for this site (see Tools/profilingtools.py). Set up by main.py.
+PROFILER = None
+
+#A warning is logged if the control logic takes longer than this share of the reading
+#interval.
+LOGIC_OVERRUN_SHARE = 0.5
+
+#If set, a Chrome trace of the first TRACE_CYCLES trips around the main loop is
+#written to this file.
+TRACE_FILE = None
+TRACE_CYCLES = 20
+
 #Used to signal pending shutdown, reboot, and update.
 SHUTDOWN = False
 SHUTDOWNALL = False
@@ -205,20 +236,32 @@ UPDATE = False
 #flag must be set up first to prevent issues.
 import Tools #pylint: disable=wrong-import-position
 import Tools.deviceobjects #pylint: disable=wrong-import-position
+import Tools.blackboardtools #pylint: disable=wrong-import-position
 
 import Logic #pylint: disable=wrong-import-position
 
+LATESTREADINGS = Tools.blackboardtools.ReadingsBlackboard()
+
 def reconfigure_logging():
     """
     Causes logging to be reconfigured for any modules imported before the logger was set up.
     """
 
+    Tools.archivetools.reconfigure_logger()
+    Tools.backfilltools.reconfigure_logger()
+    Tools.batchtools.reconfigure_logger()
+    Tools.blackboardtools.reconfigure_logger()
+    Tools.clocktools.reconfigure_logger()
     Tools.coretools.reconfigure_logger()
     Tools.dbtools.reconfigure_logger()
     Tools.devicemanagement.reconfigure_logger()
+    Tools.historytools.reconfigure_logger()
+    Tools.housekeepingtools.reconfigure_logger()
+    Tools.i2ctools.reconfigure_logger()
     Tools.deviceobjects.reconfigure_logger()
     Tools.logiccoretools.reconfigure_logger()
     Tools.monitortools.reconfigure_logger()
+    Tools.profilingtools.reconfigure_logger()
     Tools.sockettools.reconfigure_logger()
     Tools.statetools.reconfigure_logger()
 
@@ -269,6 +312,9 @@ SITE_SETTINGS = {
             "DBHost": "192.168.0.25",
             "DBPort": 3306,
 
+            #Remote probes used by the control logic.
+            "RemoteSensors": ["G4:M0", "G4:FS0"],
+
             #Local probes.
             "Probes":
                 {
@@ -494,6 +540,9 @@ SITE_SETTINGS = {
             "DBHost": "192.168.0.25",
             "DBPort": 3306,
 
+            #Remote probes used by the control logic.
+            "RemoteSensors": ["G6:FS0", "G3:FS0", "G3:FS1", "G3:FS2"],
+
             #Local probes.
             "Probes":
                 {
@@ -574,6 +623,9 @@ SITE_SETTINGS = {
             "DBHost": "192.168.0.25",
             "DBPort": 3306,
 
+            #Remote probes used by the control logic.
+            "RemoteSensors": ["G4:M0", "G4:FS0", "G4:FS1"],
+
             #Local probes.
             "Probes":
                 {
@@ -36,20 +36,22 @@ site.
 
 import sys
 import getopt
-import time
-import datetime
 import logging
 import traceback
 
 import config
 
 from Tools import coretools
+from Tools import clocktools
 from Tools.coretools import rcs_print as print #pylint: disable=redefined-builtin
 from Tools import dbtools
 from Tools import logiccoretools
 from Tools import sockettools
 from Tools import monitortools
 from Tools import loggingtools
+from Tools import housekeepingtools
+from Tools import backfilltools
+from Tools import profilingtools
 
 from Logic import controllogic
 
@@ -95,6 +97,11 @@ def usage():
     print("       -d, --debug                   Enable debug mode")
     print("       -q, --quiet                   Log only warnings, errors, and critical")
     print("                                     errors.\n")
+    print("       -a, --archive                 Write the binary readings archive as well")
+    print("                                     as the CSV readings files.\n")
+    print("       -T <file>, --trace=<file>     Write a Chrome trace of the first few")
+    print("                                     trips around the main loop to <file>.")
+    print("                                     View it in chrome://tracing.\n")
     print("The WMT River Control System is released under the GNU GPL Version 3")
     print("Version: "+config.VERSION+" ("+config.RELEASEDATE+")")
     print("Copyright (C) Wimborne Model Town 2017-2022")
@@ -133,8 +140,9 @@ def handle_cmdline_options():
 
     #Check all cmdline options are valid.
     try:
-        opts = getopt.getopt(sys.argv[1:], "htdqi:",
-                             ["help", "testing", "debug", "quiet", "id="])[0]
+        opts = getopt.getopt(sys.argv[1:], "htdqai:T:",
+                             ["help", "testing", "debug", "quiet", "archive", "id=",
+                              "trace="])[0]
 
     except getopt.GetoptError as err:
         #Invalid option. Show the help message and then exit.
@@ -167,6 +175,12 @@ def handle_cmdline_options():
             logger.setLevel(logging.WARNING)
             handler.setLevel(logging.WARNING)
 
+        elif opt in ["-a", "--archive"]:
+            config.ARCHIVE_READINGS = True
+
+        elif opt in ["-T", "--trace"]:
+            config.TRACE_FILE = arg
+
         elif opt in ["-h", "--help"]:
             usage()
             sys.exit()
@@ -228,34 +242,39 @@ def run():
 
     #Welcome message.
     logger.info("River Control System Version "+config.VERSION+" ("+config.RELEASEDATE+")")
-    logger.info("System Time: "+str(datetime.datetime.now()))
+    logger.info("System Time: "+str(clocktools.get_clock().now()))
     logger.info("System startup sequence initiated.")
 
     print("River Control System Version "+config.VERSION+" ("+config.RELEASEDATE+")")
-    print("System Time:", str(datetime.datetime.now()))
+    print("System Time:", str(clocktools.get_clock().now()))
     print("System startup sequence initiated.")
 
     #Get the default reading interval for this site.
     reading_interval = config.SITE_SETTINGS[site_id]["Default Interval"]
 
-    #Make a readings dictionary for temporary storage for the control logic function.
-    readings = {}
-
     #The NAS box needs more time to stabilise before we continue.
-    #Wait another minute.
-    if site_id == "NAS":
+    #Wait another minute (not needed in test deployments).
+    if site_id == "NAS" and not config.TESTING:
         print("Waiting 1 minute for NAS box to finish booting up (Press CTRL-C to skip)...")
         logger.info("Waiting 1 minute for NAS box to finish booting up (Press CTRL-C to skip)...")
 
         try:
-            time.sleep(60)
+            clocktools.get_clock().sleep(60)
 
         except KeyboardInterrupt:
             print("\nNAS box wait skipped as requested by user.")
             logger.info("NAS box wait skipped as requested by user.")
 
     #Run setup code.
-    nas_socket, monitors, devices, timesync, loadmonitor = do_setup(site_id, reading_interval)
+    nas_socket, monitors, devices, timesync, loadmonitor, housekeeping, backfill = \
+        do_setup(site_id, reading_interval)
+
+    #Time each trip around the main loop.
+    profiler = profilingtools.CycleProfiler(site_id)
+    config.PROFILER = profiler
+
+    if config.TRACE_FILE is not None:
+        profiler.start_trace(config.TRACE_FILE, config.TRACE_CYCLES)
 
     logger.info("Entering main loop...")
     print("Entering main loop...")
@@ -263,24 +282,33 @@ def run():
     #Enter main loop.
     try:
         while not config.EXITING:
+            profiler.start_cycle()
+
             #Initialise the database if needed.
             if not config.DBCONNECTION.initialised() and config.DBCONNECTION.is_ready():
                 config.DBCONNECTION.initialise_db()
 
-            #Check for new readings from all monitors and the database.
-            coretools.get_local_readings(monitors, readings)
+            #Check for new readings from all monitors, and get the latest readings.
+            profiler.start_phase(profilingtools.READINGS)
+            readings = coretools.get_local_readings(monitors)
+            profiler.end_phase()
 
             #Run the control logic for this site.
             if "ControlLogicFunction" in config.SITE_SETTINGS[site_id]:
                 function = getattr(controllogic,
                                    config.SITE_SETTINGS[site_id]["ControlLogicFunction"])
 
+                profiler.start_phase(profilingtools.LOGIC)
                 reading_interval = function(readings, devices, monitors, reading_interval)
+                profiler.end_phase()
 
             #Count down the reading interval.
+            profiler.start_phase(profilingtools.WAIT)
             coretools.wait_for_next_reading_interval(reading_interval, site_id,
                                                      nas_socket)
 
+            profiler.end_cycle(reading_interval)
+
             #Check if shutdown, reboot, or update have been requested.
             #NOTE: config.EXITING is shut if so, ending the main loop.
             #TODO: Disabled as it isn't behaving reliably, uncomment when working.
@@ -291,7 +319,10 @@ def run():
         logger.info("Caught keyboard interrupt. System teardown sequence initiated...")
         print("\nCaught keyboard interrupt. System teardown sequence initiated...")
 
-    do_teardown(devices, monitors, timesync, loadmonitor)
+    #Write the trace now if we're exiting before it was finished.
+    profiler.stop_trace()
+
+    do_teardown(devices, monitors, timesync, loadmonitor, housekeeping, backfill)
 
     #---------- Do shutdown, update and reboot if needed ----------
     #TODO: Disabled as it isn't behaving reliably, uncomment when working.
@@ -320,15 +351,21 @@ def do_setup(site_id, reading_interval):
         1. Socket.                      The socket that connects to the NAS box (or False).
         2. list<BaseMonitorClass>.      A list of all the monitors for this site.
         3. list<BaseDeviceClass>.       A list of all the devices for this site.
-        4. SyncTime.                    The time syncing thread.
+        4. SyncTime.                    The time syncing thread (or None).
         5. MonitorLoad.                 The load monitoring thread.
+        6. Housekeeping.                The housekeeping thread.
+        7. Backfill.                    The database backfill thread.
 
     Usage:
-        >>> nas_socket, monitors, devices, timesync, loadmonitor = do_teardown("G6", 30)
+        >>> nas_socket, monitors, devices, timesync, loadmonitor, housekeeping, backfill = \
+        >>>     do_setup("G6", 30)
 
     """
     #If this isn't the NAS box, start synchronising time with the NAS box.
-    if site_id != "NAS":
+    #Don't change the system time in test deployments.
+    timesync = None
+
+    if site_id != "NAS" and not config.TESTING:
         timesync = coretools.SyncTime(site_id)
 
     #Start monitoring system load.
@@ -378,9 +415,17 @@ def do_setup(site_id, reading_interval):
 
         function()
 
-    return nas_socket, monitors, devices, timesync, loadmonitor
+    #Start compressing and cleaning up old readings and log files.
+    housekeeping = housekeepingtools.Housekeeping(monitors=monitors,
+                                                  handlers=logger.handlers)
+
+    #Start filling any gaps in the database from our readings files.
+    backfill = backfilltools.Backfill(monitors)
 
-def do_teardown(devices, monitors, timesync, loadmonitor):
+    return nas_socket, monitors, devices, timesync, loadmonitor, housekeeping, backfill
+
+def do_teardown(devices, monitors, timesync, loadmonitor, #pylint: disable=too-many-arguments
+                housekeeping, backfill):
     """
     This function tears down the system, performing all tasks needed to get the river
     control system ready to be torn down cleanly. This includes the following tasks:
@@ -388,6 +433,8 @@ def do_teardown(devices, monitors, timesync, loadmonitor):
     - Setting config.EXITING to True to request all river control system threads to stop.
     - Waiting for the timesyncing service to stop.
     - Waiting for the load monitoring service to stop.
+    - Waiting for the housekeeping service to stop.
+    - Waiting for the backfill service to stop.
     - Waiting for the database connection to disconnect.
     - Waiting for all sockets to disconnect.
     - Waiting for any device management threads to stop.
@@ -397,28 +444,42 @@ def do_teardown(devices, monitors, timesync, loadmonitor):
     Args:
         devices (list<BaseDeviceClass>):        A list of all the devices for this site.
         monitors (list<BaseMonitorClass>):      A list of all the monitors for this site.
-        timesync (SyncTime):                    The time syncing thread.
+        timesync (SyncTime):                    The time syncing thread, or None.
         loadmonitor (MonitorLoad):              The load monitoring thread.
+        housekeeping (Housekeeping):            The housekeeping thread.
+        backfill (Backfill):                    The database backfill thread.
 
     Usage:
         >>> do_teardown(list<BaseDeviceClass>, list<BaseMonitorClass>,
-        >>>             <SyncTime<, <MonitorLoad>)
+        >>>             <SyncTime<, <MonitorLoad>, <Housekeeping>, <Backfill>)
 
     """
     #This triggers teardown of everything else - no explicit call to each thread is needed.
     #The rest of the code below simply monitors the progress.
-    config.EXITING = True
+    coretools.request_exit()
 
     #Wait for the timesync service to exit.
-    logger.info("Waiting for timesync service to exit...")
-    print("Waiting for timesync service to exit...")
-    timesync.wait_exit()
+    if timesync is not None:
+        logger.info("Waiting for timesync service to exit...")
+        print("Waiting for timesync service to exit...")
+        timesync.wait_exit()
 
     #Wait for load monitoring service to exit.
     logger.info("Waiting for load monitoring service to exit...")
     print("Waiting for load monitoring service to exit...")
     loadmonitor.wait_exit()
 
+    #Wait for the housekeeping service to exit.
+    logger.info("Waiting for housekeeping service to exit...")
+    print("Waiting for housekeeping service to exit...")
+    housekeeping.wait_exit()
+
+    #Wait for the backfill service to exit. This must be done before the database
+    #connection exits.
+    logger.info("Waiting for backfill service to exit...")
+    print("Waiting for backfill service to exit...")
+    backfill.wait_exit()
+
     #Wait for the database connection to exit.
     logger.info("Waiting for database connection to exit...")
     print("Waiting for database connection to exit...")